@@ -235,7 +235,7 @@ class CautionsAdmin(EnterpriseFilteredAdmin):
         'chauffeur__nom',
         'camion__immatriculation',
     )
-    enterprise_lookup = 'contrat__entreprise'
+    enterprise_lookup = 'entreprise'
 
 
 @admin.register(FraisTrajet)
@@ -244,7 +244,7 @@ class FraisTrajetAdmin(EnterpriseFilteredAdmin):
     search_fields = ('^pk_frais', '^contrat__numero_bl', 'origine', 'destination', '^contrat__camion__immatriculation')
     list_filter = ('type_trajet', 'date_trajet', 'origine', 'destination')
     autocomplete_fields = ('mission', 'contrat')
-    enterprise_lookup = 'mission__contrat__entreprise'
+    enterprise_lookup = 'entreprise'
 
     def get_mission_short(self, obj):
         if obj.mission:
@@ -278,7 +278,7 @@ class MissionAdmin(EnterpriseFilteredAdmin):
     search_fields = ('pk_mission', 'origine', 'destination', 'contrat__pk_contrat')
     list_filter = ('statut', 'origine', 'destination', 'date_depart')
     autocomplete_fields = ('prestation_transport', 'contrat')
-    enterprise_lookup = 'contrat__entreprise'
+    enterprise_lookup = 'entreprise'
 
 
 @admin.register(MissionConteneur)
@@ -287,7 +287,7 @@ class MissionConteneurAdmin(EnterpriseFilteredAdmin):
     search_fields = ('mission__pk_mission', 'conteneur__pk_conteneur')
     list_filter = ('mission', 'conteneur')
     autocomplete_fields = ('mission', 'conteneur')
-    enterprise_lookup = 'mission__contrat__entreprise'
+    enterprise_lookup = 'mission__entreprise'
 
 
 @admin.register(PaiementMission)
@@ -300,7 +300,7 @@ class PaiementMissionAdmin(EnterpriseFilteredAdmin):
     search_fields = ('pk_paiement', 'mission__pk_mission', 'prestation__pk_presta_transport')
     list_filter = ('caution_est_retiree', 'date_paiement', 'mode_paiement')
     autocomplete_fields = ('mission', 'prestation', 'caution')
-    enterprise_lookup = 'mission__contrat__entreprise'
+    enterprise_lookup = 'entreprise'
 
 
 @admin.register(Mecanicien)
@@ -0,0 +1,168 @@
+"""
+Champs à la demande (?fields= / ?expand=)
+=========================================
+
+Chaque serializer de l'API accepte deux paramètres de requête (GET) :
+
+- ``?fields=pk_chauffeur,nom`` : seuls ces champs sont renvoyés ;
+- ``?expand=mission_info`` : renvoie dans les listes les champs coûteux
+  (objets imbriqués) déclarés dans ``Meta.champs_etendus``. Ces champs
+  sont toujours présents sur le détail d'un objet.
+
+Chaque serializer déclare aussi, dans ``Meta.optimisations``, ce qu'il faut
+au queryset pour calculer un champ sans requête par ligne : jointure
+(``joindre``), préchargement (``precharger``) ou annotation (``annoter``).
+La vue n'applique que les optimisations des champs réellement renvoyés :
+une liste coûte un nombre constant de requêtes, et une liste réduite à
+quelques colonnes ne paie pas les jointures des autres.
+
+Usage:
+    class ChauffeurListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+        entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True)
+
+        class Meta:
+            model = Chauffeur
+            fields = ['pk_chauffeur', 'nom', 'entreprise_nom']
+            optimisations = {'entreprise_nom': joindre('entreprise')}
+
+    class ChauffeurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
+        ...
+
+    GET /api/v1/chauffeurs/?fields=pk_chauffeur,nom
+"""
+
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from transport.cles import champ_reference, cles_entieres_actives
+
+
+def _liste_parametre(request, nom):
+    """Valeurs d'un paramètre « a,b,c », None s'il est absent."""
+    valeur = request.query_params.get(nom) if request is not None else None
+    if valeur is None:
+        return None
+    return {champ.strip() for champ in valeur.split(',') if champ.strip()}
+
+
+# ----------------------------------------------------------------------
+# Optimisations déclarées par champ
+# ----------------------------------------------------------------------
+
+def joindre(*relations):
+    """Le champ lit des relations ForeignKey : select_related."""
+    return lambda queryset: queryset.select_related(*relations)
+
+
+def precharger(*lookups):
+    """Le champ lit des relations multiples : prefetch_related."""
+    return lambda queryset: queryset.prefetch_related(*lookups)
+
+
+def annoter(**annotations):
+    """
+    Le champ lit une annotation. Les valeurs sont des fonctions qui
+    construisent l'expression ; une annotation déjà posée par la vue (ex:
+    pour un filtre) n'est pas recalculée.
+    """
+    def appliquer(queryset):
+        manquantes = {
+            nom: expression() for nom, expression in annotations.items()
+            if nom not in queryset.query.annotations
+        }
+        return queryset.annotate(**manquantes) if manquantes else queryset
+    return appliquer
+
+
+# ----------------------------------------------------------------------
+# Relations
+# ----------------------------------------------------------------------
+
+class ReferenceRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Clé étrangère désignée par le slug de l'objet lié (``champ_reference``) :
+    avec CLES_ENTIERES, un contrat, une mission ou un paiement reste désigné
+    par son slug et non par son ``id``. Sinon, identique à
+    PrimaryKeyRelatedField.
+    """
+
+    def use_pk_only_optimization(self):
+        if self.queryset is None:
+            # Lecture seule : modèle lié inconnu, le slug est lu sur l'objet
+            return not cles_entieres_actives()
+        modele = self.queryset.model
+        return champ_reference(modele) == modele._meta.pk.name
+
+    def to_representation(self, value):
+        if self.use_pk_only_optimization():
+            return super().to_representation(value)
+        return getattr(value, champ_reference(type(value)))
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        champ = champ_reference(queryset.model)
+        if champ == queryset.model._meta.pk.name:
+            return super().to_internal_value(data)
+        try:
+            return queryset.get(**{champ: data})
+        except ObjectDoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+# ----------------------------------------------------------------------
+# Serializer
+# ----------------------------------------------------------------------
+
+class ChampsDynamiquesMixin:
+    """Filtre les champs du serializer selon ?fields= et ?expand=."""
+
+    serializer_related_field = ReferenceRelatedField
+
+    def get_fields(self):
+        champs = super().get_fields()
+        # Seul le serializer de la réponse est filtré, pas les imbriqués
+        dans_liste = isinstance(self.parent, serializers.ListSerializer)
+        racine = self.parent is None or (dans_liste and self.parent.parent is None)
+        request = self.context.get('request')
+        if not racine or request is None or request.method not in SAFE_METHODS:
+            return champs
+
+        if dans_liste:
+            etendus = _liste_parametre(request, 'expand') or set()
+            for nom in getattr(self.Meta, 'champs_etendus', ()):
+                if nom not in etendus:
+                    champs.pop(nom, None)
+
+        demandes = _liste_parametre(request, 'fields')
+        if demandes:
+            for nom in list(champs):
+                if nom not in demandes:
+                    del champs[nom]
+        return champs
+
+    def optimiser_queryset(self, queryset):
+        """Applique au queryset les optimisations des champs renvoyés."""
+        optimisations = getattr(self.Meta, 'optimisations', {})
+        for nom in self.fields:
+            if nom in optimisations:
+                queryset = optimisations[nom](queryset)
+        return queryset
+
+
+# ----------------------------------------------------------------------
+# Vue
+# ----------------------------------------------------------------------
+
+class ChampsDynamiquesViewMixin:
+    """Ajoute au queryset filtré les optimisations du serializer de l'action."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer(many=self.action == 'list')
+        serializer = getattr(serializer, 'child', serializer)
+        if isinstance(serializer, ChampsDynamiquesMixin):
+            queryset = serializer.optimiser_queryset(queryset)
+        return queryset
@@ -0,0 +1,144 @@
+"""
+Pagination de l'API
+===================
+
+``PaginationAdaptative`` (pagination par défaut de l'API) garde la
+pagination par numéro de page (``?page=3``) et ajoute deux modes, choisis
+par paramètre de requête :
+
+- ``?pagination=curseur`` : pagination par clé (keyset). Chaque page est
+  lue après la dernière ligne de la précédente, sur le couple
+  (date, clé primaire) déclaré par la vue (``ordre_curseur``) : ni COUNT,
+  ni OFFSET, durée constante quelle que soit la profondeur. La réponse
+  contient ``next`` (URL avec ``?curseur=...``) et ``results`` ; le tri
+  ``?ordering=`` est ignoré dans ce mode.
+- ``?total=false`` : pagination par numéro de page sans COUNT (écrans à
+  défilement infini) ; ``next`` est déterminé en lisant une ligne de plus.
+
+Usage dans une vue:
+    class MissionViewSet(viewsets.ModelViewSet):
+        ordre_curseur = '-date_depart'
+
+    GET /api/missions/?pagination=curseur
+    GET /api/missions/?curseur=WyIyMDI2LTAxLTE1IiwgIm1pcy0uLi4iXQ
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginationAdaptative(PageNumberPagination):
+    """Pagination par page, par curseur (keyset) ou par page sans total."""
+
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    mode_query_param = 'pagination'
+    cursor_query_param = 'curseur'
+    total_query_param = 'total'
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = 'page'
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        ordre = getattr(view, 'ordre_curseur', None)
+        curseur = request.query_params.get(self.cursor_query_param)
+        if ordre and (curseur or request.query_params.get(self.mode_query_param) == 'curseur'):
+            self.mode = 'curseur'
+            return self._paginer_curseur(queryset, ordre, curseur, page_size)
+        if request.query_params.get(self.total_query_param, '').lower() in ('0', 'false', 'non'):
+            self.mode = 'sans_total'
+            return self._paginer_sans_total(queryset, page_size)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'curseur':
+            return Response({'next': self._lien_curseur(), 'results': data})
+        if self.mode == 'sans_total':
+            return Response({'next': self._lien_page(1), 'previous': self._lien_page(-1), 'results': data})
+        return super().get_paginated_response(data)
+
+    # ------------------------------------------------------------------
+    # Curseur (keyset)
+    # ------------------------------------------------------------------
+
+    def _paginer_curseur(self, queryset, ordre, curseur, page_size):
+        champ = ordre.lstrip('-')
+        descendant = ordre.startswith('-')
+        pk = queryset.model._meta.pk.name
+        if curseur:
+            valeur, cle = self._decoder(curseur, queryset.model._meta.get_field(champ), queryset.model._meta.pk)
+            comparaison = 'lt' if descendant else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{champ}__{comparaison}': valeur})
+                | Q(**{champ: valeur, f'{pk}__{comparaison}': cle})
+            )
+        sens = '-' if descendant else ''
+        lignes = list(queryset.order_by(f'{sens}{champ}', f'{sens}{pk}')[:page_size + 1])
+
+        self.curseur_suivant = None
+        if len(lignes) > page_size:
+            dernier = lignes[page_size - 1]
+            self.curseur_suivant = self._encoder(getattr(dernier, champ), dernier.pk)
+        return lignes[:page_size]
+
+    def _encoder(self, valeur, cle):
+        position = json.dumps([valeur.isoformat(), cle])
+        return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+    def _decoder(self, curseur, champ, champ_cle):
+        try:
+            position = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+            valeur, cle = json.loads(position)
+            if isinstance(cle, (list, dict)):
+                raise TypeError(cle)
+            valeur = champ.to_python(valeur)
+            # Clé chaîne (slug) ou entière (CLES_ENTIERES)
+            cle = champ_cle.to_python(cle)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if valeur is None or cle is None:
+            raise NotFound(self.invalid_cursor_message)
+        return valeur, cle
+
+    def _lien_curseur(self):
+        if not self.curseur_suivant:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.curseur_suivant)
+
+    # ------------------------------------------------------------------
+    # Page sans total
+    # ------------------------------------------------------------------
+
+    def _paginer_sans_total(self, queryset, page_size):
+        try:
+            self.numero = int(self.request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        self.numero = max(1, self.numero)
+        debut = (self.numero - 1) * page_size
+        # Une ligne de plus suffit à savoir s'il existe une page suivante
+        lignes = list(queryset[debut:debut + page_size + 1])
+        self.a_suivante = len(lignes) > page_size
+        return lignes[:page_size]
+
+    def _lien_page(self, decalage):
+        numero = self.numero + decalage
+        if (decalage > 0 and not self.a_suivante) or numero < 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if numero == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, numero)
@@ -3,6 +3,7 @@ Serializers pour l'API REST du système de transport.
 Convertit les modèles Django en JSON pour React Native.
 """
 
+from django.db.models import Exists, OuterRef, Prefetch
 from rest_framework import serializers
 
 from transport.models import (
@@ -42,19 +43,25 @@ from transport.models import (
     Notification,
     AuditLog,
 )
+from .champs import ChampsDynamiquesMixin, annoter, joindre, precharger
+
+
+def _en_mission_active(relation):
+    """Annotation : l'objet a une mission 'en cours' (SQL Exists)."""
+    return lambda: Exists(Mission.objects.filter(statut='en cours', **{relation: OuterRef('pk')}))
 
 
 # =============================================================================
 # SERIALIZERS UTILISATEUR & ENTREPRISE
 # =============================================================================
 
-class EntrepriseSerializer(serializers.ModelSerializer):
+class EntrepriseSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Entreprise
         fields = '__all__'
 
 
-class UtilisateurSerializer(serializers.ModelSerializer):
+class UtilisateurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True)
 
     class Meta:
@@ -64,9 +71,10 @@ class UtilisateurSerializer(serializers.ModelSerializer):
             'entreprise', 'entreprise_nom', 'is_active', 'date_joined'
         ]
         read_only_fields = ['pk_utilisateur', 'date_joined']
+        optimisations = {'entreprise_nom': joindre('entreprise')}
 
 
-class UtilisateurCreateSerializer(serializers.ModelSerializer):
+class UtilisateurCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True)
 
@@ -97,16 +105,28 @@ class UtilisateurCreateSerializer(serializers.ModelSerializer):
 # SERIALIZERS PERSONNEL
 # =============================================================================
 
-class ChauffeurSerializer(serializers.ModelSerializer):
+class ChauffeurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True)
     camion_actuel = serializers.SerializerMethodField()
 
     class Meta:
         model = Chauffeur
         fields = '__all__'
+        optimisations = {
+            'entreprise_nom': joindre('entreprise'),
+            'camion_actuel': precharger(Prefetch(
+                'affectation_set',
+                queryset=Affectation.objects.filter(date_fin_affectation__isnull=True).select_related('camion'),
+                to_attr='affectations_actives',
+            )),
+        }
 
     def get_camion_actuel(self, obj):
-        camion = obj.get_camion_actuel()
+        if hasattr(obj, 'affectations_actives'):
+            # Affectations actives préchargées par la vue
+            camion = obj.affectations_actives[0].camion if obj.affectations_actives else None
+        else:
+            camion = obj.get_camion_actuel()
         if camion:
             return {
                 'pk': camion.pk_camion,
@@ -116,7 +136,7 @@ class ChauffeurSerializer(serializers.ModelSerializer):
         return None
 
 
-class ChauffeurListSerializer(serializers.ModelSerializer):
+class ChauffeurListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True, default=None)
     est_affecter = serializers.SerializerMethodField()
@@ -124,6 +144,10 @@ class ChauffeurListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chauffeur
         fields = ['pk_chauffeur', 'nom', 'prenom', 'telephone', 'email', 'est_affecter', 'entreprise_nom']
+        optimisations = {
+            'entreprise_nom': joindre('entreprise'),
+            'est_affecter': annoter(en_mission_active=_en_mission_active('contrat__chauffeur')),
+        }
 
     def get_est_affecter(self, obj):
         # True si le chauffeur a une mission 'en cours' (annotation SQL Exists)
@@ -133,7 +157,7 @@ class ChauffeurListSerializer(serializers.ModelSerializer):
         return obj.est_affecter
 
 
-class ChauffeurCreateSerializer(serializers.ModelSerializer):
+class ChauffeurCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de chauffeur avec valeurs par défaut"""
     est_affecter = serializers.BooleanField(default=False, required=False)
 
@@ -146,13 +170,13 @@ class ChauffeurCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class MecanicienSerializer(serializers.ModelSerializer):
+class MecanicienSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Mecanicien
         fields = '__all__'
 
 
-class MecanicienCreateSerializer(serializers.ModelSerializer):
+class MecanicienCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de mécanicien"""
     class Meta:
         model = Mecanicien
@@ -162,7 +186,7 @@ class MecanicienCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class AffectationSerializer(serializers.ModelSerializer):
+class AffectationSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     chauffeur_nom = serializers.CharField(source='chauffeur.__str__', read_only=True)
     camion_immat = serializers.CharField(source='camion.immatriculation', read_only=True)
     est_active = serializers.SerializerMethodField()
@@ -170,6 +194,10 @@ class AffectationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Affectation
         fields = '__all__'
+        optimisations = {
+            'chauffeur_nom': joindre('chauffeur'),
+            'camion_immat': joindre('camion'),
+        }
 
     def get_est_active(self, obj):
         return obj.date_fin_affectation is None
@@ -179,15 +207,16 @@ class AffectationSerializer(serializers.ModelSerializer):
 # SERIALIZERS VEHICULES
 # =============================================================================
 
-class CamionSerializer(serializers.ModelSerializer):
+class CamionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True)
 
     class Meta:
         model = Camion
         fields = '__all__'
+        optimisations = {'entreprise_nom': joindre('entreprise')}
 
 
-class CamionListSerializer(serializers.ModelSerializer):
+class CamionListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     est_affecter = serializers.SerializerMethodField()
     entreprise_nom = serializers.CharField(source='entreprise.nom', read_only=True, default=None)
@@ -195,6 +224,10 @@ class CamionListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Camion
         fields = ['pk_camion', 'immatriculation', 'modele', 'capacite_tonnes', 'est_affecter', 'entreprise_nom']
+        optimisations = {
+            'entreprise_nom': joindre('entreprise'),
+            'est_affecter': annoter(en_mission_active=_en_mission_active('contrat__camion')),
+        }
 
     def get_est_affecter(self, obj):
         # True si le camion a une mission 'en cours' (annotation SQL Exists)
@@ -203,7 +236,7 @@ class CamionListSerializer(serializers.ModelSerializer):
         return obj.est_affecter
 
 
-class CamionCreateSerializer(serializers.ModelSerializer):
+class CamionCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de camion avec valeurs par défaut"""
     est_affecter = serializers.BooleanField(default=False, required=False)
     capacite_tonnes = serializers.DecimalField(max_digits=5, decimal_places=2, default=0, required=False)
@@ -216,29 +249,33 @@ class CamionCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class CompagnieConteneurSerializer(serializers.ModelSerializer):
+class CompagnieConteneurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = CompagnieConteneur
         fields = '__all__'
 
 
-class CompagnieConteneurCreateSerializer(serializers.ModelSerializer):
+class CompagnieConteneurCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de compagnie conteneur"""
     class Meta:
         model = CompagnieConteneur
         fields = ['nom']
 
 
-class ConteneurSerializer(serializers.ModelSerializer):
+class ConteneurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     compagnie_nom = serializers.CharField(source='compagnie.nom', read_only=True)
     client_nom = serializers.CharField(source='client.nom', read_only=True)
 
     class Meta:
         model = Conteneur
         fields = '__all__'
+        optimisations = {
+            'compagnie_nom': joindre('compagnie'),
+            'client_nom': joindre('client'),
+        }
 
 
-class ConteneurListSerializer(serializers.ModelSerializer):
+class ConteneurListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     compagnie_nom = serializers.CharField(source='compagnie.nom', read_only=True)
     client_nom = serializers.CharField(source='client.nom', read_only=True)
@@ -247,9 +284,14 @@ class ConteneurListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Conteneur
         fields = ['pk_conteneur', 'numero_conteneur', 'type_conteneur', 'poids', 'compagnie_nom', 'client', 'client_nom', 'transitaire', 'transitaire_nom', 'statut']
+        optimisations = {
+            'compagnie_nom': joindre('compagnie'),
+            'client_nom': joindre('client'),
+            'transitaire_nom': joindre('transitaire'),
+        }
 
 
-class ConteneurCreateSerializer(serializers.ModelSerializer):
+class ConteneurCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de conteneur"""
     poids = serializers.DecimalField(max_digits=6, decimal_places=2, default=0, required=False)
 
@@ -261,27 +303,28 @@ class ConteneurCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class FournisseurSerializer(serializers.ModelSerializer):
+class FournisseurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Fournisseur
         fields = '__all__'
 
 
-class PieceRepareeSerializer(serializers.ModelSerializer):
+class PieceRepareeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = PieceReparee
         fields = '__all__'
 
 
-class ReparationMecanicienSerializer(serializers.ModelSerializer):
+class ReparationMecanicienSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     mecanicien_nom = serializers.CharField(source='mecanicien.__str__', read_only=True)
 
     class Meta:
         model = ReparationMecanicien
         fields = '__all__'
+        optimisations = {'mecanicien_nom': joindre('mecanicien')}
 
 
-class ReparationSerializer(serializers.ModelSerializer):
+class ReparationSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     camion_immat = serializers.CharField(source='camion.immatriculation', read_only=True)
     pieces = PieceRepareeSerializer(many=True, read_only=True, source='piecereparee_set')
     mecaniciens = ReparationMecanicienSerializer(many=True, read_only=True, source='reparationmecanicien_set')
@@ -289,19 +332,25 @@ class ReparationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reparation
         fields = '__all__'
+        champs_etendus = ('pieces', 'mecaniciens')
+        optimisations = {
+            'camion_immat': joindre('camion'),
+            'pieces': precharger('piecereparee_set'),
+            'mecaniciens': precharger('reparationmecanicien_set__mecanicien'),
+        }
 
 
 # =============================================================================
 # SERIALIZERS COMMERCIAL
 # =============================================================================
 
-class TransitaireSerializer(serializers.ModelSerializer):
+class TransitaireSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Transitaire
         fields = '__all__'
 
 
-class TransitaireListSerializer(serializers.ModelSerializer):
+class TransitaireListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     commission_taux = serializers.DecimalField(source='commission_percentage', max_digits=5, decimal_places=2, read_only=True)
 
@@ -310,7 +359,7 @@ class TransitaireListSerializer(serializers.ModelSerializer):
         fields = ['pk_transitaire', 'nom', 'telephone', 'email', 'score_fidelite', 'etat_paiement', 'commission_taux']
 
 
-class TransitaireCreateSerializer(serializers.ModelSerializer):
+class TransitaireCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de transitaire"""
     score_fidelite = serializers.IntegerField(default=100, required=False)
     etat_paiement = serializers.CharField(default='bon', required=False)
@@ -325,13 +374,13 @@ class TransitaireCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = '__all__'
 
 
-class ClientCreateSerializer(serializers.ModelSerializer):
+class ClientCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de client avec valeurs par défaut"""
     score_fidelite = serializers.IntegerField(default=100, required=False)
     etat_paiement = serializers.CharField(default='bon', required=False)
@@ -346,7 +395,7 @@ class ClientCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class ClientListSerializer(serializers.ModelSerializer):
+class ClientListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     class Meta:
         model = Client
@@ -357,7 +406,7 @@ class ClientListSerializer(serializers.ModelSerializer):
 # SERIALIZERS CONTRATS & PRESTATIONS
 # =============================================================================
 
-class PrestationDeTransportsSerializer(serializers.ModelSerializer):
+class PrestationDeTransportsSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # Aliases pour compatibilité mobile
     pk_prestation = serializers.CharField(source='pk_presta_transport', read_only=True)
     contrat = serializers.CharField(source='contrat_transport_id', read_only=True, default=None)
@@ -367,9 +416,10 @@ class PrestationDeTransportsSerializer(serializers.ModelSerializer):
     class Meta:
         model = PrestationDeTransports
         fields = '__all__'
+        optimisations = {'contrat_ref': joindre('contrat_transport')}
 
 
-class ContratTransportSerializer(serializers.ModelSerializer):
+class ContratTransportSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     client_nom = serializers.CharField(source='client.nom', read_only=True)
     transitaire_nom = serializers.CharField(source='transitaire.nom', read_only=True)
     chauffeur_nom = serializers.CharField(source='chauffeur.__str__', read_only=True)
@@ -379,9 +429,16 @@ class ContratTransportSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContratTransport
         fields = '__all__'
+        optimisations = {
+            'client_nom': joindre('client'),
+            'transitaire_nom': joindre('transitaire'),
+            'chauffeur_nom': joindre('chauffeur'),
+            'camion_immat': joindre('camion'),
+            'conteneur_numero': joindre('conteneur'),
+        }
 
 
-class ContratTransportCreateSerializer(serializers.ModelSerializer):
+class ContratTransportCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de contrat"""
     avance_transport = serializers.DecimalField(max_digits=12, decimal_places=2, default=0, required=False)
     caution = serializers.DecimalField(max_digits=12, decimal_places=2, default=0, required=False)
@@ -401,7 +458,7 @@ class ContratTransportCreateSerializer(serializers.ModelSerializer):
         ]
 
 
-class ContratTransportListSerializer(serializers.ModelSerializer):
+class ContratTransportListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     client_nom = serializers.CharField(source='client.nom', read_only=True)
     transitaire_nom = serializers.CharField(source='transitaire.nom', read_only=True, default=None)
@@ -414,13 +471,18 @@ class ContratTransportListSerializer(serializers.ModelSerializer):
             'montant_total', 'statut', 'statut_caution', 'client_nom', 'transitaire_nom',
             'lieu_chargement', 'destinataire', 'conteneur_numero',
         ]
+        optimisations = {
+            'client_nom': joindre('client'),
+            'transitaire_nom': joindre('transitaire'),
+            'conteneur_numero': joindre('conteneur'),
+        }
 
 
 # =============================================================================
 # SERIALIZERS MISSIONS
 # =============================================================================
 
-class FraisTrajetSerializer(serializers.ModelSerializer):
+class FraisTrajetSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     camion_immat = serializers.CharField(source='contrat.camion.immatriculation', read_only=True, default=None)
     chauffeur_nom = serializers.SerializerMethodField()
     mission_pk_short = serializers.SerializerMethodField()
@@ -429,6 +491,10 @@ class FraisTrajetSerializer(serializers.ModelSerializer):
     class Meta:
         model = FraisTrajet
         fields = '__all__'
+        optimisations = {
+            'camion_immat': joindre('contrat__camion'),
+            'chauffeur_nom': joindre('contrat__chauffeur'),
+        }
 
     def get_chauffeur_nom(self, obj):
         try:
@@ -440,11 +506,9 @@ class FraisTrajetSerializer(serializers.ModelSerializer):
         return None
 
     def get_mission_pk_short(self, obj):
-        try:
-            if obj.mission:
-                return str(obj.mission.pk_mission)[:20]
-        except Exception:
-            pass
+        # Clé lue sur la ligne : pas de requête sur la mission
+        if obj.mission_id:
+            return str(obj.mission_id)[:20]
         return None
 
     def get_total_frais(self, obj):
@@ -454,15 +518,16 @@ class FraisTrajetSerializer(serializers.ModelSerializer):
             return 0
 
 
-class MissionConteneurSerializer(serializers.ModelSerializer):
+class MissionConteneurSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     conteneur_numero = serializers.CharField(source='conteneur.numero_conteneur', read_only=True)
 
     class Meta:
         model = MissionConteneur
         fields = '__all__'
+        optimisations = {'conteneur_numero': joindre('conteneur')}
 
 
-class MissionSerializer(serializers.ModelSerializer):
+class MissionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     prestation_info = PrestationDeTransportsSerializer(source='prestation_transport', read_only=True)
     conteneurs = MissionConteneurSerializer(many=True, read_only=True, source='missionconteneur_set')
     frais = FraisTrajetSerializer(many=True, read_only=True, source='frais_trajets')
@@ -474,6 +539,18 @@ class MissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mission
         fields = '__all__'
+        champs_etendus = ('prestation_info', 'conteneurs', 'frais')
+        optimisations = {
+            'prestation_info': joindre('prestation_transport__contrat_transport'),
+            'conteneurs': precharger('missionconteneur_set__conteneur'),
+            'frais': precharger(Prefetch(
+                'frais_trajets',
+                queryset=FraisTrajet.objects.select_related('contrat__camion', 'contrat__chauffeur'),
+            )),
+            'chauffeur_nom': joindre('contrat__chauffeur'),
+            'camion_immat': joindre('contrat__camion'),
+            'contrat_numero_bl': joindre('contrat'),
+        }
 
     _STATUT_MAP = {
         'en cours': 'en_cours',
@@ -509,7 +586,7 @@ class MissionSerializer(serializers.ModelSerializer):
         return None
 
 
-class MissionListSerializer(serializers.ModelSerializer):
+class MissionListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     chauffeur_nom = serializers.SerializerMethodField()
     camion_immat = serializers.SerializerMethodField()
@@ -529,6 +606,11 @@ class MissionListSerializer(serializers.ModelSerializer):
             'jours_stationnement_facturables', 'montant_stationnement',
             'contrat_ref',
         ]
+        optimisations = {
+            'chauffeur_nom': joindre('contrat__chauffeur'),
+            'camion_immat': joindre('contrat__camion'),
+            'contrat_ref': joindre('contrat'),
+        }
 
     _STATUT_MAP = {
         'en cours': 'en_cours',
@@ -564,7 +646,7 @@ class MissionListSerializer(serializers.ModelSerializer):
         return None
 
 
-class MissionCreateSerializer(serializers.ModelSerializer):
+class MissionCreateSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour création de mission"""
     class Meta:
         model = Mission
@@ -575,7 +657,7 @@ class MissionCreateSerializer(serializers.ModelSerializer):
 # SERIALIZERS FINANCES
 # =============================================================================
 
-class CautionsSerializer(serializers.ModelSerializer):
+class CautionsSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     conteneur_numero = serializers.CharField(source='conteneur.numero_conteneur', read_only=True)
     client_nom = serializers.CharField(source='client.nom', read_only=True)
     transitaire_nom = serializers.CharField(source='transitaire.nom', read_only=True)
@@ -583,9 +665,14 @@ class CautionsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cautions
         fields = '__all__'
+        optimisations = {
+            'conteneur_numero': joindre('conteneur'),
+            'client_nom': joindre('client'),
+            'transitaire_nom': joindre('transitaire'),
+        }
 
 
-class CautionsListSerializer(serializers.ModelSerializer):
+class CautionsListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     client_nom = serializers.CharField(source='client.nom', read_only=True, default=None)
     conteneur_numero = serializers.CharField(source='conteneur.numero_conteneur', read_only=True, default=None)
@@ -599,6 +686,13 @@ class CautionsListSerializer(serializers.ModelSerializer):
             'pk_caution', 'montant', 'statut', 'montant_rembourser',
             'client_nom', 'conteneur_numero', 'chauffeur_nom', 'camion_immat', 'transitaire_nom',
         ]
+        optimisations = {
+            'client_nom': joindre('client'),
+            'conteneur_numero': joindre('conteneur'),
+            'chauffeur_nom': joindre('chauffeur'),
+            'camion_immat': joindre('camion'),
+            'transitaire_nom': joindre('transitaire'),
+        }
 
     def get_chauffeur_nom(self, obj):
         try:
@@ -609,7 +703,7 @@ class CautionsListSerializer(serializers.ModelSerializer):
         return None
 
 
-class PaiementMissionSerializer(serializers.ModelSerializer):
+class PaiementMissionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     mission_info = MissionListSerializer(source='mission', read_only=True)
     caution_info = CautionsListSerializer(source='caution', read_only=True)
     statut_paiement = serializers.SerializerMethodField()
@@ -617,6 +711,14 @@ class PaiementMissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = PaiementMission
         fields = '__all__'
+        champs_etendus = ('mission_info', 'caution_info')
+        optimisations = {
+            'mission_info': joindre('mission__contrat__chauffeur', 'mission__contrat__camion'),
+            'caution_info': joindre(
+                'caution__client', 'caution__conteneur', 'caution__chauffeur',
+                'caution__camion', 'caution__transitaire',
+            ),
+        }
 
     def get_statut_paiement(self, obj):
         if obj.statut_paiement == 'valide':
@@ -624,7 +726,7 @@ class PaiementMissionSerializer(serializers.ModelSerializer):
         return obj.statut_paiement
 
 
-class PaiementMissionListSerializer(serializers.ModelSerializer):
+class PaiementMissionListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     mission_pk = serializers.CharField(source='mission.pk_mission', read_only=True)
     mission_origine = serializers.CharField(source='mission.origine', read_only=True, default=None)
@@ -639,6 +741,12 @@ class PaiementMissionListSerializer(serializers.ModelSerializer):
             'chauffeur_nom', 'montant_total', 'frais_stationnement',
             'commission_transitaire', 'est_valide', 'statut_paiement', 'date_paiement'
         ]
+        optimisations = {
+            'mission_pk': joindre('mission'),
+            'mission_origine': joindre('mission'),
+            'mission_destination': joindre('mission'),
+            'chauffeur_nom': joindre('mission__contrat__chauffeur'),
+        }
 
     def get_statut_paiement(self, obj):
         if obj.statut_paiement == 'valide':
@@ -659,19 +767,19 @@ class PaiementMissionListSerializer(serializers.ModelSerializer):
 # SERIALIZERS SALAIRES
 # =============================================================================
 
-class PrimeSerializer(serializers.ModelSerializer):
+class PrimeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Prime
         fields = '__all__'
 
 
-class DeductionSerializer(serializers.ModelSerializer):
+class DeductionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Deduction
         fields = '__all__'
 
 
-class SalaireSerializer(serializers.ModelSerializer):
+class SalaireSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     chauffeur_nom = serializers.CharField(source='chauffeur.__str__', read_only=True)
     primes = PrimeSerializer(many=True, read_only=True, source='primes')
     deductions = DeductionSerializer(many=True, read_only=True, source='deductions')
@@ -679,9 +787,15 @@ class SalaireSerializer(serializers.ModelSerializer):
     class Meta:
         model = Salaire
         fields = '__all__'
+        champs_etendus = ('primes', 'deductions')
+        optimisations = {
+            'chauffeur_nom': joindre('chauffeur'),
+            'primes': precharger('primes'),
+            'deductions': precharger('deductions'),
+        }
 
 
-class SalaireListSerializer(serializers.ModelSerializer):
+class SalaireListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     chauffeur_nom = serializers.CharField(source='chauffeur.__str__', read_only=True)
 
@@ -692,26 +806,27 @@ class SalaireListSerializer(serializers.ModelSerializer):
             'salaire_base', 'salaire_net', 'total_primes', 'total_deductions',
             'date_paiement', 'statut',
         ]
+        optimisations = {'chauffeur_nom': joindre('chauffeur')}
 
 
 # =============================================================================
 # SERIALIZERS AUDIT & NOTIFICATIONS
 # =============================================================================
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
 
 
-class NotificationListSerializer(serializers.ModelSerializer):
+class NotificationListSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer allégé pour les listes"""
     class Meta:
         model = Notification
         fields = ['pk_notification', 'message', 'type_notification', 'is_read', 'icon', 'color', 'created_at']
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     utilisateur_nom = serializers.CharField(source='utilisateur.nom_utilisateur', read_only=True)
 
     class Meta:
@@ -722,6 +837,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
             'timestamp', 'ip_address',
         ]
         read_only_fields = fields
+        optimisations = {'utilisateur_nom': joindre('utilisateur')}
 
 
 # =============================================================================
@@ -0,0 +1,239 @@
+"""
+Synchronisation incrémentale (/api/v1/sync/)
+=============================================
+
+Permet à l'application mobile de ne télécharger que ce qui a changé depuis
+sa dernière synchronisation, au lieu de relire toutes les listes :
+
+    GET /api/v1/sync/                    → synchronisation complète
+    GET /api/v1/sync/?since=<cursor>     → changements depuis le curseur
+    GET /api/v1/sync/?since=2026-01-15T08:00:00Z
+
+Réponse:
+    {
+        "cursor": "...",          # à renvoyer dans ?since= au prochain appel
+        "has_more": false,        # true : rappeler immédiatement avec cursor
+        "resync": false,          # true : vider la copie locale avant d'appliquer
+        "changes": {"missions": [...], "paiements": [...]},
+        "deleted": {"missions": ["pk", ...]}
+    }
+
+Le client applique ``deleted`` puis ``changes``. Seuls les flux non vides
+sont présents.
+
+Chaque flux est lu par clé (updated_at, clé primaire), au plus ``limite``
+objets par flux et par appel, jusqu'à un horizon fixé au début de la
+synchronisation : maintenant moins ``SYNC_MARGE_SECONDES``. La marge
+couvre les transactions encore ouvertes dont updated_at est antérieur à
+leur commit. Tant que ``has_more`` est vrai, le curseur garde le même
+horizon ; la synchronisation suivante repart de cet horizon.
+
+Les suppressions sont lues dans ``SuppressionSync``, conservé
+``SYNC_RETENTION_JOURS`` jours : un curseur plus ancien renvoie une
+synchronisation complète avec ``resync: true``.
+"""
+
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+
+from ..cles import champ_reference
+from ..models import (
+    Camion, Cautions, Chauffeur, ContratTransport, Mission, Notification, PaiementMission, SuppressionSync,
+)
+from .serializers import (
+    CamionListSerializer, CautionsListSerializer, ChauffeurListSerializer, ContratTransportListSerializer,
+    MissionListSerializer, NotificationListSerializer, PaiementMissionListSerializer,
+)
+
+
+# (clé de la réponse, modèle, champ de périmètre, serializer, select_related)
+FLUX = [
+    ('contrats', ContratTransport, 'entreprise', ContratTransportListSerializer,
+     ('client', 'transitaire', 'conteneur')),
+    ('missions', Mission, 'entreprise', MissionListSerializer,
+     ('contrat__chauffeur', 'contrat__camion')),
+    ('cautions', Cautions, 'entreprise', CautionsListSerializer,
+     ('client', 'conteneur', 'chauffeur', 'camion', 'transitaire')),
+    ('paiements', PaiementMission, 'entreprise', PaiementMissionListSerializer,
+     ('mission__contrat__chauffeur',)),
+    ('notifications', Notification, 'utilisateur', NotificationListSerializer, ()),
+    ('chauffeurs', Chauffeur, 'entreprise', ChauffeurListSerializer, ('entreprise',)),
+    ('camions', Camion, 'entreprise', CamionListSerializer, ('entreprise',)),
+]
+
+_SUPPRESSIONS = '_suppressions'
+
+LIMITE_DEFAUT = 200
+LIMITE_MAX = 1000
+
+
+def _apres(position, champ_date, champ_cle):
+    """Filtre des lignes strictement après la position (date, clé) ; clé None : après la date."""
+    date, cle = position
+    if cle is None:
+        return Q(**{f'{champ_date}__gt': date})
+    return Q(**{f'{champ_date}__gt': date}) | Q(**{champ_date: date, f'{champ_cle}__gt': cle})
+
+
+class Synchronisation:
+    """Calcule une page de synchronisation pour un utilisateur."""
+
+    def __init__(self, utilisateur, since=None, limite=LIMITE_DEFAUT):
+        self.utilisateur = utilisateur
+        self.perimetres = {'entreprise': utilisateur.entreprise_id, 'utilisateur': utilisateur.pk}
+        self.limite = limite
+        self.resync = False
+        self.positions, self.horizon = self._positions_depart(since)
+
+    # ------------------------------------------------------------------
+    # Curseur
+    # ------------------------------------------------------------------
+
+    def _positions_depart(self, since):
+        """Positions de départ de chaque flux (None : depuis le début) et horizon."""
+        maintenant = timezone.now()
+        horizon = maintenant - timedelta(seconds=getattr(settings, 'SYNC_MARGE_SECONDES', 5))
+        if not since:
+            return self._synchronisation_complete(horizon)
+
+        date = parse_datetime(since)
+        if date is not None:
+            if timezone.is_naive(date):
+                date = timezone.make_aware(date)
+            positions = {cle: (date, None) for cle in self._cles()}
+            etat = {'p': positions}
+        else:
+            etat = self._decoder(since)
+            positions = etat['p']
+
+        # Suppressions purgées depuis : la copie locale ne peut plus être corrigée
+        if positions[_SUPPRESSIONS][0] < maintenant - SuppressionSync.retention():
+            self.resync = True
+            return self._synchronisation_complete(horizon)
+        return positions, etat.get('h', horizon)
+
+    def _synchronisation_complete(self, horizon):
+        # Rien en local : les suppressions antérieures à l'horizon sont sans objet
+        positions = {cle: None for cle, *_ in FLUX}
+        positions[_SUPPRESSIONS] = (horizon, None)
+        return positions, horizon
+
+    def _cles(self):
+        return [cle for cle, *_ in FLUX] + [_SUPPRESSIONS]
+
+    def _encoder(self, positions, horizon=None):
+        etat = {'p': {
+            cle: None if position is None else [position[0].isoformat(), position[1]]
+            for cle, position in positions.items()
+        }}
+        if horizon is not None:
+            etat['h'] = horizon.isoformat()
+        return base64.urlsafe_b64encode(json.dumps(etat).encode()).decode().rstrip('=')
+
+    def _decoder(self, curseur):
+        try:
+            etat = json.loads(base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)))
+            positions = {}
+            for cle in self._cles():
+                position = etat['p'][cle]
+                if position is None:
+                    positions[cle] = None
+                    continue
+                date = parse_datetime(position[0])
+                if date is None:
+                    raise ValueError(position)
+                positions[cle] = (date, position[1])
+            if positions[_SUPPRESSIONS] is None:
+                raise ValueError(etat)
+            horizon = parse_datetime(etat['h']) if 'h' in etat else None
+        except (binascii.Error, ValueError, TypeError, KeyError, IndexError):
+            raise ParseError('Curseur de synchronisation invalide.')
+        resultat = {'p': positions}
+        if horizon is not None:
+            resultat['h'] = horizon
+        return resultat
+
+    # ------------------------------------------------------------------
+    # Lecture des flux
+    # ------------------------------------------------------------------
+
+    def executer(self):
+        changements, suppressions = {}, {}
+        positions_suivantes = {}
+        a_suivre = False
+
+        for cle, model, perimetre, serializer_class, relations in FLUX:
+            lignes, position, reste = self._lire_flux(model, perimetre, relations, self.positions[cle])
+            positions_suivantes[cle] = position
+            a_suivre = a_suivre or reste
+            if lignes:
+                changements[cle] = serializer_class(lignes, many=True).data
+
+        lignes, position, reste = self._lire_suppressions()
+        positions_suivantes[_SUPPRESSIONS] = position
+        a_suivre = a_suivre or reste
+        for cle, pks in lignes.items():
+            suppressions[cle] = pks
+
+        return {
+            'cursor': self._encoder(positions_suivantes, self.horizon if a_suivre else None),
+            'has_more': a_suivre,
+            'resync': self.resync,
+            'changes': changements,
+            'deleted': suppressions,
+        }
+
+    def _lire_flux(self, model, perimetre, relations, position):
+        pk = model._meta.pk.name
+        queryset = model.objects.filter(**{perimetre: self.perimetres[perimetre]}, updated_at__lte=self.horizon)
+        if position is not None:
+            queryset = queryset.filter(_apres(position, 'updated_at', pk))
+        if relations:
+            queryset = queryset.select_related(*relations)
+        lignes = list(queryset.order_by('updated_at', pk)[:self.limite + 1])
+
+        if len(lignes) > self.limite:
+            dernier = lignes[self.limite - 1]
+            return lignes[:self.limite], (dernier.updated_at, dernier.pk), True
+        # Flux épuisé jusqu'à l'horizon
+        return lignes, (self.horizon, None), False
+
+    def _lire_suppressions(self):
+        noms = {model._meta.model_name: (cle, model, perimetre) for cle, model, perimetre, *_ in FLUX}
+        perimetre = Q()
+        for nom, (_, _, champ) in noms.items():
+            perimetre |= Q(modele=nom, **{f'{champ}_id': self.perimetres[champ]})
+
+        queryset = SuppressionSync.objects.filter(perimetre, supprime_le__lte=self.horizon).filter(
+            _apres(self.positions[_SUPPRESSIONS], 'supprime_le', 'id')
+        )
+        lignes = list(queryset.order_by('supprime_le', 'id').values_list('supprime_le', 'id', 'modele', 'objet_pk')[
+            :self.limite + 1
+        ])
+        reste = len(lignes) > self.limite
+        if reste:
+            lignes = lignes[:self.limite]
+            position = (lignes[-1][0], lignes[-1][1])
+        else:
+            position = (self.horizon, None)
+
+        par_modele = {}
+        for _, _, nom, objet_pk in lignes:
+            par_modele.setdefault(nom, set()).add(objet_pk)
+        suppressions = {}
+        for nom, pks in par_modele.items():
+            cle, model, _ = noms[nom]
+            # Objet recréé avec la même clé depuis : il arrive dans changes
+            champ = champ_reference(model)
+            recrees = set(model.objects.filter(**{f'{champ}__in': pks}).values_list(champ, flat=True))
+            if pks - recrees:
+                suppressions[cle] = sorted(pks - recrees)
+        return suppressions, position, reste
@@ -33,6 +33,8 @@ from .views import (
     NotificationViewSet, AuditLogViewSet,
     # Dashboard
     DashboardAPIView,
+    # Synchronisation incrémentale
+    SyncAPIView,
     # Login mobile (sans CSRF)
     LoginAPIView,
 )
@@ -78,6 +80,9 @@ urlpatterns = [
     # Dashboard
     path('dashboard/stats/', DashboardAPIView.as_view(), name='dashboard-stats'),
 
+    # Synchronisation incrémentale (application mobile)
+    path('sync/', SyncAPIView.as_view(), name='sync'),
+
     # Toutes les routes du router
     path('', include(router.urls)),
 ]
@@ -1,6 +1,9 @@
 """
 ViewSets pour l'API REST du système de transport.
 Fournit les endpoints CRUD pour React Native.
+
+Tous les ViewSets acceptent ?fields= et ?expand= ; les jointures et
+préchargements sont ajoutés selon les champs renvoyés (transport.api.champs).
 """
 
 from rest_framework import viewsets, status, filters
@@ -9,7 +12,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.db.models import Sum, Count, Q, Exists, OuterRef
+from django.db.models import Q, Exists, OuterRef
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -58,6 +61,10 @@ from .serializers import (
     # Dashboard
     DashboardStatsSerializer,
 )
+from transport.dashboard_metrics import get_dashboard_metrics
+from transport.context_processors import invalidate_notifications_count
+from .champs import ChampsDynamiquesViewMixin
+from .sync import LIMITE_DEFAUT, LIMITE_MAX, Synchronisation
 
 
 # =============================================================================
@@ -143,7 +150,7 @@ LoginAPIView = login_api_view
 # VIEWSETS UTILISATEUR & ENTREPRISE
 # =============================================================================
 
-class EntrepriseViewSet(viewsets.ModelViewSet):
+class EntrepriseViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les entreprises"""
     serializer_class = EntrepriseSerializer
     permission_classes = [IsAuthenticated]
@@ -158,7 +165,7 @@ class EntrepriseViewSet(viewsets.ModelViewSet):
         return Entreprise.objects.none()
 
 
-class UtilisateurViewSet(viewsets.ModelViewSet):
+class UtilisateurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les utilisateurs"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -187,7 +194,7 @@ class UtilisateurViewSet(viewsets.ModelViewSet):
 # VIEWSETS PERSONNEL
 # =============================================================================
 
-class ChauffeurViewSet(viewsets.ModelViewSet):
+class ChauffeurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les chauffeurs"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -205,20 +212,20 @@ class ChauffeurViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Chauffeur.objects.none()
+        queryset = Chauffeur.objects.filter(entreprise=user.entreprise)
+        est_affecter = self.request.query_params.get('est_affecter')
+        disponible = self.request.query_params.get('disponible')
+        if est_affecter is None and not (disponible and disponible.lower() == 'true'):
+            # Jointures et annotation ajoutées selon les champs renvoyés (Meta.optimisations)
+            return queryset
         # Annotation : en_mission_active = True si le chauffeur a une mission 'en cours'
         en_mission = Mission.objects.filter(
             statut='en cours',
             contrat__chauffeur=OuterRef('pk'),
         )
-        queryset = Chauffeur.objects.filter(
-            entreprise=user.entreprise
-        ).select_related('entreprise').annotate(
-            en_mission_active=Exists(en_mission)
-        )
-        est_affecter = self.request.query_params.get('est_affecter')
+        queryset = queryset.annotate(en_mission_active=Exists(en_mission))
         if est_affecter is not None:
             queryset = queryset.filter(en_mission_active=est_affecter.lower() == 'true')
-        disponible = self.request.query_params.get('disponible')
         if disponible is not None and disponible.lower() == 'true':
             queryset = queryset.filter(en_mission_active=False)
         return queryset
@@ -236,7 +243,7 @@ class ChauffeurViewSet(viewsets.ModelViewSet):
         return Response({'detail': 'Aucun camion affecté'}, status=404)
 
 
-class MecanicienViewSet(viewsets.ModelViewSet):
+class MecanicienViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les mécaniciens"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter]
@@ -254,7 +261,7 @@ class MecanicienViewSet(viewsets.ModelViewSet):
         return Mecanicien.objects.filter(entreprise=user.entreprise)
 
 
-class AffectationViewSet(viewsets.ModelViewSet):
+class AffectationViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les affectations chauffeur-camion"""
     serializer_class = AffectationSerializer
     permission_classes = [IsAuthenticated]
@@ -265,9 +272,7 @@ class AffectationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Affectation.objects.none()
-        queryset = Affectation.objects.filter(
-            chauffeur__entreprise=user.entreprise
-        ).select_related('chauffeur', 'camion')
+        queryset = Affectation.objects.filter(chauffeur__entreprise=user.entreprise)
         actives = self.request.query_params.get('actives')
         if actives and actives.lower() == 'true':
             queryset = queryset.filter(date_fin_affectation__isnull=True)
@@ -285,7 +290,7 @@ class AffectationViewSet(viewsets.ModelViewSet):
 # VIEWSETS VEHICULES
 # =============================================================================
 
-class CamionViewSet(viewsets.ModelViewSet):
+class CamionViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les camions"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -303,20 +308,20 @@ class CamionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Camion.objects.none()
+        queryset = Camion.objects.filter(entreprise=user.entreprise)
+        est_affecter = self.request.query_params.get('est_affecter')
+        disponible = self.request.query_params.get('disponible')
+        if est_affecter is None and not (disponible and disponible.lower() == 'true'):
+            # Jointures et annotation ajoutées selon les champs renvoyés (Meta.optimisations)
+            return queryset
         # Annotation : en_mission_active = True si le camion a une mission 'en cours'
         en_mission = Mission.objects.filter(
             statut='en cours',
             contrat__camion=OuterRef('pk'),
         )
-        queryset = Camion.objects.filter(
-            entreprise=user.entreprise
-        ).select_related('entreprise').annotate(
-            en_mission_active=Exists(en_mission)
-        )
-        est_affecter = self.request.query_params.get('est_affecter')
+        queryset = queryset.annotate(en_mission_active=Exists(en_mission))
         if est_affecter is not None:
             queryset = queryset.filter(en_mission_active=est_affecter.lower() == 'true')
-        disponible = self.request.query_params.get('disponible')
         if disponible is not None and disponible.lower() == 'true':
             queryset = queryset.filter(en_mission_active=False)
         return queryset
@@ -337,7 +342,7 @@ class CamionViewSet(viewsets.ModelViewSet):
         return Response({'detail': 'Aucun chauffeur affecté'}, status=404)
 
 
-class CompagnieConteneurViewSet(viewsets.ModelViewSet):
+class CompagnieConteneurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les compagnies de conteneurs"""
     queryset = CompagnieConteneur.objects.all()
     permission_classes = [IsAuthenticated]
@@ -353,7 +358,7 @@ class CompagnieConteneurViewSet(viewsets.ModelViewSet):
         return CompagnieConteneurSerializer
 
 
-class ConteneurViewSet(viewsets.ModelViewSet):
+class ConteneurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les conteneurs"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -372,9 +377,7 @@ class ConteneurViewSet(viewsets.ModelViewSet):
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Conteneur.objects.none()
         # Conteneur n'a pas de FK entreprise directe — filtrer via ContratTransport
-        queryset = Conteneur.objects.filter(
-            contrattransport__entreprise=user.entreprise
-        ).select_related('compagnie', 'client').distinct()
+        queryset = Conteneur.objects.filter(contrattransport__entreprise=user.entreprise).distinct()
         disponible = self.request.query_params.get('disponible')
         if disponible is not None and disponible.lower() == 'true':
             conteneurs_en_mission = Mission.objects.filter(
@@ -384,7 +387,7 @@ class ConteneurViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class ReparationViewSet(viewsets.ModelViewSet):
+class ReparationViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les réparations"""
     serializer_class = ReparationSerializer
     permission_classes = [IsAuthenticated]
@@ -395,12 +398,10 @@ class ReparationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Reparation.objects.none()
-        return Reparation.objects.filter(
-            camion__entreprise=user.entreprise
-        ).select_related('camion')
+        return Reparation.objects.filter(camion__entreprise=user.entreprise)
 
 
-class FournisseurViewSet(viewsets.ModelViewSet):
+class FournisseurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les fournisseurs"""
     serializer_class = FournisseurSerializer
     permission_classes = [IsAuthenticated]
@@ -418,7 +419,7 @@ class FournisseurViewSet(viewsets.ModelViewSet):
 # VIEWSETS COMMERCIAL
 # =============================================================================
 
-class TransitaireViewSet(viewsets.ModelViewSet):
+class TransitaireViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les transitaires"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -442,7 +443,7 @@ class TransitaireViewSet(viewsets.ModelViewSet):
         serializer.save(entreprise=self.request.user.entreprise)
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les clients"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -470,7 +471,7 @@ class ClientViewSet(viewsets.ModelViewSet):
 # VIEWSETS CONTRATS
 # =============================================================================
 
-class PrestationDeTransportsViewSet(viewsets.ModelViewSet):
+class PrestationDeTransportsViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les prestations de transport"""
     serializer_class = PrestationDeTransportsSerializer
     permission_classes = [IsAuthenticated]
@@ -479,13 +480,14 @@ class PrestationDeTransportsViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return PrestationDeTransports.objects.none()
-        return PrestationDeTransports.objects.filter(
-            contrat_transport__entreprise=user.entreprise
-        ).select_related('contrat_transport')
+        return PrestationDeTransports.objects.filter(contrat_transport__entreprise=user.entreprise)
 
 
-class ContratTransportViewSet(viewsets.ModelViewSet):
+class ContratTransportViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les contrats de transport"""
+    # Le slug désigne l'objet même avec CLES_ENTIERES (voir transport/cles.py)
+    lookup_field = 'pk_contrat'
+    lookup_url_kwarg = 'pk'
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['numero_bl', 'client__nom']
@@ -502,9 +504,7 @@ class ContratTransportViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return ContratTransport.objects.none()
-        queryset = ContratTransport.objects.filter(entreprise=user.entreprise).select_related(
-            'client', 'transitaire', 'chauffeur', 'camion', 'entreprise'
-        )
+        queryset = ContratTransport.objects.filter(entreprise=user.entreprise)
         statut = self.request.query_params.get('statut')
         if statut:
             queryset = queryset.filter(statut=statut)
@@ -623,14 +623,19 @@ class ContratTransportViewSet(viewsets.ModelViewSet):
 # VIEWSETS MISSIONS
 # =============================================================================
 
-class MissionViewSet(viewsets.ModelViewSet):
+class MissionViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les missions"""
+    # Le slug désigne l'objet même avec CLES_ENTIERES (voir transport/cles.py)
+    lookup_field = 'pk_mission'
+    lookup_url_kwarg = 'pk'
     queryset = Mission.objects.none()
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['pk_mission']
     ordering_fields = ['date_depart', 'date_retour', 'statut']
     ordering = ['-date_depart']
+    # ?pagination=curseur : pages lues sur l'index (entreprise, date_depart, pk)
+    ordre_curseur = '-date_depart'
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -643,9 +648,7 @@ class MissionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Mission.objects.none()
-        queryset = Mission.objects.filter(
-            contrat__entreprise=user.entreprise
-        ).select_related('prestation_transport', 'contrat', 'contrat__chauffeur', 'contrat__camion')
+        queryset = Mission.objects.filter(entreprise=user.entreprise)
         statut = self.request.query_params.get('statut')
         if statut:
             queryset = queryset.filter(statut=statut)
@@ -737,7 +740,7 @@ class MissionViewSet(viewsets.ModelViewSet):
         }, status=400)
 
 
-class MissionConteneurViewSet(viewsets.ModelViewSet):
+class MissionConteneurViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les conteneurs de mission"""
     serializer_class = MissionConteneurSerializer
     permission_classes = [IsAuthenticated]
@@ -746,12 +749,10 @@ class MissionConteneurViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return MissionConteneur.objects.none()
-        return MissionConteneur.objects.filter(
-            mission__contrat__entreprise=user.entreprise
-        ).select_related('mission', 'conteneur')
+        return MissionConteneur.objects.filter(mission__entreprise=user.entreprise)
 
 
-class FraisTrajetViewSet(viewsets.ModelViewSet):
+class FraisTrajetViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les frais de trajet"""
     serializer_class = FraisTrajetSerializer
     permission_classes = [IsAuthenticated]
@@ -760,16 +761,14 @@ class FraisTrajetViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return FraisTrajet.objects.none()
-        return FraisTrajet.objects.filter(
-            contrat__entreprise=user.entreprise
-        ).select_related('mission', 'contrat')
+        return FraisTrajet.objects.filter(entreprise=user.entreprise)
 
 
 # =============================================================================
 # VIEWSETS FINANCES
 # =============================================================================
 
-class CautionsViewSet(viewsets.ModelViewSet):
+class CautionsViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les cautions"""
     queryset = Cautions.objects.none()
     permission_classes = [IsAuthenticated]
@@ -785,21 +784,23 @@ class CautionsViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Cautions.objects.none()
-        queryset = Cautions.objects.filter(
-            contrat__entreprise=user.entreprise
-        ).select_related('conteneur', 'contrat', 'transitaire', 'client', 'chauffeur', 'camion')
+        queryset = Cautions.objects.filter(entreprise=user.entreprise)
         statut = self.request.query_params.get('statut')
         if statut:
             queryset = queryset.filter(statut=statut)
         return queryset
 
 
-class PaiementMissionViewSet(viewsets.ModelViewSet):
+class PaiementMissionViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les paiements de mission"""
+    # Le slug désigne l'objet même avec CLES_ENTIERES (voir transport/cles.py)
+    lookup_field = 'pk_paiement'
+    lookup_url_kwarg = 'pk'
     queryset = PaiementMission.objects.none()
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['date_paiement', 'montant_total']
+    ordre_curseur = '-date_paiement'
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -810,9 +811,7 @@ class PaiementMissionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return PaiementMission.objects.none()
-        queryset = PaiementMission.objects.filter(
-            mission__contrat__entreprise=user.entreprise
-        ).select_related('mission', 'caution', 'prestation')
+        queryset = PaiementMission.objects.filter(entreprise=user.entreprise)
         est_valide = self.request.query_params.get('est_valide')
         if est_valide is not None:
             queryset = queryset.filter(est_valide=est_valide.lower() == 'true')
@@ -833,7 +832,7 @@ class PaiementMissionViewSet(viewsets.ModelViewSet):
 # VIEWSETS SALAIRES
 # =============================================================================
 
-class SalaireViewSet(viewsets.ModelViewSet):
+class SalaireViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les salaires"""
     queryset = Salaire.objects.none()
     permission_classes = [IsAuthenticated]
@@ -849,9 +848,7 @@ class SalaireViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Salaire.objects.none()
-        queryset = Salaire.objects.filter(
-            chauffeur__entreprise=user.entreprise
-        ).select_related('chauffeur')
+        queryset = Salaire.objects.filter(chauffeur__entreprise=user.entreprise)
         chauffeur = self.request.query_params.get('chauffeur')
         if chauffeur:
             queryset = queryset.filter(chauffeur__pk_chauffeur=chauffeur)
@@ -861,7 +858,7 @@ class SalaireViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class PrimeViewSet(viewsets.ModelViewSet):
+class PrimeViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les primes"""
     serializer_class = PrimeSerializer
     permission_classes = [IsAuthenticated]
@@ -870,12 +867,10 @@ class PrimeViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Prime.objects.none()
-        return Prime.objects.filter(
-            salaire__chauffeur__entreprise=user.entreprise
-        ).select_related('salaire')
+        return Prime.objects.filter(salaire__chauffeur__entreprise=user.entreprise)
 
 
-class DeductionViewSet(viewsets.ModelViewSet):
+class DeductionViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les déductions"""
     serializer_class = DeductionSerializer
     permission_classes = [IsAuthenticated]
@@ -884,21 +879,20 @@ class DeductionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Deduction.objects.none()
-        return Deduction.objects.filter(
-            salaire__chauffeur__entreprise=user.entreprise
-        ).select_related('salaire')
+        return Deduction.objects.filter(salaire__chauffeur__entreprise=user.entreprise)
 
 
 # =============================================================================
 # VIEWSETS AUDIT & NOTIFICATIONS
 # =============================================================================
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ChampsDynamiquesViewMixin, viewsets.ModelViewSet):
     """API endpoint pour les notifications"""
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    ordre_curseur = '-created_at'
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -914,7 +908,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Marque toutes les notifications comme lues"""
         Notification.objects.filter(
             utilisateur=request.user, is_read=False
-        ).update(is_read=True)
+        ).update(is_read=True, updated_at=timezone.now())
+        # update() ne déclenche pas les signaux
+        invalidate_notifications_count(request.user.pk)
         return Response({'status': 'Toutes les notifications marquées comme lues'})
 
     @action(detail=True, methods=['post'])
@@ -934,7 +930,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Response({'count': count})
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(ChampsDynamiquesViewMixin, viewsets.ReadOnlyModelViewSet):
     """API endpoint pour les logs d'audit (lecture seule)"""
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
@@ -942,14 +938,13 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['action', 'model_name']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    ordre_curseur = '-timestamp'
 
     def get_queryset(self):
         user = self.request.user
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return AuditLog.objects.none()
-        return AuditLog.objects.filter(
-            utilisateur__entreprise=user.entreprise
-        ).select_related('utilisateur')
+        return AuditLog.objects.filter(utilisateur__entreprise=user.entreprise)
 
 
 # =============================================================================
@@ -965,137 +960,36 @@ class DashboardAPIView(APIView):
         if not (hasattr(user, 'entreprise') and user.entreprise):
             return Response({}, status=status.HTTP_403_FORBIDDEN)
 
-        entreprise = user.entreprise
-
-        # Missions
-        total_missions = Mission.objects.filter(contrat__entreprise=entreprise).count()
-        missions_en_cours = Mission.objects.filter(contrat__entreprise=entreprise, statut='en cours').count()
-        missions_terminees = Mission.objects.filter(contrat__entreprise=entreprise, statut='terminée').count()
-
-        # Paiements
-        paiements = PaiementMission.objects.filter(
-            mission__contrat__entreprise=entreprise
-        ).aggregate(
-            total=Sum('montant_total'),
-            en_attente=Count('pk_paiement', filter=Q(est_valide=False))
-        )
-
-        # Cautions
-        cautions = Cautions.objects.filter(
-            contrat__entreprise=entreprise
-        ).aggregate(
-            total=Sum('montant'),
-            bloquees=Count('pk_caution', filter=Q(statut='bloquee'))
-        )
-
-        today = timezone.now().date()
-
-        # Missions ce mois
-        this_month_start = today.replace(day=1)
-        missions_ce_mois = Mission.objects.filter(
-            contrat__entreprise=entreprise,
-            date_depart__gte=this_month_start,
-        ).count()
-
-        # Revenus ce mois (paiements validés)
-        revenus_ce_mois = PaiementMission.objects.filter(
-            mission__contrat__entreprise=entreprise,
-            date_paiement__gte=this_month_start,
-            est_valide=True,
-        ).aggregate(total=Sum('montant_total'))['total'] or 0
-
-        # Chauffeurs — affectés = ont une mission 'en cours'
-        total_chauffeurs = Chauffeur.objects.filter(entreprise=entreprise).count()
-        chauffeurs_affectes = Chauffeur.objects.filter(
-            entreprise=entreprise,
-            contrattransport__mission__statut='en cours',
-        ).distinct().count()
-        chauffeurs_disponibles = total_chauffeurs - chauffeurs_affectes
-
-        # Camions — affectés = ont une mission 'en cours'
-        total_camions = Camion.objects.filter(entreprise=entreprise).count()
-        camions_affectes = Camion.objects.filter(
-            entreprise=entreprise,
-            contrattransport__mission__statut='en cours',
-        ).distinct().count()
-        camions_disponibles = total_camions - camions_affectes
-
-        # Réparations
-        total_reparations = Reparation.objects.filter(camion__entreprise=entreprise).count()
-        reparations_en_cours = Reparation.objects.filter(
-            camion__entreprise=entreprise,
-            date_reparation__gte=this_month_start,
-        ).count()
+        metrics = get_dashboard_metrics(user.entreprise)
+        data = metrics.as_api_dict()
 
-        # Contrats
-        total_contrats = ContratTransport.objects.filter(entreprise=entreprise).count()
-        contrats_actifs = ContratTransport.objects.filter(entreprise=entreprise, statut='actif').count()
+        serializer = DashboardStatsSerializer(data)
+        return Response(serializer.data)
 
-        # Clients
-        total_clients = Client.objects.filter(entreprise=entreprise).count()
 
-        # Paiements validés
-        paiements_valides = PaiementMission.objects.filter(
-            mission__contrat__entreprise=entreprise,
-            est_valide=True,
-        ).count()
+# =============================================================================
+# API SYNCHRONISATION INCRÉMENTALE
+# =============================================================================
 
-        # Chiffre d'affaires = somme de tous les montants contractuels
-        chiffre_affaires = ContratTransport.objects.filter(
-            entreprise=entreprise,
-        ).aggregate(total=Sum('montant_total'))['total'] or 0
+class SyncAPIView(APIView):
+    """
+    Changements et suppressions depuis la dernière synchronisation
+    (voir transport.api.sync).
 
-        # Salaires en attente (statut brouillon)
-        salaires_en_attente = Salaire.objects.filter(
-            chauffeur__entreprise=entreprise,
-            statut='brouillon',
-        ).count()
+    GET /api/v1/sync/?since=<cursor>&limite=200
+    """
+    permission_classes = [IsAuthenticated]
 
-        # Missions en retard (en cours mais date_retour dépassée)
-        missions_en_retard = Mission.objects.filter(
-            contrat__entreprise=entreprise,
-            statut='en cours',
-            date_retour__lt=today,
-        ).count()
+    def get(self, request):
+        user = request.user
+        if not (hasattr(user, 'entreprise') and user.entreprise):
+            return Response({}, status=status.HTTP_403_FORBIDDEN)
 
-        # Missions en stationnement actif
-        stationnement_qs = Mission.objects.filter(
-            contrat__entreprise=entreprise,
-            statut_stationnement='en_stationnement',
-        )
-        conteneurs_frais_stationnement = stationnement_qs.count()
-        total_frais_stationnement = stationnement_qs.aggregate(
-            total=Sum('montant_stationnement')
-        )['total'] or 0
-
-        data = {
-            'total_missions': total_missions,
-            'missions_en_cours': missions_en_cours,
-            'missions_terminees': missions_terminees,
-            'missions_ce_mois': missions_ce_mois,
-            'total_paiements': paiements['total'] or 0,
-            'paiements_en_attente': paiements['en_attente'] or 0,
-            'paiements_valides': paiements_valides,
-            'revenus_ce_mois': revenus_ce_mois,
-            'chiffre_affaires': chiffre_affaires,
-            'total_cautions': cautions['total'] or 0,
-            'cautions_bloquees': cautions['bloquees'] or 0,
-            'total_chauffeurs': total_chauffeurs,
-            'chauffeurs_affectes': chauffeurs_affectes,
-            'chauffeurs_disponibles': chauffeurs_disponibles,
-            'total_camions': total_camions,
-            'camions_affectes': camions_affectes,
-            'camions_disponibles': camions_disponibles,
-            'reparations_en_cours': reparations_en_cours,
-            'total_reparations': total_reparations,
-            'total_contrats': total_contrats,
-            'contrats_actifs': contrats_actifs,
-            'total_clients': total_clients,
-            'salaires_en_attente': salaires_en_attente,
-            'missions_en_retard': missions_en_retard,
-            'conteneurs_frais_stationnement': conteneurs_frais_stationnement,
-            'total_frais_stationnement': total_frais_stationnement,
-        }
+        try:
+            limite = int(request.query_params.get('limite', LIMITE_DEFAUT))
+        except ValueError:
+            return Response({'error': 'limite doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+        limite = min(max(1, limite), LIMITE_MAX)
 
-        serializer = DashboardStatsSerializer(data)
-        return Response(serializer.data)
+        synchronisation = Synchronisation(user, since=request.query_params.get('since'), limite=limite)
+        return Response(synchronisation.executer())
@@ -8,3 +8,7 @@ class TransportConfig(AppConfig):
     def ready(self):
         """Importer les signaux au démarrage de l'application"""
         import transport.signals  # noqa
+        from django.core import checks
+        from transport.cles import verifier_mode_cles
+
+        checks.register(verifier_mode_cles, checks.Tags.database)
@@ -0,0 +1,293 @@
+"""
+Archivage du journal d'audit
+============================
+
+Les entrées d'audit plus anciennes que la durée de conservation sont
+déplacées, mois par mois, dans des fichiers JSON Lines compressés :
+
+    MEDIA_ROOT/audit_archives/2025-03.jsonl.gz
+
+Chaque lot (``AUDIT_ARCHIVE_LOT`` entrées) est ajouté au fichier du mois
+(un membre gzip par lot, fsync), puis supprimé de la base dans une
+transaction courte qui met aussi à jour le résumé mensuel
+(``AuditMensuel``) : le journal n'est jamais verrouillé longtemps, et un
+archivage interrompu reprend là où il s'est arrêté. Une interruption entre
+l'écriture d'un lot et sa suppression laisse ce lot en double dans
+l'archive ; la lecture dédoublonne par clé. Un arrêt brutal pendant
+l'écriture laisse un membre incomplet en fin de fichier : il est coupé
+avant l'ajout du lot suivant (ses entrées sont encore en base), et la
+lecture saute toute zone illisible pour reprendre au membre suivant.
+
+La durée de conservation se compte en mois entiers : avec 12 mois, le
+1er mars 2026, les mois antérieurs à mars 2025 sont archivés.
+
+Usage:
+    from transport.audit_archive import archiver, rechercher
+
+    archiver(mois_conserves=12)
+    for entree in rechercher(date(2025, 1, 1), date(2025, 3, 1), action='DELETE'):
+        ...
+
+Commandes: ``archiver_audit`` (cron) et ``rechercher_audit_archive``.
+"""
+
+import gzip
+import json
+import logging
+import mmap
+import os
+import zlib
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .audit_buffer import CHAMPS_SECOURS
+from .models import AuditCompteurJour, AuditLog, AuditMensuel
+
+logger = logging.getLogger(__name__)
+
+# Mêmes colonnes que le fichier de secours de transport.audit_buffer
+CHAMPS_ARCHIVE = CHAMPS_SECOURS
+
+# En-tête d'un membre gzip (magic + méthode deflate)
+ENTETE_GZIP = b'\x1f\x8b\x08'
+TAILLE_BLOC = 64 * 1024
+
+
+def repertoire_archives():
+    return os.path.join(settings.MEDIA_ROOT, 'audit_archives')
+
+
+def chemin_archive(mois):
+    return os.path.join(repertoire_archives(), f'{mois:%Y-%m}.jsonl.gz')
+
+
+def decaler_mois(mois, decalage):
+    """Premier jour du mois situé ``decalage`` mois avant (négatif) ou après."""
+    index = mois.year * 12 + mois.month - 1 + decalage
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def limite_conservation(mois_conserves):
+    """Premier mois conservé en base : les mois antérieurs sont archivables."""
+    return decaler_mois(AuditMensuel.mois_de(timezone.now()), -mois_conserves)
+
+
+# ----------------------------------------------------------------------
+# Archivage
+# ----------------------------------------------------------------------
+
+def mois_a_archiver(limite):
+    """Mois antérieurs à ``limite`` ayant encore des entrées en base."""
+    debut_limite, _ = AuditMensuel.bornes(limite)
+    plus_ancien = AuditLog.objects.filter(timestamp__lt=debut_limite).order_by('timestamp').values_list(
+        'timestamp', flat=True
+    ).first()
+    if plus_ancien is None:
+        return []
+    mois = AuditMensuel.mois_de(plus_ancien)
+    resultat = []
+    while mois < limite:
+        resultat.append(mois)
+        mois = decaler_mois(mois, 1)
+    return resultat
+
+
+def archiver(mois_conserves=None, taille_lot=None):
+    """
+    Archive les mois antérieurs à la durée de conservation.
+    Retourne [(mois, nombre d'entrées archivées)] pour les mois non vides.
+    """
+    if mois_conserves is None:
+        mois_conserves = getattr(settings, 'AUDIT_RETENTION_MOIS', 12)
+    resultat = []
+    for mois in mois_a_archiver(limite_conservation(mois_conserves)):
+        nombre = archiver_mois(mois, taille_lot=taille_lot)
+        if nombre:
+            resultat.append((mois, nombre))
+    return resultat
+
+
+def archiver_mois(mois, taille_lot=None):
+    """Déplace les entrées d'un mois dans son archive, par lots. Retourne le nombre archivé."""
+    taille_lot = taille_lot or getattr(settings, 'AUDIT_ARCHIVE_LOT', 1000)
+    debut, fin = AuditMensuel.bornes(mois)
+    chemin = chemin_archive(mois)
+    relatif = os.path.relpath(chemin, settings.MEDIA_ROOT)
+    logs = AuditLog.objects.filter(timestamp__gte=debut, timestamp__lt=fin)
+    _reparer(chemin)
+
+    total = 0
+    while True:
+        lignes = list(logs.order_by('timestamp', 'pk_audit').values(*CHAMPS_ARCHIVE)[:taille_lot])
+        if not lignes:
+            break
+        _ajouter(chemin, lignes)
+        with transaction.atomic():
+            supprimes, _ = AuditLog.objects.filter(pk__in=[ligne['pk_audit'] for ligne in lignes]).delete()
+            resume, _ = AuditMensuel.objects.get_or_create(mois=mois)
+            AuditMensuel.objects.filter(pk=resume.pk).update(
+                nombre=F('nombre') - supprimes,
+                nombre_archive=F('nombre_archive') + supprimes,
+                fichier_archive=relatif,
+                archive_le=timezone.now(),
+            )
+        total += supprimes
+    if total:
+        # Mois entièrement archivé : ses jours sortent des statistiques de l'historique
+        AuditCompteurJour.retirer_mois(mois)
+    return total
+
+
+def _en_json(valeur):
+    return valeur.isoformat() if isinstance(valeur, datetime) else str(valeur)
+
+
+def _reparer(chemin):
+    """
+    Coupe la fin du fichier après le dernier membre gzip complet : un lot
+    interrompu par un arrêt brutal (dont les entrées sont encore en base)
+    ne doit pas précéder les lots suivants.
+    """
+    if not os.path.exists(chemin):
+        return
+    taille = os.path.getsize(chemin)
+    fin = max((fin for _, fin, _ in _membres(chemin)), default=0)
+    if fin < taille:
+        logger.warning(f"Archive d'audit {chemin} : {taille - fin} octet(s) incomplet(s) coupé(s)")
+        with open(chemin, 'r+b') as brut:
+            brut.truncate(fin)
+            os.fsync(brut.fileno())
+
+
+def _ajouter(chemin, lignes):
+    """Ajoute un lot au fichier du mois, sous forme d'un membre gzip complet."""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'ab') as brut:
+        taille = brut.tell()
+        try:
+            with gzip.GzipFile(fileobj=brut, mode='wb', mtime=0) as compresse:
+                for valeurs in lignes:
+                    ligne = json.dumps(valeurs, ensure_ascii=False, default=_en_json) + '\n'
+                    compresse.write(ligne.encode('utf-8'))
+            brut.flush()
+            os.fsync(brut.fileno())
+        except BaseException:
+            # Pas de membre incomplet : les lots suivants resteraient illisibles
+            brut.truncate(taille)
+            raise
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+def mois_archives():
+    """Mois pour lesquels un fichier d'archive existe, du plus ancien au plus récent."""
+    repertoire = repertoire_archives()
+    if not os.path.isdir(repertoire):
+        return []
+    mois = []
+    for nom in os.listdir(repertoire):
+        if not nom.endswith('.jsonl.gz'):
+            continue
+        try:
+            annee, numero = nom[:-len('.jsonl.gz')].split('-')
+            mois.append(date(int(annee), int(numero), 1))
+        except ValueError:
+            continue
+    return sorted(mois)
+
+
+def _lire_membre(donnees, debut):
+    """
+    Décompresse le membre gzip qui commence à ``debut``.
+    Retourne (contenu, fin du membre), ou None s'il est incomplet ou corrompu.
+    """
+    decompresseur = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    morceaux = []
+    position = debut
+    while position < len(donnees):
+        bloc = donnees[position:position + TAILLE_BLOC]
+        try:
+            morceaux.append(decompresseur.decompress(bloc))
+        except zlib.error:
+            return None
+        if decompresseur.eof:
+            return b''.join(morceaux), position + len(bloc) - len(decompresseur.unused_data)
+        position += len(bloc)
+    return None
+
+
+def _membres(chemin):
+    """
+    (début, fin, contenu) de chaque membre gzip complet du fichier. Une zone
+    illisible (lot interrompu) est sautée jusqu'à l'en-tête gzip suivant.
+    """
+    with open(chemin, 'rb') as fichier:
+        if not os.fstat(fichier.fileno()).st_size:
+            return
+        with mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+            debut = 0
+            while 0 <= debut < len(donnees):
+                membre = _lire_membre(donnees, debut)
+                if membre is None:
+                    logger.warning(f"Archive d'audit {chemin} : zone illisible à l'octet {debut}, ignorée")
+                    debut = donnees.find(ENTETE_GZIP, debut + 1)
+                    continue
+                contenu, fin = membre
+                yield debut, fin, contenu
+                debut = fin
+
+
+def lire_archive(mois):
+    """Entrées (dicts) de l'archive d'un mois, sans doublon."""
+    chemin = chemin_archive(mois)
+    if not os.path.exists(chemin):
+        return
+    vus = set()
+    for _, _, contenu in _membres(chemin):
+        for ligne in contenu.decode('utf-8').splitlines():
+            if not ligne.strip():
+                continue
+            valeurs = json.loads(ligne)
+            if valeurs['pk_audit'] in vus:
+                continue
+            vus.add(valeurs['pk_audit'])
+            yield valeurs
+
+
+def rechercher(debut=None, fin=None, utilisateur=None, action=None, modele=None, objet=None, texte=None):
+    """
+    Parcourt les archives des mois ``debut`` à ``fin`` (inclus, premiers
+    jours de mois ; None : sans borne) et renvoie les entrées qui
+    correspondent à tous les filtres donnés :
+
+    - utilisateur : pk de l'utilisateur ;
+    - action : code exact (ex: 'DELETE') ;
+    - modele : partie du nom du modèle, sans casse ;
+    - objet : ID exact de l'objet ;
+    - texte : partie de la représentation ou des changements, sans casse.
+    """
+    modele = modele.lower() if modele else None
+    texte = texte.lower() if texte else None
+    for mois in mois_archives():
+        if (debut and mois < debut) or (fin and mois > fin):
+            continue
+        for valeurs in lire_archive(mois):
+            if utilisateur and valeurs['utilisateur_id'] != utilisateur:
+                continue
+            if action and valeurs['action'] != action:
+                continue
+            if modele and modele not in valeurs['model_name'].lower():
+                continue
+            if objet and valeurs['object_id'] != objet:
+                continue
+            if texte and texte not in (
+                valeurs['object_repr'] + json.dumps(valeurs['changes'], ensure_ascii=False)
+            ).lower():
+                continue
+            yield valeurs
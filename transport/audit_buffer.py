@@ -0,0 +1,244 @@
+"""
+Écriture groupée du journal d'audit
+===================================
+
+``AuditLog.log_action`` n'écrit plus une ligne par appel : l'entrée
+(clé primaire et horodatage déjà fixés) est ajoutée à un tampon propre au
+thread, écrit en un seul ``bulk_create`` :
+
+- à la fin de la requête, une fois la réponse envoyée
+  (``AuditTamponMiddleware``, avant la fermeture de la connexion par
+  Django ; à défaut, signal ``request_finished``) ;
+- dès que le tampon atteint ``AUDIT_TAMPON_TAILLE`` entrées ;
+- dès que la plus ancienne entrée a plus de ``AUDIT_TAMPON_SECONDES``
+  secondes : un thread de veille écrit aussi les tampons des threads
+  inactifs (workers) et ceux des threads terminés ;
+- à l'arrêt du processus.
+
+Une entrée ajoutée dans une transaction n'entre dans le tampon qu'au commit
+(``transaction.on_commit``) : comme avec l'écriture directe, une
+transaction annulée n'écrit pas ses entrées.
+
+Si l'écriture en base échoue, les entrées sont ajoutées au fichier
+``AUDIT_FICHIER_SECOURS`` (JSON Lines, ajout seul, fsync) ; la commande
+``rejouer_audit_secours`` les réinsère (sans doublon : les clés sont
+conservées).
+
+``AUDIT_TAMPON = False`` rétablit l'écriture immédiate. Les clés compactes
+(``CLES_COMPACTES``, voir transport/cles.py) s'appliquent aussi à l'audit.
+
+Usage:
+    from transport.audit_buffer import enregistrer, vider
+
+    enregistrer(AuditLog(...))   # entrée avec pk_audit et timestamp renseignés
+    vider()                      # écriture immédiate du tampon du thread
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Colonnes recopiées dans le fichier de secours
+CHAMPS_SECOURS = (
+    'pk_audit', 'utilisateur_id', 'timestamp', 'action', 'model_name',
+    'object_id', 'object_repr', 'changes', 'ip_address', 'user_agent',
+)
+
+_verrou_fichier = threading.Lock()
+_verrou_tampons = threading.Lock()
+# Tampons des threads vivants : un tampon disparaît avec son thread
+_tampons = weakref.WeakSet()
+_local = threading.local()
+
+
+class _Tampon:
+    def __init__(self):
+        self.entrees = []
+        self.debut = None
+        # Le thread de veille peut écrire le tampon d'un autre thread
+        self.verrou = threading.Lock()
+
+    def prendre(self):
+        """Retire et retourne les entrées du tampon."""
+        with self.verrou:
+            entrees = list(self.entrees)
+            self.entrees.clear()
+            self.debut = None
+        return entrees
+
+    def age(self):
+        debut = self.debut
+        return 0 if debut is None else time.monotonic() - debut
+
+
+# Entrées des threads terminés avant l'écriture de leur tampon
+_orphelines = _Tampon()
+
+
+def _recueillir(entrees):
+    """Fin d'un thread : ses entrées non écrites passent aux orphelines."""
+    if entrees:
+        with _orphelines.verrou:
+            if not _orphelines.entrees:
+                _orphelines.debut = time.monotonic()
+            _orphelines.entrees.extend(entrees)
+
+
+def _tampon():
+    tampon = getattr(_local, 'tampon', None)
+    if tampon is None:
+        tampon = _local.tampon = _Tampon()
+        # La liste (jamais remplacée) survit au tampon
+        weakref.finalize(tampon, _recueillir, tampon.entrees).atexit = False
+        with _verrou_tampons:
+            _tampons.add(tampon)
+    return tampon
+
+
+def tampon_actif():
+    return getattr(settings, 'AUDIT_TAMPON', True)
+
+
+def enregistrer(entree):
+    """Ajoute l'entrée au tampon (après le commit de la transaction en cours)."""
+    if not tampon_actif():
+        entree.save(force_insert=True)
+        return
+    transaction.on_commit(lambda: _empiler(entree))
+
+
+def _empiler(entree):
+    tampon = _tampon()
+    with tampon.verrou:
+        if not tampon.entrees:
+            tampon.debut = time.monotonic()
+        tampon.entrees.append(entree)
+        plein = len(tampon.entrees) >= getattr(settings, 'AUDIT_TAMPON_TAILLE', 100)
+    if plein or tampon.age() >= _delai():
+        _ecrire(tampon)
+    _demarrer_veille()
+
+
+def vider(**kwargs):  # noqa: ARG001
+    """Écrit le tampon du thread courant ; retourne le nombre d'entrées."""
+    return _ecrire(_tampon())
+
+
+def vider_tout():
+    """Écrit les tampons de tous les threads (arrêt du processus)."""
+    with _verrou_tampons:
+        tampons = list(_tampons)
+    return sum(_ecrire(tampon) for tampon in tampons + [_orphelines])
+
+
+def _fin_requete(**kwargs):  # noqa: ARG001
+    """
+    Filet de sécurité sans AuditTamponMiddleware : ce receveur passe après
+    close_old_connections, la connexion rouverte par l'écriture est donc
+    refermée ici selon CONN_MAX_AGE (jamais au milieu d'une transaction).
+    """
+    if vider() and not connection.in_atomic_block:
+        close_old_connections()
+
+
+def _ecrire(tampon):
+    entrees = tampon.prendre()
+    if not entrees:
+        return 0
+    model = type(entrees[0])
+    try:
+        # Point de sauvegarde : un échec ne casse pas une transaction englobante
+        with transaction.atomic():
+            model.objects.bulk_create(entrees, batch_size=500)
+            # bulk_create n'émet pas post_save : compteurs mis à jour ici
+            model.comptabiliser(entrees)
+    except DatabaseError:
+        logger.exception(f"Écriture de {len(entrees)} entrée(s) d'audit impossible, copie dans le fichier de secours")
+        ecrire_secours(entrees)
+    return len(entrees)
+
+
+# ----------------------------------------------------------------------
+# Fichier de secours
+# ----------------------------------------------------------------------
+
+def fichier_secours():
+    return getattr(settings, 'AUDIT_FICHIER_SECOURS', os.path.join(settings.BASE_DIR, 'logs', 'audit_secours.jsonl'))
+
+
+def ecrire_secours(entrees):
+    lignes = []
+    for entree in entrees:
+        valeurs = {champ: getattr(entree, champ) for champ in CHAMPS_SECOURS}
+        valeurs['timestamp'] = valeurs['timestamp'].isoformat()
+        lignes.append(json.dumps(valeurs, ensure_ascii=False, default=str) + '\n')
+    chemin = fichier_secours()
+    try:
+        with _verrou_fichier:
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            with open(chemin, 'a', encoding='utf-8') as fichier:
+                fichier.writelines(lignes)
+                fichier.flush()
+                os.fsync(fichier.fileno())
+    except OSError:
+        logger.exception(f"{len(lignes)} entrée(s) d'audit perdue(s) : fichier de secours {chemin} inaccessible")
+
+
+# ----------------------------------------------------------------------
+# Veille : tampons inactifs et threads terminés
+# ----------------------------------------------------------------------
+
+_verrou_veille = threading.Lock()
+_veille_pid = None
+
+
+def _delai():
+    return getattr(settings, 'AUDIT_TAMPON_SECONDES', 5)
+
+
+def _demarrer_veille():
+    """Démarre le thread de veille du processus (une fois, et après un fork)."""
+    global _veille_pid
+    if _veille_pid == os.getpid():
+        return
+    with _verrou_veille:
+        if _veille_pid != os.getpid():
+            threading.Thread(target=_veiller, name='audit-tampon-veille', daemon=True).start()
+            _veille_pid = os.getpid()
+
+
+def ecrire_anciens():
+    """Écrit les tampons dont la plus ancienne entrée a plus de AUDIT_TAMPON_SECONDES."""
+    with _verrou_tampons:
+        tampons = list(_tampons)
+    return sum(
+        _ecrire(tampon) for tampon in tampons + [_orphelines]
+        if tampon.entrees and tampon.age() >= _delai()
+    )
+
+
+def _veiller():
+    while True:
+        time.sleep(max(_delai(), 1))
+        try:
+            ecrites = ecrire_anciens()
+        except Exception:
+            logger.exception("Écriture des tampons d'audit par le thread de veille impossible")
+            continue
+        if ecrites:
+            # Connexion propre à ce thread : ne pas la garder ouverte entre deux passages
+            connections.close_all()
+
+
+request_finished.connect(_fin_requete, dispatch_uid='audit_tampon_fin_requete')
+atexit.register(vider_tout)
@@ -1,58 +1,112 @@
 """
 Middleware pour capturer automatiquement les actions importantes et les enregistrer dans l'audit
+===============================================================================================
+
+Chaque requête de modification (POST, PUT, PATCH, DELETE) d'un utilisateur
+connecté produit une entrée d'audit ``REQUETE`` : utilisateur, IP, user
+agent, vue, chemin, statut et durée de traitement.
+
+Les requêtes AJAX et les chemins de ``AUDIT_CHEMINS_IGNORES`` (admin,
+fichiers, API, audit) ne sont pas enregistrés : les vues AJAX et l'API
+tracent déjà leurs actions. Les préfixes sont lus une fois, au démarrage,
+en un tuple : le test par requête est un seul ``str.startswith``.
+
+L'entrée passe par l'écriture groupée (transport.audit_buffer) : la
+requête ne fait que construire l'objet et l'ajouter au tampon, l'INSERT a
+lieu à la fin de la requête, une fois la réponse transmise au serveur.
+``manage.py benchmark_audit`` mesure le coût ajouté à chaque requête.
+
+``AUDIT_REQUETES = False`` désactive le middleware.
+
+``AuditTamponMiddleware`` écrit le tampon à la fermeture de la réponse,
+avant que Django ne ferme la connexion à la base (``request_finished``) :
+l'écriture ne rouvre pas une connexion qui resterait ouverte jusqu'à la
+requête suivante du thread.
 """
 
-from django.utils.deprecation import MiddlewareMixin
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import audit_buffer
 from .models import AuditLog
 
+METHODES_AUDITEES = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
 
-class AuditMiddleware(MiddlewareMixin):
+class AuditMiddleware:
     """
-    Middleware pour enregistrer automatiquement certaines actions dans l'historique d'audit
+    Middleware pour enregistrer automatiquement les requêtes de modification dans l'historique d'audit
     """
 
-    def process_request(self, request):
-        """Stocker la requête pour l'utiliser plus tard dans les vues"""
-        request._audit_middleware_active = True
-        return None
-
-    def process_response(self, request, response):
-        """Enregistrer les actions POST/PUT/DELETE dans l'audit si nécessaire"""
-
-        # Ne traiter que les requêtes authentifiées
-        if not request.user.is_authenticated:
-            return response
+    def __init__(self, get_response):
+        if not getattr(settings, 'AUDIT_REQUETES', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.chemins_ignores = tuple(getattr(
+            settings, 'AUDIT_CHEMINS_IGNORES', ('/admin/', '/static/', '/media/', '/api/', '/audit/')
+        ))
 
-        # Ne traiter que les méthodes de modification
-        if request.method not in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            return response
+    def __call__(self, request):
+        if request.method not in METHODES_AUDITEES or request.path.startswith(self.chemins_ignores):
+            return self.get_response(request)
 
-        # Ignorer les requêtes AJAX et les uploads de fichiers
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return response
+        debut = time.perf_counter()
+        response = self.get_response(request)
+        duree_ms = (time.perf_counter() - debut) * 1000
 
-        # Ignorer certains chemins (admin, static, media, api)
-        ignored_paths = ['/admin/', '/static/', '/media/', '/api/', '/audit/']
-        if any(request.path.startswith(path) for path in ignored_paths):
+        # Utilisateur connecté en fin de requête : une connexion est tracée, une déconnexion non
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
             return response
 
-        # Enregistrer uniquement si le statut est succès (2xx ou 3xx)
-        if response.status_code >= 400:
+        # Ignorer les requêtes AJAX (META : request.headers analyse tous les en-têtes)
+        if request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest':
             return response
 
+        self.enregistrer(request, response, user, duree_ms)
         return response
 
     @staticmethod
-    def get_client_ip(request):
-        """Récupérer l'adresse IP du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+    def enregistrer(request, response, user, duree_ms):
+        """Ajoute l'entrée d'audit de la requête au tampon d'écriture."""
+        vue = request.resolver_match.view_name if request.resolver_match else ''
+        AuditLog.log_action(
+            utilisateur=user,
+            action='REQUETE',
+            model_name=vue[:100],
+            object_id=request.path[:250],
+            object_repr=f"{request.method} {request.path} → {response.status_code}",
+            changes={
+                'methode': request.method,
+                'chemin': request.path,
+                'statut': response.status_code,
+                'duree_ms': round(duree_ms, 1),
+            },
+            request=request,
+        )
 
-    @staticmethod
-    def get_user_agent(request):
-        """Récupérer le user agent du client"""
-        return request.META.get('HTTP_USER_AGENT', '')[:500]
+
+class AuditTamponMiddleware:
+    """
+    Middleware qui écrit le tampon d'audit du thread une fois la réponse envoyée
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        fermer = response.close
+
+        def close():
+            # Le serveur appelle response.close() une fois la réponse envoyée ;
+            # le signal request_finished (close_old_connections) part ensuite
+            try:
+                audit_buffer.vider()
+            finally:
+                fermer()
+
+        response.close = close
+        return response
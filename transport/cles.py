@@ -0,0 +1,109 @@
+"""
+Clés primaires compactes
+========================
+
+Les clés historiques (pk_contrat, pk_mission, pk_paiement...) sont des
+slugs construits en concaténant les clés des objets liés : elles atteignent
+souvent la limite de 250 caractères, et chaque clé étrangère, chaque index
+et chaque jointure en porte la copie.
+
+Avec ``settings.CLES_COMPACTES = True`` (désactivé par défaut), les nouveaux
+objets reçoivent une clé courte (24 caractères) :
+
+    <préfixe>-<horodatage en ms, hexadécimal><8 caractères aléatoires>
+
+- les clés restent des chaînes : URLs, API et clés existantes inchangées ;
+- l'horodatage en tête rend les clés croissantes, les insertions se font en
+  fin d'index au lieu de pages réparties sur tout le B-tree ;
+- la génération n'accède à aucun objet lié (aucune requête).
+
+Clés entières
+-------------
+
+Avec ``settings.CLES_ENTIERES = True`` (désactivé par défaut),
+ContratTransport, Mission et PaiementMission ont une clé ``BigAutoField``
+(``id``) et les clés étrangères qui les désignent deviennent des entiers. Le slug historique
+reste dans le même attribut (``pk_contrat``, ``pk_mission``,
+``pk_paiement``), colonne unique ``reference`` : les URLs, l'API et la
+synchronisation continuent de désigner ces objets par ce slug
+(``champ_reference``) ; les serializers complets exposent en plus ``id``.
+
+La conversion est la migration conditionnelle ``0044_cles_entieres``
+(numérotation des lignes, recopie des clés étrangères, échange de la clé
+primaire), vide sans le réglage : le mode se choisit avant que ``migrate``
+ne l'applique, à l'installation ou lors de la mise à jour qui l'apporte.
+Sans retour arrière : sauvegarder la base avant (``backup_db``). Une base
+migrée dans l'autre mode est signalée par la vérification
+``transport.E001`` (``verifier_mode_cles``), exécutée par ``migrate``.
+
+La commande ``benchmark_cles`` mesure, sur la base courante, la taille des
+index et la durée des jointures avec les clés actuelles et avec des clés
+entières, pour décider du passage.
+
+Usage:
+    from transport.cles import cle_compacte, cles_compactes_actives
+
+    if cles_compactes_actives():
+        self.pk_mission = cle_compacte('mis')
+"""
+
+import time
+from uuid import uuid4
+
+from django.conf import settings
+
+
+def cles_compactes_actives():
+    return getattr(settings, 'CLES_COMPACTES', False)
+
+
+def cles_entieres_actives():
+    return getattr(settings, 'CLES_ENTIERES', False)
+
+
+# Modèles dont la clé peut être entière : champ du slug historique
+REFERENCES = {
+    'contrattransport': 'pk_contrat',
+    'mission': 'pk_mission',
+    'paiementmission': 'pk_paiement',
+}
+
+
+def champ_reference(model):
+    """Champ qui désigne un objet hors de la base (slug), clé primaire ou non."""
+    return REFERENCES.get(model._meta.model_name, model._meta.pk.name)
+
+
+def cle_compacte(prefixe):
+    """Clé courte, croissante dans le temps et unique (préfixe de 3 lettres)."""
+    return f"{prefixe}-{int(time.time() * 1000):012x}{uuid4().hex[:8]}"
+
+
+def verifier_mode_cles(app_configs=None, databases=None, **kwargs):
+    """
+    Vérification système : la base doit avoir été migrée dans le mode de
+    clés du réglage CLES_ENTIERES (fixé par la migration 0044_cles_entieres).
+    """
+    from django.apps import apps
+    from django.core.checks import Error
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    erreurs = []
+    table = apps.get_model('transport', 'Mission')._meta.db_table
+    for alias in databases or []:
+        connection = connections[alias]
+        if ('transport', '0044_cles_entieres') not in MigrationRecorder(connection).applied_migrations():
+            continue
+        with connection.cursor() as cursor:
+            colonnes = {c.name for c in connection.introspection.get_table_description(cursor, table)}
+        base_entiere = 'id' in colonnes
+        if base_entiere != cles_entieres_actives():
+            erreurs.append(Error(
+                f"La base '{alias}' a été migrée avec CLES_ENTIERES={base_entiere}, "
+                f"le réglage vaut {cles_entieres_actives()}.",
+                hint="Le mode de clés se choisit avant d'appliquer transport.0044_cles_entieres : "
+                     "rétablir le réglage, ou restaurer une sauvegarde et migrer à nouveau.",
+                id='transport.E001',
+            ))
+    return erreurs
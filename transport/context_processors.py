@@ -1,41 +1,129 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Window
+from django.utils.functional import SimpleLazyObject
+
 from .models import Notification, Mission
 
 
-def notifications_processor(request):
+# Nombre de notifications affichées dans le menu déroulant
+NOTIFICATIONS_DROPDOWN_LIMIT = 5
+
+
+def _token(pk):
+    """Les pk slugifiés peuvent dépasser la taille de clé des backends."""
+    return hashlib.md5(str(pk).encode()).hexdigest()
+
+
+def _notifications_count_key(utilisateur_pk):
+    return f'navbar:notifications:{_token(utilisateur_pk)}'
+
+
+def _missions_entreprise_key(entreprise_pk):
+    return f'navbar:missions:entreprise:{_token(entreprise_pk)}'
+
+
+def _missions_chauffeur_key(utilisateur_pk):
+    return f'navbar:missions:chauffeur:{_token(utilisateur_pk)}'
+
+
+def invalidate_notifications_count(utilisateur_pk):
+    """Invalide le compteur de notifications non lues d'un utilisateur."""
+    if utilisateur_pk:
+        cache.delete(_notifications_count_key(utilisateur_pk))
+
+
+def invalidate_missions_en_cours(entreprise_pk=None, chauffeur_utilisateur_pk=None):
     """
-    Context processor pour fournir les notifications et le compte des missions en cours
-    à tous les templates
+    Invalide le compteur de missions en cours de l'entreprise (partagé par
+    tous ses utilisateurs non chauffeurs) et celui du chauffeur concerné.
     """
-    if request.user.is_authenticated:
-        # Récupérer les notifications non lues (limitées à 5 pour le dropdown)
-        notifications = Notification.objects.filter(
-            utilisateur=request.user,
-            is_read=False
-        )[:5]
-
-        # Compter toutes les notifications non lues
-        notifications_count = Notification.objects.filter(
-            utilisateur=request.user,
-            is_read=False
-        ).count()
-
-        # Compter les missions en cours (filtrées par rôle)
+    keys = []
+    if entreprise_pk:
+        keys.append(_missions_entreprise_key(entreprise_pk))
+    if chauffeur_utilisateur_pk:
+        keys.append(_missions_chauffeur_key(chauffeur_utilisateur_pk))
+    if keys:
+        cache.delete_many(keys)
+
+
+class _CompteursNavigation:
+    """
+    Calcule à la demande, une seule fois par requête, les données de la
+    barre de navigation d'un utilisateur.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._notifications = None
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'NOTIFICATIONS_CACHE_TIMEOUT', 60)
+
+    def notifications(self):
+        """Notifications non lues du menu déroulant (une seule requête)."""
+        if self._notifications is None:
+            if cache.get(_notifications_count_key(self.user.pk)) == 0:
+                self._notifications = []
+                return self._notifications
+
+            # Le total est calculé par fenêtre avant le LIMIT :
+            # liste et compteur sont obtenus en une seule requête
+            self._notifications = list(
+                Notification.objects.filter(
+                    utilisateur=self.user,
+                    is_read=False
+                ).annotate(
+                    total_non_lues=Window(Count('pk_notification'))
+                )[:NOTIFICATIONS_DROPDOWN_LIMIT]
+            )
+            total = self._notifications[0].total_non_lues if self._notifications else 0
+            cache.set(_notifications_count_key(self.user.pk), total, self.timeout)
+        return self._notifications
+
+    def notifications_count(self):
+        count = cache.get(_notifications_count_key(self.user.pk))
+        if count is None:
+            notifications = self.notifications()
+            count = notifications[0].total_non_lues if notifications else 0
+        return count
+
+    def missions_en_cours_count(self):
         # Un chauffeur ne voit que ses propres missions ; les autres voient tout
-        if getattr(request.user, 'role', None) == 'chauffeur':
-            missions_en_cours_count = Mission.objects.filter(
+        if getattr(self.user, 'role', None) == 'chauffeur':
+            key = _missions_chauffeur_key(self.user.pk)
+            queryset = Mission.objects.filter(
                 statut='en cours',
-                contrat__chauffeur__utilisateur=request.user
-            ).count()
+                contrat__chauffeur__utilisateur=self.user
+            )
         else:
-            missions_en_cours_count = Mission.objects.filter(
+            key = _missions_entreprise_key(self.user.entreprise_id)
+            queryset = Mission.objects.filter(
                 statut='en cours',
-                contrat__entreprise=request.user.entreprise
-            ).count()
+                entreprise_id=self.user.entreprise_id
+            )
+        return cache.get_or_set(key, queryset.count, self.timeout)
+
+
+def notifications_processor(request):
+    """
+    Context processor pour fournir les notifications et le compte des missions en cours
+    à tous les templates.
 
+    Les valeurs sont paresseuses : un template qui ne les affiche pas
+    (partiels AJAX, pages d'erreur) ne déclenche aucune requête. Les
+    compteurs sont mis en cache quelques secondes par utilisateur et
+    invalidés par les signaux de Notification et de Mission.
+    """
+    if request.user.is_authenticated:
+        compteurs = _CompteursNavigation(request.user)
         return {
-            'notifications': notifications,
-            'notifications_count': notifications_count,
-            'missions_en_cours_count': missions_en_cours_count,
+            'notifications': SimpleLazyObject(compteurs.notifications),
+            'notifications_count': SimpleLazyObject(compteurs.notifications_count),
+            'missions_en_cours_count': SimpleLazyObject(compteurs.missions_en_cours_count),
         }
     else:
         return {
@@ -0,0 +1,374 @@
+"""
+Workflow des contrats de transport
+==================================
+
+Crée et met à jour en cascade les objets dépendants d'un contrat :
+PrestationDeTransports, Cautions, Mission et PaiementMission.
+
+Les écritures sont groupées (``bulk_create``, ``QuerySet.update()``) : une
+requête par table au lieu d'un ``save()`` complet par objet. La validation
+est faite une seule fois, avant toute écriture.
+
+Les écritures groupées n'émettent pas les signaux post_save de ces modèles ;
+leurs effets utiles sont donc rejoués ici :
+- maintenance des cumuls de revenus (RevenueRollup) ;
+- invalidation du dashboard, des compteurs de missions de la barre de
+  navigation et des factures PDF en cache.
+
+Usage (depuis le signal post_save de ContratTransport):
+    from transport.contrat_workflow import creer_workflow, propager_modifications
+
+    creer_workflow(contrat)
+    propager_modifications(contrat, etats_avant, entreprise_id_avant)
+"""
+
+import logging
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .context_processors import invalidate_missions_en_cours
+from .dashboard_metrics import invalidate_dashboard_cache
+from .invoice_generator import invalidate_invoice_cache
+from .models import (
+    Cautions, Conteneur, FraisTrajet, Mission, PaiementMission,
+    PrestationDeTransports, RevenueRollup,
+)
+
+logger = logging.getLogger(__name__)
+
+# Clés étrangères exclues de full_clean : les objets liés viennent d'être
+# construits ou chargés, vérifier leur existence coûterait une requête chacun
+_FK_MISSION = ['prestation_transport', 'contrat', 'entreprise']
+_FK_PAIEMENT = ['mission', 'caution', 'prestation', 'entreprise']
+
+_CENTIMES = Decimal('0.01')
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def _verifier_conteneur(contrat):
+    """Le conteneur du contrat doit être au port pour partir en mission."""
+    conteneur = contrat.conteneur
+    if not conteneur or conteneur.est_disponible():
+        return
+
+    mission_en_cours = conteneur.get_mission_en_cours()
+    if mission_en_cours:
+        logger.error(
+            f"❌ CONTENEUR DÉJÀ EN MISSION! Le conteneur {conteneur.numero_conteneur} "
+            f"est déjà assigné à la mission #{mission_en_cours.pk_mission[:8]} "
+            f"(statut: {mission_en_cours.statut}, destination: {mission_en_cours.destination}). "
+            f"Le conteneur doit d'abord être retourné au port."
+        )
+        raise ValidationError(
+            f"🚫 Impossible de créer le contrat: le conteneur {conteneur.numero_conteneur} "
+            f"est déjà en mission vers {mission_en_cours.destination}. "
+            f"Attendez que la mission se termine et que le conteneur soit retourné au port."
+        )
+    logger.error(f"❌ Le conteneur {conteneur.numero_conteneur} n'est pas disponible (statut: {conteneur.get_statut_display()})")
+    raise ValidationError(
+        f"🚫 Le conteneur {conteneur.numero_conteneur} n'est pas disponible "
+        f"(statut actuel: {conteneur.get_statut_display()})"
+    )
+
+
+def _verifier_cascade(contrat, etats_avant):
+    """
+    Reprend, avant toute écriture, les contrôles de Mission.clean et
+    PaiementMission.clean que la cascade pourrait enfreindre.
+    """
+    if contrat.date_debut and contrat.date_limite_retour and contrat.date_limite_retour < contrat.date_debut:
+        raise ValidationError({'date_retour': 'La date de retour doit être après la date de départ'})
+
+    montant = contrat.montant_total
+    for etat in etats_avant.values():
+        commission = etat['commission_transitaire']
+        if etat['est_valide'] or not commission or not montant:
+            continue
+        if commission > montant:
+            raise ValidationError({
+                'commission_transitaire': 'La commission ne peut pas dépasser le montant total'
+            })
+        if commission > montant * Decimal('0.3'):
+            raise ValidationError({
+                'commission_transitaire': 'La commission ne peut pas dépasser 30% du montant total'
+            })
+
+
+# ============================================================================
+# EFFETS DE BORD
+# ============================================================================
+
+def _etat_rollup(paiement, contrat):
+    """État d'un paiement au format de ``RevenueRollup.etat_paiement``."""
+    return {
+        'date_paiement': paiement.date_paiement,
+        'est_valide': paiement.est_valide,
+        'montant_total': Decimal(paiement.montant_total).quantize(_CENTIMES),
+        'commission_transitaire': Decimal(paiement.commission_transitaire).quantize(_CENTIMES),
+        'entreprise_id': contrat.entreprise_id,
+        'client_id': contrat.client_id,
+        'chauffeur_id': contrat.chauffeur_id,
+    }
+
+
+def _invalider_caches(contrat, paiements=()):
+    """
+    Invalide les caches dépendants du contrat, immédiatement puis après le
+    commit (comme les signaux : un lecteur concurrent ne peut pas remettre
+    en cache une valeur périmée).
+    """
+    entreprise_id = contrat.entreprise_id
+    chauffeur_utilisateur_id = contrat.chauffeur.utilisateur_id if contrat.chauffeur_id else None
+    paiements = list(paiements)
+
+    def invalider():
+        if entreprise_id:
+            invalidate_dashboard_cache(entreprise_id)
+        invalidate_missions_en_cours(entreprise_id, chauffeur_utilisateur_id)
+        for pk_paiement in paiements:
+            invalidate_invoice_cache(pk_paiement)
+
+    invalider()
+    transaction.on_commit(invalider)
+
+
+# ============================================================================
+# CRÉATION
+# ============================================================================
+
+def creer_workflow(contrat):
+    """
+    Crée la prestation, la caution, la mission (en cours) et le paiement
+    (non validé) d'un nouveau contrat, puis passe le conteneur en mission.
+
+    Retourne le paiement créé, ou None si le contrat est incomplet.
+    """
+    logger.info(f"🔄 Création automatique du workflow pour le contrat {contrat.pk_contrat}")
+
+    champs_manquants = [
+        champ for champ in ('camion', 'client', 'transitaire', 'chauffeur')
+        if not getattr(contrat, f'{champ}_id')
+    ]
+    if champs_manquants:
+        logger.error(f"❌ Création du workflow impossible: champs manquants - {', '.join(champs_manquants)}")
+        return None
+
+    _verifier_conteneur(contrat)
+
+    conteneur = contrat.conteneur
+    camion = contrat.camion
+    chauffeur = contrat.chauffeur
+    transitaire = contrat.transitaire
+
+    prestation = PrestationDeTransports(
+        contrat_transport=contrat,
+        camion=camion,
+        client=contrat.client,
+        transitaire=transitaire,
+        prix_transport=contrat.montant_total,
+        avance=contrat.avance_transport,
+        caution=contrat.caution,
+        solde=contrat.reliquat_transport,
+        date=timezone.now()
+    )
+
+    caution = Cautions(
+        conteneur=conteneur,
+        contrat=contrat,
+        entreprise_id=contrat.entreprise_id,
+        transitaire=transitaire,
+        client=contrat.client,
+        chauffeur=chauffeur,
+        camion=camion,
+        montant=contrat.caution,
+        statut='en_attente',
+        montant_rembourser=0
+    )
+
+    # Origine : lieu de chargement du contrat, sinon adresse du client
+    origine = "À définir"
+    if getattr(contrat, 'lieu_chargement', None):
+        origine = contrat.lieu_chargement
+    elif hasattr(contrat.client, 'adresse'):
+        origine = contrat.client.adresse or "À définir"
+    destination = contrat.destinataire if contrat.destinataire else "À définir"
+
+    itineraire = f"Itinéraire : {origine} → {destination}\n"
+    itineraire += f"Camion: {camion.immatriculation}\n"
+    itineraire += f"Chauffeur: {chauffeur.nom} {chauffeur.prenom}\n"
+    itineraire += f"Conteneur: {conteneur.numero_conteneur}\n"
+    itineraire += f"Date de départ prévue: {contrat.date_debut}\n"
+    itineraire += f"Date de retour prévue: {contrat.date_limite_retour}\n"
+    itineraire += "\n--- Veuillez compléter les détails de l'itinéraire ---"
+
+    mission = Mission(
+        prestation_transport=prestation,
+        contrat=contrat,
+        entreprise_id=contrat.entreprise_id,
+        date_depart=contrat.date_debut,
+        date_retour=contrat.date_limite_retour,
+        origine=origine,
+        destination=destination,
+        itineraire=itineraire,
+        statut='en cours'
+    )
+
+    commission = 0
+    if hasattr(transitaire, 'commission_percentage'):
+        commission = (contrat.montant_total * transitaire.commission_percentage) / 100
+
+    paiement = PaiementMission(
+        mission=mission,
+        entreprise_id=contrat.entreprise_id,
+        caution=caution,
+        prestation=prestation,
+        montant_total=contrat.montant_total,
+        commission_transitaire=commission,
+        caution_est_retiree=False,
+        mode_paiement='',
+        observation='Paiement créé automatiquement - En attente de validation après fin de mission',
+        est_valide=False,
+        date_validation=None
+    )
+
+    # Les clés du paiement reprennent celles des objets précédents : l'ordre compte
+    for objet in (prestation, caution, mission, paiement):
+        objet.generer_pk()
+
+    # Validation unique, avant toute écriture (équivalent des full_clean
+    # de Mission.save et PaiementMission.save)
+    paiement.synchroniser_frais_stationnement()
+    mission.full_clean(exclude=_FK_MISSION, validate_unique=False, validate_constraints=False)
+    paiement.full_clean(exclude=_FK_PAIEMENT, validate_unique=False, validate_constraints=False)
+
+    try:
+        with transaction.atomic():
+            PrestationDeTransports.objects.bulk_create([prestation])
+            Cautions.objects.bulk_create([caution])
+            Mission.objects.bulk_create([mission])
+            PaiementMission.objects.bulk_create([paiement])
+
+            if conteneur:
+                Conteneur.objects.filter(pk_conteneur=conteneur.pk_conteneur).update(statut='en_mission')
+                conteneur.statut = 'en_mission'
+
+            RevenueRollup.appliquer(_etat_rollup(paiement, contrat), signe=1)
+            _invalider_caches(contrat)
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la création du workflow pour le contrat {contrat.pk_contrat}: {str(e)}")
+        raise
+
+    logger.info(
+        f"🎉 Workflow complet créé pour le contrat {contrat.pk_contrat}: "
+        f"prestation {prestation.pk_presta_transport}, caution {caution.pk_caution}, "
+        f"mission {mission.pk_mission}, paiement {paiement.pk_paiement} (Commission: {commission})"
+    )
+    return paiement
+
+
+# ============================================================================
+# MISE À JOUR EN CASCADE
+# ============================================================================
+
+def synchroniser_entreprise_contrat(contrat):
+    """Recopie contrat.entreprise_id sur les cautions, missions, paiements et frais du contrat."""
+    entreprise_id = contrat.entreprise_id
+    maintenant = timezone.now()
+    Cautions.objects.filter(contrat=contrat).update(entreprise_id=entreprise_id, updated_at=maintenant)
+    Mission.objects.filter(contrat=contrat).update(entreprise_id=entreprise_id, updated_at=maintenant)
+    PaiementMission.objects.filter(mission__contrat=contrat).update(entreprise_id=entreprise_id, updated_at=maintenant)
+    FraisTrajet.objects.filter(Q(contrat=contrat) | Q(mission__contrat=contrat)).update(entreprise_id=entreprise_id)
+
+
+def propager_modifications(contrat, etats_avant=None, entreprise_id_avant=None):
+    """
+    Reporte les modifications d'un contrat sur ses prestations, cautions,
+    missions en cours et paiements non validés.
+
+    ``etats_avant`` est l'état des paiements du contrat avant sa
+    modification (``RevenueRollup.etats_contrat``), lu par le signal
+    pre_save ; il permet de déplacer les cumuls de revenus si le montant,
+    le client ou le chauffeur ont changé. ``entreprise_id_avant``, lu au
+    même moment, signale un transfert du contrat à une autre entreprise,
+    y compris quand le contrat n'a plus de paiement.
+    """
+    logger.info(f"🔄 Mise à jour en cascade pour le contrat {contrat.pk_contrat}")
+
+    if etats_avant is None:
+        etats_avant = RevenueRollup.etats_contrat(contrat.pk)
+    _verifier_cascade(contrat, etats_avant)
+
+    # update() ne renseigne pas les champs auto_now : updated_at est passé
+    # explicitement pour que /api/v1/sync/ voie les objets modifiés
+    maintenant = timezone.now()
+    champs_mission = {
+        'date_depart': contrat.date_debut,
+        'date_retour': contrat.date_limite_retour,
+        'updated_at': maintenant,
+    }
+    if contrat.destinataire:
+        champs_mission['destination'] = contrat.destinataire
+
+    try:
+        with transaction.atomic():
+            nb_prestations = PrestationDeTransports.objects.filter(contrat_transport=contrat).update(
+                camion=contrat.camion_id,
+                client=contrat.client_id,
+                transitaire=contrat.transitaire_id,
+                prix_transport=contrat.montant_total,
+                avance=contrat.avance_transport,
+                caution=contrat.caution,
+                solde=contrat.reliquat_transport,
+            )
+            nb_cautions = Cautions.objects.filter(contrat=contrat).update(
+                camion=contrat.camion_id,
+                chauffeur=contrat.chauffeur_id,
+                client=contrat.client_id,
+                transitaire=contrat.transitaire_id,
+                montant=contrat.caution,
+                updated_at=maintenant,
+            )
+            # Les missions terminées ou annulées gardent leurs dates
+            nb_missions = Mission.objects.filter(contrat=contrat, statut='en cours').update(**champs_mission)
+            nb_paiements = PaiementMission.objects.filter(
+                mission__contrat=contrat, est_valide=False
+            ).update(montant_total=contrat.montant_total, updated_at=maintenant)
+
+            # Contrat transféré à une autre entreprise : recopier la nouvelle
+            # entreprise sur les objets liés (entreprise_id dénormalisé)
+            transfere = (
+                entreprise_id_avant is not None and entreprise_id_avant != contrat.entreprise_id
+            ) or any(avant['entreprise_id'] != contrat.entreprise_id for avant in etats_avant.values())
+            if transfere:
+                synchroniser_entreprise_contrat(contrat)
+
+            for avant in etats_avant.values():
+                apres = dict(
+                    avant,
+                    entreprise_id=contrat.entreprise_id,
+                    client_id=contrat.client_id,
+                    chauffeur_id=contrat.chauffeur_id,
+                )
+                if not avant['est_valide']:
+                    apres['montant_total'] = Decimal(contrat.montant_total).quantize(_CENTIMES)
+                if apres != avant:
+                    RevenueRollup.appliquer(avant, signe=-1)
+                    RevenueRollup.appliquer(apres, signe=1)
+
+            _invalider_caches(contrat, paiements=etats_avant)
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la mise à jour en cascade pour le contrat {contrat.pk_contrat}: {str(e)}")
+        raise
+
+    logger.info(
+        f"🎉 Mise à jour en cascade terminée pour le contrat {contrat.pk_contrat}: "
+        f"{nb_prestations} prestation(s), {nb_cautions} caution(s), "
+        f"{nb_missions} mission(s), {nb_paiements} paiement(s)"
+    )
@@ -0,0 +1,358 @@
+"""
+Moteur d'agrégats du dashboard
+==============================
+
+Calcule en une seule passe les KPIs partagés par ``dashboard``,
+``tableau_bord_statistiques`` et ``DashboardAPIView``.
+
+Chaque table de base (missions, paiements, réparations, ...) est interrogée
+une seule fois grâce à l'agrégation conditionnelle (``Count(filter=Q(...))``),
+au lieu d'un ``count()`` par statut.
+
+Les vues passent par ``get_dashboard_metrics`` qui met en cache un snapshot
+par entreprise et par filtre de dates. Les signaux de ``transport.signals``
+invalident le snapshot de l'entreprise concernée à chaque modification.
+
+Usage:
+    from transport.dashboard_metrics import get_dashboard_metrics
+
+    metrics = get_dashboard_metrics(request.user.entreprise, date_debut, date_fin)
+    metrics.missions_en_cours
+"""
+
+import hashlib
+import uuid
+from dataclasses import dataclass, asdict, field
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q, F, Exists, OuterRef
+from django.utils import timezone
+
+from .models import (
+    Mission, PaiementMission, Cautions, Chauffeur, Camion, Reparation,
+    PieceReparee, ContratTransport, Client, Affectation, Salaire,
+    STATUT_MISSION_CHOICES,
+)
+
+
+@dataclass(frozen=True)
+class DashboardMetrics:
+    """Résultat typé du calcul des KPIs d'une entreprise."""
+
+    # Missions (période filtrée sauf mention contraire)
+    total_missions: int = 0
+    missions_en_cours: int = 0
+    missions_terminees: int = 0
+    missions_annulees: int = 0
+    missions_en_retard: int = 0
+    missions_ce_mois: int = 0                 # indépendant du filtre de dates
+    conteneurs_frais_stationnement: int = 0   # indépendant du filtre de dates
+    total_frais_stationnement: Decimal = Decimal('0')
+
+    # Paiements
+    total_paiements: Decimal = Decimal('0')
+    paiements_en_attente: int = 0
+    paiements_valides: int = 0
+    revenus_ce_mois: Decimal = Decimal('0')   # paiements validés du mois en cours
+    revenus_mois_actuel: Decimal = Decimal('0')  # tous paiements du mois (ou de la période)
+
+    # Cautions
+    total_cautions: Decimal = Decimal('0')
+    cautions_bloquees: int = 0
+
+    # Personnel et flotte
+    total_chauffeurs: int = 0
+    chauffeurs_affectes: int = 0
+    total_camions: int = 0
+    camions_affectes: int = 0
+    affectations: int = 0
+
+    # Maintenance
+    total_reparations: int = 0
+    reparations_en_cours: int = 0             # réparations du mois en cours
+    cout_reparations_total: Decimal = Decimal('0')
+    total_pieces: int = 0
+    cout_pieces_total: Decimal = Decimal('0')
+
+    # Contrats et clients
+    total_contrats: int = 0
+    contrats_actifs: int = 0
+    chiffre_affaires: Decimal = Decimal('0')
+    total_clients: int = 0
+    clients_sous_contrat: int = 0
+
+    # Salaires
+    salaires_en_attente: int = 0
+
+    missions_par_statut_counts: dict = field(default_factory=dict)
+
+    @property
+    def chauffeurs_disponibles(self):
+        return self.total_chauffeurs - self.chauffeurs_affectes
+
+    @property
+    def camions_disponibles(self):
+        return self.total_camions - self.camions_affectes
+
+    @property
+    def missions_par_statut(self):
+        """Équivalent de ``values('statut').annotate(total=Count('statut'))``."""
+        return [
+            {'statut': statut, 'total': total}
+            for statut, total in self.missions_par_statut_counts.items()
+            if total
+        ]
+
+    def as_api_dict(self):
+        """Données attendues par ``DashboardStatsSerializer``."""
+        data = asdict(self)
+        data.pop('missions_par_statut_counts')
+        data['chauffeurs_disponibles'] = self.chauffeurs_disponibles
+        data['camions_disponibles'] = self.camions_disponibles
+        return data
+
+
+def _period_q(field_name, date_debut, date_fin):
+    """Construit le Q de filtrage de période pour un champ date."""
+    q = Q()
+    if date_debut:
+        q &= Q(**{f'{field_name}__gte': date_debut})
+    if date_fin:
+        q &= Q(**{f'{field_name}__lte': date_fin})
+    return q
+
+
+def _month_bounds(today):
+    """Retourne (premier jour du mois, premier jour du mois suivant)."""
+    month_start = today.replace(day=1)
+    if month_start.month == 12:
+        next_month = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        next_month = month_start.replace(month=month_start.month + 1)
+    return month_start, next_month
+
+
+def compute_dashboard_metrics(
+    entreprise,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    today: Optional[date] = None,
+) -> DashboardMetrics:
+    """
+    Calcule tous les KPIs du dashboard pour une entreprise.
+
+    Une requête par table de base ; le nombre de requêtes est constant
+    quelle que soit la volumétrie.
+
+    Args:
+        entreprise: Entreprise de l'utilisateur courant
+        date_debut: Borne inférieure optionnelle de la période
+        date_fin: Borne supérieure optionnelle de la période
+        today: Date de référence (par défaut aujourd'hui)
+
+    Returns:
+        DashboardMetrics
+    """
+    today = today or timezone.now().date()
+    month_start, next_month = _month_bounds(today)
+
+    # ========== MISSIONS ==========
+    periode = _period_q('date_depart', date_debut, date_fin)
+    statut_aggregates = {
+        f'statut_{index}': Count('pk_mission', filter=periode & Q(statut=statut))
+        for index, (statut, _label) in enumerate(STATUT_MISSION_CHOICES)
+    }
+    en_stationnement = Q(statut_stationnement='en_stationnement')
+    missions = Mission.objects.filter(entreprise=entreprise).aggregate(
+        total=Count('pk_mission', filter=periode),
+        en_retard=Count('pk_mission', filter=periode & Q(statut='en cours', date_retour__lt=today)),
+        ce_mois=Count('pk_mission', filter=Q(date_depart__gte=month_start)),
+        stationnement=Count('pk_mission', filter=en_stationnement),
+        frais_stationnement=Sum('montant_stationnement', filter=en_stationnement),
+        **statut_aggregates,
+    )
+    par_statut = {
+        statut: missions[f'statut_{index}']
+        for index, (statut, _label) in enumerate(STATUT_MISSION_CHOICES)
+    }
+
+    # ========== PAIEMENTS ==========
+    periode = _period_q('date_paiement', date_debut, date_fin)
+    if date_debut and date_fin:
+        revenus_periode = periode
+    else:
+        revenus_periode = Q(date_paiement__gte=month_start, date_paiement__lt=next_month)
+    paiements = PaiementMission.objects.filter(entreprise=entreprise).aggregate(
+        total=Sum('montant_total', filter=periode),
+        en_attente=Count('pk_paiement', filter=periode & Q(est_valide=False)),
+        valides=Count('pk_paiement', filter=periode & Q(est_valide=True)),
+        revenus_ce_mois=Sum('montant_total', filter=Q(est_valide=True, date_paiement__gte=month_start)),
+        revenus_mois_actuel=Sum('montant_total', filter=revenus_periode),
+    )
+
+    # ========== CAUTIONS ==========
+    cautions = Cautions.objects.filter(entreprise=entreprise).aggregate(
+        total=Sum('montant'),
+        bloquees=Count('pk_caution', filter=Q(statut='bloquee')),
+    )
+
+    # ========== CHAUFFEURS / CAMIONS ==========
+    # "Affecté" = a au moins une mission 'en cours' (même règle que l'API)
+    chauffeurs = Chauffeur.objects.filter(entreprise=entreprise).annotate(
+        en_mission_active=Exists(
+            Mission.objects.filter(statut='en cours', contrat__chauffeur=OuterRef('pk'))
+        )
+    ).aggregate(
+        total=Count('pk_chauffeur'),
+        affectes=Count('pk_chauffeur', filter=Q(en_mission_active=True)),
+    )
+    camions = Camion.objects.filter(entreprise=entreprise).annotate(
+        en_mission_active=Exists(
+            Mission.objects.filter(statut='en cours', contrat__camion=OuterRef('pk'))
+        )
+    ).aggregate(
+        total=Count('pk_camion'),
+        affectes=Count('pk_camion', filter=Q(en_mission_active=True)),
+    )
+    affectations = Affectation.objects.filter(chauffeur__entreprise=entreprise).count()
+
+    # ========== RÉPARATIONS / PIÈCES ==========
+    periode = _period_q('date_reparation', date_debut, date_fin)
+    reparations = Reparation.objects.filter(camion__entreprise=entreprise).aggregate(
+        total=Count('pk_reparation', filter=periode),
+        ce_mois=Count('pk_reparation', filter=Q(date_reparation__gte=month_start)),
+        cout=Sum('cout', filter=periode),
+    )
+    pieces_qs = PieceReparee.objects.filter(reparation__camion__entreprise=entreprise)
+    pieces = pieces_qs.filter(_period_q('reparation__date_reparation', date_debut, date_fin)).aggregate(
+        total=Count('pk_piece'),
+        cout=Sum(F('quantite') * F('cout_unitaire')),
+    )
+
+    # ========== CONTRATS / CLIENTS ==========
+    periode = _period_q('date_debut', date_debut, date_fin)
+    contrats = ContratTransport.objects.filter(entreprise=entreprise).aggregate(
+        total=Count('pk_contrat', filter=periode),
+        actifs=Count('pk_contrat', filter=periode & Q(statut='actif')),
+        chiffre_affaires=Sum('montant_total', filter=periode),
+    )
+    sous_contrat = Q(contrattransport__entreprise=entreprise)
+    clients = Client.objects.filter(Q(entreprise=entreprise) | sous_contrat).aggregate(
+        total=Count('pk_client', filter=Q(entreprise=entreprise), distinct=True),
+        sous_contrat=Count('pk_client', filter=sous_contrat, distinct=True),
+    )
+
+    salaires_en_attente = Salaire.objects.filter(
+        chauffeur__entreprise=entreprise,
+        statut='brouillon',
+    ).count()
+
+    return DashboardMetrics(
+        total_missions=missions['total'],
+        missions_en_cours=par_statut.get('en cours', 0),
+        missions_terminees=par_statut.get('terminée', 0),
+        missions_annulees=par_statut.get('annulée', 0),
+        missions_en_retard=missions['en_retard'],
+        missions_ce_mois=missions['ce_mois'],
+        conteneurs_frais_stationnement=missions['stationnement'],
+        total_frais_stationnement=missions['frais_stationnement'] or Decimal('0'),
+        total_paiements=paiements['total'] or Decimal('0'),
+        paiements_en_attente=paiements['en_attente'],
+        paiements_valides=paiements['valides'],
+        revenus_ce_mois=paiements['revenus_ce_mois'] or Decimal('0'),
+        revenus_mois_actuel=paiements['revenus_mois_actuel'] or Decimal('0'),
+        total_cautions=cautions['total'] or Decimal('0'),
+        cautions_bloquees=cautions['bloquees'],
+        total_chauffeurs=chauffeurs['total'],
+        chauffeurs_affectes=chauffeurs['affectes'],
+        total_camions=camions['total'],
+        camions_affectes=camions['affectes'],
+        affectations=affectations,
+        total_reparations=reparations['total'],
+        reparations_en_cours=reparations['ce_mois'],
+        cout_reparations_total=reparations['cout'] or Decimal('0'),
+        total_pieces=pieces['total'],
+        cout_pieces_total=pieces['cout'] or Decimal('0'),
+        total_contrats=contrats['total'],
+        contrats_actifs=contrats['actifs'],
+        chiffre_affaires=contrats['chiffre_affaires'] or Decimal('0'),
+        total_clients=clients['total'],
+        clients_sous_contrat=clients['sous_contrat'],
+        salaires_en_attente=salaires_en_attente,
+        missions_par_statut_counts=par_statut,
+    )
+
+
+# ============================================================================
+# SNAPSHOTS EN CACHE PAR ENTREPRISE
+# ============================================================================
+
+def _entreprise_token(entreprise_pk):
+    """Les pk slugifiés peuvent dépasser la taille de clé des backends."""
+    return hashlib.md5(str(entreprise_pk).encode()).hexdigest()
+
+
+def _version_key(entreprise_pk):
+    return f'dashboard:{_entreprise_token(entreprise_pk)}:version'
+
+
+def _get_version(entreprise_pk):
+    key = _version_key(entreprise_pk)
+    version = cache.get(key)
+    if version is None:
+        # add() : deux lecteurs simultanés retiennent le même jeton
+        jeton = uuid.uuid4().hex
+        version = jeton if cache.add(key, jeton, None) else cache.get(key, jeton)
+    return version
+
+
+def invalidate_dashboard_cache(entreprise_pk):
+    """
+    Invalide tous les snapshots d'une entreprise (toutes périodes confondues).
+
+    Remplace le jeton de version contenu dans les clés par un jeton aléatoire :
+    contrairement à un compteur (évincé puis recréé à 1), il ne retombe jamais
+    sur une version déjà utilisée. Les anciens snapshots ne sont plus jamais
+    lus et expirent d'eux-mêmes.
+
+    Le jeton n'est partagé qu'au sein du backend de cache : avec plusieurs
+    processus (gunicorn, uwsgi), il faut un backend commun (file ou db), sinon
+    chaque processus garde ses propres snapshots.
+    """
+    if not entreprise_pk:
+        return
+    cache.set(_version_key(entreprise_pk), uuid.uuid4().hex, None)
+
+
+def get_dashboard_metrics(
+    entreprise,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+) -> DashboardMetrics:
+    """
+    Version mise en cache de ``compute_dashboard_metrics``.
+
+    La clé contient l'entreprise, la période demandée et la date du jour
+    (les KPIs "ce mois" / "en retard" changent à minuit).
+    """
+    if entreprise is None:
+        return compute_dashboard_metrics(entreprise, date_debut, date_fin)
+
+    today = timezone.now().date()
+    entreprise_pk = entreprise.pk
+    cache_key = 'dashboard:{}:v{}:{}:{}:{}'.format(
+        _entreprise_token(entreprise_pk),
+        _get_version(entreprise_pk),
+        date_debut.isoformat() if date_debut else '-',
+        date_fin.isoformat() if date_fin else '-',
+        today.isoformat(),
+    )
+    metrics = cache.get(cache_key)
+    if metrics is None:
+        metrics = compute_dashboard_metrics(entreprise, date_debut, date_fin, today=today)
+        cache.set(cache_key, metrics, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return metrics
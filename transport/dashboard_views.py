@@ -9,13 +9,14 @@ avec des statistiques, KPIs et graphiques.
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Sum, Avg, Q, F
-from django.db.models.functions import TruncMonth, TruncWeek, TruncDay
+from django.db.models.functions import TruncMonth, TruncDay
 from django.utils import timezone
 from datetime import timedelta, datetime
 from decimal import Decimal
 from .models import (
     Mission, PaiementMission, Conteneur, Camion, Chauffeur,
-    ContratTransport, Reparation, Client, Transitaire, Cautions
+    ContratTransport, Reparation, Client, Transitaire, Cautions,
+    RevenueRollup
 )
 
 
@@ -48,7 +49,7 @@ def dashboard_home(request):
     # === KPIs PAR ENTREPRISE ===
 
     # 1. Missions
-    missions_qs = Mission.objects.filter(contrat__entreprise=entreprise)
+    missions_qs = Mission.objects.filter(entreprise=entreprise)
     total_missions = missions_qs.count()
     if period_start:
         missions_periode = missions_qs.filter(date_depart__gte=period_start)
@@ -69,7 +70,7 @@ def dashboard_home(request):
         taux_annulation = 0
 
     # 2. Chiffre d'affaires
-    paiements_qs = PaiementMission.objects.filter(mission__contrat__entreprise=entreprise)
+    paiements_qs = PaiementMission.objects.filter(entreprise=entreprise)
     if period_start:
         paiements_valides = paiements_qs.filter(
             est_valide=True,
@@ -133,7 +134,7 @@ def dashboard_home(request):
     ).order_by('-nb_missions').distinct()[:5]
 
     # 5. Cautions
-    cautions_qs = Cautions.objects.filter(contrat__entreprise=entreprise)
+    cautions_qs = Cautions.objects.filter(entreprise=entreprise)
     cautions_bloquees = cautions_qs.filter(statut='en_attente').aggregate(
         total=Sum('montant')
     )['total'] or 0
@@ -327,73 +328,68 @@ def dashboard_financier(request):
     # Entreprise de l'utilisateur courant
     entreprise = getattr(request.user, 'entreprise', None)
 
-    # Tous les paiements de l'entreprise (validés + en attente)
-    paiements_qs_base = PaiementMission.objects.filter(
-        mission__contrat__entreprise=entreprise
-    )
+    # Les montants sont lus dans les cumuls pré-calculés (RevenueRollup).
+    # La période est alignée sur des semaines entières (lundi).
+    rollups = RevenueRollup.objects.filter(entreprise=entreprise)
+    semaines = rollups.filter(granularite='semaine')
     if period_start:
-        paiements_qs_base = paiements_qs_base.filter(date_paiement__gte=period_start)
+        semaines = semaines.filter(periode__gte=period_start - timedelta(days=period_start.weekday()))
 
-    # Paiements validés uniquement
-    paiements_valides = paiements_qs_base.filter(est_valide=True)
-    # Paiements en attente
-    paiements_attente = paiements_qs_base.filter(est_valide=False)
+    valide = Q(est_valide=True)
+    attente = Q(est_valide=False)
 
     # === KPIs ===
-    ca_valide = paiements_valides.aggregate(total=Sum('montant_total'))['total'] or 0
-    ca_en_attente = paiements_attente.aggregate(total=Sum('montant_total'))['total'] or 0
+    totaux = semaines.aggregate(
+        ca_valide=Sum('montant_total', filter=valide),
+        ca_en_attente=Sum('montant_total', filter=attente),
+        commission_total=Sum('commission_transitaire', filter=valide),
+        nb_valides=Sum('nombre_paiements', filter=valide),
+        nb_attente=Sum('nombre_paiements', filter=attente),
+    )
+    ca_valide = totaux['ca_valide'] or 0
+    ca_en_attente = totaux['ca_en_attente'] or 0
     ca_total = Decimal(ca_valide) + Decimal(ca_en_attente)
 
-    commission_total = paiements_valides.aggregate(total=Sum('commission_transitaire'))['total'] or 0
+    commission_total = totaux['commission_total'] or 0
     ca_net = Decimal(ca_valide) - Decimal(commission_total)
 
-    nb_paiements_valides = paiements_valides.count()
-    nb_paiements_attente = paiements_attente.count()
-    nb_paiements = paiements_qs_base.count()
+    nb_paiements_valides = totaux['nb_valides'] or 0
+    nb_paiements_attente = totaux['nb_attente'] or 0
+    nb_paiements = nb_paiements_valides + nb_paiements_attente
 
     ca_moyen = (ca_valide / nb_paiements_valides) if nb_paiements_valides > 0 else 0
 
     # === Évolution CA par semaine (8 dernières semaines) — tous paiements ===
     eight_weeks_ago = today - timedelta(weeks=8)
-    ca_par_semaine = PaiementMission.objects.filter(
-        mission__contrat__entreprise=entreprise,
-        date_paiement__gte=eight_weeks_ago
-    ).annotate(
-        semaine=TruncWeek('date_paiement')
-    ).values('semaine').annotate(
+    ca_par_semaine = rollups.filter(
+        granularite='semaine',
+        periode__gte=eight_weeks_ago - timedelta(days=eight_weeks_ago.weekday())
+    ).values('periode').annotate(
         ca=Sum('montant_total'),
-        ca_valide=Sum('montant_total', filter=Q(est_valide=True)),
-        ca_attente=Sum('montant_total', filter=Q(est_valide=False)),
-    ).order_by('semaine')
+        ca_valide=Sum('montant_total', filter=valide),
+        ca_attente=Sum('montant_total', filter=attente),
+    ).order_by('periode')
 
-    labels_semaine = [s['semaine'].strftime('%d/%m') for s in ca_par_semaine]
+    labels_semaine = [s['periode'].strftime('%d/%m') for s in ca_par_semaine]
     data_ca_semaine = [float(s['ca'] or 0) for s in ca_par_semaine]
     data_ca_valide_semaine = [float(s['ca_valide'] or 0) for s in ca_par_semaine]
     data_ca_attente_semaine = [float(s['ca_attente'] or 0) for s in ca_par_semaine]
 
     # === Top clients par CA total (tous paiements) ===
-    top_clients_ca = Client.objects.filter(
-        contrattransport__entreprise=entreprise
-    ).annotate(
-        ca=Sum('contrattransport__mission__paiementmission__montant_total'),
-        ca_valide=Sum('contrattransport__mission__paiementmission__montant_total',
-                      filter=Q(contrattransport__mission__paiementmission__est_valide=True)),
-    ).order_by('-ca').distinct()[:10]
+    par_mois = Q(revenuerollup__entreprise=entreprise, revenuerollup__granularite='mois')
+    top_clients_ca = Client.objects.filter(par_mois).annotate(
+        ca=Sum('revenuerollup__montant_total', filter=par_mois),
+        ca_valide=Sum('revenuerollup__montant_total',
+                      filter=par_mois & Q(revenuerollup__est_valide=True)),
+    ).order_by('-ca')[:10]
 
     # === Répartition CA par type de client ===
-    ca_entreprises = Client.objects.filter(
-        contrattransport__entreprise=entreprise,
-        type_client='entreprise'
-    ).annotate(
-        ca=Sum('contrattransport__mission__paiementmission__montant_total')
-    ).aggregate(total=Sum('ca'))['total'] or 0
-
-    ca_particuliers = Client.objects.filter(
-        contrattransport__entreprise=entreprise,
-        type_client='particulier'
-    ).annotate(
-        ca=Sum('contrattransport__mission__paiementmission__montant_total')
-    ).aggregate(total=Sum('ca'))['total'] or 0
+    ca_par_type = rollups.filter(granularite='mois').aggregate(
+        entreprises=Sum('montant_total', filter=Q(client__type_client='entreprise')),
+        particuliers=Sum('montant_total', filter=Q(client__type_client='particulier')),
+    )
+    ca_entreprises = ca_par_type['entreprises'] or 0
+    ca_particuliers = ca_par_type['particuliers'] or 0
 
     context = {
         'title': 'Dashboard Financier',
@@ -64,6 +64,30 @@ def admin_required(view_func):
     return _wrapped_view
 
 
+def superuser_required(view_func):
+    """
+    Décorateur pour limiter l'accès aux superutilisateurs (pages internes)
+
+    Usage:
+        @superuser_required
+        def ma_vue_interne(request):
+            ...
+    """
+    @wraps(view_func)
+    @login_required
+    def _wrapped_view(request, *args, **kwargs):
+        if request.user.is_superuser:
+            return view_func(request, *args, **kwargs)
+
+        messages.error(
+            request,
+            "❌ Accès refusé. Cette page est réservée aux superutilisateurs."
+        )
+        return redirect('dashboard')
+
+    return _wrapped_view
+
+
 def manager_or_admin_required(view_func):
     """
     Décorateur pour limiter l'accès aux managers et administrateurs
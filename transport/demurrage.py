@@ -0,0 +1,243 @@
+"""
+Calendrier ouvré et frais de stationnement (demurrage)
+======================================================
+
+Règles de calcul des frais de stationnement :
+
+- les N premiers jours ouvrables (lun-ven, hors jours fériés) sont gratuits,
+  N = ``settings.DEMURRAGE_JOURS_GRATUITS`` (3 par défaut) ;
+- si l'arrivée tombe un jour non ouvré, la franchise commence au jour ouvré
+  suivant ;
+- après la franchise, TOUS les jours calendaires sont facturés ;
+- tarif : ``Entreprise.tarif_stationnement`` s'il est renseigné, sinon
+  ``settings.DEMURRAGE_TARIF_JOURNALIER``.
+
+Les comptes de jours ouvrables sont calculés en temps constant (semaines
+entières + reste), sans boucle jour par jour : le coût ne dépend plus de la
+durée du stationnement. ``calculer_frais_missions`` calcule les frais d'un
+queryset de missions en une seule requête.
+
+Usage:
+    from transport.demurrage import calculer_frais, calculer_frais_missions
+
+    frais = calculer_frais(date_arrivee, date_dechargement, Decimal('25000'))
+    frais.montant, frais.jours_facturables
+
+    frais_par_mission = calculer_frais_missions(Mission.objects.filter(...))
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def _lun_ven(debut, fin):
+    """Nombre de jours du lundi au vendredi entre deux dates incluses."""
+    if fin < debut:
+        return 0
+    semaines, reste = divmod((fin - debut).days + 1, 7)
+    jour = debut.weekday()
+    # Le reste (< 7 jours) commence au jour `jour` et peut déborder sur la
+    # semaine suivante : jours ouvrés de [jour, jour + reste) modulo 7
+    partiel = max(0, min(jour + reste, 5) - jour) + max(0, min(jour + reste - 7, 5))
+    return semaines * 5 + partiel
+
+
+def _ajouter_lun_ven(jour, n):
+    """n-ième jour du lundi au vendredi à partir de `jour` inclus (n >= 1)."""
+    if jour.weekday() >= 5:
+        jour += timedelta(days=7 - jour.weekday())
+    semaines, reste = divmod(n - 1, 5)
+    jour += timedelta(weeks=semaines)
+    if jour.weekday() + reste >= 5:
+        reste += 2
+    return jour + timedelta(days=reste)
+
+
+class CalendrierOuvre:
+    """
+    Jours ouvrés : du lundi au vendredi, hors jours fériés.
+
+    Args:
+        jours_feries: Dates (date ou chaîne AAAA-MM-JJ) exclues des jours ouvrés
+    """
+
+    def __init__(self, jours_feries=()):
+        feries = {
+            date.fromisoformat(jour) if isinstance(jour, str) else jour
+            for jour in jours_feries
+        }
+        # Seuls les fériés tombant en semaine retirent un jour ouvré
+        self._feries = sorted(jour for jour in feries if jour.weekday() < 5)
+
+    def _feries_entre(self, debut, fin):
+        return bisect_right(self._feries, fin) - bisect_left(self._feries, debut)
+
+    def est_ouvre(self, jour):
+        return jour.weekday() < 5 and self._feries_entre(jour, jour) == 0
+
+    def jours_ouvres(self, debut, fin):
+        """Nombre de jours ouvrés entre deux dates incluses."""
+        if not debut or not fin or fin < debut:
+            return 0
+        return _lun_ven(debut, fin) - self._feries_entre(debut, fin)
+
+    def n_ieme_jour_ouvre(self, debut, n):
+        """Date du n-ième jour ouvré à partir de `debut` inclus (n >= 1)."""
+        fin = _ajouter_lun_ven(debut, n)
+        # Chaque férié rencontré repousse la fin d'autant de jours ouvrés ;
+        # le nombre d'itérations est borné par le nombre de fériés
+        manquants = n - self.jours_ouvres(debut, fin)
+        while manquants > 0:
+            fin = _ajouter_lun_ven(fin + timedelta(days=1), manquants)
+            manquants = n - self.jours_ouvres(debut, fin)
+        return fin
+
+
+def calendrier_par_defaut():
+    """Calendrier construit à partir de settings.DEMURRAGE_JOURS_FERIES."""
+    return CalendrierOuvre(getattr(settings, 'DEMURRAGE_JOURS_FERIES', ()))
+
+
+def jours_gratuits_par_defaut():
+    return getattr(settings, 'DEMURRAGE_JOURS_GRATUITS', 3)
+
+
+def tarif_journalier(entreprise=None):
+    """Tarif journalier de l'entreprise, ou tarif par défaut des settings."""
+    if entreprise is not None and entreprise.tarif_stationnement is not None:
+        return entreprise.tarif_stationnement
+    return Decimal(str(getattr(settings, 'DEMURRAGE_TARIF_JOURNALIER', '25000')))
+
+
+@dataclass
+class FraisStationnement:
+    """Résultat du calcul des frais de stationnement d'une mission."""
+
+    date_arrivee: date
+    date_fin: date
+    debut_gratuit: date
+    fin_gratuit: date
+    jours_gratuits: int
+    jours_facturables: int
+    tarif_journalier: Decimal
+    decharge: bool = False
+
+    @property
+    def debut_facturation(self):
+        return self.fin_gratuit + timedelta(days=1)
+
+    @property
+    def jours_total(self):
+        return (self.date_fin - self.date_arrivee).days + 1
+
+    @property
+    def montant(self):
+        return self.jours_facturables * self.tarif_journalier
+
+    @property
+    def statut(self):
+        if self.decharge:
+            return 'decharge'
+        return 'en_stationnement' if self.jours_facturables > 0 else 'attente'
+
+    @property
+    def message(self):
+        return (
+            f"{self.jours_total} jours total depuis arrivée, {self.jours_gratuits} jours ouvrables gratuits, "
+            f"{self.jours_facturables} jours facturables"
+        )
+
+    def as_dict(self):
+        """Format historique de Mission.calculer_frais_stationnement()."""
+        return {
+            'jours_total': self.jours_total,
+            'jours_gratuits': self.jours_gratuits,
+            'jours_facturables': self.jours_facturables,
+            'montant': self.montant,
+            'statut': self.statut,
+            'message': self.message,
+        }
+
+
+def _periode_gratuite(date_arrivee, jours_gratuits, calendrier):
+    """(début, fin) de la franchise ; fin = veille de l'arrivée si aucune franchise."""
+    if jours_gratuits <= 0:
+        return date_arrivee, date_arrivee - timedelta(days=1)
+    debut = calendrier.n_ieme_jour_ouvre(date_arrivee, 1)
+    return debut, calendrier.n_ieme_jour_ouvre(debut, jours_gratuits)
+
+
+def calculer_frais(date_arrivee, date_fin, tarif, jours_gratuits=None, calendrier=None, decharge=False):
+    """
+    Calcule les frais de stationnement entre l'arrivée et `date_fin` incluse.
+
+    Args:
+        date_arrivee: Date d'arrivée (blocage pour stationnement)
+        date_fin: Date de déchargement, ou date de référence si non déchargé
+        tarif: Tarif journalier (Decimal)
+        jours_gratuits: Jours ouvrables gratuits (défaut: settings)
+        calendrier: CalendrierOuvre (défaut: settings)
+        decharge: True si `date_fin` est la date de déchargement
+
+    Returns:
+        FraisStationnement
+    """
+    if jours_gratuits is None:
+        jours_gratuits = jours_gratuits_par_defaut()
+    calendrier = calendrier or calendrier_par_defaut()
+    debut_gratuit, fin_gratuit = _periode_gratuite(date_arrivee, jours_gratuits, calendrier)
+    return FraisStationnement(
+        date_arrivee=date_arrivee,
+        date_fin=date_fin,
+        debut_gratuit=debut_gratuit,
+        fin_gratuit=fin_gratuit,
+        jours_gratuits=jours_gratuits,
+        jours_facturables=max(0, (date_fin - fin_gratuit).days),
+        tarif_journalier=tarif,
+        decharge=decharge,
+    )
+
+
+def calculer_frais_missions(missions, date_reference=None):
+    """
+    Calcule les frais de stationnement d'un queryset de missions en une requête.
+
+    Les missions sans date d'arrivée sont ignorées. Pour les missions non
+    déchargées, les frais courent jusqu'à `date_reference` (aujourd'hui par
+    défaut).
+
+    Returns:
+        dict: {pk_mission: FraisStationnement}
+    """
+    date_reference = date_reference or timezone.now().date()
+    jours_gratuits = jours_gratuits_par_defaut()
+    calendrier = calendrier_par_defaut()
+    tarif_defaut = tarif_journalier()
+
+    lignes = missions.filter(date_arrivee__isnull=False).values_list(
+        'pk_mission', 'date_arrivee', 'date_dechargement', 'entreprise__tarif_stationnement',
+    )
+    # Beaucoup de missions partagent la même date d'arrivée
+    periodes = {}
+    resultats = {}
+    for pk_mission, date_arrivee, date_dechargement, tarif in lignes:
+        if date_arrivee not in periodes:
+            periodes[date_arrivee] = _periode_gratuite(date_arrivee, jours_gratuits, calendrier)
+        debut_gratuit, fin_gratuit = periodes[date_arrivee]
+        date_fin = date_dechargement or date_reference
+        resultats[pk_mission] = FraisStationnement(
+            date_arrivee=date_arrivee,
+            date_fin=date_fin,
+            debut_gratuit=debut_gratuit,
+            fin_gratuit=fin_gratuit,
+            jours_gratuits=jours_gratuits,
+            jours_facturables=max(0, (date_fin - fin_gratuit).days),
+            tarif_journalier=tarif if tarif is not None else tarif_defaut,
+            decharge=date_dechargement is not None,
+        )
+    return resultats
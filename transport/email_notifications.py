@@ -30,9 +30,15 @@ class EmailNotifier:
     Classe pour gérer l'envoi de notifications email
     """
 
-    def __init__(self):
+    def __init__(self, connection=None):
+        """
+        Args:
+            connection: Connexion SMTP partagée (``get_connection()``) pour
+                        envoyer un lot d'emails sans se reconnecter à chaque envoi
+        """
         self.from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@transport-system.com')
         self.admin_email = getattr(settings, 'ADMIN_EMAIL', 'admin@transport-system.com')
+        self.connection = connection
 
     def _send_email(self, subject, html_content, recipient_list, fail_silently=True):
         """
@@ -53,7 +59,8 @@ class EmailNotifier:
                 subject=subject,
                 body=text_content,
                 from_email=self.from_email,
-                to=recipient_list
+                to=recipient_list,
+                connection=self.connection
             )
 
             # Ajouter le contenu HTML
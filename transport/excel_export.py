@@ -0,0 +1,113 @@
+"""
+Écriture de fichiers Excel en flux
+==================================
+
+Classeur openpyxl en mode ``write_only`` : les lignes sont écrites au fil
+de l'eau dans un fichier temporaire au lieu d'être conservées en mémoire.
+
+Contraintes du mode write_only :
+- les largeurs de colonnes doivent être fixées avant la première ligne ;
+- les styles sont des styles nommés appliqués aux cellules qui en ont
+  besoin (en-têtes, montants), les autres valeurs sont écrites brutes.
+
+Exemple:
+    writer = ExcelWriter()
+    ws = writer.add_sheet("Missions", headers=["ID", "Montant"], widths=[20, 15])
+    writer.write_rows(ws, lignes(), styles={1: 'montant_fcfa'})
+    return writer.response("missions.xlsx")
+"""
+
+from django.http import HttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _fond(couleur):
+    return PatternFill(start_color=couleur, end_color=couleur, fill_type="solid")
+
+
+# Styles nommés disponibles : nom -> attributs du NamedStyle
+NAMED_STYLES = {
+    'entete_bleu': dict(
+        font=Font(color="FFFFFF", bold=True), fill=_fond("4472C4"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+    ),
+    'entete_vert': dict(
+        font=Font(color="FFFFFF", bold=True), fill=_fond("70AD47"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+    ),
+    'entete_rapport': dict(
+        font=Font(color="FFFFFF", bold=True), fill=_fond("667EEA"),
+        alignment=Alignment(horizontal="center"),
+    ),
+    'entete_violet': dict(
+        font=Font(color="FFFFFF", bold=True), fill=_fond("764BA2"),
+    ),
+    'entete_gris': dict(
+        font=Font(bold=True), fill=_fond("E0E0E0"),
+    ),
+    'titre_rapport': dict(
+        font=Font(size=18, bold=True, color="FFFFFF"), fill=_fond("667EEA"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+    ),
+    'titre_section': dict(
+        font=Font(size=14, bold=True),
+    ),
+    'montant_fcfa': dict(
+        number_format='#,##0 "FCFA"',
+    ),
+}
+
+
+class ExcelWriter:
+    """Classeur Excel en écriture seule, alimenté par des générateurs de lignes."""
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        for name, attrs in NAMED_STYLES.items():
+            self.workbook.add_named_style(NamedStyle(name=name, **attrs))
+
+    def cell(self, sheet, value, style):
+        """Cellule portant un style nommé."""
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.style = style
+        return cell
+
+    def add_sheet(self, title, headers=None, widths=None, header_style='entete_bleu'):
+        """
+        Crée une feuille, fixe les largeurs de colonnes puis écrit l'en-tête.
+
+        ``widths`` est la liste des largeurs, colonne A en premier.
+        """
+        from openpyxl.utils import get_column_letter
+
+        sheet = self.workbook.create_sheet(title)
+        for idx, width in enumerate(widths or [], 1):
+            sheet.column_dimensions[get_column_letter(idx)].width = width
+        if headers:
+            sheet.append([self.cell(sheet, header, header_style) for header in headers])
+        return sheet
+
+    def write_rows(self, sheet, rows, styles=None):
+        """
+        Écrit les lignes d'un itérable (générateur, values_list().iterator()...).
+
+        ``styles`` associe un index de colonne (0 = A) à un style nommé.
+        """
+        for row in rows:
+            if styles:
+                row = list(row)
+                for idx, style in styles.items():
+                    row[idx] = self.cell(sheet, row[idx], style)
+            sheet.append(row)
+
+    def response(self, filename):
+        """Réponse HTTP contenant le classeur."""
+        response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        self.workbook.save(response)
+        return response
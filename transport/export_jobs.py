@@ -0,0 +1,125 @@
+"""
+Exécution des exports en arrière-plan
+=====================================
+
+Les exports lourds (Excel, CSV, PDF) peuvent être demandés en asynchrone :
+la vue crée un ``ExportJob``, le worker (``python manage.py run_export_worker``)
+l'exécute puis dépose le fichier dans MEDIA_ROOT/exports/.
+
+Chaque type d'export réutilise la vue synchrone existante, appelée avec une
+requête reconstruite à partir de l'utilisateur et des filtres mémorisés :
+le contenu et les contrôles d'accès restent identiques à l'export direct.
+"""
+
+import logging
+import re
+import tempfile
+
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files import File
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# type d'export -> (vue synchrone, libellé, rôles requis)
+EXPORT_TYPES = {
+    'missions_excel': ('transport.export_views.export_missions_excel', 'Missions (Excel)', None),
+    'missions_csv': ('transport.export_views.export_missions_csv', 'Missions (CSV)', None),
+    'missions_pdf': ('transport.pdf_reports.generate_missions_report_pdf', 'Rapport des missions (PDF)', None),
+    'paiements_excel': ('transport.export_views.export_paiements_excel', 'Paiements (Excel)', None),
+    'paiements_csv': ('transport.export_views.export_paiements_csv', 'Paiements (CSV)', None),
+    'paiements_pdf': ('transport.pdf_reports.generate_paiements_report_pdf', 'Rapport des paiements (PDF)', None),
+    'utilisateurs_excel': ('transport.export_views.export_utilisateurs_excel', 'Utilisateurs (Excel)', None),
+    'audit_excel': ('transport.export_views.export_audit_excel', "Historique d'audit (Excel)", None),
+    'rapport_financier_excel': (
+        'transport.reports_views.export_financial_report_excel', 'Rapport financier (Excel)',
+        ('ADMIN', 'COMPTABLE'),
+    ),
+}
+
+# Taille des blocs entre deux mises à jour de l'avancement pendant l'écriture
+_PROGRESS_BYTES = 1024 * 1024
+
+
+class ExportJobError(Exception):
+    """Erreur fonctionnelle pendant l'exécution d'un export."""
+
+
+def export_autorise(user, type_export):
+    """Vérifie, comme role_required, que l'utilisateur peut demander cet export."""
+    from .permissions import ROLES
+
+    roles = EXPORT_TYPES[type_export][2]
+    if not roles or user.is_superuser:
+        return True
+    allowed = {ROLES[role]['name'] for role in roles}
+    return user.groups.filter(name__in=allowed).exists()
+
+
+def _construire_requete(job):
+    """Requête GET équivalente à celle de l'export direct."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = f'/exports/{job.type_export}/'
+    request.GET = QueryDict(mutable=True)
+    for key, values in (job.parametres or {}).items():
+        request.GET.setlist(key, values if isinstance(values, list) else [values])
+    request.user = job.utilisateur
+    # Les décorateurs d'accès peuvent ajouter un message en cas de refus
+    request._messages = CookieStorage(request)
+    return request
+
+
+def _nom_fichier(response, type_export):
+    match = re.search(r'filename="?([^";]+)"?', response.get('Content-Disposition', ''))
+    return match.group(1) if match else type_export
+
+
+def executer_job(job):
+    """Exécute un job réservé et enregistre le fichier produit."""
+    vue = import_string(EXPORT_TYPES[job.type_export][0])
+
+    job.avancer(10, 'Génération du fichier')
+    response = vue(_construire_requete(job))
+    if response.status_code != 200:
+        if response.status_code in (301, 302):
+            raise ExportJobError("Accès refusé à cet export")
+        raise ExportJobError(
+            f"L'export a répondu {response.status_code}: {response.content[:500].decode(errors='replace')}"
+        )
+
+    job.avancer(50, 'Écriture du fichier')
+    with tempfile.TemporaryFile() as tmp:
+        chunks = response.streaming_content if response.streaming else [response.content]
+        ecrits = prochain_palier = 0
+        for chunk in chunks:
+            tmp.write(chunk)
+            ecrits += len(chunk)
+            if ecrits >= prochain_palier + _PROGRESS_BYTES:
+                prochain_palier = ecrits
+                job.avancer(60, f'{ecrits // 1024} Ko écrits')
+        tmp.seek(0)
+
+        job.avancer(90, 'Enregistrement')
+        job.nom_fichier = _nom_fichier(response, job.type_export)
+        job.content_type = response.get('Content-Type', 'application/octet-stream')
+        job.fichier.save(f'{job.pk_job}_{job.nom_fichier}', File(tmp), save=False)
+    job.terminer()
+
+
+def executer_job_par_pk(pk_job):
+    """
+    Recharge un job réservé, l'exécute et enregistre l'échec éventuel.
+    Retourne le statut final.
+    """
+    from .models import ExportJob
+
+    job = ExportJob.objects.select_related('utilisateur').get(pk_job=pk_job)
+    try:
+        executer_job(job)
+    except Exception as exc:
+        logger.exception("❌ Échec de l'export %s (%s)", job.pk_job, job.type_export)
+        job.echouer(exc)
+    return job.statut
@@ -3,273 +3,217 @@ Vues pour l'export de données en Excel et CSV
 ==============================================
 """
 
-from django.http import HttpResponse
+import csv
+
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
 from datetime import datetime
 from .models import Mission, PaiementMission
 
 
+# Nombre de lignes lues par aller-retour base lors des exports en flux
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """Pseudo-buffer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def _streaming_csv_response(filename, headers, rows):
+    """
+    Construit une réponse CSV streamée (BOM UTF-8, séparateur ';').
+
+    Les lignes sont produites au fil de l'eau : la mémoire reste constante
+    quelle que soit la taille de l'export.
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+
+    def contenu():
+        # BOM UTF-8 pour Excel
+        yield '\ufeff' + writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(contenu(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def _lignes_missions(missions):
+    """Lignes d'export (Excel et CSV) des missions, lues par paquets."""
+    rows = missions.values_list(
+        'pk_mission', 'statut', 'origine', 'destination', 'date_depart', 'date_retour',
+        'contrat__chauffeur_id', 'contrat__chauffeur__nom', 'contrat__chauffeur__prenom',
+        'contrat__client__nom', 'contrat__camion__immatriculation',
+        'contrat__conteneur__numero_conteneur',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for (pk_mission, statut, origine, destination, date_depart, date_retour,
+         chauffeur_id, chauffeur_nom, chauffeur_prenom, client, camion, conteneur) in rows:
+        yield [
+            pk_mission[:15],
+            statut,
+            origine,
+            destination,
+            date_depart.strftime('%d/%m/%Y') if date_depart else '',
+            date_retour.strftime('%d/%m/%Y') if date_retour else '',
+            f"{chauffeur_nom} {chauffeur_prenom}" if chauffeur_id else '',
+            client or '',
+            camion or '',
+            conteneur or '',
+        ]
+
+
+def _lignes_paiements(paiements):
+    """Lignes d'export (Excel et CSV) des paiements, lues par paquets."""
+    rows = paiements.values_list(
+        'pk_paiement', 'mission__pk_mission', 'montant_total', 'commission_transitaire',
+        'caution_est_retiree', 'est_valide', 'date_validation',
+        'mission__contrat__chauffeur_id', 'mission__contrat__chauffeur__nom',
+        'mission__contrat__chauffeur__prenom', 'mode_paiement',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for (pk_paiement, mission_id, montant_total, commission, caution_retiree,
+         est_valide, date_validation, chauffeur_id, chauffeur_nom,
+         chauffeur_prenom, mode_paiement) in rows:
+        yield [
+            pk_paiement[:15],
+            mission_id[:15] if mission_id else '',
+            float(montant_total),
+            float(commission),
+            'Oui' if caution_retiree else 'Non',
+            'Validé' if est_valide else 'En attente',
+            date_validation.strftime('%d/%m/%Y') if date_validation else '',
+            f"{chauffeur_nom} {chauffeur_prenom}" if chauffeur_id else '',
+            mode_paiement,
+        ]
+
+
 @login_required
 def export_missions_excel(request):
     """Export des missions en format Excel"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from .excel_export import ExcelWriter
     except ImportError:
         return HttpResponse("❌ Bibliothèque openpyxl non installée. Exécutez: pip install openpyxl", status=500)
 
     from .filters import MissionFilter
 
     # Récupérer les missions filtrées
-    missions = Mission.objects.select_related(
-        'contrat', 'contrat__chauffeur', 'contrat__client', 'contrat__camion', 'contrat__conteneur'
-    ).filter(contrat__entreprise=request.user.entreprise).order_by('-date_depart')
+    missions = Mission.objects.filter(
+        entreprise=request.user.entreprise
+    ).order_by('-date_depart')
 
     # Appliquer les mêmes filtres que la liste
     missions = MissionFilter.apply(missions, request)
 
-    # Créer un nouveau workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Missions"
-
-    # Style de l'en-tête
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # En-têtes
-    headers = [
-        "ID Mission", "Statut", "Origine", "Destination",
-        "Date Départ", "Date Retour", "Chauffeur", "Client",
-        "Camion", "Conteneur"
-    ]
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Données
-    for row, mission in enumerate(missions, 2):
-        ws.cell(row=row, column=1).value = mission.pk_mission[:15]
-        ws.cell(row=row, column=2).value = mission.statut
-        ws.cell(row=row, column=3).value = mission.origine
-        ws.cell(row=row, column=4).value = mission.destination
-        ws.cell(row=row, column=5).value = mission.date_depart.strftime('%d/%m/%Y') if mission.date_depart else ''
-        ws.cell(row=row, column=6).value = mission.date_retour.strftime('%d/%m/%Y') if mission.date_retour else ''
-
-        if mission.contrat:
-            ws.cell(row=row, column=7).value = f"{mission.contrat.chauffeur.nom} {mission.contrat.chauffeur.prenom}" if mission.contrat.chauffeur else ''
-            ws.cell(row=row, column=8).value = mission.contrat.client.nom if mission.contrat.client else ''
-            ws.cell(row=row, column=9).value = mission.contrat.camion.immatriculation if mission.contrat.camion else ''
-            ws.cell(row=row, column=10).value = mission.contrat.conteneur.numero_conteneur if mission.contrat.conteneur else ''
-
-    # Ajuster les largeurs de colonnes
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column].width = min(max_length + 2, 50)
-
-    # Préparer la réponse HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    writer = ExcelWriter()
+    ws = writer.add_sheet(
+        "Missions",
+        headers=[
+            "ID Mission", "Statut", "Origine", "Destination",
+            "Date Départ", "Date Retour", "Chauffeur", "Client",
+            "Camion", "Conteneur"
+        ],
+        widths=[17, 12, 25, 25, 13, 13, 30, 30, 15, 18],
     )
-    response['Content-Disposition'] = f'attachment; filename=missions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    writer.write_rows(ws, _lignes_missions(missions))
 
-    wb.save(response)
-    return response
+    return writer.response(f'missions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
 
 
 @login_required
 def export_missions_csv(request):
-    """Export des missions en format CSV"""
-    import csv
+    """Export des missions en format CSV (réponse streamée)"""
     from .filters import MissionFilter
 
     # Récupérer les missions filtrées
-    missions = Mission.objects.select_related(
-        'contrat', 'contrat__chauffeur', 'contrat__client', 'contrat__camion', 'contrat__conteneur'
-    ).filter(contrat__entreprise=request.user.entreprise).order_by('-date_depart')
+    missions = Mission.objects.filter(
+        entreprise=request.user.entreprise
+    ).order_by('-date_depart')
 
     # Appliquer les mêmes filtres que la liste
     missions = MissionFilter.apply(missions, request)
 
-    # Créer la réponse HTTP
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename=missions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-
-    # BOM UTF-8 pour Excel
-    response.write('\ufeff')
-
-    writer = csv.writer(response, delimiter=';')
-
-    # En-têtes
-    writer.writerow([
-        'ID Mission', 'Statut', 'Origine', 'Destination',
-        'Date Départ', 'Date Retour', 'Chauffeur', 'Client',
-        'Camion', 'Conteneur'
-    ])
-
-    # Données
-    for mission in missions:
-        writer.writerow([
-            mission.pk_mission[:15],
-            mission.statut,
-            mission.origine,
-            mission.destination,
-            mission.date_depart.strftime('%d/%m/%Y') if mission.date_depart else '',
-            mission.date_retour.strftime('%d/%m/%Y') if mission.date_retour else '',
-            f"{mission.contrat.chauffeur.nom} {mission.contrat.chauffeur.prenom}" if mission.contrat and mission.contrat.chauffeur else '',
-            mission.contrat.client.nom if mission.contrat and mission.contrat.client else '',
-            mission.contrat.camion.immatriculation if mission.contrat and mission.contrat.camion else '',
-            mission.contrat.conteneur.numero_conteneur if mission.contrat and mission.contrat.conteneur else '',
-        ])
-
-    return response
+    return _streaming_csv_response(
+        f'missions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        [
+            'ID Mission', 'Statut', 'Origine', 'Destination',
+            'Date Départ', 'Date Retour', 'Chauffeur', 'Client',
+            'Camion', 'Conteneur'
+        ],
+        _lignes_missions(missions),
+    )
 
 
 @login_required
 def export_paiements_excel(request):
     """Export des paiements en format Excel"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from .excel_export import ExcelWriter
     except ImportError:
         return HttpResponse("❌ Bibliothèque openpyxl non installée. Exécutez: pip install openpyxl", status=500)
 
     from .filters import PaiementMissionFilter
 
     # Récupérer les paiements filtrés
-    paiements = PaiementMission.objects.select_related(
-        'mission', 'mission__contrat__chauffeur', 'caution'
-    ).filter(mission__contrat__entreprise=request.user.entreprise).order_by('-date_paiement')
+    paiements = PaiementMission.objects.filter(
+        entreprise=request.user.entreprise
+    ).order_by('-date_paiement')
 
     # Appliquer les mêmes filtres que la liste
     paiements = PaiementMissionFilter.apply(paiements, request)
 
-    # Créer un nouveau workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Paiements"
-
-    # Style de l'en-tête
-    header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # En-têtes
-    headers = [
-        "ID Paiement", "Mission", "Montant Total", "Commission",
-        "Caution Retirée", "Est Validé", "Date Validation",
-        "Chauffeur", "Mode Paiement"
-    ]
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Données
-    for row, paiement in enumerate(paiements, 2):
-        ws.cell(row=row, column=1).value = paiement.pk_paiement[:15]
-        ws.cell(row=row, column=2).value = paiement.mission.pk_mission[:15] if paiement.mission else ''
-        ws.cell(row=row, column=3).value = float(paiement.montant_total)
-        ws.cell(row=row, column=4).value = float(paiement.commission_transitaire)
-        ws.cell(row=row, column=5).value = "Oui" if paiement.caution_est_retiree else "Non"
-        ws.cell(row=row, column=6).value = "Validé" if paiement.est_valide else "En attente"
-        ws.cell(row=row, column=7).value = paiement.date_validation.strftime('%d/%m/%Y') if paiement.date_validation else ''
-
-        if paiement.mission and paiement.mission.contrat and paiement.mission.contrat.chauffeur:
-            chauffeur = paiement.mission.contrat.chauffeur
-            ws.cell(row=row, column=8).value = f"{chauffeur.nom} {chauffeur.prenom}"
-
-        ws.cell(row=row, column=9).value = paiement.mode_paiement
-
-    # Ajuster les largeurs de colonnes
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column].width = min(max_length + 2, 50)
-
-    # Préparer la réponse HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    writer = ExcelWriter()
+    ws = writer.add_sheet(
+        "Paiements",
+        headers=[
+            "ID Paiement", "Mission", "Montant Total", "Commission",
+            "Caution Retirée", "Est Validé", "Date Validation",
+            "Chauffeur", "Mode Paiement"
+        ],
+        widths=[17, 17, 15, 13, 16, 13, 16, 30, 16],
+        header_style='entete_vert',
     )
-    response['Content-Disposition'] = f'attachment; filename=paiements_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    writer.write_rows(ws, _lignes_paiements(paiements))
 
-    wb.save(response)
-    return response
+    return writer.response(f'paiements_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
 
 
 @login_required
 def export_paiements_csv(request):
-    """Export des paiements en format CSV"""
-    import csv
+    """Export des paiements en format CSV (réponse streamée)"""
     from .filters import PaiementMissionFilter
 
     # Récupérer les paiements filtrés
-    paiements = PaiementMission.objects.select_related(
-        'mission', 'mission__contrat__chauffeur', 'caution'
-    ).filter(mission__contrat__entreprise=request.user.entreprise).order_by('-date_paiement')
+    paiements = PaiementMission.objects.filter(
+        entreprise=request.user.entreprise
+    ).order_by('-date_paiement')
 
     # Appliquer les mêmes filtres que la liste
     paiements = PaiementMissionFilter.apply(paiements, request)
 
-    # Créer la réponse HTTP
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename=paiements_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-
-    # BOM UTF-8 pour Excel
-    response.write('\ufeff')
-
-    writer = csv.writer(response, delimiter=';')
-
-    # En-têtes
-    writer.writerow([
-        'ID Paiement', 'Mission', 'Montant Total', 'Commission',
-        'Caution Retirée', 'Est Validé', 'Date Validation',
-        'Chauffeur', 'Mode Paiement'
-    ])
-
-    # Données
-    for paiement in paiements:
-        chauffeur = ''
-        if paiement.mission and paiement.mission.contrat and paiement.mission.contrat.chauffeur:
-            c = paiement.mission.contrat.chauffeur
-            chauffeur = f"{c.nom} {c.prenom}"
-
-        writer.writerow([
-            paiement.pk_paiement[:15],
-            paiement.mission.pk_mission[:15] if paiement.mission else '',
-            float(paiement.montant_total),
-            float(paiement.commission_transitaire),
-            'Oui' if paiement.caution_est_retiree else 'Non',
-            'Validé' if paiement.est_valide else 'En attente',
-            paiement.date_validation.strftime('%d/%m/%Y') if paiement.date_validation else '',
-            chauffeur,
-            paiement.mode_paiement,
-        ])
-
-    return response
+    return _streaming_csv_response(
+        f'paiements_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        [
+            'ID Paiement', 'Mission', 'Montant Total', 'Commission',
+            'Caution Retirée', 'Est Validé', 'Date Validation',
+            'Chauffeur', 'Mode Paiement'
+        ],
+        _lignes_paiements(paiements),
+    )
 
 
 @login_required
 def export_utilisateurs_excel(request):
     """Export des utilisateurs en format Excel"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from .excel_export import ExcelWriter
     except ImportError:
         return HttpResponse("❌ Bibliothèque openpyxl non installée. Exécutez: pip install openpyxl", status=500)
 
@@ -281,95 +225,61 @@ def export_utilisateurs_excel(request):
         pk_utilisateur=''
     ).exclude(
         pk_utilisateur__isnull=True
-    ).filter(entreprise=request.user.entreprise).prefetch_related('groups').order_by('nom_utilisateur', 'email')
-
-    # Créer un nouveau workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Utilisateurs"
-
-    # Style de l'en-tête
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # En-têtes
-    headers = [
-        "Nom d'utilisateur", "Email", "Rôle", "Statut",
-        "Staff", "Superuser", "Date de création", "Entreprise"
-    ]
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Données
-    for row_idx, user in enumerate(utilisateurs, 2):
-        # Déterminer le rôle
-        role_code = get_user_role(user)
-        if role_code == 'SUPERUSER':
-            role_display = 'Super Admin'
-        elif role_code in ROLES:
-            role_display = ROLES[role_code]['name']
-        else:
-            role_display = 'Aucun rôle'
-
-        # Nom d'affichage
-        display_name = user.nom_utilisateur or user.email or f"User {user.pk_utilisateur}"
-
-        ws.append([
-            display_name,
-            user.email,
-            role_display,
-            'Actif' if user.is_active else 'Inactif',
-            'Oui' if user.is_staff else 'Non',
-            'Oui' if user.is_superuser else 'Non',
-            user.date_creation.strftime('%d/%m/%Y %H:%M') if user.date_creation else '',
-            user.entreprise.nom if user.entreprise else '',
-        ])
-
-    # Ajuster la largeur des colonnes
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column].width = adjusted_width
-
-    # Créer la réponse HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    ).filter(entreprise=request.user.entreprise).select_related(
+        'entreprise'
+    ).prefetch_related('groups').order_by('nom_utilisateur', 'email')
+
+    def lignes():
+        for user in utilisateurs:
+            # Déterminer le rôle
+            role_code = get_user_role(user)
+            if role_code == 'SUPERUSER':
+                role_display = 'Super Admin'
+            elif role_code in ROLES:
+                role_display = ROLES[role_code]['name']
+            else:
+                role_display = 'Aucun rôle'
+
+            # Nom d'affichage
+            display_name = user.nom_utilisateur or user.email or f"User {user.pk_utilisateur}"
+
+            yield [
+                display_name,
+                user.email,
+                role_display,
+                'Actif' if user.is_active else 'Inactif',
+                'Oui' if user.is_staff else 'Non',
+                'Oui' if user.is_superuser else 'Non',
+                user.date_creation.strftime('%d/%m/%Y %H:%M') if user.date_creation else '',
+                user.entreprise.nom if user.entreprise else '',
+            ]
+
+    writer = ExcelWriter()
+    ws = writer.add_sheet(
+        "Utilisateurs",
+        headers=[
+            "Nom d'utilisateur", "Email", "Rôle", "Statut",
+            "Staff", "Superuser", "Date de création", "Entreprise"
+        ],
+        widths=[25, 35, 20, 10, 8, 11, 18, 30],
     )
-    filename = f"utilisateurs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    # Sauvegarder le workbook dans la réponse
-    wb.save(response)
+    writer.write_rows(ws, lignes())
 
-    return response
+    return writer.response(f"utilisateurs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
 
 
 @login_required
 def export_audit_excel(request):
     """Export de l'historique d'audit en format Excel"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from .excel_export import ExcelWriter
     except ImportError:
         return HttpResponse("❌ Bibliothèque openpyxl non installée. Exécutez: pip install openpyxl", status=500)
 
     from .models import AuditLog
 
     # Récupérer les logs avec les mêmes filtres que la liste
-    logs = AuditLog.objects.select_related('utilisateur').order_by('-timestamp')
+    logs = AuditLog.objects.order_by('-timestamp')
 
     # Appliquer les filtres depuis les paramètres GET
     action_filter = request.GET.get('action')
@@ -402,59 +312,113 @@ def export_audit_excel(request):
 
     # Limiter les résultats
     limit = int(request.GET.get('limit', 1000))
-    logs = logs[:limit]
-
-    # Créer un nouveau workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Historique Audit"
-
-    # Style de l'en-tête
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # En-têtes
-    headers = [
-        "Date/Heure", "Utilisateur", "Action", "Modèle",
-        "ID Objet", "Objet", "Adresse IP", "User Agent"
-    ]
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Données
-    for row_idx, log in enumerate(logs, 2):
-        utilisateur = log.utilisateur.email if log.utilisateur else 'Système'
-
-        ws.append([
-            log.timestamp.strftime('%d/%m/%Y %H:%M:%S') if log.timestamp else '',
-            utilisateur,
-            log.get_action_display(),
-            log.model_name,
-            log.object_id,
-            log.object_repr,
-            log.ip_address or '',
-            log.user_agent[:100] if log.user_agent else '',
-        ])
-
-    # Ajuster la largeur des colonnes
-    column_widths = [20, 30, 20, 15, 25, 40, 15, 50]
-    for idx, width in enumerate(column_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].width = width
-
-    # Créer la réponse HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    rows = logs.values_list(
+        'timestamp', 'utilisateur__email', 'action', 'model_name',
+        'object_id', 'object_repr', 'ip_address', 'user_agent',
+    )[:limit].iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    actions = dict(AuditLog.ACTION_CHOICES)
+
+    def lignes():
+        for timestamp, email, action, model_name, object_id, object_repr, ip_address, user_agent in rows:
+            yield [
+                timestamp.strftime('%d/%m/%Y %H:%M:%S') if timestamp else '',
+                email or 'Système',
+                actions.get(action, action),
+                model_name,
+                object_id,
+                object_repr,
+                ip_address or '',
+                user_agent[:100] if user_agent else '',
+            ]
+
+    writer = ExcelWriter()
+    ws = writer.add_sheet(
+        "Historique Audit",
+        headers=[
+            "Date/Heure", "Utilisateur", "Action", "Modèle",
+            "ID Objet", "Objet", "Adresse IP", "User Agent"
+        ],
+        widths=[20, 30, 20, 15, 25, 40, 15, 50],
     )
-    filename = f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    writer.write_rows(ws, lignes())
 
-    # Sauvegarder le workbook dans la réponse
-    wb.save(response)
+    return writer.response(f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
 
-    return response
+
+# ============================================================================
+# EXPORTS EN ARRIÈRE-PLAN
+# ============================================================================
+# Flux : POST demander -> GET statut (scrutation) -> GET telecharger.
+# Les jobs sont exécutés par `python manage.py run_export_worker`.
+
+def _job_payload(job):
+    from django.urls import reverse
+
+    payload = {
+        'job_id': job.pk_job,
+        'type_export': job.type_export,
+        'statut': job.statut,
+        'progression': job.progression,
+        'message': job.message,
+        'statut_url': reverse('statut_export', args=[job.pk_job]),
+    }
+    if job.statut == 'echoue':
+        payload['erreur'] = job.erreur
+    if job.est_telechargeable:
+        payload['telechargement_url'] = reverse('telecharger_export', args=[job.pk_job])
+        payload['nom_fichier'] = job.nom_fichier
+        payload['expire_le'] = job.date_expiration.isoformat() if job.date_expiration else None
+    return payload
+
+
+@login_required
+@require_POST
+def demander_export(request, type_export):
+    """
+    Met en file un export ; les filtres sont les mêmes paramètres GET que
+    l'export direct (ex: POST /exports/missions_excel/?statut=en cours).
+    """
+    from .export_jobs import EXPORT_TYPES, export_autorise
+    from .models import ExportJob
+
+    if type_export not in EXPORT_TYPES:
+        return JsonResponse({'error': "Type d'export inconnu"}, status=404)
+    if not export_autorise(request.user, type_export):
+        return JsonResponse({'error': "⛔ Vous n'avez pas les permissions nécessaires pour cet export."}, status=403)
+
+    job = ExportJob.objects.create(
+        utilisateur=request.user,
+        entreprise=request.user.entreprise,
+        type_export=type_export,
+        parametres=dict(request.GET.lists()),
+    )
+    return JsonResponse(_job_payload(job), status=202)
+
+
+@login_required
+def statut_export(request, pk):
+    """Avancement d'un export demandé par l'utilisateur connecté."""
+    from .models import ExportJob
+
+    job = get_object_or_404(ExportJob, pk_job=pk, utilisateur=request.user)
+    return JsonResponse(_job_payload(job))
+
+
+@login_required
+def telecharger_export(request, pk):
+    """Téléchargement du fichier produit par le worker."""
+    from .models import ExportJob
+
+    job = get_object_or_404(ExportJob, pk_job=pk, utilisateur=request.user)
+    if job.statut == 'expire':
+        return HttpResponse("Ce fichier a expiré. Relancez l'export.", status=410)
+    if not job.est_telechargeable:
+        raise Http404("Export non disponible")
+
+    return FileResponse(
+        job.fichier.open('rb'),
+        as_attachment=True,
+        filename=job.nom_fichier,
+        content_type=job.content_type or None,
+    )
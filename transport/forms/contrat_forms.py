@@ -139,7 +139,7 @@ class ContratTransportForm(forms.ModelForm):
             # Mode création : uniquement les chauffeurs non en mission
             chauffeurs_en_mission_qs = Mission.objects.filter(statut='en cours')
             if entreprise:
-                chauffeurs_en_mission_qs = chauffeurs_en_mission_qs.filter(contrat__entreprise=entreprise)
+                chauffeurs_en_mission_qs = chauffeurs_en_mission_qs.filter(entreprise=entreprise)
             chauffeurs_en_mission_ids = chauffeurs_en_mission_qs.values_list('contrat__chauffeur_id', flat=True).distinct()
             self.fields['chauffeur'].queryset = chauffeurs_base.exclude(
                 pk_chauffeur__in=chauffeurs_en_mission_ids
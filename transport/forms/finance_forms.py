@@ -117,10 +117,10 @@ class PaiementMissionForm(forms.ModelForm):
         entreprise = getattr(self.user, 'entreprise', None)
         if entreprise:
             self.fields['mission'].queryset = Mission.objects.filter(
-                contrat__entreprise=entreprise
+                entreprise=entreprise
             )
             self.fields['caution'].queryset = Cautions.objects.filter(
-                contrat__entreprise=entreprise
+                entreprise=entreprise
             )
 
     def clean(self):
@@ -136,7 +136,7 @@ class FraisTrajetForm(forms.ModelForm):
         if entreprise:
             from ..models import ContratTransport
             self.fields['mission'].queryset = Mission.objects.filter(
-                contrat__entreprise=entreprise
+                entreprise=entreprise
             )
             self.fields['contrat'].queryset = ContratTransport.objects.filter(
                 entreprise=entreprise
@@ -159,7 +159,7 @@ class FraisTrajetForm(forms.ModelForm):
         if not self.instance.pk:  # Seulement en mode création
             # Récupérer les missions/contrats de l'entreprise qui ont déjà un frais aller
             if entreprise:
-                base_qs = FraisTrajet.objects.filter(mission__contrat__entreprise=entreprise)
+                base_qs = FraisTrajet.objects.filter(entreprise=entreprise)
             else:
                 base_qs = FraisTrajet.objects.none()
 
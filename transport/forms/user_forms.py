@@ -15,7 +15,7 @@ from ..models import (
 class EntrepriseForm(forms.ModelForm):
     class Meta:
         model = Entreprise
-        fields = ['nom', 'secteur_activite', 'email_contact', 'telephone_contact', 'date_creation', 'statut']
+        fields = ['nom', 'secteur_activite', 'email_contact', 'telephone_contact', 'date_creation', 'statut', 'tarif_stationnement']
         widgets = {
             'nom': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nom de l\'entreprise'}),
             'secteur_activite': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Secteur d\'activité'}),
@@ -23,6 +23,7 @@ class EntrepriseForm(forms.ModelForm):
             'telephone_contact': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Téléphone de contact'}),
             'date_creation': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
             'statut': forms.Select(attrs={'class': 'form-control'}),
+            'tarif_stationnement': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Tarif par défaut', 'step': '0.01'}),
         }
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1,6 +1,8 @@
 """
 Générateur de factures PDF professionnelles
 """
+import hashlib
+import json
 from io import BytesIO
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
@@ -11,6 +13,16 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from reportlab.pdfgen import canvas
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+
+# Répertoire (dans MEDIA_ROOT) des factures déjà rendues
+INVOICE_CACHE_DIR = 'invoices'
+
+# À incrémenter à chaque modification de la mise en page : toutes les
+# factures en cache sont alors régénérées.
+INVOICE_TEMPLATE_VERSION = 1
 
 
 class InvoiceGenerator:
@@ -37,6 +49,67 @@ class InvoiceGenerator:
         numero = str(self.paiement.pk_paiement)[-6:].zfill(6)
         return f"FAC-{year}-{numero}"
 
+    def invoice_date(self):
+        """
+        Date imprimée sur la facture : validation du paiement, à défaut date
+        de paiement. Stable d'un rendu à l'autre, elle fait partie de la clé
+        de cache.
+        """
+        if self.paiement.date_validation:
+            return timezone.localtime(self.paiement.date_validation).date()
+        return self.paiement.date_paiement or timezone.localdate()
+
+    # ------------------------------------------------------------------
+    # Cache des PDF (adressé par le contenu)
+    # ------------------------------------------------------------------
+
+    def cache_key(self):
+        """
+        Empreinte SHA-256 des données affichées sur la facture.
+
+        Deux paiements dont la facture serait identique partagent la même
+        clé ; toute modification d'un champ affiché change la clé.
+        """
+        client = self.contrat.client if self.contrat else None
+        chauffeur = self.contrat.chauffeur if self.contrat else None
+        data = [
+            INVOICE_TEMPLATE_VERSION,
+            self.generate_invoice_number(),
+            self.paiement.pk_paiement,
+            self.paiement.montant_total,
+            self.paiement.commission_transitaire,
+            self.paiement.date_paiement,
+            self.invoice_date(),
+            self.paiement.mode_paiement,
+            [client.nom, client.type_client, client.telephone, client.email] if client else None,
+            [chauffeur.nom, chauffeur.prenom, chauffeur.telephone] if chauffeur else None,
+            [self.mission.pk_mission, self.mission.origine, self.mission.destination,
+             self.mission.date_depart] if self.mission else None,
+        ]
+        return hashlib.sha256(json.dumps(data, default=str).encode()).hexdigest()
+
+    def cache_path(self):
+        """Chemin du PDF en cache, regroupé par paiement pour l'invalidation."""
+        return f"{invoice_cache_dir(self.paiement.pk_paiement)}/{self.cache_key()}.pdf"
+
+    def get_cached_path(self):
+        """
+        Retourne le chemin (dans le stockage) du PDF de la facture, en le
+        rendant et l'enregistrant s'il n'est pas encore en cache.
+        """
+        path = self.cache_path()
+        if not default_storage.exists(path):
+            saved = default_storage.save(path, ContentFile(self.generate().getvalue()))
+            if saved != path:
+                # Rendu concurrent : un autre processus a écrit la même facture
+                default_storage.delete(saved)
+        return path
+
+    def get_pdf_bytes(self):
+        """Contenu du PDF, lu depuis le cache si possible."""
+        with default_storage.open(self.get_cached_path(), 'rb') as f:
+            return f.read()
+
     def generate(self):
         """
         Génère le PDF de la facture
@@ -81,7 +154,7 @@ class InvoiceGenerator:
         elements.append(Spacer(1, 0.5*cm))
 
         # === INFORMATIONS GÉNÉRALES ===
-        date_facture = datetime.now().strftime('%d/%m/%Y')
+        date_facture = self.invoice_date().strftime('%d/%m/%Y')
 
         info_data = [
             [Paragraph('<b>Date de facture:</b>', info_style), date_facture],
@@ -257,6 +330,22 @@ class InvoiceGenerator:
         return f'facture_{invoice_number}.pdf'
 
 
+def invoice_cache_dir(pk_paiement):
+    """Répertoire de cache des factures d'un paiement."""
+    return f"{INVOICE_CACHE_DIR}/{hashlib.md5(str(pk_paiement).encode()).hexdigest()}"
+
+
+def invalidate_invoice_cache(pk_paiement):
+    """Supprime les PDF en cache d'un paiement (appelé par les signaux)."""
+    directory = invoice_cache_dir(pk_paiement)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f"{directory}/{name}")
+
+
 def generate_invoice_for_payment(paiement):
     """
     Fonction helper pour générer une facture pour un paiement
@@ -267,3 +356,80 @@ def generate_invoice_for_payment(paiement):
     """
     generator = InvoiceGenerator(paiement)
     return generator.generate()
+
+
+# ============================================================================
+# GÉNÉRATION EN LOT
+# ============================================================================
+
+# En dessous de ce nombre de factures, le coût de démarrage du pool de
+# processus dépasse le gain : le rendu reste séquentiel.
+BATCH_PARALLEL_THRESHOLD = 8
+
+
+def _init_render_process():
+    """Initialise Django dans un processus de rendu (démarrage spawn/forkserver)."""
+    import django
+    django.setup()
+
+
+def render_invoice(paiement):
+    """
+    Rend la facture d'un paiement (relations déjà chargées), ou la lit
+    depuis le cache.
+
+    Retourne (pk_paiement, numéro de facture, nom de fichier, octets du PDF).
+    Fonction de niveau module pour pouvoir être exécutée dans un pool de processus.
+    """
+    generator = InvoiceGenerator(paiement)
+    pdf = generator.get_pdf_bytes()
+    return paiement.pk_paiement, generator.generate_invoice_number(), generator.get_filename(), pdf
+
+
+def _render_invoice_safe(paiement):
+    try:
+        return render_invoice(paiement), None
+    except Exception as e:
+        return (paiement.pk_paiement, None, None, None), str(e)
+
+
+def render_invoices(paiements, max_workers=None):
+    """
+    Rend les factures d'une liste de paiements, en parallèle dans un pool de
+    processus au-delà de BATCH_PARALLEL_THRESHOLD (ReportLab est limité par
+    le CPU et le GIL).
+
+    Produit, dans l'ordre, ((pk_paiement, numéro, nom de fichier, pdf), erreur)
+    où erreur vaut None en cas de succès.
+
+    Les processus ne sont pas créés par fork du serveur (multi-thread, avec
+    des connexions ouvertes) : ils partent du serveur forkserver, ou d'un
+    interpréteur neuf (spawn) là où forkserver n'existe pas.
+    """
+    import logging
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from django.conf import settings
+
+    paiements = list(paiements)
+    if max_workers is None:
+        max_workers = getattr(settings, 'INVOICE_RENDER_WORKERS', None)
+
+    if len(paiements) < BATCH_PARALLEL_THRESHOLD or max_workers == 1:
+        for paiement in paiements:
+            yield _render_invoice_safe(paiement)
+        return
+
+    methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(methode),
+            initializer=_init_render_process,
+        ) as pool:
+            results = list(pool.map(_render_invoice_safe, paiements, chunksize=4))
+    except (OSError, RuntimeError) as e:
+        # Environnement sans multiprocessing (sandbox, certains hébergeurs)
+        logging.getLogger(__name__).warning("Pool de rendu indisponible (%s), rendu séquentiel", e)
+        results = map(_render_invoice_safe, paiements)
+    yield from results
@@ -1,16 +1,59 @@
 """
 Vues pour la gestion des factures
 """
+import logging
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, FileResponse
+from django.http import FileResponse, JsonResponse
 from django.contrib import messages
 from transport.models import PaiementMission
 from transport.permissions import role_required, permission_required
-from transport.invoice_generator import InvoiceGenerator, generate_invoice_for_payment
+from transport.invoice_generator import InvoiceGenerator, generate_invoice_for_payment, render_invoices
 from transport.email_notifications import EmailNotifier
-from django.core.mail import EmailMessage
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+
+def _invoice_queryset(request):
+    """Paiements de l'entreprise avec les relations affichées sur la facture."""
+    return PaiementMission.objects.filter(
+        entreprise=request.user.entreprise
+    ).select_related(
+        'mission__contrat__client',
+        'mission__contrat__chauffeur'
+    )
+
+
+def _invoice_file_response(request, generator, as_attachment):
+    """
+    Sert le PDF en cache de la facture avec ETag / Last-Modified : un
+    navigateur qui possède déjà la facture reçoit un 304 sans corps.
+    """
+    path = generator.get_cached_path()
+    etag = f'"{generator.cache_key()}"'
+    last_modified = int(default_storage.get_modified_time(path).timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = FileResponse(
+        default_storage.open(path, 'rb'),
+        as_attachment=as_attachment,
+        filename=generator.get_filename(),
+        content_type='application/pdf',
+    )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Le navigateur revalide à chaque affichage (réponse 304 si inchangée)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @login_required
@@ -19,7 +62,7 @@ def generate_invoice(request, paiement_id):
     """
     Génère une facture PDF pour un paiement
     """
-    paiement = get_object_or_404(PaiementMission, pk_paiement=paiement_id, mission__contrat__entreprise=request.user.entreprise)
+    paiement = get_object_or_404(_invoice_queryset(request), pk_paiement=paiement_id)
 
     # Vérifier que le paiement est validé
     if not paiement.est_valide:
@@ -27,14 +70,9 @@ def generate_invoice(request, paiement_id):
         return redirect('paiement_mission_list')
 
     try:
-        # Générer la facture
+        # Servir la facture depuis le cache (rendue au premier appel)
         generator = InvoiceGenerator(paiement)
-        pdf_file = generator.generate()
-        filename = generator.get_filename()
-
-        # Retourner le PDF en téléchargement
-        response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response = _invoice_file_response(request, generator, as_attachment=True)
 
         messages.success(request, f"✅ Facture {generator.generate_invoice_number()} générée avec succès!")
 
@@ -51,15 +89,11 @@ def preview_invoice(request, paiement_id):
     """
     Prévisualise une facture PDF dans le navigateur
     """
-    paiement = get_object_or_404(PaiementMission, pk_paiement=paiement_id, mission__contrat__entreprise=request.user.entreprise)
+    paiement = get_object_or_404(_invoice_queryset(request), pk_paiement=paiement_id)
 
     try:
-        # Générer la facture
-        generator = InvoiceGenerator(paiement)
-        pdf_file = generator.generate()
-
-        # Retourner le PDF pour affichage dans le navigateur
-        return FileResponse(pdf_file, content_type='application/pdf')
+        # Retourner le PDF (en cache) pour affichage dans le navigateur
+        return _invoice_file_response(request, InvoiceGenerator(paiement), as_attachment=False)
 
     except Exception as e:
         messages.error(request, f"❌ Erreur lors de la prévisualisation: {str(e)}")
@@ -72,7 +106,7 @@ def send_invoice_email(request, paiement_id):
     """
     Envoie la facture par email au client et au chauffeur
     """
-    paiement = get_object_or_404(PaiementMission, pk_paiement=paiement_id, mission__contrat__entreprise=request.user.entreprise)
+    paiement = get_object_or_404(_invoice_queryset(request), pk_paiement=paiement_id)
 
     # Vérifier que le paiement est validé
     if not paiement.est_valide:
@@ -80,9 +114,9 @@ def send_invoice_email(request, paiement_id):
         return redirect('paiement_mission_list')
 
     try:
-        # Générer la facture PDF
+        # Facture PDF (en cache)
         generator = InvoiceGenerator(paiement)
-        pdf_file = generator.generate()
+        pdf_content = generator.get_pdf_bytes()
         filename = generator.get_filename()
         invoice_number = generator.generate_invoice_number()
 
@@ -137,8 +171,7 @@ def send_invoice_email(request, paiement_id):
         )
 
         # Attacher le PDF
-        pdf_file.seek(0)
-        email.attach(filename, pdf_file.read(), 'application/pdf')
+        email.attach(filename, pdf_content, 'application/pdf')
 
         # Envoyer
         email.send()
@@ -160,7 +193,7 @@ def invoices_list(request):
     # Paiements validés uniquement
     paiements = PaiementMission.objects.filter(
         est_valide=True,
-        mission__contrat__entreprise=request.user.entreprise
+        entreprise=request.user.entreprise
     ).select_related(
         'mission',
         'mission__contrat',
@@ -176,11 +209,93 @@ def invoices_list(request):
     return render(request, 'transport/invoices/list.html', context)
 
 
+def _invoice_recipients(paiement):
+    """Adresses du client et du chauffeur du contrat lié au paiement."""
+    recipients = []
+    if paiement.mission and paiement.mission.contrat:
+        if paiement.mission.contrat.client and paiement.mission.contrat.client.email:
+            recipients.append(paiement.mission.contrat.client.email)
+        if paiement.mission.contrat.chauffeur:
+            chauffeur = paiement.mission.contrat.chauffeur
+            if hasattr(chauffeur, 'email') and chauffeur.email:
+                recipients.append(chauffeur.email)
+    return recipients
+
+
+def send_invoices_batch(paiements, connection=None):
+    """
+    Rend et envoie les factures d'une liste de paiements.
+
+    Les PDF sont rendus en parallèle (voir ``render_invoices``) et tous les
+    emails partent par une seule connexion SMTP. Retourne un résultat par
+    paiement : {'paiement_id', 'statut' ('envoyee', 'sans_destinataire',
+    'erreur'), 'detail'}.
+    """
+    paiements = list(paiements)
+    by_pk = {paiement.pk_paiement: paiement for paiement in paiements}
+
+    # Ne rendre que les factures qui ont au moins un destinataire
+    results = []
+    to_render = []
+    for paiement in paiements:
+        if _invoice_recipients(paiement):
+            to_render.append(paiement)
+        else:
+            results.append({
+                'paiement_id': paiement.pk_paiement,
+                'statut': 'sans_destinataire',
+                'detail': "Aucun destinataire trouvé (client ou chauffeur sans email)",
+            })
+
+    connection = connection or get_connection()
+    # Ouverte au premier envoi : si le serveur SMTP est injoignable, l'échec
+    # est reporté sur chaque facture restante au lieu de faire échouer le lot
+    ouverte = False
+    erreur_connexion = None
+    try:
+        for (paiement_id, invoice_number, filename, pdf), error in render_invoices(to_render):
+            if error is None and erreur_connexion is not None:
+                error = erreur_connexion
+            if error is None and not ouverte:
+                try:
+                    connection.open()
+                    ouverte = True
+                except Exception as e:
+                    error = erreur_connexion = f"Connexion SMTP impossible : {e}"
+            if error is None:
+                try:
+                    email = EmailMessage(
+                        subject=f"📄 Facture {invoice_number}",
+                        body="Veuillez trouver ci-joint votre facture.",
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=_invoice_recipients(by_pk[paiement_id]),
+                        connection=connection,
+                    )
+                    email.attach(filename, pdf, 'application/pdf')
+                    email.send()
+                except Exception as e:
+                    error = str(e)
+
+            if error is None:
+                results.append({'paiement_id': paiement_id, 'statut': 'envoyee', 'detail': invoice_number})
+            else:
+                logger.error("❌ Erreur envoi facture %s: %s", paiement_id, error)
+                results.append({'paiement_id': paiement_id, 'statut': 'erreur', 'detail': error})
+    finally:
+        if ouverte:
+            connection.close()
+    return results
+
+
 @login_required
 @role_required('ADMIN', 'COMPTABLE')
 def bulk_send_invoices(request):
     """
     Envoi en masse de factures
+
+    Les paiements sont chargés en une requête, les PDF rendus en parallèle
+    et les emails envoyés par une connexion SMTP unique. Le détail par
+    paiement est renvoyé en JSON pour les appels AJAX.
     """
     if request.method == 'POST':
         paiement_ids = request.POST.getlist('paiement_ids')
@@ -189,57 +304,34 @@ def bulk_send_invoices(request):
             messages.error(request, "❌ Aucun paiement sélectionné.")
             return redirect('invoices_list')
 
-        success_count = 0
-        error_count = 0
-
-        for paiement_id in paiement_ids:
-            try:
-                paiement = get_object_or_404(PaiementMission, pk_paiement=paiement_id, mission__contrat__entreprise=request.user.entreprise)
-
-                # Générer et envoyer la facture
-                generator = InvoiceGenerator(paiement)
-                pdf_file = generator.generate()
-                filename = generator.get_filename()
-
-                # Préparer les destinataires
-                recipients = []
-                if paiement.mission and paiement.mission.contrat:
-                    if paiement.mission.contrat.client and paiement.mission.contrat.client.email:
-                        recipients.append(paiement.mission.contrat.client.email)
-                    if paiement.mission.contrat.chauffeur:
-                        chauffeur = paiement.mission.contrat.chauffeur
-                        if hasattr(chauffeur, 'email') and chauffeur.email:
-                            recipients.append(chauffeur.email)
-
-                if recipients:
-                    email = EmailMessage(
-                        subject=f"📄 Facture {generator.generate_invoice_number()}",
-                        body="Veuillez trouver ci-joint votre facture.",
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=recipients,
-                    )
-                    pdf_file.seek(0)
-                    email.attach(filename, pdf_file.read(), 'application/pdf')
-                    email.send()
+        paiements = _invoice_queryset(request).filter(pk_paiement__in=paiement_ids)
+        results = send_invoices_batch(paiements)
+
+        found = {result['paiement_id'] for result in results}
+        results.extend(
+            {'paiement_id': paiement_id, 'statut': 'introuvable', 'detail': "Paiement introuvable"}
+            for paiement_id in dict.fromkeys(paiement_ids) if paiement_id not in found
+        )
 
-                    success_count += 1
-                else:
-                    error_count += 1
-                    print(f"⚠️ Paiement {paiement_id}: Aucun destinataire trouvé (client ou chauffeur sans email)")
+        success_count = sum(1 for result in results if result['statut'] == 'envoyee')
+        failed = [result for result in results if result['statut'] != 'envoyee']
 
-            except Exception as e:
-                error_count += 1
-                print(f"❌ Erreur envoi facture {paiement_id}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                continue
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({
+                'success_count': success_count,
+                'error_count': len(failed),
+                'results': results,
+            })
 
         if success_count > 0:
             messages.success(request, f"✅ {success_count} facture(s) envoyée(s) avec succès!")
-        if error_count > 0:
-            messages.warning(request, f"⚠️ {error_count} facture(s) n'ont pas pu être envoyées (vérifiez les emails ou la console pour les détails).")
+        if failed:
+            details = ', '.join(f"{result['paiement_id'][:15]} ({result['detail']})" for result in failed[:5])
+            if len(failed) > 5:
+                details += f" et {len(failed) - 5} autre(s)"
+            messages.warning(request, f"⚠️ {len(failed)} facture(s) n'ont pas pu être envoyées : {details}")
 
-        if success_count == 0 and error_count == 0:
+        if not results:
             messages.info(request, "ℹ️ Aucune facture n'a été traitée.")
 
         return redirect('invoices_list')
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from transport.audit_archive import archiver
+from transport.models import AuditCompteurJour, AuditMensuel
+
+
+class Command(BaseCommand):
+    help = 'Archive les entrées d\'audit plus anciennes que AUDIT_RETENTION_MOIS dans des fichiers mensuels compressés'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mois',
+            type=int,
+            help='Nombre de mois entiers conservés en base (défaut: settings.AUDIT_RETENTION_MOIS)',
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            help='Entrées archivées puis supprimées par transaction (défaut: settings.AUDIT_ARCHIVE_LOT)',
+        )
+        parser.add_argument(
+            '--reconstruire',
+            action='store_true',
+            help='Recalcule d\'abord les compteurs (AuditMensuel, AuditCompteurJour) à partir du journal',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Les entrées sont ajoutées à MEDIA_ROOT/audit_archives/AAAA-MM.jsonl.gz
+        puis supprimées de la base par lots, en transactions courtes (voir
+        transport/audit_archive.py). La commande peut être interrompue et
+        relancée. Les archives se consultent avec rechercher_audit_archive.
+
+        Cette commande peut être exécutée chaque mois via cron:
+        0 3 1 * * cd /path/to/project && python manage.py archiver_audit
+        """
+        mois_conserves = options.get('mois')
+        if mois_conserves is None:
+            mois_conserves = getattr(settings, 'AUDIT_RETENTION_MOIS', 12)
+        if mois_conserves < 1:
+            raise CommandError('--mois doit être supérieur ou égal à 1.')
+        if options.get('taille_lot') is not None and options['taille_lot'] < 1:
+            raise CommandError('--taille-lot doit être supérieur ou égal à 1.')
+
+        debut = time.monotonic()
+        if options.get('reconstruire'):
+            nb = AuditMensuel.reconstruire()
+            nb_compteurs = AuditCompteurJour.reconstruire()
+            self.stdout.write(f'📊 Compteurs reconstruits ({nb} entrée(s) en base, {nb_compteurs} compteur(s) journalier(s))')
+
+        archives = archiver(mois_conserves=mois_conserves, taille_lot=options.get('taille_lot'))
+        for mois, nombre in archives:
+            self.stdout.write(f'   {mois:%m/%Y} : {nombre} entrée(s) archivée(s)')
+
+        duree = time.monotonic() - debut
+        total = sum(nombre for _, nombre in archives)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} entrée(s) d\'audit archivée(s) sur {len(archives)} mois '
+            f'(conservation {mois_conserves} mois) en {duree:.2f}s'
+        ))
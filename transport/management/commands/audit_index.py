@@ -0,0 +1,206 @@
+import re
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from transport.models import (
+    Cautions, ContratTransport, Entreprise, FraisTrajet, Mission, Notification, PaiementMission, Utilisateur,
+)
+
+
+# ============================================================================
+# REQUÊTES CRITIQUES
+# ============================================================================
+# Chaque entrée reproduit le filtre et le tri d'une vue très sollicitée :
+# (nom, vue d'origine, constructeur(entreprise, utilisateur) -> queryset)
+
+def _aujourd_hui():
+    return timezone.now().date()
+
+
+REQUETES = [
+    (
+        'missions_liste', 'optimized_views.mission_list_optimized',
+        lambda e, u: Mission.objects.filter(entreprise=e).order_by('-date_depart')[:20],
+    ),
+    (
+        'missions_par_statut', 'dashboard_views / api.MissionViewSet',
+        lambda e, u: Mission.objects.filter(entreprise=e, statut='en cours').values_list('pk', flat=True),
+    ),
+    (
+        'missions_par_mois', 'dashboard_views (graphique 6 mois)',
+        lambda e, u: Mission.objects.filter(
+            entreprise=e, date_depart__gte=_aujourd_hui() - timedelta(days=180),
+        ).values_list('date_depart', 'statut'),
+    ),
+    (
+        'missions_alerte_retard', 'dashboard_views (alertes)',
+        lambda e, u: Mission.objects.filter(
+            entreprise=e, statut='en cours',
+            date_depart__lte=_aujourd_hui() - timedelta(days=23), date_retour__isnull=True,
+        ).values_list('pk', flat=True),
+    ),
+    (
+        'missions_en_retard', 'check_missions_retard',
+        lambda e, u: Mission.objects.filter(statut='en cours', date_retour__lt=_aujourd_hui()).values_list('pk', flat=True),
+    ),
+    (
+        'paiements_liste', 'optimized_views.paiement_list_optimized',
+        lambda e, u: PaiementMission.objects.filter(entreprise=e).order_by('-date_paiement')[:20],
+    ),
+    (
+        'paiements_valides_periode', 'dashboard_views (chiffre d\'affaires)',
+        lambda e, u: PaiementMission.objects.filter(
+            entreprise=e, est_valide=True,
+            date_validation__gte=timezone.now() - timedelta(days=180),
+        ).values_list('montant_total', 'commission_transitaire'),
+    ),
+    (
+        'paiements_en_attente', 'dashboard_views (CA en attente)',
+        lambda e, u: PaiementMission.objects.filter(
+            entreprise=e, est_valide=False,
+        ).values_list('montant_total', flat=True),
+    ),
+    (
+        'contrats_liste', 'optimized_views.contrat_list_optimized / api.ContratTransportViewSet',
+        lambda e, u: ContratTransport.objects.filter(entreprise=e).order_by('-date_debut')[:20],
+    ),
+    (
+        'contrats_par_statut', 'api.ContratTransportViewSet (?statut=)',
+        lambda e, u: ContratTransport.objects.filter(entreprise=e, statut='actif').values_list('pk', flat=True),
+    ),
+    (
+        'cautions_en_attente', 'dashboard_views (cautions)',
+        lambda e, u: Cautions.objects.filter(entreprise=e, statut='en_attente').values_list('montant', flat=True),
+    ),
+    (
+        'notifications_non_lues', 'context_processors / ajax_views',
+        lambda e, u: Notification.objects.filter(utilisateur=u, is_read=False).order_by('-created_at')[:10],
+    ),
+]
+
+# Lecture complète d'une table : "SCAN t" (SQLite) ou "Seq Scan on t" (PostgreSQL).
+# Un parcours d'index ("SCAN t USING INDEX ...") n'est pas signalé.
+_PARCOURS_COMPLET = re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?!.*USING)|Seq Scan on "?(\w+)"?')
+_INDEX_UTILISE = re.compile(r'USING (?:COVERING )?INDEX "?(\w+)"?|Index (?:Only )?Scan (?:Backward )?using "?(\w+)"?')
+# Tri en mémoire faute d'index couvrant l'ORDER BY
+_TRI = re.compile(r'USE TEMP B-TREE FOR ORDER BY|^\s*(?:->\s*)?Sort\b')
+
+
+def analyser_plan(plan):
+    """Retourne (tables parcourues entièrement, index utilisés, tri sans index) d'un plan EXPLAIN."""
+    parcours, index, tri = [], [], False
+    for ligne in plan.splitlines():
+        for match in _PARCOURS_COMPLET.finditer(ligne):
+            parcours.append(match.group(1) or match.group(2))
+        for match in _INDEX_UTILISE.finditer(ligne):
+            index.append(match.group(1) or match.group(2))
+        tri = tri or bool(_TRI.search(ligne))
+    return parcours, index, tri
+
+
+def index_manquants():
+    """Index déclarés dans les Meta des modèles mais absents de la base (migration non appliquée)."""
+    manquants = []
+    with connection.cursor() as cursor:
+        for model in (Mission, PaiementMission, ContratTransport, Cautions, FraisTrajet, Notification):
+            table = model._meta.db_table
+            existants = set(connection.introspection.get_constraints(cursor, table))
+            for index in model._meta.indexes:
+                if index.name not in existants:
+                    manquants.append(f'{table}.{index.name}')
+    return manquants
+
+
+class Command(BaseCommand):
+    help = 'Analyse les plans d\'exécution (EXPLAIN) des requêtes les plus fréquentes et leur durée'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entreprise',
+            type=str,
+            help='PK de l\'entreprise utilisée pour les filtres (défaut : celle qui a le plus de contrats)',
+        )
+        parser.add_argument(
+            '--repetitions',
+            type=int,
+            default=5,
+            help='Nombre d\'exécutions par requête pour la mesure de durée (défaut: 5)',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Afficher le plan d\'exécution complet de chaque requête',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Exécute EXPLAIN puis mesure la durée médiane des requêtes critiques
+        des vues (listes, dashboard, API, navbar). Une requête qui parcourt
+        entièrement une table est signalée ; les index déclarés dans les
+        modèles mais non créés en base sont listés.
+
+        À lancer avant et après une migration d'index, sur une copie de la
+        base de production, pour comparer les plans et les durées:
+        python manage.py audit_index --repetitions 20
+        """
+        if options.get('entreprise'):
+            try:
+                entreprise = Entreprise.objects.get(pk=options['entreprise'])
+            except Entreprise.DoesNotExist:
+                raise CommandError(f'Entreprise "{options["entreprise"]}" introuvable.')
+        else:
+            from django.db.models import Count
+            entreprise = Entreprise.objects.annotate(nb=Count('contrattransport')).order_by('-nb').first()
+            if entreprise is None:
+                raise CommandError('Aucune entreprise en base.')
+        utilisateur = (
+            Utilisateur.objects.filter(entreprise=entreprise).first()
+            or Utilisateur.objects.first()
+        )
+        repetitions = max(1, options['repetitions'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🔎 Audit des index ({connection.vendor}) pour {entreprise.nom}, {repetitions} exécution(s) par requête'
+        ))
+
+        nb_parcours = nb_tris = 0
+        for nom, source, construire in REQUETES:
+            queryset = construire(entreprise, utilisateur)
+            plan = queryset.explain()
+            parcours, index, tri = analyser_plan(plan)
+
+            durees = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                list(queryset.all())
+                durees.append((time.perf_counter() - debut) * 1000)
+
+            etat = '⚠️ ' if parcours or tri else '✅'
+            self.stdout.write(f'{etat} {nom:<28} {statistics.median(durees):8.2f} ms   ({source})')
+            if parcours:
+                nb_parcours += 1
+                self.stdout.write(f'      parcours complet : {", ".join(dict.fromkeys(parcours))}')
+            if tri:
+                nb_tris += 1
+                self.stdout.write('      tri en mémoire (aucun index ne couvre l\'ORDER BY)')
+            if index:
+                self.stdout.write(f'      index : {", ".join(dict.fromkeys(index))}')
+            if options['plans']:
+                for ligne in plan.splitlines():
+                    self.stdout.write(f'      | {ligne}')
+
+        manquants = index_manquants()
+        if manquants:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {len(manquants)} index déclaré(s) absent(s) de la base (lancer migrate) : {", ".join(manquants)}'
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(REQUETES)} requête(s) analysée(s) : {nb_parcours} parcours complet(s) de table, '
+            f'{nb_tris} tri(s) en mémoire'
+        ))
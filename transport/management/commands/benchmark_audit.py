@@ -0,0 +1,107 @@
+import statistics
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from transport import audit_buffer
+from transport.audit_middleware import AuditMiddleware
+from transport.models import AuditCompteurJour, AuditLog, AuditMensuel, Utilisateur
+
+CHEMIN = '/__benchmark_audit__/'
+
+
+def _us(secondes):
+    return f'{secondes * 1_000_000:.1f} µs'
+
+
+class Command(BaseCommand):
+    help = 'Mesure le temps ajouté à une requête de modification par AuditMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requetes',
+            type=int,
+            default=2000,
+            help='Nombre de requêtes simulées (défaut: 2000)',
+        )
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Utilisateur des requêtes simulées (défaut: premier utilisateur actif)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Simule des POST authentifiés (RequestFactory, vue vide) et mesure,
+        requête par requête, la durée avec et sans AuditMiddleware : la
+        différence est le temps que le middleware ajoute avant l'envoi de
+        la réponse. L'écriture du tampon, faite en fin de requête (après la
+        réponse), est mesurée à part.
+
+        Les entrées créées sont supprimées à la fin et les compteurs du
+        mois recalculés. À lancer sur une copie de la base de production:
+        python manage.py benchmark_audit --requetes 5000
+        """
+        requetes = max(1, options['requetes'])
+        utilisateurs = Utilisateur.objects.filter(is_active=True)
+        if options.get('email'):
+            utilisateurs = utilisateurs.filter(email=options['email'])
+        user = utilisateurs.order_by('email').first()
+        if user is None:
+            raise CommandError('Aucun utilisateur actif pour simuler les requêtes.')
+
+        vue = lambda request: HttpResponse(status=302)  # noqa: E731
+        try:
+            middleware = AuditMiddleware(vue)
+        except MiddlewareNotUsed:
+            raise CommandError('AuditMiddleware est désactivé (AUDIT_REQUETES=False).')
+        factory = RequestFactory()
+
+        sans, avec, ecritures = [], [], []
+        try:
+            for _ in range(requetes):
+                request = factory.post(CHEMIN, HTTP_USER_AGENT='benchmark_audit')
+                request.user = user
+
+                debut = time.perf_counter()
+                vue(request)
+                sans.append(time.perf_counter() - debut)
+
+                debut = time.perf_counter()
+                middleware(request)
+                avec.append(time.perf_counter() - debut)
+
+                debut = time.perf_counter()
+                audit_buffer.vider()
+                ecritures.append(time.perf_counter() - debut)
+        finally:
+            audit_buffer.vider()
+            self._nettoyer()
+
+        surcouts = [a - s for a, s in zip(avec, sans)]
+        median = statistics.median(surcouts)
+        p95 = statistics.quantiles(surcouts, n=20)[-1] if len(surcouts) > 1 else surcouts[0]
+        self.stdout.write(f'📊 {requetes} requête(s) POST simulée(s) pour {user.email}')
+        self.stdout.write(f'   Vue seule          : médiane {_us(statistics.median(sans))}')
+        self.stdout.write(f'   Avec le middleware : médiane {_us(statistics.median(avec))}')
+        self.stdout.write(
+            f'   Surcoût            : médiane {_us(median)}, p95 {_us(p95)}, '
+            f'moyenne {_us(statistics.mean(surcouts))}'
+        )
+        self.stdout.write(f'   Écriture après la réponse : médiane {_us(statistics.median(ecritures))}')
+
+        if median < 0.001:
+            self.stdout.write(self.style.SUCCESS(f'✅ Surcoût médian de {_us(median)} par requête (< 1 ms)'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️ Surcoût médian de {_us(median)} par requête (≥ 1 ms)'))
+
+    def _nettoyer(self):
+        logs = AuditLog.objects.filter(action='REQUETE', object_id=CHEMIN)
+        mois = {AuditMensuel.mois_de(horodatage) for horodatage in logs.values_list('timestamp', flat=True)}
+        logs.delete()
+        if mois:
+            AuditMensuel.reconstruire(mois=mois)
+            AuditCompteurJour.reconstruire(mois=mois)
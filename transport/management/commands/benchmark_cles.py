@@ -0,0 +1,149 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import Avg, Max
+from django.db.models.functions import Length
+
+from transport.models import Cautions, ContratTransport, Mission, PaiementMission
+
+
+# (libellé, table enfant, colonne de clé étrangère, table parente)
+RELATIONS = [
+    ('mission → contrat', Mission, 'contrat_id', ContratTransport),
+    ('caution → contrat', Cautions, 'contrat_id', ContratTransport),
+    ('paiement → mission', PaiementMission, 'mission_id', Mission),
+]
+
+
+def _mo(octets):
+    return f'{octets / 1024 / 1024:.2f} Mo' if octets is not None else 'n/d'
+
+
+class Command(BaseCommand):
+    help = 'Compare la taille des index et la durée des jointures entre les clés slug actuelles et des clés entières'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repetitions',
+            type=int,
+            default=5,
+            help='Nombre d\'exécutions de chaque jointure (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Pour chaque relation, copie les clés dans deux jeux de tables
+        temporaires : l'un avec les clés slug actuelles, l'autre avec des
+        clés entières (BIGINT) et le slug conservé en colonne unique
+        « reference ». Mesure la taille des index (clé primaire parente,
+        clé primaire et clé étrangère enfant) puis la durée médiane de la
+        jointure enfant → parent.
+
+        Les tables de la base ne sont pas modifiées. À lancer sur une copie
+        de la base de production avant de décider d'une migration des clés:
+        python manage.py benchmark_cles --repetitions 20
+        """
+        repetitions = max(1, options['repetitions'])
+        entier = 'INTEGER' if connection.vendor == 'sqlite' else 'BIGINT'
+        self.stdout.write(self.style.SUCCESS(
+            f'🔑 Clés slug vs clés entières ({connection.vendor}), {repetitions} exécution(s) par jointure'
+        ))
+
+        with connection.cursor() as cursor:
+            for libelle, enfant, colonne, parent in RELATIONS:
+                nb_lignes = enfant.objects.count()
+                longueurs = parent.objects.aggregate(moyenne=Avg(Length('pk')), max=Max(Length('pk')))
+                self.stdout.write(
+                    f'📦 {libelle} : {nb_lignes} ligne(s), clé parente de {longueurs["moyenne"] or 0:.0f} '
+                    f'caractères en moyenne ({longueurs["max"] or 0} max)'
+                )
+                if not nb_lignes:
+                    continue
+
+                tables = ['bench_parent_slug', 'bench_enfant_slug', 'bench_parent_int', 'bench_enfant_int']
+                try:
+                    self._creer_tables(cursor, enfant, colonne, parent, entier)
+                    index_slug = self._taille_index(cursor, tables[:2])
+                    index_int = self._taille_index(cursor, tables[2:])
+                    duree_slug = self._mesurer(cursor, (
+                        'SELECT COUNT(*) FROM bench_enfant_slug e '
+                        'JOIN bench_parent_slug p ON p.cle = e.parent'
+                    ), repetitions)
+                    duree_int = self._mesurer(cursor, (
+                        'SELECT COUNT(*) FROM bench_enfant_int e '
+                        'JOIN bench_parent_int p ON p.id = e.parent'
+                    ), repetitions)
+                finally:
+                    for table in tables:
+                        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+                gain = f' (-{(1 - index_int / index_slug) * 100:.0f}%)' if index_slug and index_int else ''
+                self.stdout.write(f'   index     : {_mo(index_slug)} → {_mo(index_int)}{gain}')
+                acceleration = f' (x{duree_slug / duree_int:.1f})' if duree_int else ''
+                self.stdout.write(f'   jointure  : {duree_slug:.2f} ms → {duree_int:.2f} ms{acceleration}')
+
+        self.stdout.write(self.style.SUCCESS('✅ Mesures terminées (aucune table de la base modifiée)'))
+
+    def _creer_tables(self, cursor, enfant, colonne, parent, entier):
+        pk_parent = parent._meta.pk.column
+        pk_enfant = enfant._meta.pk.column
+        table_parent = parent._meta.db_table
+        table_enfant = enfant._meta.db_table
+
+        # Clés actuelles
+        cursor.execute('CREATE TEMPORARY TABLE bench_parent_slug (cle VARCHAR(250) PRIMARY KEY)')
+        cursor.execute(f'INSERT INTO bench_parent_slug SELECT {pk_parent} FROM {table_parent}')
+        cursor.execute(
+            'CREATE TEMPORARY TABLE bench_enfant_slug (cle VARCHAR(250) PRIMARY KEY, parent VARCHAR(250))'
+        )
+        cursor.execute(f'INSERT INTO bench_enfant_slug SELECT {pk_enfant}, {colonne} FROM {table_enfant}')
+        cursor.execute('CREATE INDEX bench_enfant_slug_parent ON bench_enfant_slug (parent)')
+
+        # Clés entières, slug conservé en référence unique côté parent
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE bench_parent_int (id {entier} PRIMARY KEY, reference VARCHAR(250) UNIQUE)'
+        )
+        cursor.execute(
+            f'INSERT INTO bench_parent_int '
+            f'SELECT ROW_NUMBER() OVER (ORDER BY {pk_parent}), {pk_parent} FROM {table_parent}'
+        )
+        cursor.execute(f'CREATE TEMPORARY TABLE bench_enfant_int (id {entier} PRIMARY KEY, parent {entier})')
+        cursor.execute(
+            f'INSERT INTO bench_enfant_int '
+            f'SELECT ROW_NUMBER() OVER (ORDER BY e.{pk_enfant}), p.id FROM {table_enfant} e '
+            f'LEFT JOIN bench_parent_int p ON p.reference = e.{colonne}'
+        )
+        cursor.execute('CREATE INDEX bench_enfant_int_parent ON bench_enfant_int (parent)')
+
+    def _taille_index(self, cursor, tables):
+        """Taille cumulée des index des tables (None si la base ne l'expose pas)."""
+        try:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT SUM(pg_indexes_size(c.oid)) FROM pg_class c WHERE c.relname = ANY(%s)', [tables]
+                )
+                return cursor.fetchone()[0]
+            if connection.vendor == 'sqlite':
+                # Avec INTEGER PRIMARY KEY, la clé primaire est le rowid : elle ne coûte pas d'index
+                marqueurs = ', '.join(['%s'] * len(tables))
+                cursor.execute(
+                    f"SELECT SUM(pgsize) FROM dbstat('temp') WHERE name IN ("
+                    f"SELECT name FROM sqlite_temp_master WHERE type = 'index' AND tbl_name IN ({marqueurs}))",
+                    tables,
+                )
+                return cursor.fetchone()[0]
+        except DatabaseError:
+            # dbstat absent de cette compilation de SQLite
+            return None
+        return None
+
+    def _mesurer(self, cursor, sql, repetitions):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            durees.append((time.perf_counter() - debut) * 1000)
+        return statistics.median(durees)
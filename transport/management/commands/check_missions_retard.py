@@ -1,7 +1,13 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from transport.models import Mission, Notification, Utilisateur
 import logging
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from transport.context_processors import invalidate_notifications_count
+from transport.models import Entreprise, Mission, Notification, Utilisateur
 
 logger = logging.getLogger(__name__)
 
@@ -9,66 +15,95 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Vérifie les missions en retard et crée des notifications'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher les notifications à créer sans les enregistrer',
+        )
+        parser.add_argument(
+            '--entreprise',
+            type=str,
+            help='PK de l\'entreprise à vérifier (par défaut : toutes)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de notifications créées par requête (défaut: 500)',
+        )
+
     def handle(self, *args, **options):
         """
         Commande qui vérifie toutes les missions en cours et crée des notifications
         pour celles qui sont en retard (date_retour dépassée).
 
+        Le nombre de requêtes ne dépend pas du nombre de missions : les
+        missions déjà notifiées aujourd'hui et les destinataires de chaque
+        entreprise sont lus une seule fois, les notifications sont créées
+        par bulk_create.
+
         Cette commande peut être exécutée quotidiennement via cron:
         0 9 * * * cd /path/to/project && python manage.py check_missions_retard
         """
+        debut = time.monotonic()
         today = timezone.now().date()
+        taille_lot = max(1, options['batch_size'])
+        dry_run = options['dry_run']
 
         # Trouver toutes les missions en cours dont la date de retour est dépassée
-        # Inclure l'entreprise dans le select_related pour filtrer les notifications par entreprise
         missions_en_retard = Mission.objects.filter(
             statut='en cours',
             date_retour__lt=today
-        ).select_related('contrat__entreprise', 'contrat__chauffeur', 'contrat__chauffeur__utilisateur')
-
-        if not missions_en_retard.exists():
+        ).select_related('contrat__chauffeur__utilisateur')
+
+        if options.get('entreprise'):
+            try:
+                entreprise = Entreprise.objects.get(pk=options['entreprise'])
+            except Entreprise.DoesNotExist:
+                raise CommandError(f'Entreprise "{options["entreprise"]}" introuvable.')
+            missions_en_retard = missions_en_retard.filter(entreprise=entreprise)
+
+        missions_qs = missions_en_retard
+        missions_en_retard = list(missions_qs)
+        if not missions_en_retard:
             self.stdout.write(self.style.SUCCESS('✅ Aucune mission en retard trouvée'))
             logger.info('✅ Aucune mission en retard trouvée')
             return
 
-        notifications_created = 0
-
-        for mission in missions_en_retard:
-            # Calculer le nombre de jours de retard
-            jours_retard = (today - mission.date_retour).days
-
-            # Vérifier qu'une notification récente n'existe pas déjà pour cette mission
-            # (éviter de spammer si la commande tourne plusieurs fois par jour)
-            recent_notification = Notification.objects.filter(
-                mission=mission,
+        # Missions déjà notifiées aujourd'hui (éviter de spammer si la commande
+        # tourne plusieurs fois par jour)
+        deja_notifiees = set(
+            Notification.objects.filter(
                 type_notification='mission_retard',
-                created_at__date=today
-            ).exists()
+                created_at__date=today,
+                mission__in=missions_qs.values('pk'),
+            ).values_list('mission_id', flat=True)
+        )
+        a_notifier = [mission for mission in missions_en_retard if mission.pk not in deja_notifiees]
 
-            if recent_notification:
-                continue  # Notification déjà créée aujourd'hui pour cette mission
+        # Admins et managers, groupés par entreprise (uniquement les entreprises concernées)
+        admins_managers = defaultdict(list)
+        entreprise_ids = {mission.entreprise_id for mission in a_notifier}
+        if entreprise_ids:
+            for user in Utilisateur.objects.filter(role__in=['admin', 'manager'], entreprise_id__in=entreprise_ids):
+                admins_managers[user.entreprise_id].append(user)
 
-            # Trouver les utilisateurs à notifier (uniquement de l'entreprise concernée)
-            users_to_notify = []
-            mission_entreprise = mission.contrat.entreprise if mission.contrat else None
+        notifications = []
+        for mission in a_notifier:
+            # Calculer le nombre de jours de retard
+            jours_retard = (today - mission.date_retour).days
 
             # 1. Admins et managers de l'entreprise de la mission uniquement
-            if mission_entreprise:
-                admins_managers = Utilisateur.objects.filter(
-                    role__in=['admin', 'manager'],
-                    entreprise=mission_entreprise
-                )
-                users_to_notify.extend(list(admins_managers))
+            users_to_notify = list(admins_managers[mission.entreprise_id])
 
             # 2. Chauffeur de la mission
-            if mission.contrat and mission.contrat.chauffeur:
-                chauffeur = mission.contrat.chauffeur
-                if hasattr(chauffeur, 'utilisateur') and chauffeur.utilisateur:
-                    users_to_notify.append(chauffeur.utilisateur)
+            chauffeur = mission.contrat.chauffeur if mission.contrat else None
+            if chauffeur and chauffeur.utilisateur:
+                users_to_notify.append(chauffeur.utilisateur)
 
-            # Créer les notifications
             for user in users_to_notify:
-                Notification.objects.create(
+                notification = Notification(
                     utilisateur=user,
                     type_notification='mission_retard',
                     title=f"Mission en retard - {mission.destination}",
@@ -77,13 +112,32 @@ class Command(BaseCommand):
                     color='warning',
                     mission=mission
                 )
-                notifications_created += 1
+                notification.generer_pk()
+                notifications.append(notification)
 
-            logger.info(f"⚠️ Notifications créées pour la mission #{mission.pk_mission} ({jours_retard} jours de retard)")
+            if dry_run:
+                self.stdout.write(
+                    f'   ⚠️ #{mission.pk_mission[:8]} ({jours_retard} jour(s) de retard) : '
+                    f'{len(users_to_notify)} destinataire(s)'
+                )
 
+        if not dry_run and notifications:
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications, batch_size=taille_lot)
+            # bulk_create n'émet pas post_save : invalider les compteurs ici
+            for utilisateur_id in {notification.utilisateur_id for notification in notifications}:
+                invalidate_notifications_count(utilisateur_id)
+            logger.info(f"⚠️ Notifications créées pour {len(a_notifier)} mission(s) en retard")
+
+        duree = time.monotonic() - debut
+        debit = len(missions_en_retard) / duree if duree else 0
+        prefixe = '🔍 [dry-run] ' if dry_run else '✅ '
+        verbe = 'à créer' if dry_run else 'créée(s)'
         self.stdout.write(
             self.style.SUCCESS(
-                f'✅ {notifications_created} notification(s) créée(s) pour {missions_en_retard.count()} mission(s) en retard'
+                f'{prefixe}{len(notifications)} notification(s) {verbe} pour {len(missions_en_retard)} mission(s) en retard '
+                f'({len(deja_notifiees)} déjà notifiée(s) aujourd\'hui)'
             )
         )
-        logger.info(f"✅ Commande check_missions_retard terminée: {notifications_created} notifications créées")
+        self.stdout.write(f'   ⏱️ {duree:.2f}s, {debit:.0f} mission(s)/s')
+        logger.info(f"✅ Commande check_missions_retard terminée: {len(notifications)} notifications {verbe}")
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transport.models import SuppressionSync
+
+
+class Command(BaseCommand):
+    help = 'Supprime les traces de suppression plus anciennes que SYNC_RETENTION_JOURS'
+
+    def handle(self, *args, **options):
+        """
+        /api/v1/sync/ lit les suppressions dans SuppressionSync ; les traces
+        plus anciennes que la rétention ne servent plus (un client plus
+        ancien refait une synchronisation complète).
+
+        Cette commande peut être exécutée chaque nuit via cron:
+        30 2 * * * cd /path/to/project && python manage.py purger_suppressions_sync
+        """
+        debut = time.monotonic()
+        nb = SuppressionSync.purger()
+        duree = time.monotonic() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb} trace(s) de suppression purgée(s) '
+            f'(rétention {SuppressionSync.retention().days} jours) en {duree:.2f}s'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from transport.models import Entreprise, RevenueRollup
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit la table des cumuls de revenus (RevenueRollup) à partir des paiements'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entreprise',
+            type=str,
+            help='PK de l\'entreprise à reconstruire (par défaut : toutes)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        La table est maintenue automatiquement à chaque sauvegarde de paiement.
+        Cette commande sert après un import massif, une modification par
+        queryset.update() ou un changement de client/chauffeur sur un contrat.
+
+        Exemple de cron hebdomadaire:
+        0 4 * * 0 cd /path/to/project && python manage.py rebuild_revenue_rollup
+        """
+        entreprise = None
+        if options.get('entreprise'):
+            try:
+                entreprise = Entreprise.objects.get(pk=options['entreprise'])
+            except Entreprise.DoesNotExist:
+                raise CommandError(f'Entreprise "{options["entreprise"]}" introuvable.')
+
+        debut = time.monotonic()
+        nb_lignes = RevenueRollup.reconstruire(entreprise=entreprise)
+        duree = time.monotonic() - debut
+
+        perimetre = entreprise.nom if entreprise else 'toutes les entreprises'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb_lignes} cumul(s) reconstruit(s) pour {perimetre} en {duree:.2f}s'
+        ))
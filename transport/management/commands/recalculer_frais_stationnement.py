@@ -0,0 +1,124 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from transport.dashboard_metrics import invalidate_dashboard_cache
+from transport.demurrage import calculer_frais_missions
+from transport.invoice_generator import invalidate_invoice_cache
+from transport.models import Mission, PaiementMission
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les frais de stationnement des missions bloquées et synchronise les paiements'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de missions traitées par lot (défaut: 500)',
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Date de référence AAAA-MM-JJ (défaut: aujourd\'hui)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Les frais de stationnement d'une mission ne sont calculés qu'au blocage
+        et au déchargement : entre les deux, montant_stationnement et
+        jours_stationnement_facturables ne suivent pas l'écoulement des jours.
+        Cette commande les recalcule pour toutes les missions bloquées non
+        déchargées (y compris celles encore en franchise, qui passent en
+        stationnement payant), par lots :
+
+        - une requête de calcul par lot (transport.demurrage) ;
+        - un bulk_update des seules missions modifiées ;
+        - une requête de synchronisation de PaiementMission.frais_stationnement
+          (paiements non validés uniquement).
+
+        Cette commande peut être exécutée chaque nuit via cron:
+        5 0 * * * cd /path/to/project && python manage.py recalculer_frais_stationnement
+        """
+        taille_lot = max(1, options['batch_size'])
+        date_reference = timezone.now().date()
+        if options.get('date'):
+            try:
+                date_reference = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Format de date invalide (attendu: AAAA-MM-JJ)')
+
+        missions = Mission.objects.filter(
+            Q(statut_stationnement='en_stationnement')
+            | Q(statut_stationnement='attente', date_arrivee__isnull=False),
+            date_dechargement__isnull=True,
+        ).order_by('pk_mission')
+
+        debut = time.monotonic()
+        nb_missions = nb_modifiees = nb_paiements = 0
+        entreprises = set()
+        dernier_pk = ''
+        while True:
+            lot = list(
+                missions.filter(pk_mission__gt=dernier_pk).values_list(
+                    'pk', 'pk_mission', 'jours_stationnement_facturables', 'montant_stationnement',
+                    'statut_stationnement', 'entreprise_id',
+                )[:taille_lot]
+            )
+            if not lot:
+                break
+            dernier_pk = lot[-1][1]
+            nb_missions += len(lot)
+
+            frais_par_mission = calculer_frais_missions(
+                Mission.objects.filter(pk__in=[ligne[0] for ligne in lot]), date_reference
+            )
+            a_modifier = []
+            maintenant = timezone.now()
+            for pk, pk_mission, jours, montant, statut, entreprise_id in lot:
+                frais = frais_par_mission[pk_mission]
+                if (jours, montant, statut) != (frais.jours_facturables, frais.montant, frais.statut):
+                    a_modifier.append(Mission(
+                        pk=pk,
+                        jours_stationnement_facturables=frais.jours_facturables,
+                        montant_stationnement=frais.montant,
+                        statut_stationnement=frais.statut,
+                        updated_at=maintenant,
+                    ))
+                    entreprises.add(entreprise_id)
+            if not a_modifier:
+                continue
+
+            pks_modifies = [mission.pk for mission in a_modifier]
+            paiements = PaiementMission.objects.filter(mission_id__in=pks_modifies, est_valide=False)
+            with transaction.atomic():
+                Mission.objects.bulk_update(
+                    a_modifier,
+                    ['jours_stationnement_facturables', 'montant_stationnement', 'statut_stationnement', 'updated_at'],
+                )
+                pks_paiements = list(paiements.values_list('pk_paiement', flat=True))
+                paiements.update(
+                    frais_stationnement=Subquery(
+                        Mission.objects.filter(pk=OuterRef('mission_id')).values('montant_stationnement')[:1]
+                    ),
+                    updated_at=maintenant,
+                )
+            # bulk_update et update() n'émettent pas post_save
+            for pk_paiement in pks_paiements:
+                invalidate_invoice_cache(pk_paiement)
+            nb_modifiees += len(a_modifier)
+            nb_paiements += len(pks_paiements)
+
+        for entreprise_id in entreprises:
+            invalidate_dashboard_cache(entreprise_id)
+        duree = time.monotonic() - debut
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb_missions} mission(s) en stationnement au {date_reference.strftime("%d/%m/%Y")} : '
+            f'{nb_modifiees} mise(s) à jour, {nb_paiements} paiement(s) synchronisé(s) en {duree:.2f}s'
+        ))
@@ -0,0 +1,66 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transport.audit_archive import mois_archives, rechercher
+
+
+def _mois(valeur):
+    try:
+        annee, numero = valeur.split('-')
+        return date(int(annee), int(numero), 1)
+    except ValueError:
+        raise CommandError(f'Mois "{valeur}" invalide (format attendu: AAAA-MM).')
+
+
+class Command(BaseCommand):
+    help = 'Recherche des entrées dans les archives mensuelles du journal d\'audit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depuis', type=str, help='Premier mois parcouru (AAAA-MM)')
+        parser.add_argument('--jusqua', type=str, help='Dernier mois parcouru (AAAA-MM)')
+        parser.add_argument('--utilisateur', type=str, help='PK de l\'utilisateur')
+        parser.add_argument('--action', type=str, help='Code de l\'action (ex: DELETE, VALIDER_PAIEMENT)')
+        parser.add_argument('--modele', type=str, help='Nom du modèle (recherche partielle)')
+        parser.add_argument('--objet', type=str, help='ID exact de l\'objet')
+        parser.add_argument('--texte', type=str, help='Texte cherché dans la représentation et les changements')
+        parser.add_argument('--limite', type=int, default=100, help='Nombre maximum de résultats (0: sans limite)')
+        parser.add_argument('--json', action='store_true', help='Une entrée JSON par ligne')
+
+    def handle(self, *args, **options):
+        """
+        Exemples:
+        python manage.py rechercher_audit_archive --depuis 2025-01 --jusqua 2025-03 --action DELETE
+        python manage.py rechercher_audit_archive --objet <pk_mission> --json > mission.jsonl
+        """
+        depuis = _mois(options['depuis']) if options.get('depuis') else None
+        jusqua = _mois(options['jusqua']) if options.get('jusqua') else None
+        if not mois_archives():
+            self.stdout.write(self.style.WARNING('⚠️ Aucune archive d\'audit'))
+            return
+
+        limite = options['limite']
+        trouves = 0
+        for valeurs in rechercher(
+            debut=depuis,
+            fin=jusqua,
+            utilisateur=options.get('utilisateur'),
+            action=options.get('action'),
+            modele=options.get('modele'),
+            objet=options.get('objet'),
+            texte=options.get('texte'),
+        ):
+            if options['json']:
+                self.stdout.write(json.dumps(valeurs, ensure_ascii=False))
+            else:
+                self.stdout.write(
+                    f"{valeurs['timestamp'][:19]}  {valeurs['action']:<18} {valeurs['model_name']} "
+                    f"#{valeurs['object_id']}  {valeurs['utilisateur_id'] or 'Système'}  {valeurs['object_repr']}"
+                )
+            trouves += 1
+            if limite and trouves >= limite:
+                break
+
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {trouves} entrée(s) trouvée(s)'))
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from transport.audit_buffer import CHAMPS_SECOURS, fichier_secours
+from transport.models import AuditCompteurJour, AuditLog, AuditMensuel
+
+
+class Command(BaseCommand):
+    help = 'Réinsère en base les entrées d\'audit écrites dans le fichier de secours'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fichier',
+            type=str,
+            help='Fichier JSON Lines à rejouer (défaut: settings.AUDIT_FICHIER_SECOURS)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Quand la base est indisponible, transport.audit_buffer écrit les
+        entrées d'audit dans un fichier JSON Lines. Le fichier est renommé
+        avant lecture (les nouvelles entrées vont dans un fichier neuf), puis
+        supprimé une fois les entrées insérées. Les entrées déjà présentes
+        (même clé) sont ignorées : la commande peut être relancée sans risque.
+
+        Cette commande peut être exécutée toutes les heures via cron:
+        0 * * * * cd /path/to/project && python manage.py rejouer_audit_secours
+        """
+        chemin = options.get('fichier') or fichier_secours()
+        en_cours = f'{chemin}.en_cours'
+        if os.path.exists(chemin) and not os.path.exists(en_cours):
+            os.replace(chemin, en_cours)
+        if not os.path.exists(en_cours):
+            self.stdout.write(self.style.SUCCESS('✅ Aucune entrée d\'audit à rejouer'))
+            return
+
+        debut = time.monotonic()
+        entrees = []
+        with open(en_cours, encoding='utf-8') as fichier:
+            for numero, ligne in enumerate(fichier, start=1):
+                if not ligne.strip():
+                    continue
+                try:
+                    valeurs = json.loads(ligne)
+                    valeurs = {champ: valeurs[champ] for champ in CHAMPS_SECOURS}
+                except (ValueError, KeyError):
+                    # Dernière ligne tronquée par un arrêt brutal
+                    self.stdout.write(self.style.WARNING(f'⚠️ Ligne {numero} illisible, ignorée'))
+                    continue
+                valeurs['timestamp'] = parse_datetime(valeurs['timestamp'])
+                entrees.append(AuditLog(**valeurs))
+
+        if not entrees and os.path.getsize(en_cours):
+            raise CommandError(f'Aucune entrée lisible dans {en_cours}, fichier conservé.')
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entrees, batch_size=500, ignore_conflicts=True)
+            # Entrées déjà présentes ignorées : les mois concernés sont recomptés
+            mois = {AuditMensuel.mois_de(entree.timestamp) for entree in entrees}
+            AuditMensuel.reconstruire(mois=mois)
+            AuditCompteurJour.reconstruire(mois=mois)
+        os.remove(en_cours)
+
+        duree = time.monotonic() - debut
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(entrees)} entrée(s) d\'audit rejouée(s) en {duree:.2f}s'))
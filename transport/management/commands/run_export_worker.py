@@ -0,0 +1,139 @@
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from transport.export_jobs import executer_job_par_pk
+from transport.models import ExportJob
+
+
+def _executer(pk_job):
+    """Exécute un job dans un thread ou processus du pool."""
+    close_old_connections()
+    try:
+        return executer_job_par_pk(pk_job)
+    finally:
+        close_old_connections()
+
+
+def _initialiser_processus():
+    """Initialise Django dans un processus fils (démarrage spawn/forkserver)."""
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Exécute les exports demandés en arrière-plan (Excel, CSV, PDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Nombre d\'exports exécutés en parallèle (défaut: 2)',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Pool de threads (défaut) ou de processus',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Secondes entre deux scrutations de la file (défaut: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Traiter les jobs en attente puis s\'arrêter',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Boucle du worker : réserve les jobs en attente, les exécute dans un
+        pool et purge régulièrement les fichiers expirés.
+
+        Aucune dépendance externe (ni Redis ni Celery) : la file est la table
+        ExportJob. Plusieurs workers peuvent tourner en parallèle.
+
+        Exemple avec systemd ou supervisor:
+        python manage.py run_export_worker --workers 4
+
+        Exemple de cron (traitement par lots):
+        * * * * * cd /path/to/project && python manage.py run_export_worker --once
+        """
+        nb_workers = max(1, options['workers'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        relances = ExportJob.relancer_bloques()
+        if relances:
+            self.stdout.write(self.style.WARNING(f'⚠️ {relances} job(s) bloqué(s) remis en attente'))
+        self._purger()
+        derniere_purge = timezone.now()
+
+        if options['mode'] == 'process':
+            # Les connexions ouvertes ne doivent pas être partagées avec les fils
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=nb_workers, initializer=_initialiser_processus)
+        else:
+            pool = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix='export')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🚀 Worker {worker_id} démarré ({nb_workers} {options["mode"]}(s))'
+        ))
+
+        en_cours = {}
+        nb_termines = nb_echoues = 0
+        try:
+            while True:
+                # Récupérer les résultats terminés
+                for future in [f for f in en_cours if f.done()]:
+                    pk_job = en_cours.pop(future)
+                    try:
+                        statut = future.result()
+                    except Exception as exc:
+                        statut = 'echoue'
+                        ExportJob.objects.get(pk_job=pk_job).echouer(exc)
+                    if statut == 'termine':
+                        nb_termines += 1
+                    else:
+                        nb_echoues += 1
+                    self.stdout.write(f'   {"✅" if statut == "termine" else "❌"} {pk_job} : {statut}')
+
+                # Réserver de nouveaux jobs pour les emplacements libres
+                nouveaux = 0
+                while len(en_cours) < nb_workers:
+                    job = ExportJob.reclamer(worker_id)
+                    if job is None:
+                        break
+                    en_cours[pool.submit(_executer, job.pk_job)] = job.pk_job
+                    nouveaux += 1
+                    self.stdout.write(f'   ▶️ {job.pk_job} : {job.type_export}')
+
+                if timezone.now() - derniere_purge > timedelta(minutes=10):
+                    self._purger()
+                    derniere_purge = timezone.now()
+
+                if options['once'] and not en_cours and not nouveaux:
+                    break
+                time.sleep(options['interval'] if not nouveaux else 0.1)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹️ Arrêt demandé, attente des exports en cours...'))
+        finally:
+            pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Worker arrêté : {nb_termines} export(s) terminé(s), {nb_echoues} échec(s)'
+        ))
+
+    def _purger(self):
+        nb_fichiers = ExportJob.purger_expires()
+        if nb_fichiers:
+            self.stdout.write(f'🧹 {nb_fichiers} fichier(s) d\'export expiré(s) supprimé(s)')
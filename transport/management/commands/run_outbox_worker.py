@@ -0,0 +1,91 @@
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from transport.models import OutboxEvent
+from transport.outbox import drainer
+
+
+class Command(BaseCommand):
+    help = 'Envoie par lots les notifications et emails différés par les signaux'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Nombre d\'événements traités par lot (défaut: 100)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Secondes entre deux scrutations de la file (défaut: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider la file puis s\'arrêter',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Boucle du worker : réserve les événements en attente par lots, crée
+        les notifications et envoie les emails sur une connexion SMTP unique
+        par lot, puis purge les événements traités depuis plus de 7 jours.
+
+        Plusieurs workers peuvent tourner en parallèle : un événement n'est
+        réservé que par un seul d'entre eux.
+
+        Exemple avec systemd ou supervisor:
+        python manage.py run_outbox_worker
+
+        Exemple de cron (traitement par lots):
+        * * * * * cd /path/to/project && python manage.py run_outbox_worker --once
+        """
+        taille_lot = max(1, options['batch_size'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        relances = OutboxEvent.relancer_bloques()
+        if relances:
+            self.stdout.write(self.style.WARNING(f'⚠️ {relances} événement(s) bloqué(s) remis en attente'))
+        self._purger()
+        derniere_purge = timezone.now()
+
+        self.stdout.write(self.style.SUCCESS(f'🚀 Worker {worker_id} démarré (lots de {taille_lot})'))
+
+        total_traites = total_echecs = 0
+        try:
+            while True:
+                close_old_connections()
+                nb_traites, nb_echecs = drainer(worker_id, taille_lot)
+                total_traites += nb_traites
+                total_echecs += nb_echecs
+                if nb_traites or nb_echecs:
+                    self.stdout.write(f'   📨 {nb_traites} traité(s), {nb_echecs} échec(s)')
+
+                if timezone.now() - derniere_purge > timedelta(minutes=10):
+                    self._purger()
+                    derniere_purge = timezone.now()
+
+                lot_complet = nb_traites + nb_echecs >= taille_lot
+                if options['once'] and not lot_complet:
+                    break
+                if not lot_complet:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹️ Arrêt demandé'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Worker arrêté : {total_traites} événement(s) traité(s), {total_echecs} échec(s)'
+        ))
+
+    def _purger(self):
+        nb = OutboxEvent.purger_traites()
+        if nb:
+            self.stdout.write(f'🧹 {nb} événement(s) traité(s) supprimé(s)')
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 from transport.models import Affectation, Chauffeur, Camion, Entreprise
 
 
@@ -25,8 +26,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.WARNING(f'Début de la synchronisation pour {entreprise.nom}...'))
 
         # 1. Réinitialiser uniquement les statuts des chauffeurs/camions de cette entreprise
-        nb_chauffeurs = Chauffeur.objects.filter(entreprise=entreprise).update(est_affecter=False)
-        nb_camions = Camion.objects.filter(entreprise=entreprise).update(est_affecter=False)
+        maintenant = timezone.now()
+        nb_chauffeurs = Chauffeur.objects.filter(entreprise=entreprise).update(est_affecter=False, updated_at=maintenant)
+        nb_camions = Camion.objects.filter(entreprise=entreprise).update(est_affecter=False, updated_at=maintenant)
 
         self.stdout.write(f'✓ {nb_chauffeurs} chauffeurs réinitialisés')
         self.stdout.write(f'✓ {nb_camions} camions réinitialisés')
@@ -47,12 +49,12 @@ class Command(BaseCommand):
         for affectation in affectations_actives:
             # Marquer le chauffeur comme affecté
             affectation.chauffeur.est_affecter = True
-            affectation.chauffeur.save(update_fields=['est_affecter'])
+            affectation.chauffeur.save(update_fields=['est_affecter', 'updated_at'])
             chauffeurs_affecter.append(affectation.chauffeur)
 
             # Marquer le camion comme affecté
             affectation.camion.est_affecter = True
-            affectation.camion.save(update_fields=['est_affecter'])
+            affectation.camion.save(update_fields=['est_affecter', 'updated_at'])
             camions_affecter.append(affectation.camion)
 
             self.stdout.write(
@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from transport.models import Cautions, ContratTransport, FraisTrajet, Mission, PaiementMission
+
+
+def _entreprise_du_contrat(champ):
+    return Subquery(ContratTransport.objects.filter(pk=OuterRef(champ)).values('entreprise_id')[:1])
+
+
+def _entreprise_de_la_mission(champ):
+    return Subquery(Mission.objects.filter(pk=OuterRef(champ)).values('contrat__entreprise_id')[:1])
+
+
+# (modèle, expression de l'entreprise attendue), évaluée en SQL sur chaque ligne
+CONTROLES = [
+    (Mission, lambda: _entreprise_du_contrat('contrat_id')),
+    (Cautions, lambda: _entreprise_du_contrat('contrat_id')),
+    (PaiementMission, lambda: _entreprise_de_la_mission('mission_id')),
+    (FraisTrajet, lambda: Coalesce(_entreprise_du_contrat('contrat_id'), _entreprise_de_la_mission('mission_id'))),
+]
+
+# Valeur différente de l'attendu, NULL compris d'un côté ou de l'autre
+_INCOHERENT = (
+    Q(entreprise__isnull=True, attendu__isnull=False)
+    | Q(entreprise__isnull=False, attendu__isnull=True)
+    | (Q(entreprise__isnull=False, attendu__isnull=False) & ~Q(entreprise_id=F('attendu')))
+)
+
+
+def incoherences(model, attendu):
+    """Objets dont l'entreprise dénormalisée diffère de celle du contrat."""
+    return model.objects.annotate(attendu=attendu()).filter(_INCOHERENT)
+
+
+class Command(BaseCommand):
+    help = 'Vérifie (et corrige) l\'entreprise recopiée sur les missions, cautions, paiements et frais de trajet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corriger',
+            action='store_true',
+            help='Recopier l\'entreprise du contrat sur les objets incohérents',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Mission, Cautions, PaiementMission et FraisTrajet portent une copie
+        de l'entreprise du contrat (entreprise_id), utilisée par tous les
+        filtres par entreprise. Elle est renseignée par save() et par le
+        workflow des contrats ; une écriture qui les contourne (update(),
+        SQL direct, import) peut la désynchroniser. Cette commande compte
+        les écarts par table, en une requête chacune, et les corrige avec
+        --corriger.
+
+        Cette commande peut être exécutée chaque semaine via cron:
+        0 3 * * 0 cd /path/to/project && python manage.py verifier_entreprise_denormalisee --corriger
+        """
+        debut = time.monotonic()
+        corriger = options['corriger']
+        total = 0
+
+        for model, attendu in CONTROLES:
+            nom = model.__name__
+            nb = incoherences(model, attendu).count()
+            total += nb
+            if not nb:
+                self.stdout.write(f'   ✅ {nom} : cohérent')
+                continue
+            self.stdout.write(self.style.WARNING(f'   ⚠️ {nom} : {nb} incohérence(s)'))
+            if corriger:
+                pks = incoherences(model, attendu).values('pk')
+                champs = {'entreprise_id': attendu()}
+                if any(champ.name == 'updated_at' for champ in model._meta.concrete_fields):
+                    champs['updated_at'] = timezone.now()
+                with transaction.atomic():
+                    nb_corriges = model.objects.filter(pk__in=pks).update(**champs)
+                self.stdout.write(f'      🔧 {nb_corriges} corrigé(s)')
+
+        duree = time.monotonic() - debut
+        if total and not corriger:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {total} incohérence(s) trouvée(s) en {duree:.2f}s (relancer avec --corriger)'
+            ))
+        elif total:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} incohérence(s) corrigée(s) en {duree:.2f}s'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Aucune incohérence trouvée en {duree:.2f}s'))
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.2 on 2026-10-18 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def construire_rollups(apps, schema_editor):
+    """Remplit la table à partir des paiements existants."""
+    PaiementMission = apps.get_model('transport', 'PaiementMission')
+    RevenueRollup = apps.get_model('transport', 'RevenueRollup')
+
+    lignes = []
+    for granularite, trunc in (('mois', TruncMonth), ('semaine', TruncWeek)):
+        groupes = PaiementMission.objects.filter(
+            mission__contrat__entreprise__isnull=False
+        ).annotate(periode_calc=trunc('date_paiement')).values(
+            'periode_calc', 'est_valide',
+            'mission__contrat__entreprise_id',
+            'mission__contrat__client_id',
+            'mission__contrat__chauffeur_id',
+        ).annotate(
+            montant=Sum('montant_total'),
+            commission=Sum('commission_transitaire'),
+            nombre=Count('pk_paiement'),
+        ).order_by()
+        for groupe in groupes:
+            lignes.append(RevenueRollup(
+                entreprise_id=groupe['mission__contrat__entreprise_id'],
+                client_id=groupe['mission__contrat__client_id'],
+                chauffeur_id=groupe['mission__contrat__chauffeur_id'],
+                granularite=granularite,
+                periode=groupe['periode_calc'],
+                est_valide=groupe['est_valide'],
+                montant_total=groupe['montant'] or 0,
+                commission_transitaire=groupe['commission'] or 0,
+                nombre_paiements=groupe['nombre'],
+            ))
+    RevenueRollup.objects.bulk_create(lignes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0030_add_entreprise_to_mecanicien_fournisseur_transitaire_client'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularite', models.CharField(choices=[('mois', 'Mois'), ('semaine', 'Semaine')], max_length=10)),
+                ('periode', models.DateField(help_text='Premier jour du mois ou lundi de la semaine')),
+                ('est_valide', models.BooleanField(default=False)),
+                ('montant_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('commission_transitaire', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('nombre_paiements', models.IntegerField(default=0)),
+                ('chauffeur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.chauffeur')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.client')),
+                ('entreprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='transport.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Cumul de revenus',
+                'verbose_name_plural': 'Cumuls de revenus',
+                'indexes': [models.Index(fields=['entreprise', 'granularite', 'periode'], name='rollup_entreprise_periode')],
+                'constraints': [models.UniqueConstraint(fields=('entreprise', 'client', 'chauffeur', 'granularite', 'periode', 'est_valide'), name='unique_revenue_rollup')],
+            },
+        ),
+        migrations.RunPython(construire_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0031_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('pk_job', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('type_export', models.CharField(max_length=50)),
+                ('parametres', models.JSONField(blank=True, default=dict, help_text="Paramètres GET de l'export (filtres)")),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('echoue', 'Échoué'), ('expire', 'Expiré')], default='en_attente', max_length=20)),
+                ('progression', models.PositiveSmallIntegerField(default=0, help_text='Avancement en pourcentage')),
+                ('message', models.CharField(blank=True, default='', max_length=255)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('fichier', models.FileField(blank=True, upload_to='exports/%Y/%m/%d/')),
+                ('nom_fichier', models.CharField(blank=True, default='', max_length=255)),
+                ('content_type', models.CharField(blank=True, default='', max_length=100)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('date_expiration', models.DateTimeField(blank=True, null=True)),
+                ('entreprise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='transport.entreprise')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Export en arrière-plan',
+                'verbose_name_plural': 'Exports en arrière-plan',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['statut', 'date_creation'], name='exportjob_statut_date'), models.Index(fields=['utilisateur', '-date_creation'], name='exportjob_utilisateur')],
+            },
+        ),
+    ]
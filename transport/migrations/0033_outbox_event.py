@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0032_export_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('pk_evenement', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('type_evenement', models.CharField(choices=[('mission_terminee', 'Mission terminée'), ('paiement_valide', 'Paiement validé'), ('reparation_urgente', 'Réparation urgente'), ('caution_bloquee', 'Caution bloquée'), ('caution_remboursee', 'Caution remboursée')], max_length=30)),
+                ('objet_pk', models.CharField(help_text="Clé primaire de l'objet concerné", max_length=250)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('traite', 'Traité'), ('echoue', 'Échoué')], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('disponible_le', models.DateTimeField(default=django.utils.timezone.now, help_text='Pas de traitement avant cette date (nouvel essai)')),
+                ('date_traitement', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Événement en attente',
+                'verbose_name_plural': 'Événements en attente',
+                'ordering': ['date_creation'],
+                'indexes': [models.Index(fields=['statut', 'disponible_le'], name='outbox_statut_disponible')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:22
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0033_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entreprise',
+            name='tarif_stationnement',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Tarif journalier des frais de stationnement (FCFA). Vide : tarif par défaut', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+    ]
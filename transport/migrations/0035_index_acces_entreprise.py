@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0034_entreprise_tarif_stationnement'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='transport_n_utilisa_323111_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contrattransport',
+            index=models.Index(fields=['entreprise', '-date_debut'], name='contrat_entreprise_debut'),
+        ),
+        migrations.AddIndex(
+            model_name='contrattransport',
+            index=models.Index(fields=['entreprise', 'statut'], name='contrat_entreprise_statut'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['statut', 'date_retour'], name='mission_statut_retour'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'is_read', '-created_at'], name='notif_utilisateur_lu_date'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remplir_entreprise(apps, schema_editor):
+    """Recopie l'entreprise du contrat sur les objets existants (une requête par table)."""
+    ContratTransport = apps.get_model('transport', 'ContratTransport')
+    Mission = apps.get_model('transport', 'Mission')
+    Cautions = apps.get_model('transport', 'Cautions')
+    PaiementMission = apps.get_model('transport', 'PaiementMission')
+    FraisTrajet = apps.get_model('transport', 'FraisTrajet')
+
+    def entreprise_du_contrat(champ):
+        return Subquery(
+            ContratTransport.objects.filter(pk_contrat=OuterRef(champ)).values('entreprise_id')[:1]
+        )
+
+    def entreprise_de_la_mission(champ):
+        return Subquery(
+            Mission.objects.filter(pk_mission=OuterRef(champ)).values('contrat__entreprise_id')[:1]
+        )
+
+    Mission.objects.update(entreprise_id=entreprise_du_contrat('contrat_id'))
+    Cautions.objects.filter(contrat__isnull=False).update(entreprise_id=entreprise_du_contrat('contrat_id'))
+    PaiementMission.objects.update(entreprise_id=entreprise_de_la_mission('mission_id'))
+    FraisTrajet.objects.update(entreprise_id=Coalesce(
+        entreprise_du_contrat('contrat_id'), entreprise_de_la_mission('mission_id'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0035_index_acces_entreprise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cautions',
+            name='entreprise',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.entreprise'),
+        ),
+        migrations.AddField(
+            model_name='fraistrajet',
+            name='entreprise',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.entreprise'),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='entreprise',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.entreprise'),
+        ),
+        migrations.AddField(
+            model_name='paiementmission',
+            name='entreprise',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='transport.entreprise'),
+        ),
+        migrations.RunPython(remplir_entreprise, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cautions',
+            index=models.Index(fields=['entreprise', 'statut'], name='caution_entreprise_statut'),
+        ),
+        migrations.AddIndex(
+            model_name='fraistrajet',
+            index=models.Index(fields=['entreprise', 'date_trajet'], name='frais_entreprise_date'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['entreprise', '-date_depart'], name='mission_entreprise_depart'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['entreprise', 'statut'], name='mission_entreprise_statut'),
+        ),
+        migrations.AddIndex(
+            model_name='paiementmission',
+            index=models.Index(fields=['entreprise', '-date_paiement'], name='paiement_entreprise_date'),
+        ),
+        migrations.AddIndex(
+            model_name='paiementmission',
+            index=models.Index(fields=['entreprise', 'est_valide'], name='paiement_entreprise_valide'),
+        ),
+    ]
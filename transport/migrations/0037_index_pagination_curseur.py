@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0036_entreprise_denormalisee'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='mission',
+            name='mission_entreprise_depart',
+        ),
+        migrations.RemoveIndex(
+            model_name='paiementmission',
+            name='paiement_entreprise_date',
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['entreprise', '-date_depart', '-pk_mission'], name='mission_entreprise_depart'),
+        ),
+        migrations.AddIndex(
+            model_name='paiementmission',
+            index=models.Index(fields=['entreprise', '-date_paiement', '-pk_paiement'], name='paiement_entreprise_date'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0037_index_pagination_curseur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuppressionSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(help_text='Nom du modèle (Meta.model_name)', max_length=50)),
+                ('objet_pk', models.CharField(max_length=250)),
+                ('supprime_le', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Suppression synchronisée',
+                'verbose_name_plural': 'Suppressions synchronisées',
+            },
+        ),
+        migrations.AddField(
+            model_name='camion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='cautions',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='chauffeur',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='contrattransport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='paiementmission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='camion',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_camion'], name='camion_entreprise_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='cautions',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_caution'], name='caution_entreprise_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='chauffeur',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_chauffeur'], name='chauffeur_entreprise_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='contrattransport',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_contrat'], name='contrat_entreprise_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_mission'], name='mission_entreprise_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'updated_at', 'pk_notification'], name='notif_utilisateur_maj'),
+        ),
+        migrations.AddIndex(
+            model_name='paiementmission',
+            index=models.Index(fields=['entreprise', 'updated_at', 'pk_paiement'], name='paiement_entreprise_maj'),
+        ),
+        migrations.AddField(
+            model_name='suppressionsync',
+            name='entreprise',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='transport.entreprise'),
+        ),
+        migrations.AddField(
+            model_name='suppressionsync',
+            name='utilisateur',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='suppressionsync',
+            index=models.Index(fields=['entreprise', 'supprime_le', 'id'], name='suppr_entreprise_date'),
+        ),
+        migrations.AddIndex(
+            model_name='suppressionsync',
+            index=models.Index(fields=['utilisateur', 'supprime_le', 'id'], name='suppr_utilisateur_date'),
+        ),
+        migrations.AddIndex(
+            model_name='suppressionsync',
+            index=models.Index(fields=['supprime_le'], name='suppr_date'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:07
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def construire_resume(apps, schema_editor):
+    """Remplit le résumé mensuel à partir du journal existant."""
+    AuditLog = apps.get_model('transport', 'AuditLog')
+    AuditMensuel = apps.get_model('transport', 'AuditMensuel')
+
+    groupes = AuditLog.objects.annotate(mois_calc=TruncMonth('timestamp')).values('mois_calc').annotate(
+        nombre=Count('pk_audit')
+    ).order_by()
+    AuditMensuel.objects.bulk_create([
+        AuditMensuel(mois=timezone.localtime(groupe['mois_calc']).date(), nombre=groupe['nombre'])
+        for groupe in groupes
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0039_audit_horodatage_explicite'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditMensuel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois', unique=True)),
+                ('nombre', models.IntegerField(default=0, help_text='Entrées encore en base')),
+                ('nombre_archive', models.IntegerField(default=0, help_text="Entrées déplacées dans l'archive")),
+                ('fichier_archive', models.CharField(blank=True, help_text='Chemin relatif à MEDIA_ROOT', max_length=255)),
+                ('archive_le', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': "Résumé mensuel de l'audit",
+                'verbose_name_plural': "Résumés mensuels de l'audit",
+                'ordering': ['-mois'],
+            },
+        ),
+        migrations.RunPython(construire_resume, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def construire_compteurs(apps, schema_editor):
+    """Remplit les compteurs journaliers à partir du journal existant."""
+    AuditLog = apps.get_model('transport', 'AuditLog')
+    AuditCompteurJour = apps.get_model('transport', 'AuditCompteurJour')
+
+    groupes = AuditLog.objects.annotate(jour_calc=TruncDate('timestamp')).values(
+        'jour_calc', 'action', 'utilisateur_id', 'utilisateur__entreprise_id',
+    ).annotate(nombre=Count('pk_audit')).order_by()
+    AuditCompteurJour.objects.bulk_create([
+        AuditCompteurJour(
+            entreprise_id=groupe['utilisateur__entreprise_id'],
+            jour=groupe['jour_calc'],
+            action=groupe['action'],
+            utilisateur_id=groupe['utilisateur_id'],
+            nombre=groupe['nombre'],
+        )
+        for groupe in groupes
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0040_audit_resume_mensuel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditCompteurJour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('action', models.CharField(max_length=50)),
+                ('nombre', models.IntegerField(default=0)),
+                ('entreprise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='transport.entreprise')),
+                ('utilisateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Compteur journalier de l'audit",
+                'verbose_name_plural': "Compteurs journaliers de l'audit",
+                'indexes': [models.Index(fields=['entreprise', 'jour'], name='audit_compteur_entreprise_jour')],
+                'constraints': [models.UniqueConstraint(fields=('entreprise', 'jour', 'action', 'utilisateur'), name='unique_audit_compteur_jour')],
+            },
+        ),
+        migrations.RunPython(construire_compteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0041_audit_compteurs_journaliers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'Création'), ('UPDATE', 'Modification'), ('DELETE', 'Suppression'), ('VALIDER_PAIEMENT', 'Validation de paiement'), ('TERMINER_MISSION', 'Terminer mission'), ('ANNULER_MISSION', 'Annuler mission'), ('BLOQUER_CAUTION', 'Bloquer caution'), ('DEBLOQUER_CAUTION', 'Débloquer caution'), ('LOGIN', 'Connexion'), ('LOGOUT', 'Déconnexion'), ('FAILED_LOGIN', 'Tentative de connexion échouée'), ('CHANGE_PASSWORD', 'Changement de mot de passe'), ('REQUETE', 'Requête HTTP')], help_text="Type d'action effectuée", max_length=50),
+        ),
+    ]
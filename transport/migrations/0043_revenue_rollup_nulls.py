@@ -0,0 +1,54 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Coalesce
+
+
+def fusionner_doublons(apps, schema_editor):
+    """
+    Fusionne les lignes créées en double pour une même clé à client ou
+    chauffeur NULL (l'ancienne contrainte ne les empêchait pas).
+    """
+    RevenueRollup = apps.get_model('transport', 'RevenueRollup')
+    cle = ('entreprise_id', 'client_id', 'chauffeur_id', 'granularite', 'periode', 'est_valide')
+    doublons = (
+        RevenueRollup.objects.filter(models.Q(client__isnull=True) | models.Q(chauffeur__isnull=True))
+        .values(*cle)
+        .annotate(
+            nb=Count('id'), garde=Min('id'), montant=Sum('montant_total'),
+            commission=Sum('commission_transitaire'), paiements=Sum('nombre_paiements'),
+        )
+        .filter(nb__gt=1)
+    )
+    for doublon in doublons:
+        lignes = RevenueRollup.objects.filter(**{champ: doublon[champ] for champ in cle})
+        lignes.filter(id=doublon['garde']).update(
+            montant_total=doublon['montant'],
+            commission_transitaire=doublon['commission'],
+            nombre_paiements=doublon['paiements'],
+        )
+        lignes.exclude(id=doublon['garde']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0042_audit_action_requete'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionner_doublons, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='revenuerollup',
+            name='unique_revenue_rollup',
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(
+                models.F('entreprise'), Coalesce('client', models.Value('')), Coalesce('chauffeur', models.Value('')),
+                models.F('granularite'), models.F('periode'), models.F('est_valide'),
+                name='unique_revenue_rollup',
+            ),
+        ),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 5.0.2
+
+"""
+Conversion des clés de ContratTransport, Mission et PaiementMission en
+BigAutoField (CLES_ENTIERES, voir transport/cles.py).
+
+Migration conditionnelle : sans CLES_ENTIERES elle ne contient aucune
+opération et les slugs restent les clés primaires. Le mode est donc fixé
+au moment où cette migration est appliquée (installation ou mise à jour).
+
+Pour chaque modèle :
+1. colonne entière ``id_entier``, numérotée dans l'ordre chronologique ;
+2. pour chaque clé étrangère qui le désigne, colonne entière remplie par
+   jointure sur l'ancienne clé, puis suppression de l'ancienne colonne ;
+3. le slug perd la clé primaire et devient la colonne unique ``reference`` ;
+4. ``id_entier`` devient la clé primaire ``id`` (séquence recalée) ;
+5. les colonnes entières deviennent les clés étrangères, sous leur nom.
+
+Les contraintes uniques qui portent sur ces clés étrangères sont retirées
+au début et recréées à la fin.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# (modèle, slug, tri chronologique, [(modèle lié, clé étrangère, options)])
+CONVERSIONS = [
+    ('contrattransport', 'pk_contrat', ('date_debut', 'pk_contrat'), [
+        ('mission', 'contrat', {'on_delete': django.db.models.deletion.CASCADE}),
+        ('fraistrajet', 'contrat', {'on_delete': django.db.models.deletion.CASCADE, 'null': True, 'blank': True}),
+        ('cautions', 'contrat', {'on_delete': django.db.models.deletion.PROTECT, 'null': True, 'blank': True}),
+        ('prestationdetransports', 'contrat_transport', {'on_delete': django.db.models.deletion.CASCADE}),
+    ]),
+    ('mission', 'pk_mission', ('date_depart', 'pk_mission'), [
+        ('fraistrajet', 'mission', {
+            'on_delete': django.db.models.deletion.CASCADE, 'null': True, 'blank': True,
+            'related_name': 'frais_trajets',
+        }),
+        ('paiementmission', 'mission', {'on_delete': django.db.models.deletion.CASCADE}),
+        ('missionconteneur', 'mission', {'on_delete': django.db.models.deletion.CASCADE}),
+        ('notification', 'mission', {'on_delete': django.db.models.deletion.CASCADE, 'null': True, 'blank': True}),
+    ]),
+    ('paiementmission', 'pk_paiement', ('date_paiement', 'pk_paiement'), [
+        ('notification', 'paiement', {'on_delete': django.db.models.deletion.CASCADE, 'null': True, 'blank': True}),
+    ]),
+]
+
+# Contraintes uniques portant sur une clé étrangère convertie
+CONTRAINTES = [
+    ('fraistrajet', models.UniqueConstraint(
+        fields=['mission', 'contrat', 'type_trajet'], name='unique_frais_par_mission_type',
+    )),
+    ('mission', models.UniqueConstraint(
+        fields=['prestation_transport', 'contrat', 'origine', 'destination', 'date_depart'], name='unique_mission',
+    )),
+    ('missionconteneur', models.UniqueConstraint(fields=['mission', 'conteneur'], name='unique_mission_conteneur')),
+    ('paiementmission', models.UniqueConstraint(
+        fields=['mission', 'caution', 'prestation'], name='unique_mission_caution',
+    )),
+    ('prestationdetransports', models.UniqueConstraint(
+        fields=['camion', 'contrat_transport', 'client', 'transitaire', 'date'], name='unique_presta_transport',
+    )),
+]
+
+
+def numeroter(modele, tri):
+    def operation(apps, schema_editor):  # noqa: ARG001
+        Model = apps.get_model('transport', modele)
+        lot = []
+        for numero, objet in enumerate(Model.objects.order_by(*tri).only('pk').iterator(chunk_size=2000), start=1):
+            objet.id_entier = numero
+            lot.append(objet)
+            if len(lot) >= 2000:
+                Model.objects.bulk_update(lot, ['id_entier'])
+                lot = []
+        Model.objects.bulk_update(lot, ['id_entier'])
+    return operation
+
+
+def recopier(modele, lie, cle):
+    def operation(apps, schema_editor):  # noqa: ARG001
+        Model = apps.get_model('transport', modele)
+        Lie = apps.get_model('transport', lie)
+        Lie.objects.filter(**{f'{cle}__isnull': False}).update(**{
+            f'{cle}_entier': Subquery(Model.objects.filter(pk=OuterRef(f'{cle}_id')).values('id_entier')[:1]),
+        })
+    return operation
+
+
+def recaler_sequence(modele):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            # SQLite reprend après le plus grand id ; MySQL n'est pas utilisé
+            return
+        table = apps.get_model('transport', modele)._meta.db_table
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        )
+    return operation
+
+
+def _operations():
+    operations = [
+        migrations.RemoveConstraint(model_name=modele, name=contrainte.name)
+        for modele, contrainte in CONTRAINTES
+    ]
+    for modele, slug, tri, liens in CONVERSIONS:
+        operations += [
+            migrations.AddField(modele, 'id_entier', models.BigIntegerField(null=True)),
+            migrations.RunPython(numeroter(modele, tri), migrations.RunPython.noop),
+        ]
+        for lie, cle, _ in liens:
+            operations += [
+                migrations.AddField(lie, f'{cle}_entier', models.BigIntegerField(null=True)),
+                migrations.RunPython(recopier(modele, lie, cle), migrations.RunPython.noop),
+                migrations.RemoveField(lie, cle),
+            ]
+        options_slug = {'max_length': 250, 'unique': True, 'db_column': 'reference'}
+        if slug != 'pk_paiement':
+            options_slug['editable'] = False
+        operations += [
+            migrations.AlterField(modele, slug, models.CharField(**options_slug)),
+            migrations.AlterField(modele, 'id_entier', models.BigAutoField(primary_key=True, serialize=False)),
+            migrations.RenameField(modele, 'id_entier', 'id'),
+            migrations.RunPython(recaler_sequence(modele), migrations.RunPython.noop),
+        ]
+        for lie, cle, options in liens:
+            operations += [
+                migrations.AlterField(lie, f'{cle}_entier', models.ForeignKey(
+                    to=f'transport.{modele}', **dict(options, null=True, related_name='+'),
+                )),
+                migrations.RenameField(lie, f'{cle}_entier', cle),
+                migrations.AlterField(lie, cle, models.ForeignKey(to=f'transport.{modele}', **options)),
+            ]
+    operations += [
+        migrations.AddConstraint(model_name=modele, constraint=contrainte)
+        for modele, contrainte in CONTRAINTES
+    ]
+    return operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0043_revenue_rollup_nulls'),
+    ]
+
+    operations = _operations() if getattr(settings, 'CLES_ENTIERES', False) else []
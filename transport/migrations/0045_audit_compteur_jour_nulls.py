@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Coalesce
+
+
+def fusionner_doublons(apps, schema_editor):
+    """
+    Fusionne les compteurs créés en double pour une même clé à entreprise ou
+    utilisateur NULL (l'ancienne contrainte ne les empêchait pas).
+    """
+    AuditCompteurJour = apps.get_model('transport', 'AuditCompteurJour')
+    cle = ('entreprise_id', 'jour', 'action', 'utilisateur_id')
+    doublons = (
+        AuditCompteurJour.objects.filter(models.Q(entreprise__isnull=True) | models.Q(utilisateur__isnull=True))
+        .values(*cle)
+        .annotate(nb=Count('id'), garde=Min('id'), total=Sum('nombre'))
+        .filter(nb__gt=1)
+    )
+    for doublon in doublons:
+        lignes = AuditCompteurJour.objects.filter(**{champ: doublon[champ] for champ in cle})
+        lignes.filter(id=doublon['garde']).update(nombre=doublon['total'])
+        lignes.exclude(id=doublon['garde']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transport', '0044_cles_entieres'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionner_doublons, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='auditcompteurjour',
+            name='unique_audit_compteur_jour',
+        ),
+        migrations.AddConstraint(
+            model_name='auditcompteurjour',
+            constraint=models.UniqueConstraint(
+                Coalesce('entreprise', models.Value('')), models.F('jour'), models.F('action'),
+                Coalesce('utilisateur', models.Value('')),
+                name='unique_audit_compteur_jour',
+            ),
+        ),
+    ]
@@ -82,6 +82,23 @@ from .finance import (
 from .audit import (
     Notification,
     AuditLog,
+    AuditMensuel,
+    AuditCompteurJour,
+)
+
+# Import des agrégats de reporting
+from .reporting import (
+    RevenueRollup,
+)
+
+from .jobs import (
+    ExportJob,
+    OutboxEvent,
+)
+
+# Import des traces de suppression (synchronisation mobile)
+from .sync import (
+    SuppressionSync,
 )
 
 __all__ = [
@@ -143,4 +160,16 @@ __all__ = [
     # Audit
     'Notification',
     'AuditLog',
+    'AuditMensuel',
+    'AuditCompteurJour',
+
+    # Reporting
+    'RevenueRollup',
+
+    # Jobs
+    'ExportJob',
+    'OutboxEvent',
+
+    # Synchronisation
+    'SuppressionSync',
 ]
@@ -4,7 +4,13 @@ Audit.Py
 Modèles pour audit
 """
 
-from django.db import models
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
 from django.utils.timezone import now
 from django.utils.text import slugify
 from uuid import uuid4
@@ -12,6 +18,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
+from transport.audit_buffer import enregistrer as enregistrer_audit
+from transport.cles import cle_compacte, cles_compactes_actives
 from .choices import *
 
 class Notification(models.Model):
@@ -62,15 +70,22 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['utilisateur', '-created_at']),
-            models.Index(fields=['utilisateur', 'is_read']),
+            # Notifications non lues, les plus récentes d'abord (navbar, ajax)
+            models.Index(fields=['utilisateur', 'is_read', '-created_at'], name='notif_utilisateur_lu_date'),
+            # Synchronisation incrémentale (/api/v1/sync/)
+            models.Index(fields=['utilisateur', 'updated_at', 'pk_notification'], name='notif_utilisateur_maj'),
         ]
 
-    def save(self, *args, **kwargs):
+    def generer_pk(self):
+        """Génère la clé primaire slugifiée si elle n'existe pas encore."""
         if not self.pk_notification:
             base = f"{self.utilisateur.pk_utilisateur}{self.type_notification}{self.created_at or now()}"
             base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
             slug = slugify(base)[:240]
             self.pk_notification = f"{slug}-{uuid4().hex[:8]}"
+
+    def save(self, *args, **kwargs):
+        self.generer_pk()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -112,6 +127,7 @@ class AuditLog(models.Model):
         ('LOGOUT', 'Déconnexion'),
         ('FAILED_LOGIN', 'Tentative de connexion échouée'),
         ('CHANGE_PASSWORD', 'Changement de mot de passe'),
+        ('REQUETE', 'Requête HTTP'),
     ]
 
     pk_audit = models.CharField(max_length=250, primary_key=True, editable=False)
@@ -126,8 +142,8 @@ class AuditLog(models.Model):
         help_text="Utilisateur qui a effectué l'action"
     )
 
-    # Quand
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Quand (fixé à l'appel : l'écriture peut être différée, voir transport.audit_buffer)
+    timestamp = models.DateTimeField(default=now, editable=False, db_index=True)
 
     # Quoi
     action = models.CharField(
@@ -179,12 +195,19 @@ class AuditLog(models.Model):
         verbose_name = "Journal d'audit"
         verbose_name_plural = "Journaux d'audit"
 
-    def save(self, *args, **kwargs):
+    def generer_pk(self):
+        """Génère la clé primaire si elle n'existe pas encore."""
         if not self.pk_audit:
-            base = f"audit{self.utilisateur.pk_utilisateur if self.utilisateur else 'system'}{self.action}{self.timestamp or now()}"
+            if cles_compactes_actives():
+                self.pk_audit = cle_compacte('aud')
+                return
+            base = f"audit{self.utilisateur_id or 'system'}{self.action}{self.timestamp or now()}"
             base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '').replace(':', '')
             slug = slugify(base)[:240]
             self.pk_audit = f"{slug}-{uuid4().hex[:8]}"
+
+    def save(self, *args, **kwargs):
+        self.generer_pk()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -206,7 +229,8 @@ class AuditLog(models.Model):
             request: HttpRequest pour récupérer IP et user agent
 
         Returns:
-            Instance AuditLog créée
+            Instance AuditLog (clé et horodatage renseignés). L'écriture est
+            groupée en fin de requête, voir transport.audit_buffer.
         """
         ip_address = None
         user_agent = ''
@@ -222,7 +246,7 @@ class AuditLog(models.Model):
             # Récupérer le user agent
             user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
 
-        return cls.objects.create(
+        entree = cls(
             utilisateur=utilisateur,
             action=action,
             model_name=model_name,
@@ -232,6 +256,212 @@ class AuditLog(models.Model):
             ip_address=ip_address,
             user_agent=user_agent
         )
+        entree.generer_pk()
+        enregistrer_audit(entree)
+        return entree
+
+    @staticmethod
+    def comptabiliser(entrees):
+        """Met à jour les compteurs (mensuels et journaliers) des entrées écrites en base."""
+        AuditMensuel.comptabiliser(entrees)
+        AuditCompteurJour.comptabiliser(entrees)
+
+
+def _incrementer(model, cle, nombre):
+    """Ajoute ``nombre`` au compteur identifié par ``cle``, créé au besoin."""
+    if model.objects.filter(**cle).update(nombre=F('nombre') + nombre):
+        return
+    # Ligne à zéro, sans effet si une écriture concurrente l'a créée
+    # entre-temps (contrainte unique), puis incrément
+    model.objects.bulk_create([model(**cle)], ignore_conflicts=True)
+    model.objects.filter(**cle).update(nombre=F('nombre') + nombre)
+
+
+def _periodes(mois):
+    """Filtre des entrées d'audit datées des mois donnés."""
+    filtre = Q(pk__in=[])
+    for un_mois in mois:
+        debut, fin = AuditMensuel.bornes(un_mois)
+        filtre |= Q(timestamp__gte=debut, timestamp__lt=fin)
+    return filtre
+
+
+class AuditMensuel(models.Model):
+    """
+    Nombre d'entrées d'audit par mois, en base et archivées.
+
+    Lue par la page de nettoyage de l'audit à la place de COUNT sur tout le
+    journal. Maintenue à chaque écriture (signal post_save d'AuditLog et
+    écriture groupée de transport.audit_buffer) et par l'archivage
+    (transport.audit_archive) ; ``python manage.py archiver_audit
+    --reconstruire`` recalcule les compteurs en base.
+    """
+    mois = models.DateField(unique=True, help_text="Premier jour du mois")
+    nombre = models.IntegerField(default=0, help_text="Entrées encore en base")
+    nombre_archive = models.IntegerField(default=0, help_text="Entrées déplacées dans l'archive")
+    fichier_archive = models.CharField(max_length=255, blank=True, help_text="Chemin relatif à MEDIA_ROOT")
+    archive_le = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-mois']
+        verbose_name = "Résumé mensuel de l'audit"
+        verbose_name_plural = "Résumés mensuels de l'audit"
+
+    def __str__(self):
+        return f"{self.mois:%m/%Y}: {self.nombre} en base, {self.nombre_archive} archivée(s)"
+
+    @staticmethod
+    def mois_de(horodatage):
+        """Premier jour du mois (heure locale) d'un horodatage."""
+        return timezone.localtime(horodatage).date().replace(day=1)
+
+    @staticmethod
+    def bornes(mois):
+        """Début (inclus) et fin (exclue) du mois, en datetimes locaux."""
+        suivant = (mois.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return (
+            timezone.make_aware(datetime.combine(mois, time.min)),
+            timezone.make_aware(datetime.combine(suivant, time.min)),
+        )
+
+    @classmethod
+    def comptabiliser(cls, entrees):
+        """Ajoute des entrées d'audit écrites en base aux compteurs de leur mois."""
+        par_mois = Counter(cls.mois_de(entree.timestamp) for entree in entrees)
+        for mois, nombre in par_mois.items():
+            _incrementer(cls, {'mois': mois}, nombre)
+
+    @classmethod
+    def reconstruire(cls, mois=None):
+        """
+        Recalcule ``nombre`` à partir du journal, pour les mois donnés ou pour
+        tous. Les compteurs d'archive sont conservés. Retourne le nombre
+        d'entrées comptées.
+        """
+        logs = AuditLog.objects.all()
+        resumes = cls.objects.all()
+        if mois is not None:
+            logs = logs.filter(_periodes(mois))
+            resumes = resumes.filter(mois__in=list(mois))
+
+        comptes = {
+            cls.mois_de(ligne['mois_calc']): ligne['total']
+            for ligne in logs.annotate(mois_calc=TruncMonth('timestamp')).values('mois_calc').annotate(
+                total=Count('pk_audit')
+            ).order_by()
+        }
+        with transaction.atomic():
+            resumes.exclude(mois__in=list(comptes)).update(nombre=0)
+            for un_mois, total in comptes.items():
+                cls.objects.update_or_create(mois=un_mois, defaults={'nombre': total})
+        return sum(comptes.values())
+
+
+class AuditCompteurJour(models.Model):
+    """
+    Nombre d'entrées d'audit par (entreprise, jour, action, utilisateur).
+
+    Lu par l'historique d'audit pour les statistiques et les utilisateurs
+    les plus actifs : quelques lignes sommées au lieu de COUNT et GROUP BY
+    sur le journal. L'entreprise est celle de l'utilisateur au moment de
+    l'écriture. Maintenu comme ``AuditMensuel`` (voir
+    ``AuditLog.comptabiliser``) ; les jours archivés sont retirés avec leur
+    mois (transport.audit_archive).
+    """
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    jour = models.DateField()
+    action = models.CharField(max_length=50)
+    utilisateur = models.ForeignKey("Utilisateur", on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    nombre = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur journalier de l'audit"
+        verbose_name_plural = "Compteurs journaliers de l'audit"
+        constraints = [
+            # Une entreprise ou un utilisateur NULL compte comme une valeur :
+            # sinon deux premières écritures concurrentes créeraient chacune leur ligne
+            models.UniqueConstraint(
+                Coalesce('entreprise', Value('')), 'jour', 'action', Coalesce('utilisateur', Value('')),
+                name='unique_audit_compteur_jour',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['entreprise', 'jour'], name='audit_compteur_entreprise_jour'),
+        ]
+
+    def __str__(self):
+        return f"{self.entreprise_id} {self.jour} {self.action} {self.utilisateur_id}: {self.nombre}"
+
+    @staticmethod
+    def _entreprises(entrees):
+        """Entreprise de chaque utilisateur des entrées, sans requête si l'utilisateur est déjà chargé."""
+        entreprises, manquants = {}, set()
+        for entree in entrees:
+            if entree.utilisateur_id is None:
+                continue
+            if AuditLog.utilisateur.is_cached(entree):
+                entreprises[entree.utilisateur_id] = entree.utilisateur.entreprise_id
+            else:
+                manquants.add(entree.utilisateur_id)
+        if manquants - set(entreprises):
+            Utilisateur = AuditLog._meta.get_field('utilisateur').related_model
+            entreprises.update(
+                Utilisateur.objects.filter(pk__in=manquants - set(entreprises)).values_list('pk', 'entreprise_id')
+            )
+        return entreprises
+
+    @classmethod
+    def comptabiliser(cls, entrees):
+        """Ajoute des entrées d'audit écrites en base aux compteurs de leur jour."""
+        entreprises = cls._entreprises(entrees)
+        par_cle = Counter(
+            (entreprises.get(entree.utilisateur_id), timezone.localtime(entree.timestamp).date(),
+             entree.action, entree.utilisateur_id)
+            for entree in entrees
+        )
+        for (entreprise_id, jour, action, utilisateur_id), nombre in par_cle.items():
+            cle = dict(entreprise_id=entreprise_id, jour=jour, action=action, utilisateur_id=utilisateur_id)
+            _incrementer(cls, cle, nombre)
+
+    @classmethod
+    def retirer_mois(cls, mois):
+        """Supprime les compteurs des jours d'un mois (mois archivé)."""
+        debut, fin = AuditMensuel.bornes(mois)
+        cls.objects.filter(jour__gte=debut.date(), jour__lt=fin.date()).delete()
+
+    @classmethod
+    def reconstruire(cls, mois=None):
+        """
+        Recalcule les compteurs à partir du journal, pour les mois donnés ou
+        pour tous. Retourne le nombre de lignes créées.
+        """
+        logs = AuditLog.objects.all()
+        compteurs = cls.objects.all()
+        if mois is not None:
+            logs = logs.filter(_periodes(mois))
+            jours = Q(pk__in=[])
+            for un_mois in mois:
+                debut, fin = AuditMensuel.bornes(un_mois)
+                jours |= Q(jour__gte=debut.date(), jour__lt=fin.date())
+            compteurs = compteurs.filter(jours)
+
+        groupes = logs.annotate(jour_calc=TruncDate('timestamp')).values(
+            'jour_calc', 'action', 'utilisateur_id', 'utilisateur__entreprise_id',
+        ).annotate(total=Count('pk_audit')).order_by()
+        lignes = [
+            cls(
+                entreprise_id=groupe['utilisateur__entreprise_id'],
+                jour=groupe['jour_calc'],
+                action=groupe['action'],
+                utilisateur_id=groupe['utilisateur_id'],
+                nombre=groupe['total'],
+            )
+            for groupe in groupes
+        ]
+        with transaction.atomic():
+            compteurs.delete()
+            cls.objects.bulk_create(lignes, batch_size=500)
+        return len(lignes)
 
 # =======================
 # GESTION DE LA PAIE
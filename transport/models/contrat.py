@@ -12,11 +12,17 @@ from decimal import Decimal
 from .mission import Mission
 from .vehicle import Camion
 from .personnel import Chauffeur
+from transport.cles import cle_compacte, cles_compactes_actives, cles_entieres_actives
 from .choices import *
 # Imports circulaires gérés dans les méthodes
 
 class ContratTransport(models.Model):
-    pk_contrat = models.CharField(max_length=250, primary_key=True, editable=False)
+    if cles_entieres_actives():
+        # Clé entière (voir transport/cles.py) : le slug reste la référence unique
+        id = models.BigAutoField(primary_key=True)
+        pk_contrat = models.CharField(max_length=250, unique=True, editable=False, db_column='reference')
+    else:
+        pk_contrat = models.CharField(max_length=250, primary_key=True, editable=False)
 
     conteneur = models.ForeignKey("Conteneur", on_delete=models.CASCADE)
     client = models.ForeignKey("Client", on_delete=models.SET_NULL, null=True, blank=True)
@@ -77,6 +83,9 @@ class ContratTransport(models.Model):
         help_text="Statut du contrat"
     )
 
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -84,6 +93,12 @@ class ContratTransport(models.Model):
                 name='unique_contrat_transport'
             )
         ]
+        indexes = [
+            # Listes paginées triées par date et filtre ?statut= de l'API
+            models.Index(fields=['entreprise', '-date_debut'], name='contrat_entreprise_debut'),
+            models.Index(fields=['entreprise', 'statut'], name='contrat_entreprise_statut'),
+            models.Index(fields=['entreprise', 'updated_at', 'pk_contrat'], name='contrat_entreprise_maj'),
+        ]
 
     def _auto_compute_date_limite_retour(self):
         """Calcule date_limite_retour = date_debut + 23 jours si non définie."""
@@ -192,7 +207,9 @@ class ContratTransport(models.Model):
             raise ValidationError(errors)
 
     def save(self, *args, **kwargs):
-        if not self.pk_contrat:
+        if not self.pk_contrat and cles_compactes_actives():
+            self.pk_contrat = cle_compacte('ctr')
+        elif not self.pk_contrat:
             base = (
                 f"{self.conteneur.pk_conteneur}"
                 f"{self.client.pk_client if self.client else ''}"
@@ -341,11 +358,17 @@ class PrestationDeTransports(models.Model):
     )
     date = models.DateTimeField()
 
-    def save(self,*args, **kwargs):
-        if not self.pk_presta_transport:
+    def generer_pk(self):
+        """Génère la clé primaire slugifiée si elle n'existe pas encore."""
+        if not self.pk_presta_transport and cles_compactes_actives():
+           self.pk_presta_transport = cle_compacte('pre')
+        elif not self.pk_presta_transport:
            base = f"{self.camion.immatriculation}{self.contrat_transport.pk_contrat}{self.client.pk_client}{self.transitaire.pk_transitaire}{self.date}"
            base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
            self.pk_presta_transport = slugify(base)[:250]
+
+    def save(self,*args, **kwargs):
+        self.generer_pk()
         super().save(*args,**kwargs)
     
     # class Meta:
@@ -12,6 +12,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
+from transport.cles import cle_compacte, cles_compactes_actives, cles_entieres_actives
 from .choices import *
 # Imports circulaires gérés dans les méthodes
 
@@ -19,6 +20,8 @@ class Cautions(models.Model):
     pk_caution = models.CharField(max_length=250, primary_key=True)
     conteneur = models.ForeignKey("Conteneur", on_delete=models.SET_NULL, blank=True, null=True)
     contrat = models.ForeignKey("ContratTransport", on_delete=models.PROTECT, blank=True, null=True)
+    # Copie de l'entreprise du contrat : filtre par entreprise sans jointure
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, null=True, blank=True, editable=False, db_index=False)
     transitaire = models.ForeignKey("Transitaire", on_delete=models.SET_NULL, blank=True, null=True)
     client = models.ForeignKey("Client", on_delete=models.SET_NULL, blank=True, null=True)
     chauffeur = models.ForeignKey("Chauffeur", on_delete=models.SET_NULL, blank=True, null=True)
@@ -43,6 +46,15 @@ class Cautions(models.Model):
         validators=[MinValueValidator(Decimal('0'))]
     )
 
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entreprise', 'statut'], name='caution_entreprise_statut'),
+            models.Index(fields=['entreprise', 'updated_at', 'pk_caution'], name='caution_entreprise_maj'),
+        ]
+
     def clean(self):
         """Validation personnalisée pour les cautions"""
         super().clean()
@@ -75,12 +87,23 @@ class Cautions(models.Model):
         if errors:
             raise ValidationError(errors)
 
+    def generer_pk(self):
+        """Génère la clé primaire slugifiée si elle n'existe pas encore."""
+        if not self.pk_caution and cles_compactes_actives():
+            self.pk_caution = cle_compacte('cau')
+        elif not self.pk_caution:
+            base = f"{self.conteneur.pk_conteneur if self.conteneur else ''}{self.contrat.pk_contrat if self.contrat else ''}"
+            base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
+            slug = slugify(base)[:220]
+            self.pk_caution = f"{slug}-{uuid4().hex[:8]}"
+
+    def synchroniser_entreprise(self):
+        """Recopie l'entreprise du contrat."""
+        self.entreprise_id = self.contrat.entreprise_id if self.contrat_id else None
+
     def save(self, *args, **kwargs):
-        if not self.pk_caution:
-           base = f"{self.conteneur.pk_conteneur if self.conteneur else ''}{self.contrat.pk_contrat if self.contrat else ''}"
-           base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
-           slug = slugify(base)[:220]
-           self.pk_caution = f"{slug}-{uuid4().hex[:8]}"
+        self.generer_pk()
+        self.synchroniser_entreprise()
         super().save(*args, **kwargs)
 
 
@@ -88,8 +111,15 @@ class Cautions(models.Model):
         return f"{self.pk_caution}, {self.conteneur}, {self.contrat}, {self.transitaire} {self.client}, {self.chauffeur}, {self.camion}, {self.montant}, {self.statut}, {self.montant_rembourser}"
 
 class PaiementMission(models.Model):
-    pk_paiement = models.CharField(max_length=250,primary_key=True)
+    if cles_entieres_actives():
+        # Clé entière (voir transport/cles.py) : le slug reste la référence unique
+        id = models.BigAutoField(primary_key=True)
+        pk_paiement = models.CharField(max_length=250, unique=True, db_column='reference')
+    else:
+        pk_paiement = models.CharField(max_length=250,primary_key=True)
     mission = models.ForeignKey("Mission", on_delete=models.CASCADE)
+    # Copie de l'entreprise du contrat de la mission : filtre par entreprise sans jointure
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, null=True, blank=True, editable=False, db_index=False)
     caution = models.ForeignKey("Cautions", on_delete=models.CASCADE)
     prestation = models.ForeignKey("PrestationDeTransports", on_delete=models.CASCADE)
 
@@ -137,6 +167,9 @@ class PaiementMission(models.Model):
         help_text="Statut du paiement"
     )
 
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def clean(self):
         """Validation avant sauvegarde - empêcher la validation si mission non terminée ou caution non remboursée"""
         super().clean()
@@ -277,25 +310,47 @@ class PaiementMission(models.Model):
                 elif not self.observation:
                     self.observation = note_stationnement
 
-    def save(self, *args, **kwargs):
-        if not self.pk_paiement:
-            base = f"{self.mission}{self.caution}{self.prestation}"
+    def generer_pk(self):
+        """Génère la clé primaire slugifiée si elle n'existe pas encore."""
+        if not self.pk_paiement and cles_compactes_actives():
+            self.pk_paiement = cle_compacte('pai')
+        elif not self.pk_paiement:
+            # Clés des objets liés, sans les charger (leur __str__ lit d'autres
+            # relations) ; un objet déjà attaché peut avoir reçu sa clé depuis
+            cles = [
+                getattr(self, champ).pk if self._meta.get_field(champ).is_cached(self)
+                else getattr(self, f'{champ}_id')
+                for champ in ('mission', 'caution', 'prestation')
+            ]
+            base = ''.join(str(cle or '') for cle in cles)
             base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
             self.pk_paiement = slugify(base)[:250]
 
+    def synchroniser_entreprise(self):
+        """Recopie l'entreprise du contrat de la mission."""
+        self.entreprise_id = self.mission.entreprise_id or self.mission.contrat.entreprise_id
+
+    def save(self, *args, **kwargs):
+        self.generer_pk()
+        self.synchroniser_entreprise()
+
         # ✅ NOUVEAU: Synchroniser automatiquement les frais de stationnement
         self.synchroniser_frais_stationnement()
 
-        # Valider avant de sauvegarder
-        self.full_clean()
+        # Valider avant de sauvegarder (l'entreprise est recopiée, pas saisie)
+        self.full_clean(exclude=['entreprise'])
 
         super().save(*args, **kwargs)
 
-
     class Meta:
          #unique_together = ('mission', 'caution',"prestation")
          # Simule une clé composite
         constraints = [models.UniqueConstraint(fields=['mission', 'caution','prestation'], name='unique_mission_caution')]  # Alternative
+        indexes = [
+            models.Index(fields=['entreprise', '-date_paiement', '-pk_paiement'], name='paiement_entreprise_date'),
+            models.Index(fields=['entreprise', 'est_valide'], name='paiement_entreprise_valide'),
+            models.Index(fields=['entreprise', 'updated_at', 'pk_paiement'], name='paiement_entreprise_maj'),
+        ]
 
     def __str__(self):
         statut_validation = "✅ Validé" if self.est_valide else "⏳ En attente"
@@ -0,0 +1,275 @@
+"""
+Jobs.Py
+
+Files d'attente traitées en arrière-plan : exports lourds (Excel, CSV, PDF)
+et effets de bord des signaux (notifications, emails)
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class ExportJob(models.Model):
+    """
+    Demande d'export exécutée par ``python manage.py run_export_worker``.
+
+    Cycle de vie : en_attente -> en_cours -> termine | echoue, puis expire
+    lorsque le fichier produit a dépassé sa durée de conservation.
+    """
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echoue', 'Échoué'),
+        ('expire', 'Expiré'),
+    ]
+
+    pk_job = models.CharField(max_length=32, primary_key=True, editable=False)
+    utilisateur = models.ForeignKey('Utilisateur', on_delete=models.CASCADE, related_name='export_jobs')
+    entreprise = models.ForeignKey('Entreprise', on_delete=models.CASCADE, null=True, blank=True, related_name='export_jobs')
+    type_export = models.CharField(max_length=50)
+    parametres = models.JSONField(default=dict, blank=True, help_text="Paramètres GET de l'export (filtres)")
+
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    progression = models.PositiveSmallIntegerField(default=0, help_text="Avancement en pourcentage")
+    message = models.CharField(max_length=255, blank=True, default='')
+    erreur = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+
+    fichier = models.FileField(upload_to='exports/%Y/%m/%d/', blank=True)
+    nom_fichier = models.CharField(max_length=255, blank=True, default='')
+    content_type = models.CharField(max_length=100, blank=True, default='')
+
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    date_expiration = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-date_creation']
+        verbose_name = "Export en arrière-plan"
+        verbose_name_plural = "Exports en arrière-plan"
+        indexes = [
+            models.Index(fields=['statut', 'date_creation'], name='exportjob_statut_date'),
+            models.Index(fields=['utilisateur', '-date_creation'], name='exportjob_utilisateur'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.pk_job:
+            self.pk_job = uuid.uuid4().hex
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.type_export} ({self.get_statut_display()}) - {self.utilisateur_id}"
+
+    @property
+    def est_telechargeable(self):
+        return self.statut == 'termine' and bool(self.fichier)
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def reclamer(cls, worker):
+        """
+        Réserve atomiquement le plus ancien job en attente pour ``worker``.
+
+        La réservation est une mise à jour conditionnelle sur le statut :
+        deux workers concurrents ne peuvent pas obtenir le même job, sans
+        dépendre de SELECT ... FOR UPDATE (indisponible sous SQLite).
+        """
+        candidats = cls.objects.filter(statut='en_attente').order_by('date_creation').values_list('pk_job', flat=True)[:10]
+        for pk_job in candidats:
+            reserve = cls.objects.filter(pk_job=pk_job, statut='en_attente').update(
+                statut='en_cours',
+                worker=worker,
+                progression=0,
+                message='Démarrage',
+                date_debut=timezone.now(),
+            )
+            if reserve:
+                return cls.objects.get(pk_job=pk_job)
+        return None
+
+    def avancer(self, progression, message=''):
+        """Enregistre l'avancement sans toucher aux autres colonnes."""
+        self.progression = progression
+        self.message = message
+        ExportJob.objects.filter(pk_job=self.pk_job).update(progression=progression, message=message)
+
+    def terminer(self):
+        self.statut = 'termine'
+        self.progression = 100
+        self.message = 'Terminé'
+        self.date_fin = timezone.now()
+        self.date_expiration = self.date_fin + timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+        self.save(update_fields=[
+            'statut', 'progression', 'message', 'date_fin', 'date_expiration',
+            'fichier', 'nom_fichier', 'content_type',
+        ])
+
+    def echouer(self, erreur):
+        self.statut = 'echoue'
+        self.message = 'Échec'
+        self.erreur = str(erreur)[:5000]
+        self.date_fin = timezone.now()
+        self.date_expiration = self.date_fin + timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+        self.save(update_fields=['statut', 'message', 'erreur', 'date_fin', 'date_expiration'])
+
+    @classmethod
+    def relancer_bloques(cls, age=timedelta(hours=1)):
+        """Remet en attente les jobs restés 'en_cours' (worker arrêté brutalement)."""
+        return cls.objects.filter(
+            statut='en_cours', date_debut__lt=timezone.now() - age
+        ).update(statut='en_attente', worker='', progression=0, message='Relancé')
+
+    @classmethod
+    def purger_expires(cls, maintenant=None):
+        """
+        Supprime les fichiers des jobs expirés et passe ces jobs au statut
+        'expire'. Les jobs expirés depuis plus de 30 jours sont supprimés.
+        Retourne le nombre de fichiers supprimés.
+        """
+        maintenant = maintenant or timezone.now()
+        expires = cls.objects.filter(
+            statut__in=['termine', 'echoue'], date_expiration__lte=maintenant
+        )
+        nb_fichiers = 0
+        for job in expires.iterator():
+            if job.fichier:
+                job.fichier.delete(save=False)
+                nb_fichiers += 1
+            job.statut = 'expire'
+            job.save(update_fields=['statut', 'fichier'])
+
+        cls.objects.filter(
+            statut='expire', date_expiration__lte=maintenant - timedelta(days=30)
+        ).delete()
+        return nb_fichiers
+
+
+class OutboxEvent(models.Model):
+    """
+    Effet de bord différé (notification, email) d'une modification.
+
+    L'événement est écrit dans la même transaction que la modification qui
+    le déclenche : il n'existe que si elle est validée, et n'est visible du
+    worker (``python manage.py run_outbox_worker``) qu'après le commit.
+    """
+    TYPE_CHOICES = [
+        ('mission_terminee', 'Mission terminée'),
+        ('paiement_valide', 'Paiement validé'),
+        ('reparation_urgente', 'Réparation urgente'),
+        ('caution_bloquee', 'Caution bloquée'),
+        ('caution_remboursee', 'Caution remboursée'),
+    ]
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('traite', 'Traité'),
+        ('echoue', 'Échoué'),
+    ]
+    # Au-delà, l'événement reste 'echoue' et n'est plus retenté
+    MAX_TENTATIVES = 5
+
+    pk_evenement = models.CharField(max_length=32, primary_key=True, editable=False)
+    type_evenement = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    objet_pk = models.CharField(max_length=250, help_text="Clé primaire de l'objet concerné")
+
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    erreur = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+
+    date_creation = models.DateTimeField(auto_now_add=True)
+    disponible_le = models.DateTimeField(default=timezone.now, help_text="Pas de traitement avant cette date (nouvel essai)")
+    date_traitement = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['date_creation']
+        verbose_name = "Événement en attente"
+        verbose_name_plural = "Événements en attente"
+        indexes = [
+            models.Index(fields=['statut', 'disponible_le'], name='outbox_statut_disponible'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.pk_evenement:
+            self.pk_evenement = uuid.uuid4().hex
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.type_evenement} {self.objet_pk} ({self.get_statut_display()})"
+
+    @classmethod
+    def enregistrer(cls, type_evenement, objet_pk):
+        """Ajoute un événement à la file, dans la transaction en cours."""
+        return cls.objects.create(type_evenement=type_evenement, objet_pk=str(objet_pk))
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def reclamer_lot(cls, worker, taille=100):
+        """
+        Réserve jusqu'à ``taille`` événements disponibles pour ``worker``.
+
+        Comme ExportJob.reclamer, la réservation est une mise à jour
+        conditionnelle sur le statut : un événement n'est jamais réservé
+        par deux workers.
+        """
+        maintenant = timezone.now()
+        candidats = list(
+            cls.objects.filter(statut='en_attente', disponible_le__lte=maintenant)
+            .order_by('date_creation').values_list('pk_evenement', flat=True)[:taille]
+        )
+        if not candidats:
+            return []
+        cls.objects.filter(pk_evenement__in=candidats, statut='en_attente').update(
+            statut='en_cours', worker=worker, tentatives=models.F('tentatives') + 1,
+            disponible_le=maintenant,
+        )
+        return list(cls.objects.filter(pk_evenement__in=candidats, statut='en_cours', worker=worker))
+
+    @classmethod
+    def marquer_traites(cls, evenements):
+        cls.objects.filter(pk_evenement__in=[e.pk_evenement for e in evenements]).update(
+            statut='traite', erreur='', date_traitement=timezone.now(),
+        )
+
+    @classmethod
+    def marquer_echecs(cls, evenements, erreur):
+        """
+        Remet les événements en attente avec un délai croissant, ou les
+        passe en échec définitif après MAX_TENTATIVES essais.
+        """
+        maintenant = timezone.now()
+        for evenement in evenements:
+            definitif = evenement.tentatives >= cls.MAX_TENTATIVES
+            cls.objects.filter(pk_evenement=evenement.pk_evenement).update(
+                statut='echoue' if definitif else 'en_attente',
+                erreur=str(erreur)[:5000],
+                disponible_le=maintenant + timedelta(minutes=2 ** evenement.tentatives),
+                date_traitement=maintenant if definitif else None,
+            )
+
+    @classmethod
+    def relancer_bloques(cls, age=timedelta(minutes=15)):
+        """Remet en attente les événements restés 'en_cours' (worker arrêté brutalement)."""
+        return cls.objects.filter(
+            statut='en_cours', disponible_le__lt=timezone.now() - age
+        ).update(statut='en_attente', worker='')
+
+    @classmethod
+    def purger_traites(cls, age=timedelta(days=7)):
+        """Supprime les événements traités depuis plus de ``age``."""
+        deleted, _ = cls.objects.filter(
+            statut='traite', date_traitement__lt=timezone.now() - age
+        ).delete()
+        return deleted
@@ -12,6 +12,7 @@ from decimal import Decimal
 from uuid import uuid4
 import hashlib
 
+from transport.cles import cle_compacte, cles_compactes_actives, cles_entieres_actives
 from .choices import *
 # Imports circulaires gérés dans les méthodes
 
@@ -21,6 +22,8 @@ class FraisTrajet(models.Model):
     # Relations avec Mission et Contrat
     mission = models.ForeignKey("Mission", on_delete=models.CASCADE, related_name='frais_trajets', null=True, blank=True)
     contrat = models.ForeignKey("ContratTransport", on_delete=models.CASCADE, null=True, blank=True)
+    # Copie de l'entreprise du contrat : filtre par entreprise sans jointure
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, null=True, blank=True, editable=False, db_index=False)
 
     # Type de trajet
     type_trajet = models.CharField(
@@ -63,8 +66,20 @@ class FraisTrajet(models.Model):
         verbose_name = "Frais de trajet"
         verbose_name_plural = "Frais de trajets"
         ordering = ['date_trajet', 'type_trajet']
+        indexes = [
+            models.Index(fields=['entreprise', 'date_trajet'], name='frais_entreprise_date'),
+        ]
+
+    def synchroniser_entreprise(self):
+        """Recopie l'entreprise du contrat (ou, à défaut, de la mission)."""
+        if self.contrat_id:
+            self.entreprise_id = self.contrat.entreprise_id
+        elif self.mission_id:
+            self.entreprise_id = self.mission.entreprise_id or self.mission.contrat.entreprise_id
 
     def save(self, *args, **kwargs):
+        self.synchroniser_entreprise()
+
         # Générer pk_frais automatiquement si non défini
         if not self.pk_frais:
             if self.mission and self.contrat and self.date_trajet:
@@ -101,7 +116,12 @@ class FraisTrajet(models.Model):
         return f"{type_str} | {mission_str} | {camion_str} | {chauffeur_str} | {date_str} | {trajet_str} | {montant_total} FCFA"
 
 class Mission(models.Model):
-    pk_mission = models.CharField(max_length=250, primary_key=True, editable=False)
+    if cles_entieres_actives():
+        # Clé entière (voir transport/cles.py) : le slug reste la référence unique
+        id = models.BigAutoField(primary_key=True)
+        pk_mission = models.CharField(max_length=250, unique=True, editable=False, db_column='reference')
+    else:
+        pk_mission = models.CharField(max_length=250, primary_key=True, editable=False)
     prestation_transport = models.ForeignKey("PrestationDeTransports", on_delete=models.CASCADE)
     date_depart = models.DateField(db_index=True)
     date_retour = models.DateField(blank=True, null=True, db_index=True)
@@ -112,6 +132,8 @@ class Mission(models.Model):
         help_text="Décrivez l'itinéraire détaillé de la mission"
     )
     contrat = models.ForeignKey("ContratTransport", on_delete=models.CASCADE)
+    # Copie de l'entreprise du contrat : filtre par entreprise sans jointure
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, null=True, blank=True, editable=False, db_index=False)
     statut = models.CharField(max_length=10, choices=STATUT_MISSION_CHOICES, default='en cours', db_index=True)
 
     # Gestion du stationnement (demurrage)
@@ -148,6 +170,9 @@ class Mission(models.Model):
         help_text="Montant total des frais de stationnement (25 000 CFA/jour)"
     )
 
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def clean(self):
         """Validation des dates par rapport au contrat"""
         super().clean()
@@ -180,9 +205,11 @@ class Mission(models.Model):
         if errors:
             raise ValidationError(errors)
 
-    def save(self, *args, **kwargs):
-        # Générer la clé primaire si elle n'existe pas
-        if not self.pk_mission:
+    def generer_pk(self):
+        """Génère la clé primaire slugifiée si elle n'existe pas encore."""
+        if not self.pk_mission and cles_compactes_actives():
+            self.pk_mission = cle_compacte('mis')
+        elif not self.pk_mission:
             base = (
                 f"{self.prestation_transport.pk_presta_transport}_"
                 f"{self.contrat.pk_contrat}_"
@@ -192,16 +219,27 @@ class Mission(models.Model):
             base = base.replace(',', '').replace(';', '').replace(' ', '').replace('-', '')
             self.pk_mission = slugify(base)[:250]
 
-        # Valider avant de sauvegarder (sauf si validate=False passé en kwargs)
+    def synchroniser_entreprise(self):
+        """Recopie l'entreprise du contrat."""
+        self.entreprise_id = self.contrat.entreprise_id
+
+    def save(self, *args, **kwargs):
+        # Générer la clé primaire si elle n'existe pas
+        self.generer_pk()
+        self.synchroniser_entreprise()
+
+        # Valider avant de sauvegarder (sauf si validate=False passé en kwargs) ;
+        # l'entreprise, recopiée du contrat, n'a pas à être revérifiée
         validate = kwargs.pop('validate', True)
         if validate:
-            self.full_clean()
+            self.full_clean(exclude=['entreprise'])
 
         super().save(*args, **kwargs)
 
     def calculer_jours_ouvrables(self, date_debut, date_fin):
         """
-        Calcule le nombre de jours ouvrables entre deux dates (exclut samedi et dimanche)
+        Calcule le nombre de jours ouvrables entre deux dates (exclut samedi,
+        dimanche et les jours fériés de settings.DEMURRAGE_JOURS_FERIES)
 
         Args:
             date_debut: Date de début
@@ -210,33 +248,19 @@ class Mission(models.Model):
         Returns:
             int: Nombre de jours ouvrables
         """
-        from datetime import timedelta
-
-        if not date_debut or not date_fin:
-            return 0
-
-        jours_ouvrables = 0
-        current_date = date_debut
+        from transport.demurrage import calendrier_par_defaut
 
-        while current_date <= date_fin:
-            # 0 = lundi, 6 = dimanche
-            # On compte seulement du lundi (0) au vendredi (4)
-            if current_date.weekday() < 5:  # Lundi à vendredi
-                jours_ouvrables += 1
-            current_date += timedelta(days=1)
-
-        return jours_ouvrables
+        return calendrier_par_defaut().jours_ouvres(date_debut, date_fin)
 
     def calculer_frais_stationnement(self):
         """
         Calcule les frais de stationnement (demurrage)
 
-        Règles mises à jour:
-        - 3 premiers jours ouvrables (lun-ven) gratuits
+        Règles (voir transport.demurrage):
+        - 3 premiers jours ouvrables (lun-ven, hors fériés) gratuits
         - Si arrivée le weekend, les 3 jours gratuits commencent le lundi suivant
         - À partir du 4ème jour ouvrable: TOUS les jours comptent (y compris sam/dim)
-        - Tarif: 25 000 CFA par jour après la période gratuite
-        - Pas de jours fériés exclus
+        - Tarif: Entreprise.tarif_stationnement, sinon 25 000 CFA par jour
 
         Returns:
             dict: Informations sur les frais de stationnement
@@ -250,69 +274,17 @@ class Mission(models.Model):
                 'message': 'Date d\'arrivée non renseignée'
             }
 
-        from datetime import timedelta
         from django.utils import timezone
+        from transport.demurrage import calculer_frais, tarif_journalier
 
         # Date de fin: déchargement si renseigné, sinon aujourd'hui
         date_fin = self.date_dechargement or timezone.now().date()
+        entreprise = self.contrat.entreprise if self.contrat_id else None
 
-        # Constantes
-        JOURS_GRATUITS = 3
-        TARIF_JOUR = Decimal('25000.00')  # 25 000 CFA
-
-        # Étape 1: Trouver le début de la période gratuite
-        # Si arrivée en weekend, décaler au lundi suivant
-        date_debut_gratuit = self.date_arrivee
-        while date_debut_gratuit.weekday() >= 5:  # 5=samedi, 6=dimanche
-            date_debut_gratuit += timedelta(days=1)
-
-        # Étape 2: Compter 3 jours ouvrables à partir de là (période gratuite)
-        jours_ouvrables_comptes = 0
-        current_date = date_debut_gratuit
-        date_fin_gratuit = None
-
-        while jours_ouvrables_comptes < JOURS_GRATUITS:
-            if current_date.weekday() < 5:  # Lundi à vendredi
-                jours_ouvrables_comptes += 1
-                if jours_ouvrables_comptes == JOURS_GRATUITS:
-                    date_fin_gratuit = current_date
-                    break
-            current_date += timedelta(days=1)
-
-        # Étape 3: À partir du jour suivant la fin de la période gratuite,
-        # compter TOUS les jours calendaires (y compris weekends) jusqu'au déchargement
-        if date_fin <= date_fin_gratuit:
-            # Déchargement pendant la période gratuite
-            jours_facturables = 0
-        else:
-            # Compter tous les jours calendaires après la période gratuite
-            jours_facturables = (date_fin - date_fin_gratuit).days
-
-        # Calculer le montant
-        montant = jours_facturables * TARIF_JOUR
-
-        # Déterminer le statut
-        if jours_facturables > 0:
-            statut = 'en_stationnement'
-        else:
-            statut = 'attente'
-
-        if self.date_dechargement:
-            statut = 'decharge'
-
-        # Calculer le nombre total de jours calendaires depuis l'arrivée
-        jours_total = (date_fin - self.date_arrivee).days + 1
-
-        message = f"{jours_total} jours total depuis arrivée, {JOURS_GRATUITS} jours ouvrables gratuits, {jours_facturables} jours facturables"
-
-        return {
-            'jours_total': jours_total,
-            'jours_gratuits': JOURS_GRATUITS,
-            'jours_facturables': jours_facturables,
-            'montant': montant,
-            'statut': statut,
-            'message': message
-        }
+        return calculer_frais(
+            self.date_arrivee, date_fin, tarif_journalier(entreprise),
+            decharge=bool(self.date_dechargement),
+        ).as_dict()
 
     def bloquer_pour_stationnement(self, date_arrivee=None):
         """
@@ -649,6 +621,14 @@ class Mission(models.Model):
                 name='unique_mission'
             )
         ]
+        indexes = [
+            # Missions en cours en retard (check_missions_retard, alertes du dashboard)
+            models.Index(fields=['statut', 'date_retour'], name='mission_statut_retour'),
+            # Listes et compteurs par entreprise
+            models.Index(fields=['entreprise', '-date_depart', '-pk_mission'], name='mission_entreprise_depart'),
+            models.Index(fields=['entreprise', 'statut'], name='mission_entreprise_statut'),
+            models.Index(fields=['entreprise', 'updated_at', 'pk_mission'], name='mission_entreprise_maj'),
+        ]
 
     def __str__(self):
         return (f"{self.pk_mission} - "
@@ -31,6 +31,8 @@ class Chauffeur(models.Model):
     telephone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     est_affecter = models.BooleanField(default=False)
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.pk_chauffeur:
@@ -60,6 +62,9 @@ class Chauffeur(models.Model):
                 name='unique_chauffeur'
             )
         ]
+        indexes = [
+            models.Index(fields=['entreprise', 'updated_at', 'pk_chauffeur'], name='chauffeur_entreprise_maj'),
+        ]
 
     def __str__(self):
         return f"{self.nom} {self.prenom}  {self.email}"
@@ -144,10 +149,10 @@ class Affectation(models.Model):
         if self.date_fin_affectation is None:
             # Affectation active - marquer le chauffeur et le camion comme affectés
             self.chauffeur.est_affecter = True
-            self.chauffeur.save(update_fields=['est_affecter'])
+            self.chauffeur.save(update_fields=['est_affecter', 'updated_at'])
 
             self.camion.est_affecter = True
-            self.camion.save(update_fields=['est_affecter'])
+            self.camion.save(update_fields=['est_affecter', 'updated_at'])
         else:
             # Affectation terminée - vérifier s'il y a d'autres affectations actives pour le chauffeur
             autres_affectations_chauffeur = Affectation.objects.filter(
@@ -157,7 +162,7 @@ class Affectation(models.Model):
 
             if not autres_affectations_chauffeur:
                 self.chauffeur.est_affecter = False
-                self.chauffeur.save(update_fields=['est_affecter'])
+                self.chauffeur.save(update_fields=['est_affecter', 'updated_at'])
 
             # Vérifier s'il y a d'autres affectations actives pour le camion
             autres_affectations_camion = Affectation.objects.filter(
@@ -167,7 +172,7 @@ class Affectation(models.Model):
 
             if not autres_affectations_camion:
                 self.camion.est_affecter = False
-                self.camion.save(update_fields=['est_affecter'])
+                self.camion.save(update_fields=['est_affecter', 'updated_at'])
 
         super().save(*args, **kwargs)
 
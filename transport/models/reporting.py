@@ -0,0 +1,186 @@
+"""
+Reporting.Py
+
+Tables d'agrégats pré-calculés pour les rapports financiers
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, Sum, Count, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+
+class RevenueRollup(models.Model):
+    """
+    Cumul des paiements de mission par (entreprise, client, chauffeur,
+    période, est_valide).
+
+    Chaque paiement alimente deux lignes : une mensuelle et une hebdomadaire.
+    La table est maintenue incrémentalement par les signaux de PaiementMission
+    et peut être reconstruite avec ``python manage.py rebuild_revenue_rollup``.
+    """
+    GRANULARITE_CHOICES = [
+        ('mois', 'Mois'),
+        ('semaine', 'Semaine'),
+    ]
+
+    entreprise = models.ForeignKey("Entreprise", on_delete=models.CASCADE, related_name='revenue_rollups')
+    client = models.ForeignKey("Client", on_delete=models.CASCADE, null=True, blank=True)
+    chauffeur = models.ForeignKey("Chauffeur", on_delete=models.CASCADE, null=True, blank=True)
+    granularite = models.CharField(max_length=10, choices=GRANULARITE_CHOICES)
+    periode = models.DateField(help_text="Premier jour du mois ou lundi de la semaine")
+    est_valide = models.BooleanField(default=False)
+
+    montant_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    commission_transitaire = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    nombre_paiements = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Cumul de revenus"
+        verbose_name_plural = "Cumuls de revenus"
+        constraints = [
+            # Un client ou un chauffeur NULL compte comme une valeur : sinon
+            # deux premières écritures concurrentes créeraient chacune leur ligne
+            models.UniqueConstraint(
+                'entreprise', Coalesce('client', Value('')), Coalesce('chauffeur', Value('')),
+                'granularite', 'periode', 'est_valide',
+                name='unique_revenue_rollup',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['entreprise', 'granularite', 'periode'], name='rollup_entreprise_periode'),
+        ]
+
+    def __str__(self):
+        return f"{self.entreprise_id} {self.granularite} {self.periode}: {self.montant_total}"
+
+    # ------------------------------------------------------------------
+    # Maintenance incrémentale
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def periodes_pour(date_paiement):
+        """Retourne [(granularité, début de période)] pour une date de paiement."""
+        return [
+            ('mois', date_paiement.replace(day=1)),
+            ('semaine', date_paiement - timedelta(days=date_paiement.weekday())),
+        ]
+
+    @staticmethod
+    def _etats(paiements, *champs):
+        return paiements.values(
+            *champs,
+            'entreprise_id', 'date_paiement', 'est_valide', 'montant_total', 'commission_transitaire',
+            client_id=F('mission__contrat__client_id'),
+            chauffeur_id=F('mission__contrat__chauffeur_id'),
+        )
+
+    @classmethod
+    def etat_paiement(cls, paiement_pk):
+        """
+        Lit en une requête les dimensions et montants d'un paiement tels
+        qu'ils sont en base (avant modification), ou None s'il n'existe pas.
+        """
+        from .finance import PaiementMission
+
+        return cls._etats(PaiementMission.objects.filter(pk=paiement_pk)).first()
+
+    @classmethod
+    def etats_contrat(cls, contrat_pk):
+        """
+        Lit en une requête l'état (cf. ``etat_paiement``) de tous les
+        paiements d'un contrat, indexés par pk_paiement.
+        """
+        from .finance import PaiementMission
+
+        etats = cls._etats(PaiementMission.objects.filter(mission__contrat_id=contrat_pk), 'pk_paiement')
+        return {etat.pop('pk_paiement'): etat for etat in etats}
+
+    @classmethod
+    def appliquer(cls, etat, signe=1):
+        """
+        Ajoute (signe=1) ou retire (signe=-1) la contribution d'un paiement
+        décrit par ``etat`` (dict renvoyé par ``etat_paiement``).
+        """
+        if not etat or not etat['entreprise_id'] or not etat['date_paiement']:
+            return
+        montant = (etat['montant_total'] or Decimal('0')) * signe
+        commission = (etat['commission_transitaire'] or Decimal('0')) * signe
+
+        with transaction.atomic():
+            for granularite, periode in cls.periodes_pour(etat['date_paiement']):
+                cle = dict(
+                    entreprise_id=etat['entreprise_id'],
+                    client_id=etat['client_id'],
+                    chauffeur_id=etat['chauffeur_id'],
+                    granularite=granularite,
+                    periode=periode,
+                    est_valide=etat['est_valide'],
+                )
+                increments = dict(
+                    montant_total=F('montant_total') + montant,
+                    commission_transitaire=F('commission_transitaire') + commission,
+                    nombre_paiements=F('nombre_paiements') + signe,
+                )
+                updated = cls.objects.filter(**cle).update(**increments)
+                if not updated and signe > 0:
+                    # Ligne à zéro, sans effet si une écriture concurrente l'a
+                    # créée entre-temps (contrainte unique), puis incrément
+                    cls.objects.bulk_create([cls(**cle)], ignore_conflicts=True)
+                    cls.objects.filter(**cle).update(**increments)
+            if signe < 0:
+                cls.objects.filter(
+                    entreprise_id=etat['entreprise_id'], nombre_paiements__lte=0
+                ).delete()
+
+    # ------------------------------------------------------------------
+    # Reconstruction complète
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def reconstruire(cls, entreprise=None):
+        """
+        Recalcule entièrement les cumuls (d'une entreprise ou de toutes)
+        à partir des paiements. Retourne le nombre de lignes créées.
+        """
+        from .finance import PaiementMission
+
+        paiements = PaiementMission.objects.filter(entreprise__isnull=False)
+        rollups = cls.objects.all()
+        if entreprise is not None:
+            paiements = paiements.filter(entreprise=entreprise)
+            rollups = rollups.filter(entreprise=entreprise)
+
+        lignes = []
+        for granularite, trunc in (('mois', TruncMonth), ('semaine', TruncWeek)):
+            groupes = paiements.annotate(
+                periode_calc=trunc('date_paiement'),
+            ).values(
+                'periode_calc', 'est_valide',
+                'entreprise_id',
+                'mission__contrat__client_id',
+                'mission__contrat__chauffeur_id',
+            ).annotate(
+                montant=Sum('montant_total'),
+                commission=Sum('commission_transitaire'),
+                nombre=Count('pk_paiement'),
+            ).order_by()
+            for groupe in groupes:
+                lignes.append(cls(
+                    entreprise_id=groupe['entreprise_id'],
+                    client_id=groupe['mission__contrat__client_id'],
+                    chauffeur_id=groupe['mission__contrat__chauffeur_id'],
+                    granularite=granularite,
+                    periode=groupe['periode_calc'],
+                    est_valide=groupe['est_valide'],
+                    montant_total=groupe['montant'] or 0,
+                    commission_transitaire=groupe['commission'] or 0,
+                    nombre_paiements=groupe['nombre'],
+                ))
+
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create(lignes, batch_size=500)
+        return len(lignes)
@@ -0,0 +1,66 @@
+"""
+Sync.Py
+
+Suppressions enregistrées pour la synchronisation incrémentale de l'application
+mobile (/api/v1/sync/)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from transport.cles import champ_reference
+
+
+class SuppressionSync(models.Model):
+    """
+    Trace (« tombstone ») d'un objet supprimé, lue par /api/v1/sync/ pour
+    que les clients retirent l'objet de leur copie locale.
+
+    Créée par le signal post_delete des modèles synchronisés. Les
+    références à l'entreprise et à l'utilisateur n'ont pas de contrainte en
+    base : la suppression d'une entreprise supprime en cascade ses
+    missions, et donc crée des traces qui la référencent.
+    """
+    modele = models.CharField(max_length=50, help_text="Nom du modèle (Meta.model_name)")
+    objet_pk = models.CharField(max_length=250)
+    entreprise = models.ForeignKey(
+        "Entreprise", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    utilisateur = models.ForeignKey(
+        "Utilisateur", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    supprime_le = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Suppression synchronisée"
+        verbose_name_plural = "Suppressions synchronisées"
+        indexes = [
+            models.Index(fields=['entreprise', 'supprime_le', 'id'], name='suppr_entreprise_date'),
+            models.Index(fields=['utilisateur', 'supprime_le', 'id'], name='suppr_utilisateur_date'),
+            models.Index(fields=['supprime_le'], name='suppr_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.modele} {self.objet_pk} supprimé le {self.supprime_le}"
+
+    @classmethod
+    def enregistrer(cls, instance):
+        return cls.objects.create(
+            modele=instance._meta.model_name,
+            objet_pk=str(getattr(instance, champ_reference(type(instance)))),
+            entreprise_id=getattr(instance, 'entreprise_id', None),
+            utilisateur_id=getattr(instance, 'utilisateur_id', None),
+        )
+
+    @classmethod
+    def retention(cls):
+        return timedelta(days=getattr(settings, 'SYNC_RETENTION_JOURS', 30))
+
+    @classmethod
+    def purger(cls):
+        """Supprime les traces plus anciennes que la durée de rétention."""
+        deleted, _ = cls.objects.filter(supprime_le__lt=timezone.now() - cls.retention()).delete()
+        return deleted
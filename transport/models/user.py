@@ -52,6 +52,14 @@ class Entreprise(models.Model):
     telephone_contact = models.CharField(max_length=20, blank=True, null=True)
     date_creation = models.DateField(default=now)
     statut = models.CharField(max_length=10, choices=STATUT_ENTREPRISE_CHOICES, default='active')
+    tarif_stationnement = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(Decimal('0'))],
+        help_text="Tarif journalier des frais de stationnement (FCFA). Vide : tarif par défaut"
+    )
 
     def save(self, *args, **kwargs):
         if not self.pk_entreprise:
@@ -23,6 +23,8 @@ class Camion(models.Model):
     est_affecter = models.BooleanField(default=False)
     date_entree = models.DateField(null=True, blank=True, verbose_name="Date d'entrée dans la flotte")
     date_sortie = models.DateField(null=True, blank=True, verbose_name="Date de sortie de la flotte")
+    # Dernière modification : synchronisation incrémentale (/api/v1/sync/)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.pk_camion:
@@ -40,7 +42,10 @@ class Camion(models.Model):
                 fields=['immatriculation', 'modele', 'entreprise'],
                 name='unique_camion'
             )
-        ]    
+        ]
+        indexes = [
+            models.Index(fields=['entreprise', 'updated_at', 'pk_camion'], name='camion_entreprise_maj'),
+        ]
 
     def __str__(self):
         return f"{self.immatriculation}  {self.modele}"
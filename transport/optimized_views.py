@@ -70,7 +70,7 @@ def mission_list_optimized(request):
     entreprise = request.user.entreprise
 
     # Requête optimisée avec select_related pour éviter les requêtes N+1
-    missions = Mission.objects.filter(contrat__entreprise=entreprise).select_related(
+    missions = Mission.objects.filter(entreprise=entreprise).select_related(
         'contrat',
         'contrat__chauffeur',
         'contrat__client',
@@ -90,10 +90,10 @@ def mission_list_optimized(request):
     missions_paginated = get_paginated_queryset(missions, request, per_page=20)
 
     # Compter les missions par statut pour les filtres
-    total_missions = Mission.objects.filter(contrat__entreprise=entreprise).count()
-    missions_en_cours = Mission.objects.filter(statut='en cours', contrat__entreprise=entreprise).count()
-    missions_terminees = Mission.objects.filter(statut='terminée', contrat__entreprise=entreprise).count()
-    missions_annulees = Mission.objects.filter(statut='annulée', contrat__entreprise=entreprise).count()
+    total_missions = Mission.objects.filter(entreprise=entreprise).count()
+    missions_en_cours = Mission.objects.filter(statut='en cours', entreprise=entreprise).count()
+    missions_terminees = Mission.objects.filter(statut='terminée', entreprise=entreprise).count()
+    missions_annulees = Mission.objects.filter(statut='annulée', entreprise=entreprise).count()
 
     # 🆕 Compter les missions par type de transport
     from django.db.models import Q, Exists, OuterRef
@@ -101,7 +101,7 @@ def mission_list_optimized(request):
 
     # Missions avec aller ET retour
     missions_aller_retour = Mission.objects.filter(
-        contrat__entreprise=entreprise
+        entreprise=entreprise
     ).filter(
         Exists(FraisTrajet.objects.filter(mission=OuterRef('pk'), type_trajet='aller')),
         Exists(FraisTrajet.objects.filter(mission=OuterRef('pk'), type_trajet='retour'))
@@ -109,7 +109,7 @@ def mission_list_optimized(request):
 
     # Missions avec aller seulement
     missions_aller_simple = Mission.objects.filter(
-        contrat__entreprise=entreprise
+        entreprise=entreprise
     ).filter(
         Exists(FraisTrajet.objects.filter(mission=OuterRef('pk'), type_trajet='aller'))
     ).exclude(
@@ -118,7 +118,7 @@ def mission_list_optimized(request):
 
     # Missions sans trajets
     missions_sans_trajet = Mission.objects.filter(
-        contrat__entreprise=entreprise
+        entreprise=entreprise
     ).exclude(
         Exists(FraisTrajet.objects.filter(mission=OuterRef('pk')))
     ).count()
@@ -158,7 +158,7 @@ def paiement_mission_list_optimized(request):
     entreprise = request.user.entreprise
 
     paiements = PaiementMission.objects.filter(
-        mission__contrat__entreprise=entreprise
+        entreprise=entreprise
     ).select_related(
         'mission',
         'mission__contrat',
@@ -176,8 +176,8 @@ def paiement_mission_list_optimized(request):
     paiements_paginated = get_paginated_queryset(paiements, request, per_page=20)
 
     # Statistiques
-    total_paiements = PaiementMission.objects.filter(mission__contrat__entreprise=entreprise).count()
-    paiements_valides = PaiementMission.objects.filter(est_valide=True, mission__contrat__entreprise=entreprise).count()
+    total_paiements = PaiementMission.objects.filter(entreprise=entreprise).count()
+    paiements_valides = PaiementMission.objects.filter(est_valide=True, entreprise=entreprise).count()
     paiements_en_attente = total_paiements - paiements_valides
 
     context = {
@@ -430,7 +430,7 @@ def caution_list_optimized(request):
     Liste des cautions avec pagination et requêtes optimisées
     """
     cautions = Cautions.objects.filter(
-        contrat__entreprise=request.user.entreprise
+        entreprise=request.user.entreprise
     ).select_related(
         'conteneur',
         'contrat',
@@ -448,7 +448,7 @@ def caution_list_optimized(request):
 
     # Statistiques
     from django.db.models import Sum
-    cautions_qs_stats = Cautions.objects.filter(contrat__entreprise=request.user.entreprise)
+    cautions_qs_stats = Cautions.objects.filter(entreprise=request.user.entreprise)
     total_cautions = cautions_qs_stats.count()
     cautions_en_attente = cautions_qs_stats.filter(statut='en_attente').count()
     cautions_remboursees = cautions_qs_stats.filter(statut='remboursee').count()
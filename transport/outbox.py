@@ -0,0 +1,340 @@
+"""
+Effets de bord différés des signaux
+===================================
+
+Les signaux de Mission, PaiementMission, Reparation et Cautions n'envoient
+plus de notifications ni d'emails pendant la transaction qui les déclenche :
+ils écrivent un ``OutboxEvent`` dans cette même transaction. Le worker
+(``python manage.py run_outbox_worker``) draine ensuite la file par lots :
+
+- les objets concernés sont chargés en une requête par type d'événement ;
+- les doublons (notification déjà créée) sont écartés en une requête ;
+- les notifications sont créées par ``bulk_create`` ;
+- les emails du lot partagent une seule connexion SMTP, ouverte seulement
+  si le lot a des emails à envoyer.
+
+Un serveur SMTP lent n'allonge donc plus ni les requêtes HTTP ni la durée
+des verrous. Les notifications ne dépendent pas du serveur SMTP : une
+panne ne retarde que les événements dont l'email n'est pas parti. Un
+événement en échec est retenté avec un délai croissant ; au nouvel essai,
+seul l'email est renvoyé si la notification existe déjà.
+
+Usage:
+    from transport.outbox import drainer
+
+    nb_traites, nb_echecs = drainer(worker='local')
+"""
+
+import logging
+from collections import defaultdict
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+
+from .context_processors import invalidate_notifications_count
+from .email_notifications import EmailNotifier
+from .models import (
+    Cautions, Mission, Notification, OutboxEvent, PaiementMission,
+    Reparation, Utilisateur,
+)
+from .models.choices import STATUT_CAUTION_CHOICES
+
+logger = logging.getLogger(__name__)
+
+
+class _NotifierLot(EmailNotifier):
+    """
+    EmailNotifier d'un lot : les admins de chaque entreprise ne sont lus
+    qu'une fois, et un envoi en échec lève une exception (l'événement est
+    alors retenté) au lieu d'être ignoré.
+    """
+
+    def __init__(self, connection=None):
+        super().__init__(connection=connection)
+        self._admin_emails = {}
+
+    def _send_email(self, subject, html_content, recipient_list, fail_silently=False):
+        return super()._send_email(subject, html_content, recipient_list, fail_silently=fail_silently)
+
+    def _get_entreprise_admin_emails(self, entreprise):
+        if entreprise.pk not in self._admin_emails:
+            self._admin_emails[entreprise.pk] = super()._get_entreprise_admin_emails(entreprise)
+        return self._admin_emails[entreprise.pk]
+
+
+def _admins_managers(entreprise_ids):
+    """Admins et managers des entreprises, groupés par entreprise (une requête)."""
+    par_entreprise = defaultdict(list)
+    for user in Utilisateur.objects.filter(role__in=['admin', 'manager'], entreprise_id__in=entreprise_ids):
+        par_entreprise[user.entreprise_id].append(user)
+    return par_entreprise
+
+
+# ============================================================================
+# TRAITEMENTS PAR TYPE D'ÉVÉNEMENT
+# ============================================================================
+# Chaque traitement reçoit les pk des objets concernés et ceux dont
+# l'événement est un nouvel essai (``relances``), en chaînes comme
+# ``OutboxEvent.objet_pk``, et retourne
+# (notifications à créer, emails à envoyer) ; un email est un couple
+# (méthode d'EmailNotifier, objet). Une notification déjà créée n'est pas
+# dupliquée ; son email n'est renvoyé que pour un nouvel essai, l'essai
+# précédent ayant pu créer la notification sans réussir l'envoi.
+
+def _mission_terminee(pks, relances=()):
+    deja_notifiees = set(
+        Notification.objects.filter(
+            type_notification='mission_terminee', mission_id__in=pks
+        ).values_list('mission_id', flat=True)
+    )
+    missions = Mission.objects.filter(pk__in=pks, statut='terminée').select_related(
+        'contrat__chauffeur__utilisateur', 'contrat__entreprise', 'contrat__client',
+    )
+
+    notifications, emails = [], []
+    for mission in missions:
+        if not mission.contrat.chauffeur:
+            continue
+        if mission.pk in deja_notifiees:
+            if str(mission.pk) in relances:
+                emails.append(('send_mission_terminee', mission))
+            continue
+        chauffeur = mission.contrat.chauffeur
+        if chauffeur.utilisateur:
+            notifications.append(Notification(
+                utilisateur=chauffeur.utilisateur,
+                type_notification='mission_terminee',
+                title=f"Mission terminée - {mission.destination}",
+                message=f"La mission vers {mission.destination} a été marquée comme terminée. Vous pouvez maintenant procéder à la validation du paiement.",
+                icon='check-circle',
+                color='success',
+                mission=mission
+            ))
+        emails.append(('send_mission_terminee', mission))
+    return notifications, emails
+
+
+def _paiement_valide(pks, relances=()):
+    deja_notifies = set(
+        Notification.objects.filter(
+            type_notification='paiement_valide', paiement_id__in=pks
+        ).values_list('paiement_id', flat=True)
+    )
+    paiements = PaiementMission.objects.filter(pk__in=pks, est_valide=True).select_related(
+        'mission__contrat__chauffeur__utilisateur', 'mission__contrat__entreprise',
+        'mission__contrat__client',
+    )
+
+    notifications, emails = [], []
+    for paiement in paiements:
+        if paiement.pk in deja_notifies:
+            if str(paiement.pk) in relances:
+                emails.append(('send_paiement_valide', paiement))
+            continue
+        chauffeur = paiement.mission.contrat.chauffeur
+        if chauffeur and chauffeur.utilisateur:
+            notifications.append(Notification(
+                utilisateur=chauffeur.utilisateur,
+                type_notification='paiement_valide',
+                title=f"Paiement validé - {paiement.montant_total} FCFA",
+                message=f"Le paiement de {paiement.montant_total} FCFA pour la mission vers {paiement.mission.destination} a été validé avec succès.",
+                icon='check-circle',
+                color='success',
+                paiement=paiement,
+                mission=paiement.mission
+            ))
+        emails.append(('send_paiement_valide', paiement))
+    return notifications, emails
+
+
+def _reparation_urgente(pks, relances=()):  # noqa: ARG001
+    deja_notifiees = set(
+        Notification.objects.filter(
+            type_notification='reparation_urgente', reparation_id__in=pks
+        ).values_list('reparation_id', flat=True)
+    )
+    reparations = [
+        reparation for reparation in Reparation.objects.filter(pk_reparation__in=pks).select_related('camion')
+        if reparation.pk not in deja_notifiees
+    ]
+    destinataires = _admins_managers({reparation.camion.entreprise_id for reparation in reparations})
+
+    notifications = []
+    for reparation in reparations:
+        for user in destinataires[reparation.camion.entreprise_id]:
+            notifications.append(Notification(
+                utilisateur=user,
+                type_notification='reparation_urgente',
+                title=f"Réparation urgente - {reparation.camion.immatriculation}",
+                message=f"Une réparation coûteuse ({reparation.cout} FCFA) a été enregistrée pour le camion {reparation.camion.immatriculation}. Motif: {reparation.description or 'Non spécifié'}",
+                icon='exclamation-triangle',
+                color='warning',
+                reparation=reparation
+            ))
+    return notifications, []
+
+
+def _caution_bloquee(pks, relances=()):  # noqa: ARG001
+    cautions = list(
+        Cautions.objects.filter(
+            pk_caution__in=pks, statut__in=['non_remboursee', 'consommee']
+        ).select_related('contrat', 'chauffeur__utilisateur', 'camion')
+    )
+    if not cautions:
+        return [], []
+
+    # Les notifications de caution ne sont liées à aucun objet : le doublon
+    # se repère, comme auparavant, à la référence dans le message
+    references = {caution.pk: f"caution #{caution.pk_caution[:8]}" for caution in cautions}
+    filtre = Q()
+    for reference in references.values():
+        filtre |= Q(message__icontains=reference)
+    messages_existants = [
+        message.lower() for message in
+        Notification.objects.filter(type_notification='caution_bloquee').filter(filtre)
+        .values_list('message', flat=True)
+    ]
+    destinataires = _admins_managers({c.entreprise_id for c in cautions if c.entreprise_id})
+
+    notifications = []
+    for caution in cautions:
+        if any(references[caution.pk] in message for message in messages_existants):
+            continue
+        users_to_notify = list(destinataires[caution.entreprise_id]) if caution.entreprise_id else []
+        if caution.chauffeur and caution.chauffeur.utilisateur:
+            users_to_notify.append(caution.chauffeur.utilisateur)
+
+        status_label = dict(STATUT_CAUTION_CHOICES).get(caution.statut, caution.statut)
+        for user in users_to_notify:
+            notifications.append(Notification(
+                utilisateur=user,
+                type_notification='caution_bloquee',
+                title=f"Caution {status_label} - {caution.montant} FCFA",
+                message=f"La caution #{caution.pk_caution[:8]} d'un montant de {caution.montant} FCFA a été marquée comme '{status_label}'. Camion: {caution.camion.immatriculation if caution.camion else 'N/A'}, Chauffeur: {caution.chauffeur.nom if caution.chauffeur else 'N/A'}",
+                icon='exclamation-triangle',
+                color='danger'
+            ))
+    return notifications, []
+
+
+def _caution_remboursee(pks, relances=()):  # noqa: ARG001
+    cautions = Cautions.objects.filter(pk_caution__in=pks, statut='remboursee').select_related(
+        'contrat__entreprise', 'chauffeur', 'client', 'conteneur',
+    )
+    return [], [('send_caution_debloquee', caution) for caution in cautions]
+
+
+TRAITEMENTS = {
+    'mission_terminee': _mission_terminee,
+    'paiement_valide': _paiement_valide,
+    'reparation_urgente': _reparation_urgente,
+    'caution_bloquee': _caution_bloquee,
+    'caution_remboursee': _caution_remboursee,
+}
+
+
+# ============================================================================
+# DRAINAGE DE LA FILE
+# ============================================================================
+
+def _creer_notifications(notifications):
+    for notification in notifications:
+        notification.generer_pk()
+    Notification.objects.bulk_create(notifications)
+    # bulk_create n'émet pas post_save : invalider les compteurs ici
+    for utilisateur_id in {notification.utilisateur_id for notification in notifications}:
+        invalidate_notifications_count(utilisateur_id)
+        transaction.on_commit(lambda pk=utilisateur_id: invalidate_notifications_count(pk))
+
+
+class _Envoi:
+    """Connexion SMTP du lot, ouverte au premier email à envoyer."""
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.notifier = None
+        self.erreur = None
+
+    def envoyer(self, emails):
+        """Envoie les emails ; retourne {pk de l'objet (chaîne): exception} des envois en échec."""
+        if emails and self.notifier is None and self.erreur is None:
+            self.connection = self.connection or get_connection()
+            try:
+                self.connection.open()
+            except Exception as exc:
+                logger.error(f"❌ Connexion SMTP impossible, emails du lot reportés: {exc}")
+                self.erreur = exc
+            else:
+                self.notifier = _NotifierLot(connection=self.connection)
+        if self.erreur is not None:
+            return {str(objet.pk): self.erreur for _, objet in emails}
+
+        echecs = {}
+        for methode, objet in emails:
+            try:
+                getattr(self.notifier, methode)(objet)
+            except Exception as exc:
+                echecs[str(objet.pk)] = exc
+        return echecs
+
+    def fermer(self):
+        if self.notifier is not None:
+            self.connection.close()
+
+
+def traiter_lot(evenements, connection=None):
+    """
+    Traite un lot d'événements réservés, groupés par type.
+    Retourne (nombre traités, nombre en échec).
+
+    Les notifications sont créées même si le serveur SMTP est indisponible ;
+    seuls les événements dont l'email a échoué sont remis en attente.
+    """
+    envoi = _Envoi(connection)
+    par_type = defaultdict(list)
+    for evenement in evenements:
+        par_type[evenement.type_evenement].append(evenement)
+
+    nb_traites = nb_echecs = 0
+    try:
+        for type_evenement, groupe in par_type.items():
+            # Un même objet peut avoir été modifié plusieurs fois : un seul traitement
+            pks = list(dict.fromkeys(evenement.objet_pk for evenement in groupe))
+            relances = {evenement.objet_pk for evenement in groupe if evenement.tentatives > 1}
+            try:
+                with transaction.atomic():
+                    notifications, emails = TRAITEMENTS[type_evenement](pks, relances)
+                    _creer_notifications(notifications)
+            except Exception as exc:
+                logger.exception(f"❌ Échec du traitement de {len(groupe)} événement(s) {type_evenement}")
+                OutboxEvent.marquer_echecs(groupe, exc)
+                nb_echecs += len(groupe)
+                continue
+
+            echecs = envoi.envoyer(emails)
+            reussis = [evenement for evenement in groupe if evenement.objet_pk not in echecs]
+            for pk, exc in echecs.items():
+                OutboxEvent.marquer_echecs([e for e in groupe if e.objet_pk == pk], exc)
+            if reussis:
+                OutboxEvent.marquer_traites(reussis)
+            nb_traites += len(reussis)
+            nb_echecs += len(groupe) - len(reussis)
+            logger.info(
+                f"✅ {len(reussis)}/{len(groupe)} événement(s) {type_evenement}: "
+                f"{len(notifications)} notification(s), {len(emails) - len(echecs)}/{len(emails)} email(s)"
+            )
+    finally:
+        envoi.fermer()
+    return nb_traites, nb_echecs
+
+
+def drainer(worker, taille_lot=100, connection=None):
+    """
+    Réserve puis traite un lot d'événements en attente.
+    Retourne (nombre traités, nombre en échec) ; (0, 0) si la file est vide.
+    """
+    evenements = OutboxEvent.reclamer_lot(worker, taille_lot)
+    if not evenements:
+        return 0, 0
+    return traiter_lot(evenements, connection)
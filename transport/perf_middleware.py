@@ -0,0 +1,212 @@
+"""
+Profilage des requêtes (requêtes SQL et durées par vue)
+=======================================================
+
+``ProfilageMiddleware`` mesure, pour chaque requête profilée :
+
+- la durée totale et la durée passée en SQL (``connection.execute_wrapper``) ;
+- le nombre de requêtes SQL et les doublons exacts (même SQL, mêmes paramètres) ;
+- les requêtes répétées au moins ``PERF_SEUIL_N_PLUS_1`` fois avec des
+  paramètres différents (même empreinte : valeurs et listes IN retirées),
+  signe habituel d'un N+1.
+
+Le résultat est renvoyé dans l'en-tête ``Server-Timing`` (onglet Réseau du
+navigateur) et agrégé par vue dans le cache : ``/internal/perf/`` classe
+les vues par latence p50/p95 et nombre de requêtes.
+
+Activation :
+
+- ``PERF_PROFILAGE = True`` : toutes les requêtes (développement, recette) ;
+- sinon, requête par requête avec l'en-tête ``X-Profilage: 1`` (nom réglable
+  par ``PERF_ENTETE``), pour un superutilisateur connecté.
+
+Sans profilage, le middleware ne fait qu'une lecture dans ``request.META``.
+
+Usage:
+    curl -H 'X-Profilage: 1' -b sessionid=... https://.../missions/ -I
+    Server-Timing: total;dur=84.2, sql;dur=31.7;desc="42 requetes", app;dur=52.5, doublons;desc="3", n1;desc="2"
+"""
+
+import hashlib
+import logging
+import math
+import re
+import statistics
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CLE_INDEX = 'perf:vues'
+
+_CHAINE = re.compile(r"'(?:[^']|'')*'")
+_NOMBRE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTE_IN = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_ESPACES = re.compile(r'\s+')
+
+
+def empreinte(sql):
+    """SQL sans ses valeurs : deux requêtes de même forme ont la même empreinte."""
+    sql = _CHAINE.sub('?', sql)
+    sql = _NOMBRE.sub('?', sql)
+    sql = _LISTE_IN.sub('IN (...)', sql)
+    return _ESPACES.sub(' ', sql).strip()
+
+
+class Profil:
+    """Compteurs d'une requête HTTP, alimentés par connection.execute_wrapper."""
+
+    def __init__(self):
+        self.requetes = 0
+        self.duree_sql = 0.0
+        self.duree_totale = 0.0
+        self.empreintes = Counter()
+        self.exactes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree_sql += time.perf_counter() - debut
+            self.requetes += 1
+            self.empreintes[empreinte(sql)] += 1
+            self.exactes[(sql, repr(params))] += 1
+
+    @property
+    def doublons(self):
+        """Requêtes exécutées à l'identique plus d'une fois (exécutions en trop)."""
+        return sum(nombre - 1 for nombre in self.exactes.values() if nombre > 1)
+
+    def n_plus_1(self, seuil=None):
+        """[(empreinte, répétitions)] des requêtes répétées au moins ``seuil`` fois."""
+        seuil = seuil or getattr(settings, 'PERF_SEUIL_N_PLUS_1', 5)
+        return [(sql, nombre) for sql, nombre in self.empreintes.most_common() if nombre >= seuil]
+
+    def server_timing(self):
+        total_ms = self.duree_totale * 1000
+        sql_ms = self.duree_sql * 1000
+        return ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'sql;dur={sql_ms:.1f};desc="{self.requetes} requetes"',
+            f'app;dur={max(total_ms - sql_ms, 0):.1f}',
+            f'doublons;desc="{self.doublons}"',
+            f'n1;desc="{len(self.n_plus_1())}"',
+        ])
+
+
+class ProfilageMiddleware:
+    """
+    Middleware de profilage des requêtes SQL et des durées, activé par
+    PERF_PROFILAGE ou par l'en-tête PERF_ENTETE (superutilisateurs)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.toujours = getattr(settings, 'PERF_PROFILAGE', False)
+        entete = getattr(settings, 'PERF_ENTETE', 'X-Profilage')
+        self.cle_meta = 'HTTP_' + entete.upper().replace('-', '_')
+
+    def __call__(self, request):
+        if not self.actif(request):
+            return self.get_response(request)
+
+        profil = Profil()
+        debut = time.perf_counter()
+        with ExitStack() as pile:
+            for connexion in connections.all():
+                pile.enter_context(connexion.execute_wrapper(profil))
+            response = self.get_response(request)
+        profil.duree_totale = time.perf_counter() - debut
+
+        response['Server-Timing'] = profil.server_timing()
+        enregistrer(request, profil)
+        return response
+
+    def actif(self, request):
+        if self.toujours:
+            return True
+        if not request.META.get(self.cle_meta):
+            return False
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_superuser
+
+
+# ----------------------------------------------------------------------
+# Agrégation par vue (cache)
+# ----------------------------------------------------------------------
+
+def _cle_vue(vue):
+    return 'perf:vue:' + hashlib.md5(vue.encode()).hexdigest()
+
+
+def enregistrer(request, profil):
+    """Ajoute la mesure aux échantillons de la vue (les PERF_ECHANTILLONS derniers)."""
+    if request.resolver_match is None:
+        return
+    vue = request.resolver_match.view_name or request.resolver_match._func_path
+    retention = getattr(settings, 'PERF_RETENTION_SECONDES', 86400)
+    n_plus_1 = profil.n_plus_1()
+    if n_plus_1:
+        sql, nombre = n_plus_1[0]
+        logger.debug(f"{vue} : {len(n_plus_1)} requête(s) répétée(s), dont {nombre}x {sql[:200]}")
+
+    cle = _cle_vue(vue)
+    donnees = cache.get(cle) or {'vue': vue, 'echantillons': [], 'n_plus_1': {}}
+    donnees['echantillons'].append((
+        round(profil.duree_totale * 1000, 1), profil.requetes, round(profil.duree_sql * 1000, 1), profil.doublons,
+    ))
+    del donnees['echantillons'][:-getattr(settings, 'PERF_ECHANTILLONS', 200)]
+    for sql, nombre in n_plus_1:
+        sql = sql[:500]
+        donnees['n_plus_1'][sql] = max(nombre, donnees['n_plus_1'].get(sql, 0))
+    # Les 5 empreintes les plus répétées
+    donnees['n_plus_1'] = dict(sorted(donnees['n_plus_1'].items(), key=lambda item: -item[1])[:5])
+    cache.set(cle, donnees, retention)
+
+    vues = cache.get(CLE_INDEX) or set()
+    if vue not in vues:
+        vues.add(vue)
+        cache.set(CLE_INDEX, vues, retention)
+
+
+def _centile(valeurs, centile):
+    """Centile par rang (valeur observée), valeurs triées."""
+    return valeurs[max(math.ceil(centile / 100 * len(valeurs)) - 1, 0)]
+
+
+def rapport(tri='p95'):
+    """Une ligne par vue profilée, triée par ``tri`` (p50, p95 ou requetes), décroissant."""
+    vues = cache.get(CLE_INDEX) or set()
+    donnees = cache.get_many([_cle_vue(vue) for vue in vues])
+    lignes = []
+    for entree in donnees.values():
+        echantillons = entree['echantillons']
+        if not echantillons:
+            continue
+        durees = sorted(echantillon[0] for echantillon in echantillons)
+        requetes = [echantillon[1] for echantillon in echantillons]
+        lignes.append({
+            'vue': entree['vue'],
+            'nombre': len(echantillons),
+            'p50': _centile(durees, 50),
+            'p95': _centile(durees, 95),
+            'max': durees[-1],
+            'requetes': round(statistics.mean(requetes), 1),
+            'requetes_max': max(requetes),
+            'sql_ms': round(statistics.mean(echantillon[2] for echantillon in echantillons), 1),
+            'doublons': round(statistics.mean(echantillon[3] for echantillon in echantillons), 1),
+            'n_plus_1': sorted(entree['n_plus_1'].items(), key=lambda item: -item[1]),
+        })
+    cle = {'p50': 'p50', 'requetes': 'requetes'}.get(tri, 'p95')
+    return sorted(lignes, key=lambda ligne: (-ligne[cle], ligne['vue']))
+
+
+def reinitialiser():
+    vues = cache.get(CLE_INDEX) or set()
+    cache.delete_many([_cle_vue(vue) for vue in vues] + [CLE_INDEX])
@@ -0,0 +1,45 @@
+"""
+Rapport de profilage des vues (/internal/perf/)
+===============================================
+
+Classe les vues profilées par ProfilageMiddleware (voir
+transport/perf_middleware.py) : latence p50/p95, nombre de requêtes SQL,
+doublons et requêtes répétées (N+1).
+"""
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.conf import settings
+
+from .decorators import superuser_required
+from .perf_middleware import rapport, reinitialiser
+
+TRIS = {'p95': 'Latence p95', 'p50': 'Latence p50', 'requetes': 'Requêtes SQL'}
+
+
+@superuser_required
+def rapport_perf(request):
+    """
+    Rapport des vues profilées, trié par ?tri=p95 (défaut), p50 ou requetes.
+    ?format=json renvoie les mêmes lignes en JSON ; POST remet les mesures à zéro.
+    """
+    if request.method == 'POST':
+        reinitialiser()
+        messages.success(request, "✅ Mesures de profilage remises à zéro")
+        return redirect('rapport_perf')
+
+    tri = request.GET.get('tri') if request.GET.get('tri') in TRIS else 'p95'
+    lignes = rapport(tri=tri)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'tri': tri, 'vues': lignes})
+
+    return render(request, 'transport/internal/perf.html', {
+        'lignes': lignes,
+        'tri': tri,
+        'tris': TRIS,
+        'profilage_permanent': getattr(settings, 'PERF_PROFILAGE', False),
+        'entete': getattr(settings, 'PERF_ENTETE', 'X-Profilage'),
+        'seuil_n_plus_1': getattr(settings, 'PERF_SEUIL_N_PLUS_1', 5),
+        'title': "Profilage des vues",
+    })
@@ -4,18 +4,14 @@ Vues pour les rapports financiers avancés
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count, Avg, Q
-from django.http import HttpResponse
 from django.utils import timezone
 from datetime import timedelta, datetime
 from transport.models import (
     PaiementMission, Mission, Client, Chauffeur,
-    Cautions, PrestationDeTransports
+    Cautions, PrestationDeTransports, RevenueRollup
 )
 from transport.permissions import role_required
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.chart import BarChart, Reference, PieChart
-from openpyxl.utils import get_column_letter
+from transport.excel_export import ExcelWriter
 
 
 @login_required
@@ -29,30 +25,41 @@ def financial_reports(request):
 
     # Calculer les dates
     now = timezone.now()
+    today = now.date()
     if period == 'all':
         start_date = None
     else:
         days = int(period)
-        start_date = now - timedelta(days=days)
+        start_date = today - timedelta(days=days)
 
-    # Tous les paiements de l'entreprise (validés + en attente)
-    paiements_base = PaiementMission.objects.filter(
-        mission__contrat__entreprise=request.user.entreprise
-    )
+    entreprise = request.user.entreprise
+
+    # Les montants sont lus dans les cumuls pré-calculés (RevenueRollup) :
+    # quelques centaines de lignes au lieu de tous les paiements.
+    # La période est alignée sur des semaines entières (lundi).
+    rollups = RevenueRollup.objects.filter(entreprise=entreprise)
+    semaines = rollups.filter(granularite='semaine')
     if start_date:
-        paiements_base = paiements_base.filter(date_paiement__gte=start_date)
+        semaines = semaines.filter(periode__gte=start_date - timedelta(days=start_date.weekday()))
 
-    paiements_valides = paiements_base.filter(est_valide=True)
-    paiements_attente = paiements_base.filter(est_valide=False)
+    valide = Q(est_valide=True)
+    attente = Q(est_valide=False)
 
     # === STATISTIQUES GLOBALES ===
-    ca_valide   = paiements_valides.aggregate(Sum('montant_total'))['montant_total__sum'] or 0
-    ca_attente  = paiements_attente.aggregate(Sum('montant_total'))['montant_total__sum'] or 0
-    commissions = paiements_valides.aggregate(Sum('commission_transitaire'))['commission_transitaire__sum'] or 0
-    nb_valides  = paiements_valides.count()
-    nb_attente  = paiements_attente.count()
-    nb_total    = paiements_base.count()
-    montant_moyen = paiements_valides.aggregate(Avg('montant_total'))['montant_total__avg'] or 0
+    totaux = semaines.aggregate(
+        ca_valide=Sum('montant_total', filter=valide),
+        ca_attente=Sum('montant_total', filter=attente),
+        commissions=Sum('commission_transitaire', filter=valide),
+        nb_valides=Sum('nombre_paiements', filter=valide),
+        nb_attente=Sum('nombre_paiements', filter=attente),
+    )
+    ca_valide   = totaux['ca_valide'] or 0
+    ca_attente  = totaux['ca_attente'] or 0
+    commissions = totaux['commissions'] or 0
+    nb_valides  = totaux['nb_valides'] or 0
+    nb_attente  = totaux['nb_attente'] or 0
+    nb_total    = nb_valides + nb_attente
+    montant_moyen = (ca_valide / nb_valides) if nb_valides else 0
 
     stats = {
         'total_ca'        : ca_valide + ca_attente,
@@ -67,62 +74,71 @@ def financial_reports(request):
     }
 
     # === CA PAR CLIENT (tous paiements) ===
-    ca_par_client = paiements_base.values(
-        'mission__contrat__client__nom',
-        'mission__contrat__client__type_client'
+    ca_par_client = semaines.values(
+        'client__nom',
+        'client__type_client'
     ).annotate(
         total=Sum('montant_total'),
-        total_valide=Sum('montant_total', filter=Q(est_valide=True)),
-        count=Count('pk_paiement')
+        total_valide=Sum('montant_total', filter=valide),
+        count=Sum('nombre_paiements')
     ).order_by('-total')[:10]
 
     # === CA PAR CHAUFFEUR (tous paiements) ===
-    ca_par_chauffeur = paiements_base.values(
-        'mission__contrat__chauffeur__nom',
-        'mission__contrat__chauffeur__prenom'
+    ca_par_chauffeur = semaines.values(
+        'chauffeur__nom',
+        'chauffeur__prenom'
     ).annotate(
         total=Sum('montant_total'),
-        total_valide=Sum('montant_total', filter=Q(est_valide=True)),
-        count=Count('pk_paiement')
+        total_valide=Sum('montant_total', filter=valide),
+        count=Sum('nombre_paiements')
     ).order_by('-total')[:10]
 
     # === RÉPARTITION PAR MODE DE PAIEMENT ===
+    paiements_base = PaiementMission.objects.filter(entreprise=entreprise)
+    if start_date:
+        paiements_base = paiements_base.filter(date_paiement__gte=start_date)
     mode_paiement = paiements_base.values('mode_paiement').annotate(
         total=Sum('montant_total'),
         count=Count('pk_paiement')
     ).order_by('-total')
 
-    # === ÉVOLUTION MENSUELLE (6 derniers mois, tous paiements) ===
-    monthly_data = []
-    for i in range(5, -1, -1):
-        month_start = now - timedelta(days=30 * i)
-        month_end   = now - timedelta(days=30 * (i - 1)) if i > 0 else now
-
-        month_qs = PaiementMission.objects.filter(
-            mission__contrat__entreprise=request.user.entreprise,
-            date_paiement__gte=month_start,
-            date_paiement__lt=month_end
+    # === ÉVOLUTION MENSUELLE (6 derniers mois calendaires, tous paiements) ===
+    mois_debut = [today.replace(day=1)]
+    for _ in range(5):
+        mois_debut.insert(0, (mois_debut[0] - timedelta(days=1)).replace(day=1))
+    par_mois = {
+        ligne['periode']: ligne
+        for ligne in rollups.filter(
+            granularite='mois', periode__gte=mois_debut[0]
+        ).values('periode').annotate(
+            ca=Sum('montant_total'),
+            ca_valide=Sum('montant_total', filter=valide),
+            count=Sum('nombre_paiements'),
         )
-        ca_m        = month_qs.aggregate(Sum('montant_total'))['montant_total__sum'] or 0
-        ca_valide_m = month_qs.filter(est_valide=True).aggregate(Sum('montant_total'))['montant_total__sum'] or 0
+    }
+    monthly_data = []
+    for month_start in mois_debut:
+        ligne = par_mois.get(month_start, {})
+        ca_m        = ligne.get('ca') or 0
+        ca_valide_m = ligne.get('ca_valide') or 0
         monthly_data.append({
             'label'     : month_start.strftime('%b %Y'),
             'ca'        : ca_m,
             'ca_valide' : ca_valide_m,
             'ca_attente': ca_m - ca_valide_m,
-            'count'     : month_qs.count()
+            'count'     : ligne.get('count') or 0
         })
 
     # === MISSIONS EN ATTENTE DE PAIEMENT ===
     missions_en_attente = Mission.objects.filter(
         statut='terminée',
         paiementmission__isnull=True,
-        contrat__entreprise=request.user.entreprise
+        entreprise=request.user.entreprise
     ).select_related('contrat__client', 'contrat__chauffeur').count()
 
     # === CAUTIONS EN COURS ===
     cautions_en_cours = Cautions.objects.filter(
-        contrat__entreprise=request.user.entreprise,
+        entreprise=request.user.entreprise,
         statut='en_attente'
     ).aggregate(total=Sum('montant'))['total'] or 0
 
@@ -162,113 +178,86 @@ def export_financial_report_excel(request):
     # Filtrer les paiements
     paiements = PaiementMission.objects.filter(
         est_valide=True,
-        mission__contrat__entreprise=request.user.entreprise
-    ).select_related(
-        'mission__contrat__client',
-        'mission__contrat__chauffeur',
-        'mission'
+        entreprise=request.user.entreprise
     )
     if start_date:
         paiements = paiements.filter(date_validation__gte=start_date)
 
-    # Créer le fichier Excel
-    wb = openpyxl.Workbook()
+    writer = ExcelWriter()
 
     # === FEUILLE 1: RÉSUMÉ ===
-    ws_resume = wb.active
-    ws_resume.title = "Résumé"
-
-    # Titre
-    ws_resume['A1'] = "RAPPORT FINANCIER"
-    ws_resume['A1'].font = Font(size=18, bold=True, color="FFFFFF")
-    ws_resume['A1'].fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
-    ws_resume.merge_cells('A1:D1')
-    ws_resume['A1'].alignment = Alignment(horizontal='center', vertical='center')
+    ws_resume = writer.add_sheet("Résumé", widths=[25, 20])
+    ws_resume.merged_cells.add('A1:D1')
     ws_resume.row_dimensions[1].height = 30
 
-    # Période
-    ws_resume['A3'] = "Période:"
-    ws_resume['B3'] = period_label
-    ws_resume['A4'] = "Date de génération:"
-    ws_resume['B4'] = now.strftime('%d/%m/%Y %H:%M')
-
-    # Statistiques
-    ws_resume['A6'] = "STATISTIQUES GLOBALES"
-    ws_resume['A6'].font = Font(size=14, bold=True)
-
-    stats_data = [
-        ['Indicateur', 'Valeur'],
-        ['CA Total', f"{paiements.aggregate(Sum('montant_total'))['montant_total__sum'] or 0:,.0f} FCFA"],
-        ['Commissions', f"{paiements.aggregate(Sum('commission_transitaire'))['commission_transitaire__sum'] or 0:,.0f} FCFA"],
-        ['CA Net', f"{(paiements.aggregate(Sum('montant_total'))['montant_total__sum'] or 0) - (paiements.aggregate(Sum('commission_transitaire'))['commission_transitaire__sum'] or 0):,.0f} FCFA"],
-        ['Nombre de paiements', paiements.count()],
-        ['Montant moyen', f"{paiements.aggregate(Avg('montant_total'))['montant_total__avg'] or 0:,.0f} FCFA"],
-    ]
-
-    for row_idx, row_data in enumerate(stats_data, start=8):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = ws_resume.cell(row=row_idx, column=col_idx, value=value)
-            if row_idx == 8:  # En-tête
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-
-    # Ajuster les largeurs de colonnes
-    ws_resume.column_dimensions['A'].width = 25
-    ws_resume.column_dimensions['B'].width = 20
+    # Statistiques (une seule requête)
+    stats = paiements.aggregate(
+        ca_total=Sum('montant_total'),
+        commissions=Sum('commission_transitaire'),
+        nombre=Count('pk_paiement'),
+        moyenne=Avg('montant_total'),
+    )
+    ca_total = stats['ca_total'] or 0
+    commissions = stats['commissions'] or 0
+
+    writer.write_rows(ws_resume, [
+        [writer.cell(ws_resume, "RAPPORT FINANCIER", 'titre_rapport')],
+        [],
+        ["Période:", period_label],
+        ["Date de génération:", now.strftime('%d/%m/%Y %H:%M')],
+        [],
+        [writer.cell(ws_resume, "STATISTIQUES GLOBALES", 'titre_section')],
+        [],
+        [writer.cell(ws_resume, 'Indicateur', 'entete_gris'), writer.cell(ws_resume, 'Valeur', 'entete_gris')],
+        ['CA Total', f"{ca_total:,.0f} FCFA"],
+        ['Commissions', f"{commissions:,.0f} FCFA"],
+        ['CA Net', f"{ca_total - commissions:,.0f} FCFA"],
+        ['Nombre de paiements', stats['nombre']],
+        ['Montant moyen', f"{stats['moyenne'] or 0:,.0f} FCFA"],
+    ])
 
     # === FEUILLE 2: DÉTAILS DES PAIEMENTS ===
-    ws_paiements = wb.create_sheet("Détails Paiements")
-
-    # En-têtes
     headers = ['Date', 'N° Mission', 'Client', 'Chauffeur', 'Origine', 'Destination', 'Montant Total', 'Commission', 'Net', 'Mode Paiement']
-    for col_idx, header in enumerate(headers, start=1):
-        cell = ws_paiements.cell(row=1, column=col_idx, value=header)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
-        cell.alignment = Alignment(horizontal='center')
-
-    # Données
-    for row_idx, paiement in enumerate(paiements.order_by('-date_validation'), start=2):
-        client_nom = paiement.mission.contrat.client.nom if paiement.mission and paiement.mission.contrat and paiement.mission.contrat.client else "N/A"
-        chauffeur_nom = f"{paiement.mission.contrat.chauffeur.nom} {paiement.mission.contrat.chauffeur.prenom}" if paiement.mission and paiement.mission.contrat and paiement.mission.contrat.chauffeur else "N/A"
-
-        row_data = [
-            paiement.date_validation.strftime('%d/%m/%Y') if paiement.date_validation else 'N/A',
-            str(paiement.mission.pk_mission)[:20] if paiement.mission else 'N/A',
-            client_nom,
-            chauffeur_nom,
-            paiement.mission.origine if paiement.mission else 'N/A',
-            paiement.mission.destination if paiement.mission else 'N/A',
-            float(paiement.montant_total) if paiement.montant_total else 0,
-            float(paiement.commission_transitaire) if paiement.commission_transitaire else 0,
-            float(paiement.montant_total or 0) - float(paiement.commission_transitaire or 0),
-            paiement.mode_paiement.upper() if paiement.mode_paiement else 'N/A',
-        ]
-
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = ws_paiements.cell(row=row_idx, column=col_idx, value=value)
-            # Format nombres
-            if col_idx in [7, 8, 9]:  # Colonnes montants
-                cell.number_format = '#,##0 "FCFA"'
+    ws_paiements = writer.add_sheet(
+        "Détails Paiements", headers=headers, widths=[15] * len(headers), header_style='entete_rapport'
+    )
 
-    # Ajuster largeurs
-    for col in range(1, len(headers) + 1):
-        ws_paiements.column_dimensions[get_column_letter(col)].width = 15
+    details = paiements.order_by('-date_validation').values_list(
+        'date_validation', 'mission__pk_mission', 'mission__contrat__client__nom',
+        'mission__contrat__chauffeur_id', 'mission__contrat__chauffeur__nom',
+        'mission__contrat__chauffeur__prenom', 'mission__origine', 'mission__destination',
+        'montant_total', 'commission_transitaire', 'mode_paiement',
+    ).iterator(chunk_size=2000)
+
+    def lignes_paiements():
+        for (date_validation, mission_id, client_nom, chauffeur_id, chauffeur_nom,
+             chauffeur_prenom, origine, destination, montant, commission, mode) in details:
+            yield [
+                date_validation.strftime('%d/%m/%Y') if date_validation else 'N/A',
+                str(mission_id)[:20] if mission_id else 'N/A',
+                client_nom or "N/A",
+                f"{chauffeur_nom} {chauffeur_prenom}" if chauffeur_id else "N/A",
+                origine if mission_id else 'N/A',
+                destination if mission_id else 'N/A',
+                float(montant) if montant else 0,
+                float(commission) if commission else 0,
+                float(montant or 0) - float(commission or 0),
+                mode.upper() if mode else 'N/A',
+            ]
+
+    # Colonnes montants
+    writer.write_rows(ws_paiements, lignes_paiements(), styles={
+        6: 'montant_fcfa', 7: 'montant_fcfa', 8: 'montant_fcfa',
+    })
 
     # === FEUILLE 3: CA PAR CLIENT ===
-    ws_clients = wb.create_sheet("CA par Client")
-
-    # En-têtes
-    ws_clients['A1'] = "Client"
-    ws_clients['B1'] = "Type"
-    ws_clients['C1'] = "CA Total"
-    ws_clients['D1'] = "Nombre"
-
-    for cell in [ws_clients['A1'], ws_clients['B1'], ws_clients['C1'], ws_clients['D1']]:
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="764BA2", end_color="764BA2", fill_type="solid")
+    ws_clients = writer.add_sheet(
+        "CA par Client",
+        headers=["Client", "Type", "CA Total", "Nombre"],
+        widths=[30, 15, 20, 10],
+        header_style='entete_violet',
+    )
 
-    # Données
     ca_clients = paiements.values(
         'mission__contrat__client__nom',
         'mission__contrat__client__type_client'
@@ -277,27 +266,18 @@ def export_financial_report_excel(request):
         count=Count('pk_paiement')
     ).order_by('-total')
 
-    for row_idx, data in enumerate(ca_clients, start=2):
-        ws_clients.cell(row=row_idx, column=1, value=data['mission__contrat__client__nom'] or 'N/A')
-        ws_clients.cell(row=row_idx, column=2, value=data['mission__contrat__client__type_client'] or 'N/A')
-        cell_total = ws_clients.cell(row=row_idx, column=3, value=float(data['total']) if data['total'] else 0)
-        cell_total.number_format = '#,##0 "FCFA"'
-        ws_clients.cell(row=row_idx, column=4, value=data['count'])
-
-    # Largeurs
-    ws_clients.column_dimensions['A'].width = 30
-    ws_clients.column_dimensions['B'].width = 15
-    ws_clients.column_dimensions['C'].width = 20
-    ws_clients.column_dimensions['D'].width = 10
+    writer.write_rows(ws_clients, (
+        [
+            data['mission__contrat__client__nom'] or 'N/A',
+            data['mission__contrat__client__type_client'] or 'N/A',
+            float(data['total']) if data['total'] else 0,
+            data['count'],
+        ]
+        for data in ca_clients
+    ), styles={2: 'montant_fcfa'})
 
     # === RETOURNER LE FICHIER ===
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename=rapport_financier_{now.strftime("%Y%m%d")}.xlsx'
-
-    wb.save(response)
-    return response
+    return writer.response(f'rapport_financier_{now.strftime("%Y%m%d")}.xlsx')
 
 
 @login_required
@@ -1,8 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
-from django.utils import timezone
 from django.db import transaction
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 import logging
 import threading
 
@@ -12,22 +12,173 @@ import threading
 _workflow_lock = threading.local()
 
 from .models import (
-    ContratTransport, PrestationDeTransports, Cautions, Mission,
-    PaiementMission, Notification, Reparation, Chauffeur
+    ContratTransport, Cautions, Mission,
+    PaiementMission, Notification, Reparation, Chauffeur, Camion, Client,
+    Affectation, PieceReparee, Salaire,
+    RevenueRollup, OutboxEvent, SuppressionSync, AuditLog,
 )
-from .models.choices import STATUT_CAUTION_CHOICES
+from .dashboard_metrics import invalidate_dashboard_cache
+from .context_processors import invalidate_notifications_count, invalidate_missions_en_cours
+from .invoice_generator import invalidate_invoice_cache
+from .contrat_workflow import creer_workflow, propager_modifications
 
-# Import du système de notifications email
-from .email_notifications import (
-    send_mission_terminee_notification,
-    send_paiement_valide_notification,
-    send_caution_debloquee_notification
-)
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+# INVALIDATION DU CACHE DES KPIs DU DASHBOARD
+# ============================================================================
+
+# Chemin d'accès à l'entreprise pour chaque modèle source des KPIs
+_DASHBOARD_ENTREPRISE_PATHS = {
+    ContratTransport: ('entreprise_id',),
+    Mission: ('contrat', 'entreprise_id'),
+    PaiementMission: ('mission', 'contrat', 'entreprise_id'),
+    Cautions: ('contrat', 'entreprise_id'),
+    Reparation: ('camion', 'entreprise_id'),
+    Chauffeur: ('entreprise_id',),
+    Camion: ('entreprise_id',),
+    Client: ('entreprise_id',),
+    Affectation: ('chauffeur', 'entreprise_id'),
+    PieceReparee: ('reparation', 'camion', 'entreprise_id'),
+    Salaire: ('chauffeur', 'entreprise_id'),
+}
+
+
+def _entreprise_id_for(instance):
+    """Retourne l'entreprise de l'instance, ou None si introuvable."""
+    value = instance
+    try:
+        for attr in _DASHBOARD_ENTREPRISE_PATHS[type(instance)]:
+            value = getattr(value, attr)
+            if value is None:
+                return None
+    except ObjectDoesNotExist:
+        return None
+    return value
+
+
+def invalider_cache_dashboard(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Invalide le snapshot des KPIs de l'entreprise concernée.
+
+    L'invalidation est faite immédiatement puis rejouée après le commit :
+    un lecteur concurrent qui aurait recalculé le snapshot avant le commit
+    ne peut pas laisser en cache une valeur périmée.
+    """
+    entreprise_id = _entreprise_id_for(instance)
+    if not entreprise_id:
+        return
+    invalidate_dashboard_cache(entreprise_id)
+    transaction.on_commit(lambda: invalidate_dashboard_cache(entreprise_id))
+
+
+for _model in _DASHBOARD_ENTREPRISE_PATHS:
+    post_save.connect(invalider_cache_dashboard, sender=_model,
+                      dispatch_uid=f'dashboard_cache_save_{_model.__name__}')
+    post_delete.connect(invalider_cache_dashboard, sender=_model,
+                        dispatch_uid=f'dashboard_cache_delete_{_model.__name__}')
+
+
+# ============================================================================
+# INVALIDATION DES COMPTEURS DE LA BARRE DE NAVIGATION
+# ============================================================================
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalider_compteur_notifications(sender, instance, **kwargs):  # noqa: ARG001
+    """Invalide le compteur de notifications non lues du destinataire."""
+    utilisateur_id = instance.utilisateur_id
+    invalidate_notifications_count(utilisateur_id)
+    transaction.on_commit(lambda: invalidate_notifications_count(utilisateur_id))
+
+
+@receiver(post_save, sender=Mission)
+@receiver(post_delete, sender=Mission)
+def invalider_compteur_missions(sender, instance, **kwargs):  # noqa: ARG001
+    """Invalide les compteurs de missions en cours de l'entreprise et du chauffeur."""
+    try:
+        contrat = instance.contrat
+        entreprise_id = contrat.entreprise_id
+        chauffeur_utilisateur_id = contrat.chauffeur.utilisateur_id if contrat.chauffeur_id else None
+    except ObjectDoesNotExist:
+        return
+    invalidate_missions_en_cours(entreprise_id, chauffeur_utilisateur_id)
+    transaction.on_commit(
+        lambda: invalidate_missions_en_cours(entreprise_id, chauffeur_utilisateur_id)
+    )
+
+
+# ============================================================================
+# SYNCHRONISATION INCRÉMENTALE (/api/v1/sync/)
+# ============================================================================
+
+def enregistrer_suppression_sync(sender, instance, **kwargs):  # noqa: ARG001
+    """Trace la suppression pour que les clients synchronisés retirent l'objet."""
+    SuppressionSync.enregistrer(instance)
+
+
+for _model in (ContratTransport, Mission, Cautions, PaiementMission, Notification, Chauffeur, Camion):
+    post_delete.connect(enregistrer_suppression_sync, sender=_model,
+                        dispatch_uid=f'sync_suppression_{_model.__name__}')
+
+
+# ============================================================================
+# COMPTEURS DU JOURNAL D'AUDIT
+# ============================================================================
+
+@receiver(post_save, sender=AuditLog)
+def comptabiliser_audit(sender, instance, created, **kwargs):  # noqa: ARG001
+    """Compte l'entrée (l'écriture groupée compte ses lots elle-même)."""
+    if created:
+        AuditLog.comptabiliser([instance])
+
+
+# ============================================================================
+# MAINTENANCE INCRÉMENTALE DES CUMULS DE REVENUS
+# ============================================================================
+
+@receiver(pre_save, sender=PaiementMission)
+@receiver(pre_delete, sender=PaiementMission)
+def memoriser_etat_paiement(sender, instance, **kwargs):  # noqa: ARG001
+    """Mémorise la contribution actuelle du paiement avant modification."""
+    if instance._state.adding:
+        instance._rollup_avant = None
+    else:
+        instance._rollup_avant = RevenueRollup.etat_paiement(instance.pk)
+
+
+@receiver(post_save, sender=PaiementMission)
+def mettre_a_jour_revenue_rollup(sender, instance, **kwargs):  # noqa: ARG001
+    """Déplace la contribution du paiement vers son (éventuel) nouveau cumul."""
+    avant = getattr(instance, '_rollup_avant', None)
+    apres = RevenueRollup.etat_paiement(instance.pk)
+    if avant == apres:
+        return
+    RevenueRollup.appliquer(avant, signe=-1)
+    RevenueRollup.appliquer(apres, signe=1)
+
+
+@receiver(post_delete, sender=PaiementMission)
+def retirer_revenue_rollup(sender, instance, **kwargs):  # noqa: ARG001
+    """Retire la contribution d'un paiement supprimé."""
+    RevenueRollup.appliquer(getattr(instance, '_rollup_avant', None), signe=-1)
+
+
+# ============================================================================
+# INVALIDATION DU CACHE DES FACTURES PDF
+# ============================================================================
+
+@receiver(post_save, sender=PaiementMission)
+@receiver(post_delete, sender=PaiementMission)
+def invalider_cache_facture(sender, instance, **kwargs):  # noqa: ARG001
+    """Supprime les PDF de facture en cache du paiement modifié."""
+    pk_paiement = instance.pk_paiement
+    transaction.on_commit(lambda: invalidate_invoice_cache(pk_paiement))
+
+
 # ============================================================================
 # SIGNAUX POUR LES NOTIFICATIONS AUTOMATIQUES
 # ============================================================================
@@ -44,168 +195,77 @@ def synchroniser_statut_contrat(sender, instance, created, **kwargs):
 
     contrat = instance.contrat
     if instance.statut == 'terminée' and contrat.statut == 'actif':
-        ContratTransport.objects.filter(pk_contrat=contrat.pk_contrat).update(statut='termine')
+        ContratTransport.objects.filter(pk_contrat=contrat.pk_contrat).update(statut='termine', updated_at=timezone.now())
         logger.info(f"✅ Contrat {contrat.pk_contrat} marqué comme terminé (mission terminée)")
     elif instance.statut == 'annulée' and contrat.statut == 'actif':
-        ContratTransport.objects.filter(pk_contrat=contrat.pk_contrat).update(statut='annule')
+        ContratTransport.objects.filter(pk_contrat=contrat.pk_contrat).update(statut='annule', updated_at=timezone.now())
         logger.info(f"✅ Contrat {contrat.pk_contrat} marqué comme annulé (mission annulée)")
 
 
+# Les notifications et emails sont différés : les signaux écrivent un
+# OutboxEvent dans la transaction en cours, le worker run_outbox_worker les
+# traite par lots après le commit (voir transport/outbox.py).
+
 @receiver(post_save, sender=Mission)
-def notifier_mission_terminee(sender, instance, created, **kwargs):
+def notifier_mission_terminee(sender, instance, created, **kwargs):  # noqa: ARG001
     """
-    Créer une notification quand une mission est terminée
+    Notification et email au chauffeur quand une mission est terminée
     """
     if not created and instance.statut == 'terminée':
-        # Vérifier si une notification n'existe pas déjà
-        from .models import Notification
-        existing = Notification.objects.filter(
-            mission=instance,
-            type_notification='mission_terminee'
-        ).exists()
-
-        if not existing and instance.contrat and instance.contrat.chauffeur:
-            # Créer une notification pour le chauffeur
-            chauffeur = instance.contrat.chauffeur
-            if hasattr(chauffeur, 'utilisateur') and chauffeur.utilisateur:
-                Notification.objects.create(
-                    utilisateur=chauffeur.utilisateur,
-                    type_notification='mission_terminee',
-                    title=f"Mission terminée - {instance.destination}",
-                    message=f"La mission vers {instance.destination} a été marquée comme terminée. Vous pouvez maintenant procéder à la validation du paiement.",
-                    icon='check-circle',
-                    color='success',
-                    mission=instance
-                )
-                logger.info(f"✅ Notification créée pour le chauffeur #{chauffeur.pk_chauffeur}")
-
-            # 📧 NOUVEAU: Envoyer email de notification
-            try:
-                send_mission_terminee_notification(instance)
-                logger.info(f"📧 Email envoyé pour mission terminée: {instance.pk_mission}")
-            except Exception as e:
-                logger.error(f"❌ Erreur envoi email mission terminée: {str(e)}")
+        OutboxEvent.enregistrer('mission_terminee', instance.pk)
 
 
 @receiver(post_save, sender=PaiementMission)
-def notifier_paiement_valide(sender, instance, created, **kwargs):
+def notifier_paiement_valide(sender, instance, created, **kwargs):  # noqa: ARG001
     """
-    Créer une notification quand un paiement est validé
+    Notification et email au chauffeur quand un paiement est validé
     """
-    if instance.est_valide and instance.mission and instance.mission.contrat:
-        # Vérifier si une notification n'existe pas déjà
-        from .models import Notification
-        existing = Notification.objects.filter(
-            paiement=instance,
-            type_notification='paiement_valide'
-        ).exists()
-
-        if not existing:
-            chauffeur = instance.mission.contrat.chauffeur
-            if hasattr(chauffeur, 'utilisateur') and chauffeur.utilisateur:
-                Notification.objects.create(
-                    utilisateur=chauffeur.utilisateur,
-                    type_notification='paiement_valide',
-                    title=f"Paiement validé - {instance.montant_total} FCFA",
-                    message=f"Le paiement de {instance.montant_total} FCFA pour la mission vers {instance.mission.destination} a été validé avec succès.",
-                    icon='check-circle',
-                    color='success',
-                    paiement=instance,
-                    mission=instance.mission
-                )
-                logger.info(f"✅ Notification de paiement créée pour le chauffeur #{chauffeur.pk_chauffeur}")
-
-            # 📧 NOUVEAU: Envoyer email de confirmation paiement
-            try:
-                send_paiement_valide_notification(instance)
-                logger.info(f"📧 Email envoyé pour paiement validé: {instance.pk_paiement}")
-            except Exception as e:
-                logger.error(f"❌ Erreur envoi email paiement validé: {str(e)}")
+    if instance.est_valide:
+        OutboxEvent.enregistrer('paiement_valide', instance.pk)
 
 
 @receiver(post_save, sender=Reparation)
-def notifier_reparation_urgente(sender, instance, created, **kwargs):
+def notifier_reparation_urgente(sender, instance, created, **kwargs):  # noqa: ARG001
     """
-    Créer une notification pour les réparations urgentes ou coûteuses
+    Notifier les admins et managers des réparations urgentes ou coûteuses
     """
     # Seuil pour considérer une réparation comme urgente
     SEUIL_URGENCE = 500000  # 500,000 FCFA
 
     if created and instance.cout and instance.cout >= SEUIL_URGENCE:
-        from .models import Notification, Utilisateur
+        OutboxEvent.enregistrer('reparation_urgente', instance.pk)
 
-        # Notifier les admins et managers de la même entreprise que le camion
-        admins_managers = Utilisateur.objects.filter(
-            role__in=['admin', 'manager'],
-            entreprise=instance.camion.entreprise
-        )
-
-        for user in admins_managers:
-            Notification.objects.create(
-                utilisateur=user,
-                type_notification='reparation_urgente',
-                title=f"Réparation urgente - {instance.camion.immatriculation}",
-                message=f"Une réparation coûteuse ({instance.cout} FCFA) a été enregistrée pour le camion {instance.camion.immatriculation}. Motif: {instance.description or 'Non spécifié'}",
-                icon='exclamation-triangle',
-                color='warning',
-                reparation=instance
-            )
 
-        logger.info(f"⚠️ Notifications de réparation urgente créées pour {admins_managers.count()} utilisateurs")
+@receiver(post_save, sender=Cautions)
+def notifier_caution_bloquee(sender, instance, created, **kwargs):  # noqa: ARG001
+    """
+    Notifier quand une caution est bloquée (non remboursée ou consommée),
+    et envoyer un email quand elle est remboursée
+    """
+    if created:
+        return
+    if instance.statut in ['non_remboursee', 'consommee']:
+        OutboxEvent.enregistrer('caution_bloquee', instance.pk)
+    elif instance.statut == 'remboursee':
+        OutboxEvent.enregistrer('caution_remboursee', instance.pk)
 
 
-@receiver(post_save, sender=Cautions)
-def notifier_caution_bloquee(sender, instance, created, **kwargs):
+@receiver(pre_save, sender=ContratTransport)
+def memoriser_paiements_contrat(sender, instance, **kwargs):  # noqa: ARG001
     """
-    Créer une notification quand une caution est bloquée (statut passe de débloquée à bloquée)
+    Mémorise l'état des paiements et l'entreprise du contrat avant
+    modification : la mise à jour en cascade en a besoin pour déplacer les
+    cumuls de revenus et pour recopier une nouvelle entreprise sur les
+    objets liés.
     """
-    # Vérifier si le statut a changé vers 'non_remboursee' ou 'consommee'
-    if not created and instance.statut in ['non_remboursee', 'consommee']:
-        from .models import Notification, Utilisateur
-
-        # Vérifier qu'une notification n'existe pas déjà
-        existing = Notification.objects.filter(
-            type_notification='caution_bloquee'
-        ).filter(
-            message__contains=f"Caution #{instance.pk_caution[:8]}"
-        ).exists()
-
-        if not existing:
-            # Notifier les admins, managers et le chauffeur concerné
-            users_to_notify = []
-
-            # Admins et managers de la même entreprise que la caution
-            entreprise_caution = instance.contrat.entreprise if instance.contrat else None
-            admins_managers = Utilisateur.objects.filter(
-                role__in=['admin', 'manager'],
-                entreprise=entreprise_caution
-            ) if entreprise_caution else Utilisateur.objects.none()
-            users_to_notify.extend(list(admins_managers))
-
-            # Chauffeur concerné
-            if instance.chauffeur and hasattr(instance.chauffeur, 'utilisateur') and instance.chauffeur.utilisateur:
-                users_to_notify.append(instance.chauffeur.utilisateur)
-
-            for user in users_to_notify:
-                status_label = dict(STATUT_CAUTION_CHOICES).get(instance.statut, instance.statut)
-                Notification.objects.create(
-                    utilisateur=user,
-                    type_notification='caution_bloquee',
-                    title=f"Caution {status_label} - {instance.montant} FCFA",
-                    message=f"La caution #{instance.pk_caution[:8]} d'un montant de {instance.montant} FCFA a été marquée comme '{status_label}'. Camion: {instance.camion.immatriculation if instance.camion else 'N/A'}, Chauffeur: {instance.chauffeur.nom if instance.chauffeur else 'N/A'}",
-                    icon='exclamation-triangle',
-                    color='danger'
-                )
-
-            logger.info(f"⚠️ Notifications de caution bloquée créées pour {len(users_to_notify)} utilisateurs")
-
-    # 📧 NOUVEAU: Envoyer email quand caution est débloquée/remboursée
-    if not created and instance.statut == 'remboursee':
-        try:
-            send_caution_debloquee_notification(instance)
-            logger.info(f"📧 Email envoyé pour caution remboursée: {instance.pk_caution}")
-        except Exception as e:
-            logger.error(f"❌ Erreur envoi email caution remboursée: {str(e)}")
+    if instance._state.adding:
+        instance._rollup_paiements_avant = None
+        instance._entreprise_id_avant = None
+    else:
+        instance._rollup_paiements_avant = RevenueRollup.etats_contrat(instance.pk)
+        instance._entreprise_id_avant = ContratTransport.objects.filter(
+            pk=instance.pk
+        ).values_list('entreprise_id', flat=True).first()
 
 
 @receiver(post_save, sender=ContratTransport)
@@ -220,9 +280,11 @@ def creer_workflow_complet_contrat(sender, instance, created, **kwargs):  # noqa
     Quand un contrat est modifié, mettre à jour automatiquement:
     - PrestationDeTransports liées
     - Cautions liées
-    - Mission liée (date de départ)
+    - Missions en cours liées (dates, destination)
+    - PaiementMission non validés (montant)
 
-    Utilise une transaction atomique pour garantir la cohérence des données.
+    Les écritures sont groupées dans une transaction atomique, voir
+    ``transport.contrat_workflow``.
     """
     # Protection contre la ré-entrance : les .save() internes (prestation, caution,
     # mission, paiement) peuvent déclencher d'autres signaux qui eux-mêmes
@@ -238,210 +300,11 @@ def creer_workflow_complet_contrat(sender, instance, created, **kwargs):  # noqa
 
 def _creer_workflow_complet_contrat_impl(instance, created):
     """Implémentation réelle du workflow (appelée sans risque de ré-entrance)."""
-    if created:  # Lors de la création
-        logger.info(f"🔄 Création automatique du workflow pour le contrat {instance.pk_contrat}")
-
-        # Vérifier que les champs essentiels existent
-        champs_manquants = []
-        if not instance.camion:
-            champs_manquants.append("camion")
-        if not instance.client:
-            champs_manquants.append("client")
-        if not instance.transitaire:
-            champs_manquants.append("transitaire")
-        if not instance.chauffeur:
-            champs_manquants.append("chauffeur")
-
-        if champs_manquants:
-            logger.error(f"❌ Création du workflow impossible: champs manquants - {', '.join(champs_manquants)}")
-            return
-
-        # Vérifier que le camion et le chauffeur ne sont pas déjà affectés à une mission en cours
-        missions_en_cours_camion = Mission.objects.filter(
-            contrat__camion=instance.camion,
-            statut='en cours'
-        ).exclude(contrat=instance)
-
-        missions_en_cours_chauffeur = Mission.objects.filter(
-            contrat__chauffeur=instance.chauffeur,
-            statut='en cours'
-        ).exclude(contrat=instance)
-
-        if missions_en_cours_camion.exists():
-            logger.warning(f"⚠️ Le camion {instance.camion.immatriculation} est déjà affecté à une mission en cours")
-
-        if missions_en_cours_chauffeur.exists():
-            logger.warning(f"⚠️ Le chauffeur #{instance.chauffeur.pk_chauffeur} est déjà affecté à une mission en cours")
-
-        # 🆕 VÉRIFICATION CRITIQUE: Le conteneur doit être disponible
-        if instance.conteneur and not instance.conteneur.est_disponible():
-            mission_en_cours = instance.conteneur.get_mission_en_cours()
-            if mission_en_cours:
-                logger.error(
-                    f"❌ CONTENEUR DÉJÀ EN MISSION! Le conteneur {instance.conteneur.numero_conteneur} "
-                    f"est déjà assigné à la mission #{mission_en_cours.pk_mission[:8]} "
-                    f"(statut: {mission_en_cours.statut}, destination: {mission_en_cours.destination}). "
-                    f"Le conteneur doit d'abord être retourné au port."
-                )
-                raise ValidationError(
-                    f"🚫 Impossible de créer le contrat: le conteneur {instance.conteneur.numero_conteneur} "
-                    f"est déjà en mission vers {mission_en_cours.destination}. "
-                    f"Attendez que la mission se termine et que le conteneur soit retourné au port."
-                )
-            else:
-                logger.error(f"❌ Le conteneur {instance.conteneur.numero_conteneur} n'est pas disponible (statut: {instance.conteneur.get_statut_display()})")
-                raise ValidationError(
-                    f"🚫 Le conteneur {instance.conteneur.numero_conteneur} n'est pas disponible "
-                    f"(statut actuel: {instance.conteneur.get_statut_display()})"
-                )
-
-        # Utiliser une transaction atomique pour garantir la cohérence
-        try:
-            with transaction.atomic():
-                # 1. Créer la PrestationDeTransports
-                prestation = PrestationDeTransports.objects.create(
-                    contrat_transport=instance,
-                    camion=instance.camion,
-                    client=instance.client,
-                    transitaire=instance.transitaire,
-                    prix_transport=instance.montant_total,
-                    avance=instance.avance_transport,
-                    caution=instance.caution,
-                    solde=instance.reliquat_transport,
-                    date=timezone.now()
-                )
-                logger.info(f"✅ Prestation créée: {prestation.pk_presta_transport}")
-
-                # 2. Créer la Caution
-                caution = Cautions.objects.create(
-                    conteneur=instance.conteneur,
-                    contrat=instance,
-                    transitaire=instance.transitaire,
-                    client=instance.client,
-                    chauffeur=instance.chauffeur,
-                    camion=instance.camion,
-                    montant=instance.caution,
-                    statut='en_attente',  # Statut par défaut
-                    montant_rembourser=0
-                )
-                logger.info(f"✅ Caution créée: {caution.pk_caution}")
-
-                # 3. Créer la Mission
-                # Déterminer l'origine depuis le contrat si disponible
-                origine = "À définir"
-                if hasattr(instance, 'lieu_chargement') and instance.lieu_chargement:
-                    origine = instance.lieu_chargement
-                elif instance.client and hasattr(instance.client, 'adresse'):
-                    origine = instance.client.adresse or "À définir"
-
-                # Destination
-                destination = instance.destinataire if instance.destinataire else "À définir"
-
-                # Créer un itinéraire par défaut
-                itineraire = f"Itinéraire : {origine} → {destination}\n"
-                itineraire += f"Camion: {instance.camion.immatriculation}\n"
-                itineraire += f"Chauffeur: {instance.chauffeur.nom} {instance.chauffeur.prenom}\n"
-                itineraire += f"Conteneur: {instance.conteneur.numero_conteneur}\n"
-                itineraire += f"Date de départ prévue: {instance.date_debut}\n"
-                itineraire += f"Date de retour prévue: {instance.date_limite_retour}\n"
-                itineraire += "\n--- Veuillez compléter les détails de l'itinéraire ---"
-
-                mission = Mission.objects.create(
-                    prestation_transport=prestation,
-                    contrat=instance,
-                    date_depart=instance.date_debut,
-                    date_retour=instance.date_limite_retour,  # Date de retour automatique depuis le contrat
-                    origine=origine,
-                    destination=destination,
-                    itineraire=itineraire,
-                    statut='en cours'
-                )
-                logger.info(f"✅ Mission créée: {mission.pk_mission}")
-
-                # 🆕 MARQUER LE CONTENEUR COMME EN MISSION
-                if instance.conteneur:
-                    instance.conteneur.mettre_en_mission()
-                    logger.info(f"🚢 Conteneur {instance.conteneur.numero_conteneur} marqué comme 'en_mission'")
-
-                # 4. Créer le PaiementMission (prérempli mais non validé)
-                # Calculer la commission du transitaire si disponible
-                commission = 0
-                if instance.transitaire and hasattr(instance.transitaire, 'commission_percentage'):
-                    commission = (instance.montant_total * instance.transitaire.commission_percentage) / 100
-
-                paiement = PaiementMission.objects.create(
-                    mission=mission,
-                    caution=caution,
-                    prestation=prestation,
-                    montant_total=instance.montant_total,
-                    commission_transitaire=commission,
-                    caution_est_retiree=False,
-                    mode_paiement='',
-                    observation='Paiement créé automatiquement - En attente de validation après fin de mission',
-                    est_valide=False,
-                    date_validation=None
-                )
-                logger.info(f"✅ Paiement créé: {paiement.pk_paiement} (Commission: {commission})")
-                logger.info(f"🎉 Workflow complet créé avec succès pour le contrat {instance.pk_contrat}")
-
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de la création du workflow pour le contrat {instance.pk_contrat}: {str(e)}")
-            # La transaction sera automatiquement annulée (rollback)
-            raise
-
-    else:  # Lors de la modification
-        logger.info(f"🔄 Mise à jour en cascade pour le contrat {instance.pk_contrat}")
-
-        try:
-            with transaction.atomic():
-                # Mettre à jour les PrestationDeTransports liées
-                prestations = PrestationDeTransports.objects.filter(contrat_transport=instance)
-                for prestation in prestations:
-                    prestation.camion = instance.camion
-                    prestation.client = instance.client
-                    prestation.transitaire = instance.transitaire
-                    prestation.prix_transport = instance.montant_total
-                    prestation.avance = instance.avance_transport
-                    prestation.caution = instance.caution
-                    prestation.solde = instance.reliquat_transport
-                    prestation.save()
-                    logger.info(f"✅ Prestation mise à jour: {prestation.pk_presta_transport}")
-
-                # Mettre à jour les Cautions liées
-                cautions = Cautions.objects.filter(contrat=instance)
-                for caution in cautions:
-                    caution.camion = instance.camion
-                    caution.chauffeur = instance.chauffeur
-                    caution.client = instance.client
-                    caution.transitaire = instance.transitaire
-                    caution.montant = instance.caution
-                    caution.save()
-                    logger.info(f"✅ Caution mise à jour: {caution.pk_caution}")
-
-                # Mettre à jour les Missions liées
-                missions = Mission.objects.filter(contrat=instance)
-                for mission in missions:
-                    # Mettre à jour les dates et destination
-                    # Seulement si la mission n'est pas encore terminée
-                    if mission.statut == 'en cours':
-                        mission.date_depart = instance.date_debut
-                        mission.date_retour = instance.date_limite_retour  # Mise à jour automatique de la date de retour
-                        # Mettre à jour le destinataire si changé
-                        if instance.destinataire:
-                            mission.destination = instance.destinataire
-                        mission.save()
-                        logger.info(f"✅ Mission mise à jour: {mission.pk_mission}")
-
-                # Mettre à jour les PaiementMission liés
-                paiements = PaiementMission.objects.filter(mission__contrat=instance, est_valide=False)
-                for paiement in paiements:
-                    # Mettre à jour le montant total si le paiement n'est pas encore validé
-                    paiement.montant_total = instance.montant_total
-                    paiement.save()
-                    logger.info(f"✅ Paiement mise à jour: {paiement.pk_paiement}")
-
-                logger.info(f"🎉 Mise à jour en cascade terminée pour le contrat {instance.pk_contrat}")
-
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de la mise à jour en cascade pour le contrat {instance.pk_contrat}: {str(e)}")
-            raise
+    if created:
+        creer_workflow(instance)
+    else:
+        propager_modifications(
+            instance,
+            getattr(instance, '_rollup_paiements_avant', None),
+            getattr(instance, '_entreprise_id_avant', None),
+        )
@@ -832,3 +832,2241 @@ class PieceRepareeListViewTest(MaintenanceSetupMixin, TestCase):
         content = self._get_list(self.user_b).content.decode()
         self.assertIn("Filtre B", content)
         self.assertNotIn("Filtre A", content)
+
+
+# ===========================================================================
+# PERFORMANCE : agrégats du dashboard
+# ===========================================================================
+
+class WorkflowSetupMixin:
+    """
+    Mixin commun : crée une entreprise, un utilisateur et les référentiels
+    nécessaires à un contrat. Chaque contrat créé déclenche le workflow
+    (prestation, caution, mission, paiement) via les signaux.
+    """
+
+    def setUp(self):
+        import tempfile
+        from django.core.cache import cache
+        from django.test import override_settings
+        from transport.models import CompagnieConteneur
+
+        cache.clear()
+        # Fichiers produits (exports, factures) dans un répertoire jetable
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.entreprise = Entreprise.objects.create(
+            nom="Entreprise Perf",
+            secteur_activite="Transport",
+            telephone_contact="0000000010",
+        )
+        self.user = Utilisateur.objects.create_user(
+            email="perf@test.com",
+            password="pass",
+            entreprise=self.entreprise,
+        )
+        self.camion = Camion.objects.create(
+            entreprise=self.entreprise,
+            immatriculation="PERF-001",
+            modele="TestModel",
+            capacite_tonnes=Decimal("20"),
+        )
+        self.chauffeur = Chauffeur.objects.create(
+            entreprise=self.entreprise,
+            nom="Perf",
+            prenom="Chauffeur",
+            telephone="0000000011",
+        )
+        self.client_obj = Client.objects.create(
+            nom="Client Perf",
+            type_client="particulier",
+            telephone="0000000012",
+            entreprise=self.entreprise,
+        )
+        self.transitaire = Transitaire.objects.create(
+            nom="Transitaire Perf",
+            telephone="0000000013",
+        )
+        self.compagnie = CompagnieConteneur.objects.create(nom="Compagnie Perf")
+
+    def _create_contrat(self, numero_bl, montant_total=Decimal('1000000'), date_debut=None):
+        """Crée un contrat (et son workflow) sur un conteneur neuf."""
+        date_debut = date_debut or timezone.now().date()
+        conteneur = Conteneur.objects.create(
+            numero_conteneur=f"C-{numero_bl}",
+            type_conteneur="20 pieds",
+            compagnie=self.compagnie,
+            client=self.client_obj,
+            transitaire=self.transitaire,
+        )
+        return ContratTransport.objects.create(
+            numero_bl=numero_bl,
+            client=self.client_obj,
+            transitaire=self.transitaire,
+            conteneur=conteneur,
+            camion=self.camion,
+            chauffeur=self.chauffeur,
+            entreprise=self.entreprise,
+            destinataire="Destinataire Perf",
+            montant_total=montant_total,
+            avance_transport=Decimal('0'),
+            caution=Decimal('50000'),
+            date_debut=date_debut,
+            date_limite_retour=date_debut,
+        )
+
+
+class DashboardMetricsTest(WorkflowSetupMixin, TestCase):
+    """Tests du moteur d'agrégats partagé par les dashboards."""
+
+    def test_metrics_values(self):
+        from transport.dashboard_metrics import compute_dashboard_metrics
+
+        self._create_contrat("BL-PERF-001")
+        contrat = self._create_contrat("BL-PERF-002", montant_total=Decimal('500000'))
+        mission = Mission.objects.get(contrat=contrat)
+        mission.statut = 'terminée'
+        mission.save()
+
+        metrics = compute_dashboard_metrics(self.entreprise)
+        self.assertEqual(metrics.total_missions, 2)
+        self.assertEqual(metrics.missions_en_cours, 1)
+        self.assertEqual(metrics.missions_terminees, 1)
+        self.assertEqual(metrics.total_contrats, 2)
+        self.assertEqual(metrics.chiffre_affaires, Decimal('1500000'))
+        self.assertEqual(metrics.total_chauffeurs, 1)
+        self.assertEqual(metrics.chauffeurs_affectes, 1)
+        self.assertEqual(metrics.chauffeurs_disponibles, 0)
+        self.assertEqual(metrics.total_clients, 1)
+        self.assertEqual(
+            sorted(item['statut'] for item in metrics.missions_par_statut),
+            ['en cours', 'terminée'],
+        )
+
+    def test_query_count_is_constant(self):
+        """REGRESSION TEST : le nombre de requêtes ne dépend pas du volume."""
+        from transport.dashboard_metrics import compute_dashboard_metrics
+
+        self._create_contrat("BL-PERF-010")
+        with self.assertNumQueries(11):
+            compute_dashboard_metrics(self.entreprise)
+
+        for i in range(3):
+            self._create_contrat(f"BL-PERF-02{i}")
+        with self.assertNumQueries(11):
+            compute_dashboard_metrics(self.entreprise)
+
+    def test_dashboard_api_uses_metrics(self):
+        from transport.api.views import DashboardAPIView
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        self._create_contrat("BL-PERF-030")
+        request = APIRequestFactory().get('/api/v1/dashboard/')
+        force_authenticate(request, user=self.user)
+        response = DashboardAPIView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_missions'], 1)
+        self.assertEqual(response.data['camions_disponibles'], 0)
+
+    def test_dashboard_pages_render(self):
+        self._create_contrat("BL-PERF-040")
+        self.client.login(email="perf@test.com", password="pass")
+        for url in ('/dashboard/', '/statistiques/', '/dashboard/ajax/filter/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_snapshot_cached_and_invalidated_by_signals(self):
+        from transport.dashboard_metrics import get_dashboard_metrics
+
+        contrat = self._create_contrat("BL-PERF-050")
+        self.assertEqual(get_dashboard_metrics(self.entreprise).missions_en_cours, 1)
+        with self.assertNumQueries(0):
+            get_dashboard_metrics(self.entreprise)
+
+        mission = Mission.objects.get(contrat=contrat)
+        mission.statut = 'terminée'
+        mission.save()
+        metrics = get_dashboard_metrics(self.entreprise)
+        self.assertEqual(metrics.missions_en_cours, 0)
+        self.assertEqual(metrics.missions_terminees, 1)
+
+    def test_snapshot_invalide_par_affectation_piece_et_salaire(self):
+        from transport.dashboard_metrics import get_dashboard_metrics
+        from transport.models import Affectation, Salaire
+
+        self.assertEqual(get_dashboard_metrics(self.entreprise).affectations, 0)
+        affectation = Affectation.objects.create(chauffeur=self.chauffeur, camion=self.camion)
+        self.assertEqual(get_dashboard_metrics(self.entreprise).affectations, 1)
+        affectation.delete()
+        self.assertEqual(get_dashboard_metrics(self.entreprise).affectations, 0)
+
+        reparation = Reparation.objects.create(
+            camion=self.camion, date_reparation=timezone.now().date(), cout=Decimal('1000'),
+        )
+        self.assertEqual(get_dashboard_metrics(self.entreprise).total_pieces, 0)
+        PieceReparee.objects.create(
+            reparation=reparation, nom_piece="Filtre", categorie='moteur', cout_unitaire=Decimal('500'),
+        )
+        self.assertEqual(get_dashboard_metrics(self.entreprise).total_pieces, 1)
+
+        Salaire.objects.create(pk_salaire='sal-dash', chauffeur=self.chauffeur, mois=1, annee=2026)
+        self.assertEqual(get_dashboard_metrics(self.entreprise).salaires_en_attente, 1)
+
+
+    def test_version_jamais_reutilisee_apres_eviction(self):
+        from django.core.cache import cache
+        from transport.dashboard_metrics import _get_version, _version_key, invalidate_dashboard_cache
+
+        versions = {_get_version(self.entreprise.pk)}
+        for _ in range(3):
+            invalidate_dashboard_cache(self.entreprise.pk)
+            versions.add(_get_version(self.entreprise.pk))
+            # Jeton évincé : un compteur serait reparti de 1
+            cache.delete(_version_key(self.entreprise.pk))
+            versions.add(_get_version(self.entreprise.pk))
+        self.assertEqual(len(versions), 7)
+
+class RevenueRollupTest(WorkflowSetupMixin, TestCase):
+    """Tests de la table de cumuls de revenus."""
+
+    def _cumuls(self):
+        from transport.models import RevenueRollup
+        return sorted(
+            RevenueRollup.objects.values_list(
+                'granularite', 'periode', 'est_valide', 'montant_total', 'nombre_paiements'
+            )
+        )
+
+    def test_cumul_maintenu_a_la_creation_et_validation(self):
+        from transport.models import RevenueRollup
+
+        contrat = self._create_contrat("BL-ROLL-001", montant_total=Decimal('800000'))
+        mois = RevenueRollup.objects.get(granularite='mois', est_valide=False)
+        self.assertEqual(mois.montant_total, Decimal('800000'))
+        self.assertEqual(mois.nombre_paiements, 1)
+        self.assertEqual(mois.client, self.client_obj)
+
+        # Validation : la contribution passe de "en attente" à "validé"
+        mission = Mission.objects.get(contrat=contrat)
+        mission.statut = 'terminée'
+        mission.save()
+        caution = Cautions.objects.get(contrat=contrat)
+        caution.statut = 'remboursee'
+        caution.montant_rembourser = caution.montant
+        caution.save()
+        PaiementMission.objects.get(mission=mission).valider_paiement()
+
+        self.assertFalse(RevenueRollup.objects.filter(est_valide=False).exists())
+        self.assertEqual(
+            RevenueRollup.objects.get(granularite='semaine', est_valide=True).montant_total,
+            Decimal('800000'),
+        )
+
+    def test_premiere_ecriture_concurrente_sans_client(self):
+        """Deux premières écritures d'une clé à client NULL : une seule ligne."""
+        from datetime import date
+        from unittest import mock
+        from django.db.models import QuerySet
+        from transport.models import RevenueRollup
+
+        etat = {
+            'entreprise_id': self.entreprise.pk, 'client_id': None, 'chauffeur_id': None,
+            'date_paiement': date(2026, 3, 10), 'est_valide': False,
+            'montant_total': Decimal('1000'), 'commission_transitaire': Decimal('0'),
+        }
+        RevenueRollup.appliquer(etat)
+
+        # L'écriture concurrente ne voit pas encore les lignes : sa mise à
+        # jour ne touche rien, la création bute sur la contrainte
+        update = QuerySet.update
+        vues = set()
+
+        def update_avant_commit(queryset, **kwargs):
+            if queryset.model is RevenueRollup and str(queryset.query) not in vues:
+                vues.add(str(queryset.query))
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_avant_commit):
+            RevenueRollup.appliquer(etat)
+
+        self.assertEqual(
+            self._cumuls(),
+            [
+                ('mois', date(2026, 3, 1), False, Decimal('2000'), 2),
+                ('semaine', date(2026, 3, 9), False, Decimal('2000'), 2),
+            ],
+        )
+
+    def test_reconstruction_identique_au_maintien_incremental(self):
+        from transport.models import RevenueRollup
+
+        self._create_contrat("BL-ROLL-010", montant_total=Decimal('100000'))
+        self._create_contrat("BL-ROLL-011", montant_total=Decimal('250000'))
+        incremental = self._cumuls()
+        RevenueRollup.reconstruire()
+        self.assertEqual(self._cumuls(), incremental)
+
+    def test_suppression_retire_le_cumul(self):
+        from transport.models import RevenueRollup
+
+        contrat = self._create_contrat("BL-ROLL-020")
+        PaiementMission.objects.filter(mission__contrat=contrat).delete()
+        self.assertFalse(RevenueRollup.objects.exists())
+
+    def test_pages_financieres(self):
+        self._create_contrat("BL-ROLL-030")
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.login(email="perf@test.com", password="pass")
+        for url in ('/reports/financial/', '/reports/financial/?period=all', '/dashboard/financier/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(
+            self.client.get('/reports/financial/').context['stats']['nombre_paiements'], 1
+        )
+
+
+class NotificationsProcessorTest(WorkflowSetupMixin, TestCase):
+    """Tests du context processor de la barre de navigation."""
+
+    def _contexte(self):
+        from transport.context_processors import notifications_processor
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return notifications_processor(request)
+
+    def _notifier(self, titre):
+        from transport.models import Notification
+        return Notification.objects.create(utilisateur=self.user, title=titre, message=titre)
+
+    def test_aucune_requete_si_non_utilise(self):
+        with self.assertNumQueries(0):
+            self._contexte()
+
+    def test_liste_et_compteur_en_une_requete(self):
+        for i in range(7):
+            self._notifier(f"Notif {i}")
+        from django.core.cache import cache
+        cache.clear()
+
+        contexte = self._contexte()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(contexte['notifications']), 5)
+            self.assertEqual(contexte['notifications_count'], 7)
+        # Compteur servi par le cache à la requête suivante
+        with self.assertNumQueries(0):
+            self.assertTrue(self._contexte()['notifications_count'] > 0)
+
+    def test_compteurs_invalides(self):
+        self._create_contrat("BL-NAV-001")
+        contexte = self._contexte()
+        self.assertEqual(contexte['notifications_count'], 0)
+        self.assertEqual(contexte['missions_en_cours_count'], 1)
+
+        notification = self._notifier("Nouvelle")
+        self._create_contrat("BL-NAV-002")
+        contexte = self._contexte()
+        self.assertEqual(contexte['notifications_count'], 1)
+        self.assertEqual(contexte['missions_en_cours_count'], 2)
+
+        # Le marquage en masse passe par update() : invalidation explicite
+        self.client.login(email="perf@test.com", password="pass")
+        self.client.post('/notifications/mark-all-read/')
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+        self.assertEqual(self._contexte()['notifications_count'], 0)
+
+
+class StreamingCsvExportTest(WorkflowSetupMixin, TestCase):
+    """Tests des exports CSV streamés."""
+
+    def _lire(self, url):
+        self.client.login(email="perf@test.com", password="pass")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenu = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(contenu.startswith('﻿'))
+        return [ligne.split(';') for ligne in contenu[1:].splitlines()]
+
+    def test_export_missions_csv(self):
+        self._create_contrat("BL-CSV-001")
+        lignes = self._lire('/missions/export/csv/')
+        self.assertEqual(lignes[0][0], 'ID Mission')
+        self.assertEqual(len(lignes), 2)
+        self.assertEqual(lignes[1][1], 'en cours')
+        self.assertEqual(lignes[1][6], 'Perf Chauffeur')
+        self.assertEqual(lignes[1][9], 'C-BL-CSV-001')
+
+        # Les filtres de la liste restent appliqués
+        self.assertEqual(len(self._lire('/missions/export/csv/?statut=terminée')), 1)
+
+    def test_export_paiements_csv(self):
+        self._create_contrat("BL-CSV-010", montant_total=Decimal('500000'))
+        lignes = self._lire('/paiements/export/csv/')
+        self.assertEqual(lignes[0][2], 'Montant Total')
+        self.assertEqual(len(lignes), 2)
+        self.assertEqual(lignes[1][2], '500000.0')
+        self.assertEqual(lignes[1][5], 'En attente')
+        self.assertEqual(len(self._lire('/paiements/export/csv/?est_valide=oui')), 1)
+
+
+class ExcelExportTest(WorkflowSetupMixin, TestCase):
+    """Tests des exports Excel en mode write_only."""
+
+    def _classeur(self, url):
+        import io
+        import openpyxl
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return openpyxl.load_workbook(io.BytesIO(response.content))
+
+    def setUp(self):
+        super().setUp()
+        self._create_contrat("BL-XLS-001", montant_total=Decimal('750000'))
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.login(email="perf@test.com", password="pass")
+
+    def test_exports_listes(self):
+        ws = self._classeur('/missions/export/excel/')['Missions']
+        self.assertEqual(ws['A1'].value, 'ID Mission')
+        self.assertTrue(ws['A1'].font.bold)
+        self.assertEqual(ws['G2'].value, 'Perf Chauffeur')
+        self.assertEqual(ws.column_dimensions['C'].width, 25)
+
+        ws = self._classeur('/paiements/export/excel/')['Paiements']
+        self.assertEqual(ws['C2'].value, 750000)
+        self.assertEqual(ws['F2'].value, 'En attente')
+
+        ws = self._classeur('/utilisateurs/export/excel/')['Utilisateurs']
+        self.assertEqual(ws['B2'].value, 'perf@test.com')
+
+        self._classeur('/audit/export/excel/')
+
+    def test_export_rapport_financier(self):
+        PaiementMission.objects.update(est_valide=True, date_validation=timezone.now())
+        wb = self._classeur('/reports/financial/export/')
+        self.assertEqual(wb['Résumé']['A1'].value, 'RAPPORT FINANCIER')
+        self.assertEqual(wb['Résumé']['B12'].value, 1)
+        details = wb['Détails Paiements']
+        self.assertEqual(details['G2'].value, 750000)
+        self.assertEqual(details['G2'].number_format, '#,##0 "FCFA"')
+        self.assertEqual(wb['CA par Client']['A2'].value, 'Client Perf')
+
+
+class ExportJobTest(WorkflowSetupMixin, TestCase):
+    """Tests de la file d'exports en arrière-plan."""
+
+    def setUp(self):
+        super().setUp()
+        self._create_contrat("BL-JOB-001")
+        self.client.login(email="perf@test.com", password="pass")
+
+    def test_demande_execution_et_telechargement(self):
+        from transport.export_jobs import executer_job_par_pk
+        from transport.models import ExportJob
+
+        response = self.client.post('/exports/missions_csv/?statut=en cours')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(self.client.get(f'/exports/job/{job_id}/').json()['statut'], 'en_attente')
+
+        job = ExportJob.reclamer('test-worker')
+        self.assertEqual(job.pk_job, job_id)
+        self.assertIsNone(ExportJob.reclamer('autre-worker'))
+        self.assertEqual(executer_job_par_pk(job_id), 'termine')
+
+        statut = self.client.get(f'/exports/job/{job_id}/').json()
+        self.assertEqual(statut['progression'], 100)
+        self.assertTrue(statut['nom_fichier'].endswith('.csv'))
+
+        response = self.client.get(statut['telechargement_url'])
+        self.assertEqual(response.status_code, 200)
+        contenu = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('C-BL-JOB-001', contenu)
+
+        # Expiration : le fichier est supprimé et le téléchargement refusé
+        from datetime import timedelta
+        nb = ExportJob.purger_expires(maintenant=timezone.now() + timedelta(days=2))
+        self.assertEqual(nb, 1)
+        self.assertEqual(self.client.get(statut['telechargement_url']).status_code, 410)
+
+    def test_refus_et_echec(self):
+        from transport.export_jobs import executer_job_par_pk
+        from transport.models import ExportJob
+
+        # Le rapport financier exige le rôle ADMIN ou COMPTABLE
+        self.assertEqual(self.client.post('/exports/rapport_financier_excel/').status_code, 403)
+        self.assertEqual(self.client.post('/exports/inconnu/').status_code, 404)
+
+        job = ExportJob.objects.create(
+            utilisateur=self.user, type_export='rapport_financier_excel', statut='en_cours'
+        )
+        self.assertEqual(executer_job_par_pk(job.pk_job), 'echoue')
+        job.refresh_from_db()
+        self.assertIn('Accès refusé', job.erreur)
+        self.assertEqual(self.client.get(f'/exports/job/{job.pk_job}/telecharger/').status_code, 404)
+
+
+class BulkInvoiceTest(WorkflowSetupMixin, TestCase):
+    """Tests de l'envoi de factures en lot."""
+
+    def setUp(self):
+        super().setUp()
+        self.client_obj.email = "client@perf.com"
+        self.client_obj.save()
+        self.user.is_superuser = True
+        self.user.save()
+
+    def _paiements(self, nombre, prefixe):
+        for i in range(nombre):
+            self._create_contrat(f"BL-{prefixe}-{i:03d}")
+        return PaiementMission.objects.select_related(
+            'mission__contrat__client', 'mission__contrat__chauffeur'
+        ).order_by('pk_paiement')
+
+    def test_envoi_par_connexion_unique_avec_resultat_par_paiement(self):
+        from django.core import mail
+        from django.core.mail.backends.locmem import EmailBackend
+        from transport.invoice_views import send_invoices_batch
+
+        class CountingBackend(EmailBackend):
+            ouvertures = 0
+
+            def open(self):
+                CountingBackend.ouvertures += 1
+                return super().open()
+
+        paiements = list(self._paiements(3, "INV"))
+        # Un contrat dont le client n'a pas d'email
+        sans_email = Client.objects.create(
+            nom="Sans Email", type_client="particulier", telephone="0000000099", entreprise=self.entreprise
+        )
+        ContratTransport.objects.filter(pk=paiements[0].mission.contrat_id).update(client=sans_email)
+        paiements = PaiementMission.objects.select_related(
+            'mission__contrat__client', 'mission__contrat__chauffeur'
+        ).order_by('pk_paiement')
+
+        with self.assertNumQueries(1):
+            resultats = send_invoices_batch(paiements, connection=CountingBackend())
+
+        statuts = {r['paiement_id']: r['statut'] for r in resultats}
+        self.assertEqual(sorted(statuts.values()), ['envoyee', 'envoyee', 'sans_destinataire'])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(CountingBackend.ouvertures, 1)
+        self.assertEqual(mail.outbox[0].attachments[0][2], 'application/pdf')
+
+    def test_connexion_smtp_impossible_marque_chaque_facture_en_erreur(self):
+        from django.core.mail.backends.locmem import EmailBackend
+        from transport.invoice_views import send_invoices_batch
+
+        class BrokenBackend(EmailBackend):
+            def open(self):
+                raise ConnectionRefusedError("serveur injoignable")
+
+        paiements = self._paiements(2, "SMTP")
+        resultats = send_invoices_batch(paiements, connection=BrokenBackend())
+
+        self.assertEqual([r['statut'] for r in resultats], ['erreur', 'erreur'])
+        for resultat in resultats:
+            self.assertIn("serveur injoignable", resultat['detail'])
+
+    def test_vue_bulk_send_invoices(self):
+        paiements = list(self._paiements(2, "INVV"))
+        self.client.login(email="perf@test.com", password="pass")
+        response = self.client.post(
+            '/invoices/bulk-send/',
+            {'paiement_ids': [p.pk_paiement for p in paiements] + ['inconnu']},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        data = response.json()
+        self.assertEqual(data['success_count'], 2)
+        self.assertEqual(data['results'][-1], {
+            'paiement_id': 'inconnu', 'statut': 'introuvable', 'detail': "Paiement introuvable"
+        })
+
+    def test_rendu_parallele(self):
+        from transport.invoice_generator import BATCH_PARALLEL_THRESHOLD, render_invoices
+
+        paiements = list(self._paiements(BATCH_PARALLEL_THRESHOLD, "INVP"))
+        resultats = list(render_invoices(paiements, max_workers=2))
+        self.assertEqual([r[0][0] for r in resultats], [p.pk_paiement for p in paiements])
+        for (pk, numero, nom_fichier, pdf), erreur in resultats:
+            self.assertIsNone(erreur)
+            self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+class InvoiceCacheTest(WorkflowSetupMixin, TestCase):
+    """Tests du cache des factures PDF."""
+
+    def setUp(self):
+        super().setUp()
+        contrat = self._create_contrat("BL-FAC-001")
+        self.paiement = PaiementMission.objects.get(mission__contrat=contrat)
+        PaiementMission.objects.filter(pk=self.paiement.pk).update(est_valide=True)
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.login(email="perf@test.com", password="pass")
+        self.url = f'/invoices/preview/{self.paiement.pk_paiement}/'
+
+    def test_rendu_unique_et_revalidation(self):
+        from unittest import mock
+        from transport.invoice_generator import InvoiceGenerator
+
+        with mock.patch.object(InvoiceGenerator, 'generate', wraps=None, autospec=True,
+                               side_effect=InvoiceGenerator.generate) as generate:
+            premiere = self.client.get(self.url)
+            self.assertEqual(premiere.status_code, 200)
+            self.assertTrue(b''.join(premiere.streaming_content).startswith(b'%PDF'))
+            etag = premiere['ETag']
+
+            # Téléchargement : même fichier, aucun nouveau rendu
+            telechargement = self.client.get(f'/invoices/generate/{self.paiement.pk_paiement}/')
+            self.assertEqual(telechargement['ETag'], etag)
+            self.assertIn('attachment', telechargement['Content-Disposition'])
+
+            revalidation = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(revalidation.status_code, 304)
+            self.assertEqual(generate.call_count, 1)
+
+    def test_invalidation_par_modification_du_paiement(self):
+        from django.core.files.storage import default_storage
+        from transport.invoice_generator import invoice_cache_dir
+
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            paiement = PaiementMission.objects.get(pk=self.paiement.pk)
+            paiement.est_valide = False
+            paiement.mode_paiement = 'virement'
+            paiement.save()
+        self.assertEqual(default_storage.listdir(invoice_cache_dir(self.paiement.pk_paiement))[1], [])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_date_de_facture_stable(self):
+        from datetime import datetime, timedelta
+        from transport.invoice_generator import InvoiceGenerator
+
+        validation = timezone.make_aware(datetime(2026, 3, 14, 10, 30))
+        PaiementMission.objects.filter(pk=self.paiement.pk).update(date_validation=validation)
+        paiement = PaiementMission.objects.get(pk=self.paiement.pk)
+        generateur = InvoiceGenerator(paiement)
+        self.assertEqual(generateur.invoice_date(), validation.date())
+        cle = generateur.cache_key()
+
+        # La date fait partie de la clé : une nouvelle validation change le PDF
+        paiement.date_validation = validation + timedelta(days=1)
+        self.assertNotEqual(InvoiceGenerator(paiement).cache_key(), cle)
+
+        paiement.date_validation = None
+        self.assertEqual(InvoiceGenerator(paiement).invoice_date(), paiement.date_paiement)
+
+
+
+class ContratWorkflowTest(WorkflowSetupMixin, TestCase):
+    """Tests du workflow groupé des contrats (transport.contrat_workflow)."""
+
+    def _cumuls(self):
+        from transport.models import RevenueRollup
+        return sorted(
+            RevenueRollup.objects.values_list(
+                'client_id', 'granularite', 'periode', 'est_valide',
+                'montant_total', 'commission_transitaire', 'nombre_paiements'
+            )
+        )
+
+    def _assert_cumuls_coherents(self):
+        from transport.models import RevenueRollup
+
+        incremental = self._cumuls()
+        RevenueRollup.reconstruire()
+        self.assertEqual(self._cumuls(), incremental)
+
+    def test_creation_groupee(self):
+        """REGRESSION TEST : une écriture par table, quelle que soit la cascade."""
+        self.transitaire.commission_percentage = Decimal('10')
+        self.transitaire.save()
+        # Conteneur + contrat + 4 bulk_create + conteneur en mission + cumuls
+        # (nouvelle ligne : mise à jour vide, insertion, incrément par période)
+        with self.assertNumQueries(17):
+            contrat = self._create_contrat("BL-WF-001")
+
+        prestation = PrestationDeTransports.objects.get(contrat_transport=contrat)
+        caution = Cautions.objects.get(contrat=contrat)
+        mission = Mission.objects.get(contrat=contrat)
+        paiement = PaiementMission.objects.get(mission=mission)
+        self.assertEqual(prestation.prix_transport, Decimal('1000000'))
+        self.assertEqual((caution.montant, caution.statut), (Decimal('50000'), 'en_attente'))
+        self.assertEqual((mission.statut, mission.destination), ('en cours', "Destinataire Perf"))
+        self.assertEqual((paiement.caution, paiement.prestation), (caution, prestation))
+        self.assertEqual(paiement.commission_transitaire, Decimal('100000'))
+        self.assertFalse(paiement.est_valide)
+        self.assertEqual(Conteneur.objects.get(pk=contrat.conteneur_id).statut, 'en_mission')
+        self._assert_cumuls_coherents()
+
+    def test_mise_a_jour_en_cascade(self):
+        contrat = self._create_contrat("BL-WF-010")
+        autre_client = Client.objects.create(
+            nom="Autre Client", type_client="particulier",
+            telephone="0000000014", entreprise=self.entreprise,
+        )
+        contrat.client = autre_client
+        contrat.montant_total = Decimal('1200000')
+        contrat.destinataire = "Nouveau destinataire"
+        with self.assertNumQueries(22):
+            contrat.save()
+
+        self.assertEqual(
+            PrestationDeTransports.objects.get(contrat_transport=contrat).client, autre_client
+        )
+        self.assertEqual(Cautions.objects.get(contrat=contrat).client, autre_client)
+        self.assertEqual(Mission.objects.get(contrat=contrat).destination, "Nouveau destinataire")
+        self.assertEqual(
+            PaiementMission.objects.get(mission__contrat=contrat).montant_total, Decimal('1200000')
+        )
+        # Les cumuls suivent le nouveau client et le nouveau montant
+        self.assertEqual(
+            {ligne[0] for ligne in self._cumuls()}, {autre_client.pk_client}
+        )
+        self._assert_cumuls_coherents()
+
+    def test_validation_avant_ecriture(self):
+        from django.core.exceptions import ValidationError
+        from django.db import transaction
+
+        self.transitaire.commission_percentage = Decimal('20')
+        self.transitaire.save()
+        contrat = self._create_contrat("BL-WF-020")
+
+        # Commission de 200 000 > 30% de 500 000 : rien n'est écrit
+        contrat.montant_total = Decimal('500000')
+        contrat.destinataire = "Refusé"
+        with self.assertRaises(ValidationError), transaction.atomic():
+            contrat.save()
+        self.assertEqual(Mission.objects.get(contrat=contrat).destination, "Destinataire Perf")
+        self.assertEqual(
+            PaiementMission.objects.get(mission__contrat=contrat).montant_total, Decimal('1000000')
+        )
+
+
+class OutboxTest(WorkflowSetupMixin, TestCase):
+    """Tests de la file d'effets de bord différés (transport.outbox)."""
+
+    def setUp(self):
+        super().setUp()
+        self.user.role = 'admin'
+        self.user.save()
+        self.chauffeur.utilisateur = Utilisateur.objects.create_user(
+            email="chauffeur@test.com", password="pass", entreprise=self.entreprise,
+        )
+        self.chauffeur.save()
+
+    def _terminer(self, numero_bl):
+        mission = Mission.objects.get(contrat=self._create_contrat(numero_bl))
+        mission.statut = 'terminée'
+        mission.save()
+        return mission
+
+    def test_aucun_effet_pendant_la_transaction(self):
+        from django.core import mail
+        from transport.models import Notification, OutboxEvent
+        from transport.outbox import drainer
+
+        mission = self._terminer("BL-OUT-001")
+        self.assertFalse(Notification.objects.filter(mission=mission).exists())
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('type_evenement', 'objet_pk')),
+            [('mission_terminee', str(mission.pk))],
+        )
+
+        self.assertEqual(drainer('test'), (1, 0))
+        notification = Notification.objects.get(mission=mission)
+        self.assertEqual(notification.utilisateur, self.chauffeur.utilisateur)
+        self.assertEqual(mail.outbox[0].to, ["perf@test.com"])
+        self.assertEqual(OutboxEvent.objects.get().statut, 'traite')
+
+        # Nouvelle sauvegarde : l'événement est traité sans doublon
+        mission.save()
+        self.assertEqual(drainer('test'), (1, 0))
+        self.assertEqual(Notification.objects.filter(mission=mission).count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_lot_groupe(self):
+        """REGRESSION TEST : le coût d'un lot ne dépend pas de sa taille."""
+        from django.core import mail
+        from transport.models import Notification
+        from transport.outbox import drainer
+
+        for i in range(3):
+            self._terminer(f"BL-OUT-01{i}")
+        # Réservation (3), doublons, missions, notifications (3 + savepoint),
+        # emails des admins (1) et clôture du lot (1)
+        with self.assertNumQueries(10):
+            self.assertEqual(drainer('test'), (3, 0))
+        self.assertEqual(Notification.objects.filter(type_notification='mission_terminee').count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_evenement_annule_avec_la_transaction(self):
+        from django.db import transaction
+        from transport.models import OutboxEvent
+
+        mission = Mission.objects.get(contrat=self._create_contrat("BL-OUT-020"))
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            mission.statut = 'terminée'
+            mission.save()
+            raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_echec_smtp_reporte(self):
+        from unittest import mock
+        from django.core import mail
+        from transport.models import Notification, OutboxEvent
+        from transport.outbox import drainer
+
+        mission = self._terminer("BL-OUT-030")
+        connexion = mock.Mock()
+        connexion.open.side_effect = OSError("SMTP indisponible")
+        self.assertEqual(drainer('test', connection=connexion), (0, 1))
+
+        # La notification ne dépend pas du serveur SMTP
+        self.assertEqual(Notification.objects.filter(mission=mission).count(), 1)
+        evenement = OutboxEvent.objects.get()
+        self.assertEqual((evenement.statut, evenement.tentatives), ('en_attente', 1))
+        self.assertIn("SMTP indisponible", evenement.erreur)
+        self.assertGreater(evenement.disponible_le, timezone.now())
+        # Pas de nouvel essai avant le délai
+        self.assertEqual(drainer('test'), (0, 0))
+
+        # Nouvel essai : l'email part, la notification n'est pas dupliquée
+        OutboxEvent.objects.update(disponible_le=timezone.now())
+        self.assertEqual(drainer('test'), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Notification.objects.filter(mission=mission).count(), 1)
+        self.assertEqual(OutboxEvent.objects.get().statut, 'traite')
+
+    def test_echec_envoi_retente_seulement_l_evenement_concerne(self):
+        from unittest import mock
+        from django.core import mail
+        from transport.email_notifications import EmailNotifier
+        from transport.models import Notification, OutboxEvent, Reparation
+        from transport.outbox import drainer
+
+        echec = self._terminer("BL-OUT-040")
+        succes = self._terminer("BL-OUT-041")
+        reparation = Reparation.objects.create(
+            camion=self.camion, date_reparation=timezone.now().date(),
+            cout=Decimal('600000'), description="Moteur",
+        )
+        envoyer = EmailNotifier.send_mission_terminee
+
+        def envoyer_sauf_echec(notifier, mission):
+            if mission.pk == echec.pk:
+                raise OSError("Destinataire refusé")
+            return envoyer(notifier, mission)
+
+        with mock.patch.object(EmailNotifier, 'send_mission_terminee', envoyer_sauf_echec):
+            self.assertEqual(drainer('test'), (2, 1))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(Notification.objects.filter(reparation=reparation).exists())
+        self.assertEqual(Notification.objects.filter(mission__in=[echec, succes]).count(), 2)
+        statuts = dict(OutboxEvent.objects.values_list('objet_pk', 'statut'))
+        self.assertEqual(statuts[str(echec.pk)], 'en_attente')
+        self.assertEqual(statuts[str(succes.pk)], 'traite')
+        self.assertEqual(statuts[reparation.pk], 'traite')
+
+
+class DemurrageTest(WorkflowSetupMixin, TestCase):
+    """Tests du calendrier ouvré et des frais de stationnement (transport.demurrage)."""
+
+    @staticmethod
+    def _jours_ouvres_boucle(debut, fin, feries=()):
+        from datetime import timedelta
+        jours, courant = 0, debut
+        while courant <= fin:
+            if courant.weekday() < 5 and courant not in feries:
+                jours += 1
+            courant += timedelta(days=1)
+        return jours
+
+    @staticmethod
+    def _fin_gratuit_boucle(arrivee, n, feries=()):
+        from datetime import timedelta
+        courant, comptes = arrivee, 0
+        while True:
+            if courant.weekday() < 5 and courant not in feries:
+                comptes += 1
+                if comptes == n:
+                    return courant
+            courant += timedelta(days=1)
+
+    def test_calcul_direct_egal_boucle(self):
+        """Le calcul en temps constant donne les résultats de la boucle jour par jour."""
+        from datetime import date, timedelta
+        from transport.demurrage import CalendrierOuvre
+
+        feries = {date(2026, 1, 1), date(2026, 1, 6), date(2026, 1, 7), date(2026, 1, 10)}
+        for jours_feries in (set(), feries):
+            calendrier = CalendrierOuvre(jours_feries)
+            for decalage in range(14):
+                debut = date(2025, 12, 22) + timedelta(days=decalage)
+                for duree in range(40):
+                    fin = debut + timedelta(days=duree)
+                    self.assertEqual(
+                        calendrier.jours_ouvres(debut, fin),
+                        self._jours_ouvres_boucle(debut, fin, jours_feries),
+                        (debut, fin, bool(jours_feries)),
+                    )
+                for n in range(1, 12):
+                    self.assertEqual(
+                        calendrier.n_ieme_jour_ouvre(debut, n),
+                        self._fin_gratuit_boucle(debut, n, jours_feries),
+                        (debut, n, bool(jours_feries)),
+                    )
+
+    def test_frais_regles(self):
+        from datetime import date
+        from transport.demurrage import calculer_frais
+
+        # Arrivée samedi : franchise du lundi 5 au mercredi 7, facturation dès le jeudi
+        frais = calculer_frais(date(2026, 1, 3), date(2026, 1, 11), Decimal('25000'), jours_gratuits=3)
+        self.assertEqual((frais.debut_gratuit, frais.fin_gratuit), (date(2026, 1, 5), date(2026, 1, 7)))
+        self.assertEqual(frais.jours_facturables, 4)
+        self.assertEqual(frais.montant, Decimal('100000'))
+        self.assertEqual(frais.statut, 'en_stationnement')
+
+        frais = calculer_frais(date(2026, 1, 5), date(2026, 1, 6), Decimal('25000'), jours_gratuits=3)
+        self.assertEqual((frais.jours_facturables, frais.statut), (0, 'attente'))
+
+    def test_tarif_entreprise_et_calcul_groupe(self):
+        """Le tarif de l'entreprise s'applique et le calcul groupé égale le calcul unitaire."""
+        from datetime import date
+        from transport.demurrage import calculer_frais_missions
+
+        self.entreprise.tarif_stationnement = Decimal('10000')
+        self.entreprise.save()
+        for i, (arrivee, dechargement) in enumerate([
+            (date(2026, 1, 3), date(2026, 1, 11)),
+            (date(2026, 1, 5), None),
+            (date(2026, 1, 8), date(2026, 1, 9)),
+        ]):
+            mission = Mission.objects.get(contrat=self._create_contrat(f"BL-DEM-00{i}"))
+            Mission.objects.filter(pk=mission.pk).update(date_arrivee=arrivee, date_dechargement=dechargement)
+
+        missions = Mission.objects.filter(contrat__entreprise=self.entreprise)
+        with self.assertNumQueries(1):
+            frais_par_mission = calculer_frais_missions(missions)
+        self.assertEqual(len(frais_par_mission), 3)
+        for mission in missions.select_related('contrat__entreprise'):
+            self.assertEqual(frais_par_mission[mission.pk_mission].as_dict(), mission.calculer_frais_stationnement())
+
+        mission = missions.get(date_arrivee=date(2026, 1, 3))
+        self.assertEqual(mission.calculer_frais_stationnement()['montant'], Decimal('40000'))
+
+    def test_preview_vue(self):
+        from datetime import date
+
+        self.user.role = 'admin'
+        self.user.save()
+        self.client.force_login(self.user)
+        mission = Mission.objects.get(contrat=self._create_contrat("BL-DEM-010"))
+        Mission.objects.filter(pk=mission.pk).update(date_arrivee=date(2026, 1, 3))
+
+        response = self.client.get(
+            f'/missions/{mission.pk_mission}/preview-frais-stationnement/', {'date_dechargement': '2026-01-11'}
+        )
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['jours_facturables'], 4)
+        self.assertEqual(data['jours_gratuits'], 3)
+        self.assertEqual(data['debut_facturation'], '2026-01-08')
+        self.assertEqual(data['montant_formatted'], '100 000')
+        self.assertEqual(data['statut'], 'payant')
+
+    def test_recalcul_nocturne(self):
+        """Les frais des missions bloquées suivent les jours écoulés, paiements compris."""
+        from datetime import date
+        from io import StringIO
+        from django.core.management import call_command
+
+        arrivees = [date(2026, 1, 3), date(2026, 1, 5), date(2026, 1, 12)]
+        pks = []
+        for i, arrivee in enumerate(arrivees):
+            mission = Mission.objects.get(contrat=self._create_contrat(f"BL-DEM-02{i}"))
+            Mission.objects.filter(pk=mission.pk).update(date_arrivee=arrivee, statut_stationnement='attente')
+            pks.append(mission.pk)
+        # Mission déchargée : ignorée
+        Mission.objects.filter(pk=pks[2]).update(date_dechargement=date(2026, 1, 13), statut_stationnement='decharge')
+
+        sortie = StringIO()
+        call_command('recalculer_frais_stationnement', '--date', '2026-01-11', '--batch-size', '1', stdout=sortie)
+        self.assertIn('2 mission(s)', sortie.getvalue())
+
+        samedi, lundi, decharge = (Mission.objects.get(pk=pk) for pk in pks)
+        self.assertEqual(
+            (samedi.statut_stationnement, samedi.jours_stationnement_facturables, samedi.montant_stationnement),
+            ('en_stationnement', 4, Decimal('100000')),
+        )
+        self.assertEqual((lundi.jours_stationnement_facturables, lundi.montant_stationnement), (4, Decimal('100000')))
+        self.assertEqual(decharge.montant_stationnement, Decimal('0'))
+        self.assertEqual(
+            PaiementMission.objects.get(mission_id=pks[0]).frais_stationnement, Decimal('100000')
+        )
+
+        # Relance le même jour : rien à écrire
+        call_command('recalculer_frais_stationnement', '--date', '2026-01-11', stdout=sortie)
+        self.assertIn('0 mise(s) à jour', sortie.getvalue())
+
+
+class CheckMissionsRetardTest(WorkflowSetupMixin, TestCase):
+    """Tests de la commande check_missions_retard."""
+
+    def setUp(self):
+        super().setUp()
+        from datetime import timedelta
+
+        self.user.role = 'admin'
+        self.user.save()
+        self.chauffeur.utilisateur = Utilisateur.objects.create_user(
+            email="chauffeur@test.com", password="pass", entreprise=self.entreprise,
+        )
+        self.chauffeur.save()
+        hier = timezone.now().date() - timedelta(days=1)
+        for i in range(3):
+            mission = Mission.objects.get(contrat=self._create_contrat(f"BL-RET-00{i}"))
+            Mission.objects.filter(pk=mission.pk).update(statut='en cours', date_retour=hier)
+
+    def _lancer(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+
+        sortie = StringIO()
+        call_command('check_missions_retard', *args, stdout=sortie)
+        return sortie.getvalue()
+
+    def test_notifications_groupees(self):
+        from transport.models import Notification
+
+        self._lancer('--dry-run')
+        self.assertFalse(Notification.objects.filter(type_notification='mission_retard').exists())
+
+        # Missions, doublons, destinataires, création (+ savepoint) :
+        # indépendant du nombre de missions
+        with self.assertNumQueries(6):
+            sortie = self._lancer()
+        self.assertIn('6 notification(s) créée(s) pour 3 mission(s)', sortie)
+        self.assertEqual(
+            Notification.objects.filter(type_notification='mission_retard', utilisateur=self.user).count(), 3
+        )
+
+        # Deuxième passage le même jour : aucun doublon
+        self.assertIn('0 notification(s)', self._lancer())
+        self.assertEqual(Notification.objects.filter(type_notification='mission_retard').count(), 6)
+
+    def test_filtre_entreprise(self):
+        from django.core.management.base import CommandError
+
+        autre = Entreprise.objects.create(nom="Autre", secteur_activite="Transport", telephone_contact="0000000099")
+        self.assertIn('Aucune mission en retard', self._lancer('--entreprise', autre.pk))
+        with self.assertRaises(CommandError):
+            self._lancer('--entreprise', 'inconnue')
+
+
+class AuditIndexTest(WorkflowSetupMixin, TestCase):
+    """Tests de la commande audit_index."""
+
+    def test_analyse_plan(self):
+        from transport.management.commands.audit_index import analyser_plan
+
+        sqlite = (
+            "5 0 0 SEARCH transport_contrattransport USING INDEX contrat_entreprise_debut (entreprise_id=?)\n"
+            "9 0 0 SCAN transport_mission\n"
+            "12 0 0 SCAN transport_paiementmission USING INDEX paiement_date\n"
+            "40 0 0 USE TEMP B-TREE FOR ORDER BY"
+        )
+        self.assertEqual(
+            analyser_plan(sqlite),
+            (['transport_mission'], ['contrat_entreprise_debut', 'paiement_date'], True),
+        )
+        postgresql = (
+            "Limit  (cost=0.29..8.31 rows=1 width=4)\n"
+            "  ->  Index Scan using contrat_entreprise_debut on transport_contrattransport  (cost=0.29..8.31)\n"
+            "  ->  Seq Scan on transport_mission  (cost=0.00..1.01)"
+        )
+        self.assertEqual(
+            analyser_plan(postgresql), (['transport_mission'], ['contrat_entreprise_debut'], False),
+        )
+
+    def test_commande(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        self._create_contrat("BL-IDX-001")
+        sortie = StringIO()
+        call_command('audit_index', '--repetitions', '1', '--entreprise', self.entreprise.pk, stdout=sortie)
+        self.assertIn('contrats_liste', sortie.getvalue())
+        self.assertIn('12 requête(s) analysée(s)', sortie.getvalue())
+        self.assertNotIn('absent(s) de la base', sortie.getvalue())
+
+
+class EntrepriseDenormaliseeTest(WorkflowSetupMixin, TestCase):
+    """Tests de l'entreprise recopiée sur Mission, Cautions, PaiementMission et FraisTrajet."""
+
+    def test_workflow_renseigne_entreprise(self):
+        from transport.models import FraisTrajet
+
+        contrat = self._create_contrat("BL-ENT-001")
+        paiement = PaiementMission.objects.select_related('mission', 'caution').get(mission__contrat=contrat)
+        self.assertEqual(paiement.entreprise_id, self.entreprise.pk)
+        self.assertEqual(paiement.mission.entreprise_id, self.entreprise.pk)
+        self.assertEqual(paiement.caution.entreprise_id, self.entreprise.pk)
+
+        frais = FraisTrajet.objects.create(
+            mission=paiement.mission, origine="Port", destination="Bamako",
+            frais_route=Decimal('10000'), frais_carburant=Decimal('50000'),
+        )
+        self.assertEqual(frais.entreprise_id, self.entreprise.pk)
+
+        self.assertTrue(Mission.objects.filter(entreprise=self.entreprise, pk=paiement.mission_id).exists())
+        self.assertTrue(PaiementMission.objects.filter(entreprise=self.entreprise, pk=paiement.pk).exists())
+
+    def test_transfert_contrat(self):
+        from transport.contrat_workflow import synchroniser_entreprise_contrat
+
+        contrat = self._create_contrat("BL-ENT-002")
+        paiement = PaiementMission.objects.get(mission__contrat=contrat)
+        autre = Entreprise.objects.create(nom="Autre", secteur_activite="Transport", telephone_contact="0100000000")
+        contrat.entreprise = autre
+        synchroniser_entreprise_contrat(contrat)
+
+        self.assertEqual(Mission.objects.get(pk=paiement.mission_id).entreprise_id, autre.pk)
+        self.assertEqual(PaiementMission.objects.get(pk=paiement.pk).entreprise_id, autre.pk)
+        self.assertEqual(Cautions.objects.get(pk=paiement.caution_id).entreprise_id, autre.pk)
+
+    def test_transfert_contrat_sans_paiement(self):
+        contrat = self._create_contrat("BL-ENT-004")
+        paiement = PaiementMission.objects.get(mission__contrat=contrat)
+        mission_id, caution_id = paiement.mission_id, paiement.caution_id
+        paiement.delete()
+
+        autre = Entreprise.objects.create(nom="Autre", secteur_activite="Transport", telephone_contact="0100000000")
+        contrat.entreprise = autre
+        contrat.save()
+
+        self.assertEqual(Mission.objects.get(pk=mission_id).entreprise_id, autre.pk)
+        self.assertEqual(Cautions.objects.get(pk=caution_id).entreprise_id, autre.pk)
+        self.assertFalse(Mission.objects.filter(entreprise=self.entreprise, pk=mission_id).exists())
+
+    def test_verification_et_correction(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        paiement = PaiementMission.objects.get(mission__contrat=self._create_contrat("BL-ENT-003"))
+        autre = Entreprise.objects.create(nom="Autre", secteur_activite="Transport", telephone_contact="0100000000")
+        Mission.objects.filter(pk=paiement.mission_id).update(entreprise=None)
+        PaiementMission.objects.filter(pk=paiement.pk).update(entreprise=autre)
+
+        sortie = StringIO()
+        call_command('verifier_entreprise_denormalisee', stdout=sortie)
+        self.assertIn('2 incohérence(s) trouvée(s)', sortie.getvalue())
+        self.assertIsNone(Mission.objects.get(pk=paiement.mission_id).entreprise_id)
+
+        sortie = StringIO()
+        call_command('verifier_entreprise_denormalisee', '--corriger', stdout=sortie)
+        self.assertIn('2 incohérence(s) corrigée(s)', sortie.getvalue())
+        self.assertEqual(Mission.objects.get(pk=paiement.mission_id).entreprise_id, self.entreprise.pk)
+        self.assertEqual(PaiementMission.objects.get(pk=paiement.pk).entreprise_id, self.entreprise.pk)
+
+        sortie = StringIO()
+        call_command('verifier_entreprise_denormalisee', stdout=sortie)
+        self.assertIn('Aucune incohérence', sortie.getvalue())
+
+
+class ClesCompactesTest(WorkflowSetupMixin, TestCase):
+    """Tests des clés primaires compactes (CLES_COMPACTES) et de benchmark_cles."""
+
+    def test_cles_compactes(self):
+        from django.test import override_settings
+        from transport.cles import champ_reference
+
+        with override_settings(CLES_COMPACTES=True):
+            contrat = self._create_contrat("BL-CLE-001")
+        paiement = PaiementMission.objects.select_related('mission', 'caution', 'prestation').get(mission__contrat=contrat)
+        for objet, prefixe in (
+            (contrat, 'ctr-'), (paiement.prestation, 'pre-'), (paiement.caution, 'cau-'),
+            (paiement.mission, 'mis-'), (paiement, 'pai-'),
+        ):
+            cle = getattr(objet, champ_reference(type(objet)))
+            self.assertTrue(cle.startswith(prefixe), cle)
+            self.assertEqual(len(cle), 24)
+
+        # Clés croissantes dans le temps
+        with override_settings(CLES_COMPACTES=True):
+            suivant = self._create_contrat("BL-CLE-002")
+        self.assertGreater(suivant.pk, contrat.pk)
+
+    def test_cle_paiement_sans_requete(self):
+        paiement = PaiementMission(mission_id='m1', caution_id='c1', prestation_id='p1')
+        with self.assertNumQueries(0):
+            paiement.generer_pk()
+        self.assertEqual(paiement.pk_paiement, 'm1c1p1')
+
+    def test_benchmark(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        self._create_contrat("BL-CLE-003")
+        sortie = StringIO()
+        call_command('benchmark_cles', '--repetitions', '1', stdout=sortie)
+        self.assertIn('paiement → mission : 1 ligne(s)', sortie.getvalue())
+        self.assertIn('jointure', sortie.getvalue())
+        self.assertIn('aucune table de la base modifiée', sortie.getvalue())
+
+
+class ClesEntieresTest(TestCase):
+    """
+    Tests du passage aux clés entières (CLES_ENTIERES). La conversion est
+    vérifiée en relançant une partie de la suite avec CLES_ENTIERES=True.
+    """
+
+    # Tests sensibles au type des clés de ContratTransport, Mission et PaiementMission
+    TESTS_CLES_ENTIERES = [
+        'OutboxTest', 'PaginationApiTest', 'SynchronisationIncrementaleTest', 'DemurrageTest',
+        'InvoiceCacheTest', 'RevenueRollupTest', 'ContratWorkflowTest', 'EntrepriseDenormaliseeTest',
+        'ExcelExportTest', 'StreamingCsvExportTest', 'ClesCompactesTest',
+    ]
+
+    def test_migration_cles_entieres(self):
+        from django.conf import settings
+        from django.db.migrations.loader import MigrationLoader
+
+        graphe = MigrationLoader(None, ignore_no_migrations=True).graph
+        feuilles = graphe.leaf_nodes('transport')
+        self.assertEqual(len(feuilles), 1)
+        self.assertIn(('transport', '0044_cles_entieres'), graphe.forwards_plan(feuilles[0]))
+        # Vide sans le réglage
+        migration = graphe.nodes[('transport', '0044_cles_entieres')]
+        self.assertEqual(bool(migration.operations), settings.CLES_ENTIERES)
+
+    def test_verification_mode_cles(self):
+        from django.conf import settings
+        from django.test import override_settings
+        from transport.cles import verifier_mode_cles
+
+        self.assertEqual(verifier_mode_cles(databases=['default']), [])
+        with override_settings(CLES_ENTIERES=not settings.CLES_ENTIERES):
+            erreurs = verifier_mode_cles(databases=['default'])
+        self.assertEqual([erreur.id for erreur in erreurs], ['transport.E001'])
+
+    def test_suite_avec_cles_entieres(self):
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        if settings.CLES_ENTIERES:
+            self.skipTest("suite déjà lancée avec CLES_ENTIERES=True")
+        resultat = subprocess.run(
+            [sys.executable, 'manage.py', 'test', '--noinput', '-v', '1',
+             *(f'transport.tests.{nom}' for nom in self.TESTS_CLES_ENTIERES)],
+            cwd=settings.BASE_DIR, env=dict(os.environ, CLES_ENTIERES='True'),
+            capture_output=True, text=True, timeout=900,
+        )
+        self.assertEqual(resultat.returncode, 0, resultat.stderr[-5000:])
+
+    def test_champ_reference(self):
+        from transport.cles import champ_reference
+
+        self.assertEqual(champ_reference(ContratTransport), 'pk_contrat')
+        self.assertEqual(champ_reference(Mission), 'pk_mission')
+        self.assertEqual(champ_reference(PaiementMission), 'pk_paiement')
+        self.assertEqual(champ_reference(Camion), 'pk_camion')
+
+
+class PaginationApiTest(WorkflowSetupMixin, TestCase):
+    """Tests de la pagination par curseur et sans total de l'API."""
+
+    def setUp(self):
+        super().setUp()
+        from transport.models import Notification
+
+        notifications = []
+        for i in range(5):
+            notification = Notification(
+                utilisateur=self.user, type_notification='mission_retard',
+                title=f"Notification {i}", message="Test",
+            )
+            notification.pk_notification = f"notif-{i}"
+            notifications.append(notification)
+        Notification.objects.bulk_create(notifications)
+        # Trois notifications à la même date : départagées par la clé primaire
+        meme_date = timezone.now()
+        Notification.objects.filter(pk__in=['notif-1', 'notif-2', 'notif-3']).update(created_at=meme_date)
+        self.attendu = list(
+            Notification.objects.filter(utilisateur=self.user)
+            .order_by('-created_at', '-pk_notification').values_list('pk', flat=True)
+        )
+
+    def _get(self, url):
+        from transport.api.views import NotificationViewSet
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+        return NotificationViewSet.as_view({'get': 'list'})(request)
+
+    def test_curseur(self):
+        url = '/api/v1/notifications/?pagination=curseur&page_size=2'
+        vues = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self._get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            vues.extend(item['pk_notification'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(vues, self.attendu)
+
+    def test_curseur_invalide(self):
+        response = self._get('/api/v1/notifications/?curseur=invalide')
+        self.assertEqual(response.status_code, 404)
+
+    def test_curseur_missions(self):
+        """Curseur sur la clé de Mission, chaîne ou entière (CLES_ENTIERES)."""
+        from transport.api.views import MissionViewSet
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        for i in range(5):
+            self._create_contrat(f"BL-CUR-00{i}")
+        attendu = list(
+            Mission.objects.filter(entreprise=self.entreprise)
+            .order_by('-date_depart', '-pk').values_list('pk_mission', flat=True)
+        )
+
+        url = '/api/v1/missions/?pagination=curseur&page_size=2'
+        vues = []
+        while url:
+            request = APIRequestFactory().get(url)
+            force_authenticate(request, user=self.user)
+            response = MissionViewSet.as_view({'get': 'list'})(request)
+            self.assertEqual(response.status_code, 200)
+            vues.extend(item['pk_mission'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(vues, attendu)
+
+    def test_sans_total(self):
+        with self.assertNumQueries(1):
+            response = self._get('/api/v1/notifications/?total=false&page_size=2&page=2')
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('page=3', response.data['next'])
+        self.assertNotIn('page=', response.data['previous'])
+
+        response = self._get('/api/v1/notifications/?total=false&page_size=2&page=3')
+        self.assertIsNone(response.data['next'])
+
+    def test_pagination_par_page_inchangee(self):
+        response = self._get('/api/v1/notifications/?page_size=2')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class SynchronisationIncrementaleTest(WorkflowSetupMixin, TestCase):
+    """Tests de l'API de synchronisation incrémentale (/api/v1/sync/)."""
+
+    def setUp(self):
+        from django.test import override_settings
+
+        super().setUp()
+        override = override_settings(SYNC_MARGE_SECONDES=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.contrat = self._create_contrat("BL-SYNC-1")
+
+    def _sync(self, user=None, **params):
+        from transport.api.views import SyncAPIView
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        request = APIRequestFactory().get('/api/v1/sync/', params)
+        force_authenticate(request, user=user or self.user)
+        return SyncAPIView.as_view()(request)
+
+    def test_synchronisation_complete(self):
+        response = self._sync()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['has_more'])
+        self.assertFalse(response.data['resync'])
+        self.assertEqual(
+            set(response.data['changes']),
+            {'contrats', 'missions', 'cautions', 'paiements', 'chauffeurs', 'camions'},
+        )
+        self.assertEqual(response.data['changes']['contrats'][0]['pk_contrat'], self.contrat.pk_contrat)
+        self.assertEqual(response.data['deleted'], {})
+
+    def test_changements_depuis_le_curseur(self):
+        curseur = self._sync().data['cursor']
+        self.assertEqual(self._sync(since=curseur).data['changes'], {})
+
+        self.camion.modele = "Nouveau modèle"
+        self.camion.save()
+        response = self._sync(since=curseur)
+        self.assertEqual(list(response.data['changes']), ['camions'])
+        self.assertEqual(response.data['changes']['camions'][0]['pk_camion'], self.camion.pk_camion)
+
+    def test_propagation_du_contrat_visible(self):
+        """Les update() du workflow renseignent updated_at."""
+        curseur = self._sync().data['cursor']
+        self.contrat.montant_total = Decimal('1200000')
+        self.contrat.save()
+        changes = self._sync(since=curseur).data['changes']
+        self.assertIn('cautions', changes)
+        self.assertIn('missions', changes)
+        self.assertIn('paiements', changes)
+
+    def test_suppressions(self):
+        from transport.models import Mission, SuppressionSync
+
+        curseur = self._sync().data['cursor']
+        mission = Mission.objects.get(contrat=self.contrat)
+        pk_mission = mission.pk_mission
+        # La suppression de la mission supprime son paiement en cascade
+        mission.delete()
+        self.assertTrue(SuppressionSync.objects.filter(modele='mission', objet_pk=pk_mission).exists())
+
+        response = self._sync(since=curseur)
+        self.assertEqual(set(response.data['deleted']), {'missions', 'paiements'})
+        self.assertEqual(response.data['deleted']['missions'], [pk_mission])
+        # Curseur suivant : suppressions déjà transmises
+        self.assertEqual(self._sync(since=response.data['cursor']).data['deleted'], {})
+
+    def test_reprise_par_curseur(self):
+        from transport.models import Notification
+
+        for i in range(5):
+            Notification.objects.create(utilisateur=self.user, title=f"Notification {i}", message="Test")
+        attendu = set(Notification.objects.filter(utilisateur=self.user).values_list('pk', flat=True))
+
+        vues, curseur, appels = [], None, 0
+        while True:
+            params = {'limite': 2}
+            if curseur:
+                params['since'] = curseur
+            response = self._sync(**params)
+            appels += 1
+            vues.extend(n['pk_notification'] for n in response.data['changes'].get('notifications', []))
+            curseur = response.data['cursor']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(appels, 3)
+        self.assertEqual(len(vues), len(attendu))
+        self.assertEqual(set(vues), attendu)
+
+    def test_perimetre_entreprise(self):
+        from transport.models import Mission
+
+        autre = Entreprise.objects.create(nom="Autre", secteur_activite="Transport", telephone_contact="0000000099")
+        autre_user = Utilisateur.objects.create_user(email="autre@test.com", password="pass", entreprise=autre)
+
+        response = self._sync(user=autre_user)
+        self.assertEqual(response.data['changes'], {})
+        curseur = response.data['cursor']
+        Mission.objects.filter(contrat=self.contrat).delete()
+        self.assertEqual(self._sync(user=autre_user, since=curseur).data['deleted'], {})
+
+    def test_since_trop_ancien(self):
+        from datetime import timedelta
+
+        ancien = (timezone.now() - timedelta(days=60)).isoformat()
+        response = self._sync(since=ancien)
+        self.assertTrue(response.data['resync'])
+        self.assertIn('contrats', response.data['changes'])
+
+        recent = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertFalse(self._sync(since=recent).data['resync'])
+
+    def test_curseur_invalide(self):
+        self.assertEqual(self._sync(since='invalide').status_code, 400)
+        self.assertEqual(self._sync(limite='abc').status_code, 400)
+
+    def test_purge_des_suppressions(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from transport.models import Mission, SuppressionSync
+
+        Mission.objects.filter(contrat=self.contrat).delete()
+        nb = SuppressionSync.objects.count()
+        self.assertGreater(nb, 0)
+        SuppressionSync.objects.filter(modele='mission').update(supprime_le=timezone.now() - timedelta(days=40))
+        call_command('purger_suppressions_sync', stdout=StringIO())
+        self.assertFalse(SuppressionSync.objects.filter(modele='mission').exists())
+        self.assertEqual(SuppressionSync.objects.count(), nb - 1)
+
+
+class ChampsDynamiquesApiTest(WorkflowSetupMixin, TestCase):
+    """Tests de ?fields= / ?expand= et du nombre de requêtes des listes de l'API."""
+
+    def _get(self, viewset, url, action='list', **kwargs):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+        return viewset.as_view({'get': action})(request, **kwargs)
+
+    def _creer_chauffeurs(self, nombre, debut=0):
+        from transport.models import Affectation
+
+        for i in range(debut, debut + nombre):
+            chauffeur = Chauffeur.objects.create(
+                entreprise=self.entreprise, nom=f"Nom{i}", prenom="Test", email=f"c{i}@test.com"
+            )
+            camion = Camion.objects.create(
+                entreprise=self.entreprise, immatriculation=f"CH-{i:03d}", modele="M", capacite_tonnes=Decimal("10")
+            )
+            Affectation.objects.create(chauffeur=chauffeur, camion=camion)
+
+    def test_liste_chauffeurs_nombre_de_requetes_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transport.api.views import ChauffeurViewSet
+
+        self._creer_chauffeurs(2)
+        with CaptureQueriesContext(connection) as peu:
+            self._get(ChauffeurViewSet, '/api/v1/chauffeurs/')
+        self._creer_chauffeurs(10, debut=2)
+        with CaptureQueriesContext(connection) as beaucoup:
+            response = self._get(ChauffeurViewSet, '/api/v1/chauffeurs/')
+        self.assertEqual(len(response.data['results']), 13)
+        self.assertEqual(len(peu), len(beaucoup))
+        self.assertEqual(response.data['results'][0]['entreprise_nom'], self.entreprise.nom)
+
+    def test_fields_limite_champs_et_jointures(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transport.api.views import ChauffeurViewSet
+
+        self._creer_chauffeurs(2)
+        with CaptureQueriesContext(connection) as requetes:
+            response = self._get(ChauffeurViewSet, '/api/v1/chauffeurs/?fields=pk_chauffeur,nom')
+        self.assertEqual(set(response.data['results'][0]), {'pk_chauffeur', 'nom'})
+        sql = requetes[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('EXISTS', sql)
+
+    def test_detail_camion_actuel_precharge(self):
+        from transport.api.views import ChauffeurViewSet
+        from transport.models import Affectation
+
+        self._creer_chauffeurs(1)
+        chauffeur = Chauffeur.objects.get(nom="Nom0")
+        url = f'/api/v1/chauffeurs/{chauffeur.pk}/'
+        # Chauffeur + entreprise (jointure), affectations actives + camion (préchargement)
+        with self.assertNumQueries(2):
+            response = self._get(ChauffeurViewSet, url, action='retrieve', pk=chauffeur.pk)
+        self.assertEqual(response.data['camion_actuel']['immatriculation'], "CH-000")
+
+        Affectation.objects.filter(chauffeur=chauffeur).update(date_fin_affectation=timezone.now().date())
+        response = self._get(ChauffeurViewSet, url, action='retrieve', pk=chauffeur.pk)
+        self.assertIsNone(response.data['camion_actuel'])
+
+    def test_liste_paiements_nombre_de_requetes_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transport.api.views import PaiementMissionViewSet
+
+        self._create_contrat("BL-CHAMPS-1")
+        with CaptureQueriesContext(connection) as peu:
+            self._get(PaiementMissionViewSet, '/api/v1/paiements/')
+        for i in range(2, 6):
+            self._create_contrat(f"BL-CHAMPS-{i}")
+        with CaptureQueriesContext(connection) as beaucoup:
+            response = self._get(PaiementMissionViewSet, '/api/v1/paiements/')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(peu), len(beaucoup))
+        self.assertEqual(response.data['results'][0]['chauffeur_nom'], "Perf Chauffeur")
+
+    def test_expand_dans_les_listes(self):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from transport.api.serializers import PaiementMissionSerializer
+        from transport.models import PaiementMission
+
+        self._create_contrat("BL-CHAMPS-EXP")
+        paiements = PaiementMission.objects.all()
+
+        def serialiser(url, many=True):
+            request = Request(APIRequestFactory().get(url))
+            instance = paiements if many else paiements[0]
+            return PaiementMissionSerializer(instance, many=many, context={'request': request}).data
+
+        self.assertNotIn('mission_info', serialiser('/api/v1/paiements/')[0])
+        ligne = serialiser('/api/v1/paiements/?expand=mission_info')[0]
+        self.assertIn('mission_info', ligne)
+        self.assertNotIn('caution_info', ligne)
+        # Détail : objets imbriqués toujours présents
+        self.assertIn('caution_info', serialiser('/api/v1/paiements/x/', many=False))
+
+
+class AuditTamponTest(TestCase):
+    """Tests de l'écriture groupée du journal d'audit (transport.audit_buffer)."""
+
+    def setUp(self):
+        from transport import audit_buffer
+
+        self.user = Utilisateur.objects.create_user(email='tampon@test.com', password='pass')
+        self.addCleanup(lambda: audit_buffer._tampon().entrees.clear())
+
+    def _log(self, n=1):
+        from transport.models import AuditLog
+
+        return [
+            AuditLog.log_action(
+                utilisateur=self.user, action='LOGIN', model_name='Utilisateur',
+                object_id=self.user.pk_utilisateur, object_repr=f"connexion {i}",
+            )
+            for i in range(n)
+        ]
+
+    def test_ecriture_groupee_en_fin_de_requete(self):
+        from django.core.signals import request_finished
+        from transport.models import AuditCompteurJour, AuditLog, AuditMensuel
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entrees = self._log(3)
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertTrue(all(entree.pk_audit and entree.timestamp for entree in entrees))
+
+        AuditMensuel.objects.create(mois=AuditMensuel.mois_de(entrees[0].timestamp))
+        AuditCompteurJour.objects.create(
+            jour=timezone.localtime(entrees[0].timestamp).date(), action='LOGIN', utilisateur=self.user,
+        )
+        with self.assertNumQueries(5):  # savepoint, INSERT groupé, compteurs mensuel et journalier, release
+            request_finished.send(sender=None)
+        self.assertEqual(
+            set(AuditLog.objects.values_list('pk_audit', flat=True)),
+            {entree.pk_audit for entree in entrees},
+        )
+        horodatage = AuditLog.objects.get(pk=entrees[0].pk_audit).timestamp
+        self.assertEqual(horodatage, entrees[0].timestamp)
+
+    def test_seuil_de_taille(self):
+        from django.test import override_settings
+        from transport.models import AuditLog
+
+        with override_settings(AUDIT_TAMPON_TAILLE=2), self.captureOnCommitCallbacks(execute=True):
+            self._log(3)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_transaction_annulee(self):
+        from django.db import transaction
+        from transport import audit_buffer
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._log()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(audit_buffer.vider(), 0)
+
+    def test_fichier_de_secours_et_rejeu(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        from django.db import DatabaseError
+        from django.test import override_settings
+        from transport import audit_buffer
+        from transport.models import AuditLog
+
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        chemin = os.path.join(dossier.name, 'audit.jsonl')
+        with override_settings(AUDIT_FICHIER_SECOURS=chemin):
+            with self.captureOnCommitCallbacks(execute=True):
+                entrees = self._log(2)
+            with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=DatabaseError('base indisponible')), \
+                    self.assertLogs('transport.audit_buffer', level='ERROR'):
+                self.assertEqual(audit_buffer.vider(), 2)
+            self.assertFalse(AuditLog.objects.exists())
+            with open(chemin, encoding='utf-8') as fichier:
+                self.assertEqual(len(fichier.readlines()), 2)
+
+            call_command('rejouer_audit_secours', stdout=StringIO())
+            # Relancer ne crée pas de doublon
+            call_command('rejouer_audit_secours', stdout=StringIO())
+        self.assertEqual(
+            set(AuditLog.objects.values_list('pk_audit', flat=True)),
+            {entree.pk_audit for entree in entrees},
+        )
+        self.assertFalse(os.path.exists(chemin))
+
+    def test_cles_compactes(self):
+        from django.test import override_settings
+        from transport.cles import champ_reference
+
+        with override_settings(CLES_COMPACTES=True), self.captureOnCommitCallbacks(execute=True):
+            entree, = self._log()
+        self.assertTrue(entree.pk_audit.startswith('aud-'))
+        self.assertEqual(len(entree.pk_audit), 24)
+
+    def test_tampon_desactive(self):
+        from django.test import override_settings
+        from transport.models import AuditLog
+
+        with override_settings(AUDIT_TAMPON=False):
+            entree, = self._log()
+        self.assertTrue(AuditLog.objects.filter(pk=entree.pk_audit).exists())
+
+    def test_ecriture_avant_fermeture_des_connexions(self):
+        from django.core.signals import request_finished
+        from django.http import HttpResponse
+        from transport import audit_buffer
+        from transport.audit_middleware import AuditTamponMiddleware
+        from transport.models import AuditLog
+
+        def vue(request):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._log(2)
+            return HttpResponse()
+
+        response = AuditTamponMiddleware(vue)(RequestFactory().get('/'))
+        self.assertFalse(AuditLog.objects.exists())
+
+        # close_old_connections (request_finished) passe après l'écriture du tampon
+        en_attente = []
+        receveur = lambda **kwargs: en_attente.append(len(audit_buffer._tampon().entrees))  # noqa: E731
+        request_finished.connect(receveur)
+        self.addCleanup(request_finished.disconnect, receveur)
+        response.close()
+        self.assertEqual(en_attente, [0])
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_tampon_d_un_thread_termine(self):
+        import gc
+        import threading
+        from transport import audit_buffer
+        from transport.models import AuditLog
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entrees = self._log(2)
+        audit_buffer._tampon().entrees.clear()
+        tampons_avant = len(audit_buffer._tampons)
+
+        def worker():
+            audit_buffer._tampon().entrees.extend(entrees)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        gc.collect()
+        # Le tampon disparaît avec son thread, ses entrées sont recueillies
+        self.assertEqual(len(audit_buffer._tampons), tampons_avant)
+        self.assertEqual(len(audit_buffer._orphelines.entrees), 2)
+
+        self.assertEqual(audit_buffer.vider_tout(), 2)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_ecriture_des_tampons_inactifs(self):
+        from django.test import override_settings
+        from transport import audit_buffer
+        from transport.models import AuditLog
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(2)
+        self.assertEqual(audit_buffer.ecrire_anciens(), 0)
+        with override_settings(AUDIT_TAMPON_SECONDES=0):
+            self.assertEqual(audit_buffer.ecrire_anciens(), 2)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+
+class AuditArchiveTest(TestCase):
+    """Tests du résumé mensuel et de l'archivage du journal d'audit (transport.audit_archive)."""
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from transport import audit_buffer
+
+        self.entreprise = Entreprise.objects.create(
+            nom="Entreprise Archive", secteur_activite="Transport", telephone_contact="0000000030",
+        )
+        self.user = Utilisateur.objects.create_user(
+            email='archive@test.com', password='pass', entreprise=self.entreprise, role='admin',
+        )
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        override = override_settings(MEDIA_ROOT=dossier.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(lambda: audit_buffer._tampon().entrees.clear())
+
+    def _ancien(self, mois_avant, n, action='UPDATE'):
+        """Crée n entrées datées du 10 du mois situé mois_avant mois avant le mois courant."""
+        from datetime import datetime, time
+        from transport.audit_archive import decaler_mois
+        from transport.models import AuditLog, AuditMensuel
+
+        mois = decaler_mois(AuditMensuel.mois_de(timezone.now()), -mois_avant)
+        horodatage = timezone.make_aware(datetime.combine(mois.replace(day=10), time(12)))
+        for i in range(n):
+            AuditLog.objects.create(
+                utilisateur=self.user, action=action, model_name='Mission',
+                object_id=f'mission-{mois_avant}-{i}', object_repr=f'Mission {i}', timestamp=horodatage,
+            )
+        return mois
+
+    def test_compteurs_mensuels(self):
+        from django.core.signals import request_finished
+        from django.test import override_settings
+        from transport.models import AuditLog, AuditMensuel
+
+        mois = self._ancien(2, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            AuditLog.log_action(self.user, 'LOGIN', 'Utilisateur', self.user.pk_utilisateur)
+            AuditLog.log_action(self.user, 'LOGIN', 'Utilisateur', self.user.pk_utilisateur)
+        request_finished.send(sender=None)
+        with override_settings(AUDIT_TAMPON=False):
+            AuditLog.log_action(self.user, 'LOGOUT', 'Utilisateur', self.user.pk_utilisateur)
+
+        courant = AuditMensuel.mois_de(timezone.now())
+        self.assertEqual(AuditMensuel.objects.get(mois=mois).nombre, 3)
+        self.assertEqual(AuditMensuel.objects.get(mois=courant).nombre, 3)
+
+        AuditMensuel.objects.update(nombre=0)
+        self.assertEqual(AuditMensuel.reconstruire(), 6)
+        self.assertEqual(AuditMensuel.objects.get(mois=mois).nombre, 3)
+
+    def test_archivage_par_lots(self):
+        import os
+        from transport.audit_archive import _ajouter, archiver, chemin_archive, lire_archive
+        from transport.models import AuditCompteurJour, AuditLog, AuditMensuel
+
+        ancien = self._ancien(14, 5)
+        recent = self._ancien(2, 2)
+
+        self.assertEqual(archiver(mois_conserves=12, taille_lot=2), [(ancien, 5)])
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertTrue(os.path.exists(chemin_archive(ancien)))
+        entrees = list(lire_archive(ancien))
+        self.assertEqual(len(entrees), 5)
+        self.assertEqual({entree['object_repr'] for entree in entrees}, {f'Mission {i}' for i in range(5)})
+
+        resume = AuditMensuel.objects.get(mois=ancien)
+        self.assertEqual((resume.nombre, resume.nombre_archive), (0, 5))
+        self.assertEqual(resume.fichier_archive, os.path.join('audit_archives', f'{ancien:%Y-%m}.jsonl.gz'))
+        self.assertEqual(AuditMensuel.objects.get(mois=recent).nombre, 2)
+
+        # Lot écrit puis archivage interrompu avant la suppression : pas de doublon à la lecture
+        _ajouter(chemin_archive(ancien), [dict(entrees[0])])
+        self.assertEqual(len(list(lire_archive(ancien))), 5)
+
+        # Rien de plus à archiver
+        self.assertEqual(archiver(mois_conserves=12), [])
+
+        # Les jours archivés sortent des compteurs journaliers
+        self.assertEqual(
+            sorted(AuditCompteurJour.objects.values_list('jour', flat=True)),
+            [recent.replace(day=10)],
+        )
+
+    def test_lot_interrompu_pendant_l_ecriture(self):
+        import gzip
+        import json
+        from transport.audit_archive import _ajouter, archiver, chemin_archive, lire_archive
+
+        ancien = self._ancien(14, 3)
+        archiver(mois_conserves=12)
+        chemin = chemin_archive(ancien)
+        entrees = list(lire_archive(ancien))
+        membre_tronque = gzip.compress(json.dumps({'pk_audit': 'x'}).encode() * 50)[:-12]
+
+        # Arrêt brutal pendant l'écriture d'un lot : membre incomplet en fin de fichier
+        with open(chemin, 'ab') as brut:
+            brut.write(membre_tronque)
+        self.assertEqual(len(list(lire_archive(ancien))), 3)
+
+        # L'archivage suivant coupe le membre incomplet avant d'ajouter ses lots
+        self._ancien(14, 2, action='DELETE')
+        self.assertEqual(archiver(mois_conserves=12), [(ancien, 2)])
+        self.assertEqual(len(list(lire_archive(ancien))), 5)
+        with open(chemin, 'rb') as brut:
+            self.assertNotIn(membre_tronque, brut.read())
+
+        # Fichier déjà abîmé (valide, tronqué, valide) : la lecture reprend au membre suivant
+        with open(chemin, 'wb') as brut:
+            brut.write(membre_tronque)
+        _ajouter(chemin, [entrees[0]])
+        with open(chemin, 'ab') as brut:
+            brut.write(membre_tronque)
+        _ajouter(chemin, entrees[1:])
+        self.assertEqual(
+            {entree['pk_audit'] for entree in lire_archive(ancien)},
+            {entree['pk_audit'] for entree in entrees},
+        )
+
+    def test_commande_recherche(self):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+
+        self._ancien(14, 2, action='DELETE')
+        self._ancien(13, 3)
+        call_command('archiver_audit', '--mois', '12', stdout=StringIO())
+
+        sortie = StringIO()
+        call_command('rechercher_audit_archive', '--action', 'DELETE', '--json', stdout=sortie)
+        resultats = [json.loads(ligne) for ligne in sortie.getvalue().splitlines()]
+        self.assertEqual(len(resultats), 2)
+        self.assertEqual({resultat['action'] for resultat in resultats}, {'DELETE'})
+
+        sortie = StringIO()
+        call_command('rechercher_audit_archive', '--texte', 'mission 2', stdout=sortie)
+        self.assertIn('1 entrée(s) trouvée(s)', sortie.getvalue())
+
+    def test_page_nettoyage(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+        from transport.models import AuditLog
+
+        self._ancien(14, 4)
+        self._ancien(4, 1)
+        self.client.login(email='archive@test.com', password='pass')
+
+        # Compteurs lus dans le résumé mensuel : pas de COUNT sur le journal
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(reverse('audit_cleanup'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in requetes.captured_queries if 'transport_auditlog' in q['sql']])
+        self.assertEqual(response.context['total_logs'], 5)
+        self.assertEqual([stat['count'] for stat in response.context['stats_by_period']], [5, 4, 4, 0])
+
+        response = self.client.post(reverse('audit_cleanup'), {'months': 12})
+        self.assertRedirects(response, reverse('audit_log_list'), fetch_redirect_response=False)
+        self.assertEqual(AuditLog.objects.count(), 1)
+        response = self.client.get(reverse('audit_cleanup'))
+        self.assertEqual(len(response.context['archives']), 1)
+
+
+class AuditStatistiquesTest(TestCase):
+    """Tests des compteurs journaliers lus par l'historique d'audit (AuditCompteurJour)."""
+
+    def setUp(self):
+        from transport import audit_buffer
+
+        self.entreprise = Entreprise.objects.create(
+            nom="Entreprise Stats", secteur_activite="Transport", telephone_contact="0000000031",
+        )
+        self.admin = Utilisateur.objects.create_user(
+            email='stats@test.com', password='pass', entreprise=self.entreprise, role='admin',
+        )
+        self.autre = Utilisateur.objects.create_user(
+            email='stats2@test.com', password='pass', entreprise=self.entreprise,
+        )
+        autre_entreprise = Entreprise.objects.create(
+            nom="Entreprise Voisine", secteur_activite="Transport", telephone_contact="0000000032",
+        )
+        self.voisin = Utilisateur.objects.create_user(
+            email='voisin@test.com', password='pass', entreprise=autre_entreprise,
+        )
+        self.addCleanup(lambda: audit_buffer._tampon().entrees.clear())
+
+    def _log(self, utilisateur, action, jours_avant=0, n=1):
+        from datetime import timedelta
+        from transport.models import AuditLog
+
+        for i in range(n):
+            AuditLog.objects.create(
+                utilisateur=utilisateur, action=action, model_name='Mission', object_id=f'm-{action}-{i}',
+                timestamp=timezone.now() - timedelta(days=jours_avant),
+            )
+
+    def test_compteurs_maintenus_a_l_ecriture(self):
+        from django.core.signals import request_finished
+        from transport.models import AuditCompteurJour, AuditLog
+
+        self._log(self.admin, 'CREATE', n=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            # Utilisateur non chargé : entreprise lue en une requête pour le lot
+            AuditLog.log_action(Utilisateur.objects.only('pk_utilisateur').get(pk=self.autre.pk), 'DELETE',
+                                'Mission', 'm-1')
+        request_finished.send(sender=None)
+
+        compteurs = {
+            (c.entreprise_id, c.action, c.utilisateur_id): c.nombre for c in AuditCompteurJour.objects.all()
+        }
+        self.assertEqual(compteurs, {
+            (self.entreprise.pk, 'CREATE', self.admin.pk): 2,
+            (self.entreprise.pk, 'DELETE', self.autre.pk): 1,
+        })
+
+        AuditCompteurJour.objects.all().delete()
+        AuditCompteurJour.reconstruire()
+        self.assertEqual(
+            {(c.entreprise_id, c.action, c.utilisateur_id): c.nombre for c in AuditCompteurJour.objects.all()},
+            compteurs,
+        )
+
+    def test_premiere_ecriture_concurrente_sans_utilisateur(self):
+        """Deux premières écritures d'un compteur sans utilisateur ni entreprise : une seule ligne."""
+        from unittest import mock
+        from django.db.models import QuerySet
+        from transport.models import AuditCompteurJour, AuditLog
+
+        entree = AuditLog(utilisateur=None, action='LOGIN', model_name='Utilisateur', timestamp=timezone.now())
+        AuditCompteurJour.comptabiliser([entree])
+
+        # L'écriture concurrente ne voit pas encore la ligne : sa première
+        # mise à jour ne touche rien, la création bute sur la contrainte
+        update = QuerySet.update
+        appels = []
+
+        def update_avant_commit(queryset, **kwargs):
+            if queryset.model is AuditCompteurJour and not appels:
+                appels.append(queryset)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_avant_commit):
+            AuditCompteurJour.comptabiliser([entree])
+
+        self.assertEqual(
+            list(AuditCompteurJour.objects.values_list('entreprise_id', 'utilisateur_id', 'nombre')),
+            [(None, None, 2)],
+        )
+
+    def test_statistiques_de_l_historique(self):
+        from datetime import timedelta
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        self._log(self.admin, 'CREATE', n=3)
+        self._log(self.admin, 'UPDATE', jours_avant=10, n=2)
+        self._log(self.autre, 'VALIDER_PAIEMENT', n=1)
+        self._log(self.autre, 'DELETE', jours_avant=10, n=4)
+        self._log(self.voisin, 'CREATE', n=5)
+        self.client.login(email='stats@test.com', password='pass')
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(reverse('audit_log_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'], {
+            'total': 10, 'creates': 3, 'updates': 2, 'deletes': 4, 'validations': 1,
+        })
+        self.assertEqual(
+            {u['utilisateur__email']: u['count'] for u in response.context['top_users']},
+            {'stats@test.com': 5, 'stats2@test.com': 5},
+        )
+        # Statistiques sans COUNT ni GROUP BY sur le journal
+        self.assertFalse([
+            q for q in requetes.captured_queries
+            if 'transport_auditlog' in q['sql'] and ('COUNT(' in q['sql'] or 'GROUP BY' in q['sql'])
+        ])
+
+        # Une période somme les compteurs des jours concernés
+        debut = (timezone.localdate() - timedelta(days=2)).isoformat()
+        response = self.client.get(reverse('audit_log_list'), {'date_debut': debut})
+        self.assertEqual(response.context['stats']['total'], 4)
+        self.assertEqual(
+            {u['utilisateur__email']: u['count'] for u in response.context['top_users']},
+            {'stats@test.com': 3, 'stats2@test.com': 1},
+        )
+
+        # Date invalide ignorée
+        response = self.client.get(reverse('audit_log_list'), {'date_fin': '2026-02-30'})
+        self.assertEqual(response.context['stats']['total'], 10)
+
+
+class AuditMiddlewareTest(TestCase):
+    """Tests de l'audit des requêtes de modification (transport.audit_middleware)."""
+
+    def setUp(self):
+        from transport import audit_buffer
+
+        self.entreprise = Entreprise.objects.create(
+            nom="Entreprise Middleware", secteur_activite="Transport", telephone_contact="0000000033",
+        )
+        self.user = Utilisateur.objects.create_user(
+            email='middleware@test.com', password='pass', entreprise=self.entreprise,
+        )
+        self.addCleanup(lambda: audit_buffer._tampon().entrees.clear())
+
+    def _requetes(self, *appels):
+        """Exécute les appels du client et renvoie les entrées REQUETE écrites."""
+        from transport import audit_buffer
+        from transport.models import AuditLog
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for appel in appels:
+                appel()
+        audit_buffer.vider()
+        return list(AuditLog.objects.filter(action='REQUETE'))
+
+    def test_requete_de_modification_tracee(self):
+        from django.urls import reverse
+
+        self.client.login(email='middleware@test.com', password='pass')
+        url = reverse('dashboard')
+        entree, = self._requetes(lambda: self.client.post(
+            url, HTTP_X_FORWARDED_FOR='10.0.0.7, 172.16.0.1', HTTP_USER_AGENT='Navigateur test',
+        ))
+        self.assertEqual(entree.utilisateur, self.user)
+        self.assertEqual(entree.ip_address, '10.0.0.7')
+        self.assertEqual(entree.user_agent, 'Navigateur test')
+        self.assertEqual(entree.object_id, url)
+        self.assertEqual(entree.model_name, 'dashboard')
+        self.assertEqual(entree.changes['methode'], 'POST')
+        self.assertIsInstance(entree.changes['statut'], int)
+        self.assertGreaterEqual(entree.changes['duree_ms'], 0)
+
+    def test_requetes_ignorees(self):
+        from django.test import override_settings
+        from django.urls import reverse
+
+        url = reverse('dashboard')
+        # Anonyme
+        self.assertEqual(self._requetes(lambda: self.client.post(url)), [])
+
+        self.client.login(email='middleware@test.com', password='pass')
+        self.assertEqual(self._requetes(
+            lambda: self.client.get(url),
+            lambda: self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest'),
+            lambda: self.client.post(reverse('audit_log_list')),
+        ), [])
+        with override_settings(AUDIT_REQUETES=False):
+            self.client = self.client_class()
+            self.client.login(email='middleware@test.com', password='pass')
+            self.assertEqual(self._requetes(lambda: self.client.post(url)), [])
+
+    def test_commande_benchmark(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from transport.models import AuditLog
+
+        sortie = StringIO()
+        call_command('benchmark_audit', '--requetes', '20', stdout=sortie)
+        # Le seuil de 1 ms dépend de la machine : seule la forme du rapport est vérifiée
+        texte = sortie.getvalue()
+        self.assertIn('20 requête(s) POST simulée(s) pour middleware@test.com', texte)
+        self.assertRegex(texte, r'Surcoût +: médiane -?[\d.]+ µs, p95 -?[\d.]+ µs, moyenne -?[\d.]+ µs')
+        self.assertRegex(texte, r'Surcoût médian de -?[\d.]+ µs par requête')
+        self.assertFalse(AuditLog.objects.filter(action='REQUETE').exists())
+
+
+class ProfilageTest(TestCase):
+    """Tests du profilage des requêtes (transport.perf_middleware, /internal/perf/)."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.entreprise = Entreprise.objects.create(
+            nom="Entreprise Profilage", secteur_activite="Transport", telephone_contact="0000000034",
+        )
+        self.user = Utilisateur.objects.create_user(
+            email='profilage@test.com', password='pass', entreprise=self.entreprise, role='admin',
+        )
+        self.superuser = Utilisateur.objects.create_user(
+            email='super@test.com', password='pass', entreprise=self.entreprise, role='admin',
+            is_superuser=True, is_staff=True,
+        )
+
+    def test_empreinte_retire_les_valeurs(self):
+        from transport.perf_middleware import empreinte
+
+        self.assertEqual(
+            empreinte("SELECT * FROM t WHERE id = 12 AND nom = 'l''eau'"),
+            "SELECT * FROM t WHERE id = ? AND nom = ?",
+        )
+        self.assertEqual(
+            empreinte('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            empreinte('SELECT * FROM t  WHERE id IN (%s)'),
+        )
+
+    def test_profil_doublons_et_n_plus_1(self):
+        from transport.perf_middleware import Profil
+
+        profil = Profil()
+        execute = lambda sql, params, many, context: None  # noqa: E731
+        for pk in range(6):
+            profil(execute, 'SELECT * FROM t WHERE id = %s', (pk,), False, {})
+        profil(execute, 'SELECT * FROM t WHERE id = %s', (0,), False, {})
+
+        self.assertEqual(profil.requetes, 7)
+        self.assertEqual(profil.doublons, 1)
+        self.assertEqual(profil.n_plus_1(seuil=5), [('SELECT * FROM t WHERE id = %s', 7)])
+        self.assertEqual(profil.n_plus_1(seuil=8), [])
+        self.assertIn('sql;dur=', profil.server_timing())
+        self.assertIn('desc="7 requetes"', profil.server_timing())
+
+    def test_profilage_permanent(self):
+        from django.test import override_settings
+        from django.urls import reverse
+
+        self.client.login(email='profilage@test.com', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')))
+
+        with override_settings(PERF_PROFILAGE=True):
+            self.client = self.client_class()
+            self.client.login(email='profilage@test.com', password='pass')
+            response = self.client.get(reverse('dashboard'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ requetes"')
+
+    def test_entete_reserve_aux_superutilisateurs(self):
+        from django.urls import reverse
+
+        url = reverse('dashboard')
+        self.client.login(email='profilage@test.com', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(url, HTTP_X_PROFILAGE='1'))
+
+        self.client.login(email='super@test.com', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(url))
+        self.assertIn('Server-Timing', self.client.get(url, HTTP_X_PROFILAGE='1'))
+
+    def test_rapport_classe_les_vues(self):
+        from django.urls import reverse
+        from transport.perf_middleware import rapport
+
+        self.client.login(email='super@test.com', password='pass')
+        for _ in range(3):
+            self.client.get(reverse('dashboard'), HTTP_X_PROFILAGE='1')
+        self.client.get(reverse('audit_log_list'), HTTP_X_PROFILAGE='1')
+
+        lignes = rapport()
+        self.assertEqual({ligne['vue'] for ligne in lignes}, {'dashboard', 'audit_log_list'})
+        self.assertEqual([ligne['p95'] for ligne in lignes], sorted((ligne['p95'] for ligne in lignes), reverse=True))
+        dashboard, = [ligne for ligne in lignes if ligne['vue'] == 'dashboard']
+        self.assertEqual(dashboard['nombre'], 3)
+        self.assertGreater(dashboard['requetes'], 0)
+
+        donnees = self.client.get(reverse('rapport_perf'), {'tri': 'requetes', 'format': 'json'}).json()
+        self.assertEqual(donnees['tri'], 'requetes')
+        requetes = [ligne['requetes'] for ligne in donnees['vues']]
+        self.assertEqual(requetes, sorted(requetes, reverse=True))
+
+        response = self.client.get(reverse('rapport_perf'))
+        self.assertContains(response, 'dashboard')
+
+        self.client.post(reverse('rapport_perf'))
+        self.assertEqual(rapport(), [])
+
+    def test_rapport_reserve_aux_superutilisateurs(self):
+        from django.urls import reverse
+
+        self.client.login(email='profilage@test.com', password='pass')
+        response = self.client.get(reverse('rapport_perf'))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
@@ -9,6 +9,7 @@ from . import reports_views
 from . import user_crud_views
 from . import salary_views
 from . import pwa_views
+from . import perf_views
 from .views import ajax_views
 from .views.annulation_views import (
     annuler_contrat_view,
@@ -171,6 +172,11 @@ urlpatterns = [
     path('utilisateurs/export/excel/', export_views.export_utilisateurs_excel, name='export_utilisateurs_excel'),
     path('audit/export/excel/', export_views.export_audit_excel, name='export_audit_excel'),
 
+    # Exports en arrière-plan (file ExportJob + run_export_worker)
+    path('exports/<str:type_export>/', export_views.demander_export, name='demander_export'),
+    path('exports/job/<str:pk>/', export_views.statut_export, name='statut_export'),
+    path('exports/job/<str:pk>/telecharger/', export_views.telecharger_export, name='telecharger_export'),
+
     # Rapports PDF avancés
     path('missions/rapport/pdf/', pdf_reports.generate_missions_report_pdf, name='rapport_missions_pdf'),
     path('paiements/rapport/pdf/', pdf_reports.generate_paiements_report_pdf, name='rapport_paiements_pdf'),
@@ -230,6 +236,9 @@ urlpatterns = [
     path('audit/cleanup/', views.audit_cleanup, name='audit_cleanup'),
     path('audit/<str:pk>/', views.audit_log_detail, name='audit_log_detail'),
 
+    # Profilage des vues (superutilisateurs)
+    path('internal/perf/', perf_views.rapport_perf, name='rapport_perf'),
+
     # Gestion des permissions et rôles
     # Permissions
     path('permissions/', permissions_views.permissions_dashboard, name='permissions_dashboard'),
@@ -10,19 +10,21 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Count, Sum, F
+from django.db.models import Sum, F
 from django.http import JsonResponse, QueryDict
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
+from django.utils import timezone
 
 logger = logging.getLogger('transport')
 
 from ..models import (
     Chauffeur, Camion, Affectation, Client, Conteneur, ContratTransport,
     PrestationDeTransports, Entreprise, AuditLog, Mission, PaiementMission,
-    Notification, Reparation, Transitaire, CompagnieConteneur, Fournisseur
+    Notification, Transitaire, CompagnieConteneur, Fournisseur
 )
+from ..context_processors import invalidate_notifications_count
 
 
 # ============================================================================
@@ -1012,7 +1014,7 @@ def ajax_mission_update(request, pk):
     from ..forms.mission_forms import MissionForm
 
     try:
-        mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+        mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
         if request.method == 'GET':
             form = MissionForm(instance=mission)
@@ -1075,7 +1077,7 @@ def ajax_terminer_mission_modal_content(request, pk):
     """Contenu du modal pour terminer une mission via AJAX"""
     from django.utils import timezone
     try:
-        mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+        mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
         # Date de retour par défaut = aujourd'hui
         date_retour = timezone.now().date()
@@ -1124,7 +1126,7 @@ def ajax_terminer_mission(request, pk):
     from datetime import datetime
 
     try:
-        mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+        mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
         # Vérifier que la mission n'est pas déjà terminée ou annulée
         if mission.statut == 'terminée':
@@ -1194,7 +1196,7 @@ def ajax_filter_paiements(request):
         paiements = PaiementMission.objects.select_related(
             'mission', 'caution', 'prestation',
             'mission__contrat__chauffeur', 'mission__contrat__client'
-        ).filter(mission__contrat__entreprise=request.user.entreprise).order_by('-date_paiement')
+        ).filter(entreprise=request.user.entreprise).order_by('-date_paiement')
 
         # Appliquer les filtres
         paiements = PaiementMissionFilter.apply(paiements, request)
@@ -1232,7 +1234,7 @@ def ajax_validation_modal_content(request, pk):
     """Contenu du modal de validation de paiement via AJAX"""
     try:
         paiement = get_object_or_404(
-            PaiementMission.objects.filter(mission__contrat__entreprise=request.user.entreprise),
+            PaiementMission.objects.filter(entreprise=request.user.entreprise),
             pk_paiement=pk
         )
 
@@ -1271,7 +1273,7 @@ def ajax_validate_paiement(request, pk):
     """Valider un paiement via AJAX"""
     try:
         paiement = get_object_or_404(
-            PaiementMission.objects.filter(mission__contrat__entreprise=request.user.entreprise),
+            PaiementMission.objects.filter(entreprise=request.user.entreprise),
             pk_paiement=pk
         )
 
@@ -1328,9 +1330,9 @@ def ajax_validate_paiement(request, pk):
 def ajax_dashboard_filter(request):
     """Filtrer le dashboard via AJAX"""
     from datetime import datetime
-    from django.db.models import Count, Sum
+    from django.db.models import Sum
     from django.db.models.functions import TruncMonth
-    from django.utils import timezone
+    from ..dashboard_metrics import get_dashboard_metrics
 
     try:
         # Récupération des filtres de date
@@ -1354,39 +1356,30 @@ def ajax_dashboard_filter(request):
 
         # Application des filtres
         entreprise = request.user.entreprise
-        missions_qs = Mission.objects.filter(contrat__entreprise=entreprise)
-        if date_debut:
-            missions_qs = missions_qs.filter(date_depart__gte=date_debut)
-        if date_fin:
-            missions_qs = missions_qs.filter(date_depart__lte=date_fin)
-
-        paiements_qs = PaiementMission.objects.filter(mission__contrat__entreprise=entreprise)
+        paiements_qs = PaiementMission.objects.filter(entreprise=entreprise)
         if date_debut:
             paiements_qs = paiements_qs.filter(date_paiement__gte=date_debut)
         if date_fin:
             paiements_qs = paiements_qs.filter(date_paiement__lte=date_fin)
 
-        reparations_qs = Reparation.objects.filter(camion__entreprise=entreprise)
-        if date_debut:
-            reparations_qs = reparations_qs.filter(date_reparation__gte=date_debut)
-        if date_fin:
-            reparations_qs = reparations_qs.filter(date_reparation__lte=date_fin)
+        # KPIs calculés en une requête par table (agrégation conditionnelle)
+        metrics = get_dashboard_metrics(entreprise, date_debut, date_fin)
 
         # Statistiques
         stats = {
-            "chauffeurs": Chauffeur.objects.filter(entreprise=entreprise).count(),
-            "camions": Camion.objects.filter(entreprise=entreprise).count(),
-            "missions": missions_qs.count(),
-            "missions_en_cours": missions_qs.filter(statut="en cours").count(),
-            "missions_terminees": missions_qs.filter(statut="terminée").count(),
-            "reparations": reparations_qs.count(),
-            "paiements": paiements_qs.aggregate(total=Sum("montant_total"))["total"] or 0,
-            "clients": Client.objects.filter(entreprise=entreprise).count(),
-            "affectations": Affectation.objects.filter(chauffeur__entreprise=entreprise).count(),
+            "chauffeurs": metrics.total_chauffeurs,
+            "camions": metrics.total_camions,
+            "missions": metrics.total_missions,
+            "missions_en_cours": metrics.missions_en_cours,
+            "missions_terminees": metrics.missions_terminees,
+            "reparations": metrics.total_reparations,
+            "paiements": metrics.total_paiements,
+            "clients": metrics.total_clients,
+            "affectations": metrics.affectations,
         }
 
         # Missions par statut
-        mission_par_statut = list(missions_qs.values("statut").annotate(total=Count("statut")))
+        mission_par_statut = metrics.missions_par_statut
 
         # Paiements mensuels
         paiements_mensuels = list(
@@ -1398,23 +1391,10 @@ def ajax_dashboard_filter(request):
         )
 
         # Calcul des revenus
-        if date_debut and date_fin:
-            revenus_mois_actuel = paiements_qs.aggregate(total=Sum("montant_total"))["total"] or 0
-        else:
-            current_month = timezone.now().month
-            current_year = timezone.now().year
-            revenus_mois_actuel = PaiementMission.objects.filter(
-                mission__contrat__entreprise=entreprise,
-                date_paiement__month=current_month,
-                date_paiement__year=current_year
-            ).aggregate(total=Sum("montant_total"))["total"] or 0
+        revenus_mois_actuel = metrics.revenus_mois_actuel
 
         # Missions en retard
-        today = timezone.now().date()
-        missions_en_retard = missions_qs.filter(
-            statut="en cours",
-            date_retour__lt=today
-        ).count() if missions_qs.filter(statut="en cours").exists() else 0
+        missions_en_retard = metrics.missions_en_retard
 
         return JsonResponse({
             'success': True,
@@ -1467,7 +1447,9 @@ def ajax_mark_all_notifications_read(request):
         count = Notification.objects.filter(
             utilisateur=request.user,
             is_read=False
-        ).update(is_read=True)
+        ).update(is_read=True, updated_at=timezone.now())
+        # update() ne déclenche pas les signaux
+        invalidate_notifications_count(request.user.pk)
 
         # Log
         if count > 0:
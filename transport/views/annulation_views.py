@@ -20,7 +20,7 @@ def annuler_contrat_view(request, pk):
     Cette vue affiche un formulaire de confirmation avant d'annuler le contrat.
     L'annulation est en cascade: contrat → missions → cautions → paiements
     """
-    contrat = get_object_or_404(ContratTransport, pk=pk, entreprise=request.user.entreprise)
+    contrat = get_object_or_404(ContratTransport, pk_contrat=pk, entreprise=request.user.entreprise)
 
     # Vérifier que le contrat n'est pas déjà annulé
     if contrat.statut == 'annule':
@@ -84,7 +84,7 @@ def annuler_mission_view(request, pk):
     Cette vue affiche un formulaire de confirmation avant d'annuler la mission.
     L'annulation affecte: mission → cautions → paiements
     """
-    mission = get_object_or_404(Mission, pk=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
     # Vérifier que la mission n'est pas déjà annulée
     if mission.statut == 'annulée':
@@ -156,7 +156,7 @@ def contrats_annules_list(request):
 @manager_or_admin_required
 def missions_annulees_list(request):
     """Liste toutes les missions annulées pour consultation et audit"""
-    missions = Mission.objects.filter(statut='annulée', contrat__entreprise=request.user.entreprise).select_related(
+    missions = Mission.objects.filter(statut='annulée', entreprise=request.user.entreprise).select_related(
         'contrat', 'prestation_transport'
     ).order_by('-date_depart')
 
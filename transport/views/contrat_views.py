@@ -123,7 +123,7 @@ def create_contrat(request):
 
 @login_required
 def update_contrat(request, pk):
-    contrat = get_object_or_404(ContratTransport, pk=pk, entreprise=request.user.entreprise)
+    contrat = get_object_or_404(ContratTransport, pk_contrat=pk, entreprise=request.user.entreprise)
 
     # Bloquer la modification d'un contrat annulé
     if contrat.statut == 'annule':
@@ -193,7 +193,7 @@ def update_contrat(request, pk):
 def delete_contrat(request, pk):
     from ..models import Mission, Cautions
 
-    contrat = get_object_or_404(ContratTransport, pk=pk)
+    contrat = get_object_or_404(ContratTransport, pk_contrat=pk)
 
     if request.method == "POST":
         # Vérifier si le contrat a des missions
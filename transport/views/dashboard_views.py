@@ -11,21 +11,24 @@ from django.contrib import messages
 from django.db.models import Count, Sum, F, Q
 from django.db.models.functions import TruncMonth, TruncYear
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from ..models import (
-    Chauffeur, Camion, Mission, Reparation, PaiementMission, Affectation,
-    Client, Notification, AuditLog, Entreprise, ContratTransport,
+    Chauffeur, Camion, Mission, Reparation, PaiementMission,
+    Notification, AuditLog, AuditMensuel, AuditCompteurJour, Entreprise, ContratTransport,
     PieceReparee, Utilisateur
 )
 from ..decorators import manager_or_admin_required
+from ..dashboard_metrics import get_dashboard_metrics
+from ..context_processors import invalidate_notifications_count
 
 logger = logging.getLogger('transport')
 
 
 @login_required
 def dashboard(request):
-    from datetime import timedelta, datetime
-    from django.utils import timezone
+    from datetime import datetime
 
     # ========== RÉCUPÉRATION DES FILTRES DE DATE ==========
     date_debut_str = request.GET.get('date_debut', '')
@@ -49,14 +52,14 @@ def dashboard(request):
     # ========== APPLICATION DES FILTRES ==========
     # Missions queryset with filters
     entreprise = request.user.entreprise
-    missions_qs = Mission.objects.filter(contrat__entreprise=entreprise)
+    missions_qs = Mission.objects.filter(entreprise=entreprise)
     if date_debut:
         missions_qs = missions_qs.filter(date_depart__gte=date_debut)
     if date_fin:
         missions_qs = missions_qs.filter(date_depart__lte=date_fin)
 
     # Paiements queryset with filters
-    paiements_qs = PaiementMission.objects.filter(mission__contrat__entreprise=entreprise)
+    paiements_qs = PaiementMission.objects.filter(entreprise=entreprise)
     if date_debut:
         paiements_qs = paiements_qs.filter(date_paiement__gte=date_debut)
     if date_fin:
@@ -69,21 +72,24 @@ def dashboard(request):
     if date_fin:
         reparations_qs = reparations_qs.filter(date_reparation__lte=date_fin)
 
+    # KPIs calculés en une requête par table (agrégation conditionnelle)
+    metrics = get_dashboard_metrics(entreprise, date_debut, date_fin)
+
     # Statistiques générales
     stats = {
-        "chauffeurs": Chauffeur.objects.filter(entreprise=entreprise).count(),
-        "camions": Camion.objects.filter(entreprise=entreprise).count(),
-        "missions": missions_qs.count(),
-        "missions_en_cours": missions_qs.filter(statut="en cours").count(),
-        "missions_terminees": missions_qs.filter(statut="terminée").count(),
-        "reparations": reparations_qs.count(),
-        "paiements": paiements_qs.aggregate(total=Sum("montant_total"))["total"] or 0,
-        "clients": Client.objects.filter(contrattransport__entreprise=entreprise).distinct().count(),
-        "affectations": Affectation.objects.filter(chauffeur__entreprise=entreprise).count(),
+        "chauffeurs": metrics.total_chauffeurs,
+        "camions": metrics.total_camions,
+        "missions": metrics.total_missions,
+        "missions_en_cours": metrics.missions_en_cours,
+        "missions_terminees": metrics.missions_terminees,
+        "reparations": metrics.total_reparations,
+        "paiements": metrics.total_paiements,
+        "clients": metrics.clients_sous_contrat,
+        "affectations": metrics.affectations,
     }
 
     # Missions par statut pour le graphique
-    mission_par_statut = missions_qs.values("statut").annotate(total=Count("statut"))
+    mission_par_statut = metrics.missions_par_statut
 
     # Paiements mensuels
     paiements_mensuels = (
@@ -113,11 +119,7 @@ def dashboard(request):
     ).select_related('prestation_transport', 'contrat')[:5]
 
     # Alertes - Missions qui devraient être terminées (date retour passée)
-    today = timezone.now().date()
-    missions_en_retard = missions_qs.filter(
-        statut="en cours",
-        date_retour__lt=today
-    ).count() if missions_qs.filter(statut="en cours").exists() else 0
+    missions_en_retard = metrics.missions_en_retard
 
     # Réparations récentes
     reparations_recentes = reparations_qs.select_related(
@@ -126,31 +128,21 @@ def dashboard(request):
 
     # Statistiques par entreprise (limité à l'entreprise de l'utilisateur courant)
     entreprises_stats = []
-    user_entreprise = getattr(request.user, 'entreprise', None)
-    if user_entreprise:
+    if entreprise:
         entreprises_stats.append({
-            'nom': user_entreprise.nom,
-            'chauffeurs': Chauffeur.objects.filter(entreprise=user_entreprise).count(),
-            'camions': Camion.objects.filter(entreprise=user_entreprise).count(),
+            'nom': entreprise.nom,
+            'chauffeurs': metrics.total_chauffeurs,
+            'camions': metrics.total_camions,
         })
 
-    # Calcul des revenus du mois en cours (ou période filtrée)
-    if date_debut and date_fin:
-        revenus_mois_actuel = paiements_qs.aggregate(total=Sum("montant_total"))["total"] or 0
-    else:
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        revenus_mois_actuel = PaiementMission.objects.filter(
-            mission__contrat__entreprise=entreprise,
-            date_paiement__month=current_month,
-            date_paiement__year=current_year
-        ).aggregate(total=Sum("montant_total"))["total"] or 0
+    # Revenus du mois en cours (ou de la période filtrée)
+    revenus_mois_actuel = metrics.revenus_mois_actuel
 
     return render(request, "transport/dashboard.html", {
         "date_debut": date_debut,
         "date_fin": date_fin,
         "stats": stats,
-        "mission_par_statut": list(mission_par_statut),
+        "mission_par_statut": mission_par_statut,
         "paiements_mois_labels": mois_labels,
         "paiements_mois_values": montant_values,
         "dernieres_missions": dernieres_missions,
@@ -228,7 +220,9 @@ def mark_all_notifications_read(request):
         count = Notification.objects.filter(
             utilisateur=request.user,
             is_read=False
-        ).update(is_read=True)
+        ).update(is_read=True, updated_at=timezone.now())
+        # update() ne déclenche pas les signaux
+        invalidate_notifications_count(request.user.pk)
 
         if count > 0:
             messages.success(request, f"✅ {count} notification(s) marquée(s) comme lue(s).")
@@ -275,7 +269,7 @@ def tableau_bord_statistiques(request):
     # ========== STATISTIQUES GLOBALES ==========
     entreprise = request.user.entreprise
     # Apply date filters to missions
-    missions_qs = Mission.objects.filter(contrat__entreprise=entreprise)
+    missions_qs = Mission.objects.filter(entreprise=entreprise)
     if date_debut:
         missions_qs = missions_qs.filter(date_depart__gte=date_debut)
     if date_fin:
@@ -302,14 +296,15 @@ def tableau_bord_statistiques(request):
     if date_fin:
         pieces_qs = pieces_qs.filter(reparation__date_reparation__lte=date_fin)
 
-    total_missions = missions_qs.count()
-    total_camions = Camion.objects.filter(entreprise=entreprise).count()
-    total_chauffeurs = Chauffeur.objects.filter(entreprise=entreprise).count()
-    total_reparations = reparations_qs.count()
-    total_pieces = pieces_qs.count()
-    ca_total = contrats_qs.aggregate(total=Sum('montant_total'))['total'] or 0
-    cout_reparations_total = reparations_qs.aggregate(total=Sum('cout'))['total'] or 0
-    cout_pieces_total = pieces_qs.aggregate(total=Sum(F('quantite') * F('cout_unitaire')))['total'] or 0
+    metrics = get_dashboard_metrics(entreprise, date_debut, date_fin)
+    total_missions = metrics.total_missions
+    total_camions = metrics.total_camions
+    total_chauffeurs = metrics.total_chauffeurs
+    total_reparations = metrics.total_reparations
+    total_pieces = metrics.total_pieces
+    ca_total = metrics.chiffre_affaires
+    cout_reparations_total = metrics.cout_reparations_total
+    cout_pieces_total = metrics.cout_pieces_total
 
     # ========== TOP PERFORMERS ==========
 
@@ -513,19 +508,27 @@ def tableau_bord_statistiques(request):
 # AUDIT LOG / HISTORIQUE
 # ============================================================================
 
+def _date_parametre(request, nom):
+    """Date AAAA-MM-JJ lue dans request.GET, None si absente ou invalide."""
+    try:
+        return parse_date(request.GET.get(nom) or '')
+    except ValueError:
+        return None
+
+
 @manager_or_admin_required
 def audit_log_list(request):
     """
     Affiche l'historique complet des actions effectuées dans le système
     Accessible uniquement aux managers et admins
     """
-    from django.db.models import Count
-
     # Récupérer les logs filtrés par entreprise de l'utilisateur courant
-    all_logs = AuditLog.objects.select_related('utilisateur').filter(
+    logs = AuditLog.objects.select_related('utilisateur').filter(
         utilisateur__entreprise=request.user.entreprise
     ).order_by('-timestamp')
-    logs = all_logs
+
+    # Statistiques : sommes des compteurs journaliers (AuditCompteurJour)
+    compteurs = AuditCompteurJour.objects.filter(entreprise=request.user.entreprise)
 
     # Filtrage
     action_filter = request.GET.get('action')
@@ -540,19 +543,16 @@ def audit_log_list(request):
     if user_filter:
         logs = logs.filter(utilisateur__pk_utilisateur=user_filter)
 
-    date_debut = request.GET.get('date_debut')
+    # Période : appliquée aux logs et aux statistiques (dates invalides ignorées)
+    date_debut = _date_parametre(request, 'date_debut')
     if date_debut:
-        try:
-            logs = logs.filter(timestamp__date__gte=date_debut)
-        except ValueError:
-            pass
+        logs = logs.filter(timestamp__date__gte=date_debut)
+        compteurs = compteurs.filter(jour__gte=date_debut)
 
-    date_fin = request.GET.get('date_fin')
+    date_fin = _date_parametre(request, 'date_fin')
     if date_fin:
-        try:
-            logs = logs.filter(timestamp__date__lte=date_fin)
-        except ValueError:
-            pass
+        logs = logs.filter(timestamp__date__lte=date_fin)
+        compteurs = compteurs.filter(jour__lte=date_fin)
 
     # Pagination: limiter à 100 derniers logs par défaut, max 1000
     try:
@@ -561,18 +561,18 @@ def audit_log_list(request):
         limit = 100
     logs_limited = logs[:limit]
 
-    # Calculer des statistiques sur TOUS les logs (pas seulement les filtrés)
+    par_action = dict(compteurs.values_list('action').annotate(total=Sum('nombre')).order_by())
     stats = {
-        'total': all_logs.count(),
-        'creates': all_logs.filter(action='CREATE').count(),
-        'updates': all_logs.filter(action='UPDATE').count(),
-        'deletes': all_logs.filter(action='DELETE').count(),
-        'validations': all_logs.filter(action__in=['VALIDER_PAIEMENT', 'TERMINER_MISSION']).count(),
+        'total': sum(par_action.values()),
+        'creates': par_action.get('CREATE', 0),
+        'updates': par_action.get('UPDATE', 0),
+        'deletes': par_action.get('DELETE', 0),
+        'validations': par_action.get('VALIDER_PAIEMENT', 0) + par_action.get('TERMINER_MISSION', 0),
     }
 
     # Top 5 utilisateurs les plus actifs
-    top_users = all_logs.values('utilisateur__email').annotate(
-        count=Count('pk_audit')
+    top_users = compteurs.filter(utilisateur__isnull=False).values('utilisateur__email').annotate(
+        count=Sum('nombre')
     ).order_by('-count')[:5]
 
     # Récupérer les utilisateurs pour le filtre
@@ -607,45 +607,52 @@ def audit_log_detail(request, pk):
 @manager_or_admin_required
 def audit_cleanup(request):
     """
-    Nettoyer les anciens logs d'audit
+    Archiver les anciens logs d'audit
     Accessible uniquement aux administrateurs
+
+    Les logs sont déplacés dans des fichiers mensuels compressés
+    (transport.audit_archive) ; les compteurs sont lus dans le résumé
+    mensuel (AuditMensuel), sans COUNT sur le journal.
     """
-    from datetime import datetime, timedelta
-    from django.db.models import Count
+    from ..audit_archive import archiver, limite_conservation
 
     if request.method == 'POST':
-        months = int(request.POST.get('months', 6))
-
-        # Calculer la date limite
-        date_limite = datetime.now() - timedelta(days=months * 30)
-
-        # Récupérer les logs à supprimer
-        logs_to_delete = AuditLog.objects.filter(timestamp__lt=date_limite)
-        count = logs_to_delete.count()
-
-        # Supprimer
-        logs_to_delete.delete()
-
-        messages.success(request, f"✅ {count} enregistrement(s) d'audit supprimé(s) (plus de {months} mois)")
+        try:
+            months = int(request.POST.get('months', 6))
+        except (TypeError, ValueError):
+            months = 0
+        if months < 1:
+            messages.error(request, "❌ Période de conservation invalide")
+            return redirect('audit_cleanup')
+
+        archives = archiver(mois_conserves=months)
+        count = sum(nombre for _, nombre in archives)
+
+        messages.success(
+            request,
+            f"✅ {count} enregistrement(s) d'audit archivé(s) sur {len(archives)} mois (plus de {months} mois)"
+        )
         return redirect('audit_log_list')
 
     # GET: Afficher la page de confirmation
-    # Calculer les statistiques par période
+    resumes = list(AuditMensuel.objects.all())
+
+    # Calculer les statistiques par période (mois entiers)
     stats_by_period = []
     for months in [3, 6, 12, 24]:
-        date_limite = datetime.now() - timedelta(days=months * 30)
-        count = AuditLog.objects.filter(timestamp__lt=date_limite).count()
+        date_limite = limite_conservation(months)
         stats_by_period.append({
             'months': months,
-            'count': count,
+            'count': sum(resume.nombre for resume in resumes if resume.mois < date_limite),
             'date_limite': date_limite
         })
 
-    total_logs = AuditLog.objects.count()
+    total_logs = sum(resume.nombre for resume in resumes)
 
     return render(request, 'transport/audit/audit_cleanup.html', {
         'stats_by_period': stats_by_period,
         'total_logs': total_logs,
+        'archives': [resume for resume in resumes if resume.nombre_archive],
         'title': "Nettoyage de l'audit"
     })
 
@@ -26,7 +26,7 @@ def cautions_list(request):
     base_qs = Cautions.objects.select_related(
         'conteneur', 'contrat', 'transitaire', 'client', 'chauffeur', 'camion'
     )
-    qs = base_qs.filter(contrat__entreprise=entreprise).order_by('-pk_caution') if entreprise else base_qs.order_by('-pk_caution')
+    qs = base_qs.filter(entreprise=entreprise).order_by('-pk_caution') if entreprise else base_qs.order_by('-pk_caution')
     paginator = Paginator(qs, 20)
     try:
         cautions = paginator.page(request.GET.get('page', 1))
@@ -62,7 +62,7 @@ def create_caution(request):
 @login_required
 def update_caution(request, pk):
     caution = get_object_or_404(
-        Cautions.objects.filter(contrat__entreprise=request.user.entreprise),
+        Cautions.objects.filter(entreprise=request.user.entreprise),
         pk=pk
     )
     if request.method == "POST":
@@ -91,7 +91,7 @@ def update_caution(request, pk):
 @can_delete_data
 def delete_caution(request, pk):
     caution = get_object_or_404(
-        Cautions.objects.filter(contrat__entreprise=request.user.entreprise),
+        Cautions.objects.filter(entreprise=request.user.entreprise),
         pk=pk
     )
     if request.method == "POST":
@@ -109,7 +109,7 @@ def paiement_mission_list(request):
         'mission', 'caution', 'prestation',
         'mission__contrat__chauffeur', 'mission__contrat__client'
     )
-    paiements = base_qs.filter(mission__contrat__entreprise=entreprise).order_by('-date_paiement') if entreprise else base_qs.order_by('-date_paiement')
+    paiements = base_qs.filter(entreprise=entreprise).order_by('-date_paiement') if entreprise else base_qs.order_by('-date_paiement')
 
     # Appliquer les filtres
     paiements = PaiementMissionFilter.apply(paiements, request)
@@ -161,8 +161,8 @@ def create_paiement_mission(request):
 @login_required
 def update_paiement_mission(request, pk):
     paiement = get_object_or_404(
-        PaiementMission.objects.filter(mission__contrat__entreprise=request.user.entreprise),
-        pk=pk
+        PaiementMission.objects.filter(entreprise=request.user.entreprise),
+        pk_paiement=pk
     )
     if request.method == 'POST':
         form = PaiementMissionForm(request.POST, instance=paiement, user=request.user)
@@ -179,8 +179,8 @@ def update_paiement_mission(request, pk):
 @can_delete_data
 def delete_paiement_mission(request, pk):
     paiement = get_object_or_404(
-        PaiementMission.objects.filter(mission__contrat__entreprise=request.user.entreprise),
-        pk=pk
+        PaiementMission.objects.filter(entreprise=request.user.entreprise),
+        pk_paiement=pk
     )
     if request.method == 'POST':
         paiement.delete()
@@ -192,8 +192,8 @@ def delete_paiement_mission(request, pk):
 @can_validate_payment
 def valider_paiement_mission(request, pk):
     paiement = get_object_or_404(
-        PaiementMission.objects.filter(mission__contrat__entreprise=request.user.entreprise),
-        pk=pk
+        PaiementMission.objects.filter(entreprise=request.user.entreprise),
+        pk_paiement=pk
     )
 
     # Vérifier que le paiement n'est pas déjà validé
@@ -16,7 +16,7 @@ from ..decorators import (can_delete_data)
 
 @login_required
 def frais_list(request):
-    frais = FraisTrajet.objects.filter(mission__contrat__entreprise=request.user.entreprise)
+    frais = FraisTrajet.objects.filter(entreprise=request.user.entreprise)
     return render(request, 'transport/frais/frais_list.html', {'frais': frais, 'title': 'Liste des frais de trajet'})
 
 @login_required
@@ -47,7 +47,7 @@ def create_frais(request):
 
 @login_required
 def update_frais(request, pk):
-    frais = get_object_or_404(FraisTrajet, pk=pk, mission__contrat__entreprise=request.user.entreprise)
+    frais = get_object_or_404(FraisTrajet, pk=pk, entreprise=request.user.entreprise)
 
     if request.method == 'POST':
         form = FraisTrajetForm(request.POST, instance=frais, user=request.user)
@@ -62,7 +62,7 @@ def update_frais(request, pk):
 
 @can_delete_data
 def delete_frais(request, pk):
-    frais = get_object_or_404(FraisTrajet, pk=pk, mission__contrat__entreprise=request.user.entreprise)
+    frais = get_object_or_404(FraisTrajet, pk=pk, entreprise=request.user.entreprise)
     if request.method == 'POST':
         frais.delete()
         return redirect('frais_list')
@@ -72,7 +72,7 @@ def delete_frais(request, pk):
 @login_required
 def missions_data_api(request):
     """API pour récupérer les données des missions (pour auto-complétion du formulaire frais)"""
-    missions = Mission.objects.select_related('contrat').filter(contrat__entreprise=request.user.entreprise)
+    missions = Mission.objects.select_related('contrat').filter(entreprise=request.user.entreprise)
 
     data = {
         'missions': [
@@ -15,6 +15,7 @@ from ..models import (Mission, MissionConteneur, Chauffeur, Client, PaiementMiss
 from ..forms import (MissionForm, MissionConteneurForm)
 from ..decorators import (can_delete_data, manager_or_admin_required)
 from ..filters import MissionFilter
+from ..demurrage import calculer_frais, calendrier_par_defaut, tarif_journalier
 
 
 @login_required
@@ -23,7 +24,7 @@ def mission_list(request):
 
     # Récupérer les missions de l'entreprise avec relations
     missions = Mission.objects.filter(
-        contrat__entreprise=request.user.entreprise
+        entreprise=request.user.entreprise
     ).select_related('contrat', 'prestation_transport', 'contrat__chauffeur', 'contrat__client').order_by('-date_depart')
 
     # Appliquer les filtres
@@ -96,7 +97,7 @@ def create_mission(request):
 
 @login_required
 def update_mission(request, pk):
-    mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
     if request.method == 'POST':
         form = MissionForm(request.POST, instance=mission)
         if form.is_valid():
@@ -110,7 +111,7 @@ def update_mission(request, pk):
 
 @can_delete_data
 def delete_mission(request, pk):
-    mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
     if request.method == 'POST':
         mission.delete()
         return redirect('mission_list')
@@ -120,7 +121,7 @@ def delete_mission(request, pk):
 
 @login_required
 def terminer_mission(request, pk):
-    mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
     # Vérifier que la mission n'est pas déjà terminée ou annulée
     if mission.statut == 'terminée':
@@ -331,7 +332,7 @@ def annuler_mission(request, pk):
 @login_required
 def mission_conteneur_list(request):
     mission_conteneurs = MissionConteneur.objects.filter(
-        mission__contrat__entreprise=request.user.entreprise
+        mission__entreprise=request.user.entreprise
     )
     return render(request, 'transport/missions/mission_conteneur_list.html', {
         'title': 'Liste des Missions - Conteneurs',
@@ -395,7 +396,7 @@ def bloquer_stationnement(request, pk):
     Bloque une mission pour stationnement (demurrage)
     Le camion est arrivé et commence la période de stationnement
     """
-    mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
     # ✅ VÉRIFICATION: Empêcher le double blocage
     if mission.date_arrivee:
@@ -490,7 +491,7 @@ def marquer_dechargement(request, pk):
     """
     Marque le déchargement effectif et calcule les frais finaux
     """
-    mission = get_object_or_404(Mission, pk_mission=pk, contrat__entreprise=request.user.entreprise)
+    mission = get_object_or_404(Mission, pk_mission=pk, entreprise=request.user.entreprise)
 
     # ✅ VÉRIFICATION: La mission doit d'abord être bloquée
     if not mission.date_arrivee:
@@ -657,10 +658,9 @@ def preview_frais_stationnement(request, pk):
         - debut_facturation: Date de début de facturation
         - message: Message descriptif
     """
-    from datetime import datetime, timedelta
-    from decimal import Decimal
+    from datetime import datetime
 
-    mission = get_object_or_404(Mission, pk_mission=pk)
+    mission = get_object_or_404(Mission.objects.select_related('entreprise'), pk_mission=pk)
 
     # Vérifier que la mission est bloquée
     if not mission.date_arrivee:
@@ -694,84 +694,42 @@ def preview_frais_stationnement(request, pk):
             'message': f'La date de déchargement ne peut pas être avant la date d\'arrivée ({mission.date_arrivee.strftime("%d/%m/%Y")})'
         }, status=400)
 
-    # Calculer les frais pour cette date hypothétique
-    # On utilise la même logique que dans Mission.calculer_frais_stationnement()
-    # mais avec la date de déchargement fournie
-
-    TARIF_JOURNALIER = Decimal('25000.00')
+    # Calculer les frais pour cette date hypothétique, avec les mêmes règles
+    # que Mission.calculer_frais_stationnement()
+    calendrier = calendrier_par_defaut()
     date_arrivee = mission.date_arrivee
+    frais = calculer_frais(
+        date_arrivee, date_dechargement, tarif_journalier(mission.entreprise),
+        calendrier=calendrier, decharge=True,
+    )
+    montant_total = frais.montant
 
-    # Fonction helper pour vérifier si c'est un weekend
-    def est_weekend(date):
-        return date.weekday() >= 5  # 5=samedi, 6=dimanche
-
-    # Étape 1: Trouver le début de la période gratuite
-    debut_gratuit = date_arrivee
-    while est_weekend(debut_gratuit):
-        debut_gratuit += timedelta(days=1)
-
-    # Étape 2: Calculer la fin de la période gratuite (3 jours ouvrables)
-    jours_gratuits_comptes = 0
-    current_date = debut_gratuit
-    fin_gratuit = None
-
-    while jours_gratuits_comptes < 3:
-        if not est_weekend(current_date):
-            jours_gratuits_comptes += 1
-            if jours_gratuits_comptes == 3:
-                fin_gratuit = current_date
-                break
-        current_date += timedelta(days=1)
-
-    # Étape 3: Date de début de facturation (jour après la fin de la période gratuite)
-    debut_facturation = fin_gratuit + timedelta(days=1)
-
-    # Étape 4: Calculer les jours facturables
-    if date_dechargement >= debut_facturation:
-        # TOUS les jours comptent après la période gratuite (y compris weekends)
-        jours_facturables = (date_dechargement - debut_facturation).days + 1
-    else:
-        jours_facturables = 0
-
-    # Calculer le montant
-    montant_total = jours_facturables * TARIF_JOURNALIER
-
-    # Statistiques supplémentaires
-    jours_total = (date_dechargement - date_arrivee).days + 1
-
-    # Compter les jours ouvrables utilisés
-    jours_ouvrables_utilises = 0
-    current = date_arrivee
-    while current <= date_dechargement:
-        if not est_weekend(current):
-            jours_ouvrables_utilises += 1
-        current += timedelta(days=1)
-
-    jours_gratuits_utilises = min(3, jours_ouvrables_utilises)
+    # Jours gratuits effectivement utilisés
+    jours_gratuits_utilises = min(frais.jours_gratuits, calendrier.jours_ouvres(date_arrivee, date_dechargement))
 
     # Message descriptif
-    if jours_facturables == 0:
+    if frais.jours_facturables == 0:
         message = "Aucun frais - Déchargement dans la période gratuite"
         statut = "gratuit"
     else:
-        message = f"{jours_facturables} jour(s) facturable(s) × {TARIF_JOURNALIER:,.0f} CFA = {montant_total:,.0f} CFA"
+        message = f"{frais.jours_facturables} jour(s) facturable(s) × {frais.tarif_journalier:,.0f} CFA = {montant_total:,.0f} CFA"
         statut = "payant"
 
     return JsonResponse({
         'success': True,
-        'jours_total': jours_total,
+        'jours_total': frais.jours_total,
         'jours_gratuits': jours_gratuits_utilises,
-        'jours_facturables': jours_facturables,
+        'jours_facturables': frais.jours_facturables,
         'montant': str(montant_total),
         'montant_formatted': f'{montant_total:,.0f}'.replace(',', ' '),
-        'debut_gratuit': debut_gratuit.strftime('%Y-%m-%d'),
-        'fin_gratuit': fin_gratuit.strftime('%Y-%m-%d'),
-        'debut_facturation': debut_facturation.strftime('%Y-%m-%d'),
+        'debut_gratuit': frais.debut_gratuit.strftime('%Y-%m-%d'),
+        'fin_gratuit': frais.fin_gratuit.strftime('%Y-%m-%d'),
+        'debut_facturation': frais.debut_facturation.strftime('%Y-%m-%d'),
         'date_arrivee': date_arrivee.strftime('%Y-%m-%d'),
         'date_dechargement': date_dechargement.strftime('%Y-%m-%d'),
         'message': message,
         'statut': statut,
-        'tarif_journalier': str(TARIF_JOURNALIER)
+        'tarif_journalier': str(frais.tarif_journalier)
     })
 
 # Liste
@@ -62,6 +62,9 @@ MIDDLEWARE = [
     'transport.middleware.CsrfExemptAPIMiddleware',  # Exempte les routes /api/ de CSRF
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'transport.perf_middleware.ProfilageMiddleware',  # Server-Timing et /internal/perf/ (PERF_*)
+    'transport.audit_middleware.AuditTamponMiddleware',  # Écrit le tampon d'audit après la réponse
+    'transport.audit_middleware.AuditMiddleware',  # Trace les POST/PUT/PATCH/DELETE dans l'audit
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'transport.middleware.LoginRequiredMiddleware',
@@ -98,6 +101,120 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Backend sélectionnable via DJANGO_CACHE_BACKEND : locmem (défaut), file ou db.
+# Pour "db", créer la table une fois avec : python manage.py createcachetable
+# locmem est propre à chaque processus : dès que le serveur tourne avec
+# plusieurs workers (gunicorn, uwsgi), choisir file ou db pour que
+# l'invalidation des snapshots du dashboard atteigne tous les workers.
+
+_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'transport-cache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'transport_cache'),
+    },
+}
+CACHES = {
+    'default': _CACHE_BACKENDS.get(
+        os.environ.get('DJANGO_CACHE_BACKEND', 'locmem'), _CACHE_BACKENDS['locmem']
+    ),
+}
+
+# Durée de vie (secondes) des snapshots de KPIs du dashboard par entreprise.
+# Les snapshots sont invalidés par les signaux dès qu'une donnée source change.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Durée de vie (secondes) des compteurs de la barre de navigation
+# (notifications non lues, missions en cours), invalidés par les signaux.
+NOTIFICATIONS_CACHE_TIMEOUT = int(os.environ.get('NOTIFICATIONS_CACHE_TIMEOUT', 60))
+
+# Durée de conservation (heures) des fichiers produits par les exports en
+# arrière-plan (MEDIA_ROOT/exports/), purgés par run_export_worker.
+EXPORT_JOB_TTL_HOURS = int(os.environ.get('EXPORT_JOB_TTL_HOURS', 24))
+
+# Nombre de processus pour le rendu des factures en lot (défaut : nombre de CPU).
+INVOICE_RENDER_WORKERS = int(os.environ['INVOICE_RENDER_WORKERS']) if os.environ.get('INVOICE_RENDER_WORKERS') else None
+
+# Frais de stationnement (demurrage) : tarif journalier par défaut (FCFA),
+# remplacé par Entreprise.tarif_stationnement s'il est renseigné, nombre de
+# jours ouvrables gratuits et jours fériés exclus des jours ouvrables
+# (dates AAAA-MM-JJ séparées par des virgules, aucun par défaut).
+DEMURRAGE_TARIF_JOURNALIER = os.environ.get('DEMURRAGE_TARIF_JOURNALIER', '25000')
+DEMURRAGE_JOURS_GRATUITS = int(os.environ.get('DEMURRAGE_JOURS_GRATUITS', 3))
+DEMURRAGE_JOURS_FERIES = [
+    jour.strip() for jour in os.environ.get('DEMURRAGE_JOURS_FERIES', '').split(',') if jour.strip()
+]
+
+# Clés primaires courtes et croissantes pour les nouveaux contrats, prestations,
+# cautions, missions et paiements (voir transport/cles.py). Les clés
+# existantes ne changent pas ; mesurer le gain avec `manage.py benchmark_cles`.
+CLES_COMPACTES = os.environ.get('CLES_COMPACTES', 'False').lower() in ('true', '1', 'yes')
+
+# Clés primaires entières (BigAutoField) pour ContratTransport, Mission et
+# PaiementMission ; le slug reste une colonne unique `reference` (URLs et API
+# inchangées). Le mode est fixé quand `migrate` applique la migration
+# transport.0044_cles_entieres (installation ou mise à jour), qui convertit
+# la base : sans retour arrière, sauvegarder avant. Changer ce réglage après
+# coup est refusé par la vérification transport.E001.
+CLES_ENTIERES = os.environ.get('CLES_ENTIERES', 'False').lower() in ('true', '1', 'yes')
+
+# Synchronisation incrémentale de l'application mobile (/api/v1/sync/, voir
+# transport/api/sync.py). Les traces de suppression sont conservées
+# SYNC_RETENTION_JOURS jours (purge : `manage.py purger_suppressions_sync`) ;
+# un client plus ancien refait une synchronisation complète. La marge écarte
+# les écritures des dernières secondes, dont la transaction peut être ouverte.
+SYNC_RETENTION_JOURS = int(os.environ.get('SYNC_RETENTION_JOURS', '30'))
+SYNC_MARGE_SECONDES = int(os.environ.get('SYNC_MARGE_SECONDES', '5'))
+
+# Journal d'audit : AuditLog.log_action écrit par lots (transport/audit_buffer.py),
+# en fin de requête (AuditTamponMiddleware) ou dès AUDIT_TAMPON_TAILLE entrées ;
+# un thread de veille écrit les entrées en attente depuis AUDIT_TAMPON_SECONDES.
+# En cas d'échec, les entrées vont dans AUDIT_FICHIER_SECOURS, rejoué par
+# `manage.py rejouer_audit_secours`. AUDIT_TAMPON=False : écriture immédiate.
+AUDIT_TAMPON = os.environ.get('AUDIT_TAMPON', 'True').lower() in ('true', '1', 'yes')
+AUDIT_TAMPON_TAILLE = int(os.environ.get('AUDIT_TAMPON_TAILLE', '100'))
+AUDIT_TAMPON_SECONDES = int(os.environ.get('AUDIT_TAMPON_SECONDES', '5'))
+AUDIT_FICHIER_SECOURS = os.environ.get('AUDIT_FICHIER_SECOURS', str(BASE_DIR / 'logs' / 'audit_secours.jsonl'))
+
+# Archivage du journal d'audit (transport/audit_archive.py) : les mois plus
+# anciens que AUDIT_RETENTION_MOIS mois entiers sont déplacés dans
+# MEDIA_ROOT/audit_archives/AAAA-MM.jsonl.gz par `manage.py archiver_audit`,
+# AUDIT_ARCHIVE_LOT entrées par transaction. Recherche :
+# `manage.py rechercher_audit_archive`.
+AUDIT_RETENTION_MOIS = int(os.environ.get('AUDIT_RETENTION_MOIS', '12'))
+AUDIT_ARCHIVE_LOT = int(os.environ.get('AUDIT_ARCHIVE_LOT', '1000'))
+
+# Audit des requêtes de modification (transport/audit_middleware.py) : une
+# entrée REQUETE par POST/PUT/PATCH/DELETE d'un utilisateur connecté, sauf
+# AJAX et chemins commençant par un préfixe de AUDIT_CHEMINS_IGNORES.
+AUDIT_REQUETES = os.environ.get('AUDIT_REQUETES', 'True').lower() in ('true', '1', 'yes')
+AUDIT_CHEMINS_IGNORES = tuple(
+    chemin.strip() for chemin in os.environ.get(
+        'AUDIT_CHEMINS_IGNORES', '/admin/,/static/,/media/,/api/,/audit/'
+    ).split(',') if chemin.strip()
+)
+
+# Profilage des requêtes (transport/perf_middleware.py) : nombre et durée des
+# requêtes SQL, doublons et N+1, en-tête Server-Timing et rapport
+# /internal/perf/. PERF_PROFILAGE=True profile toutes les requêtes ; sinon
+# seules les requêtes d'un superutilisateur portant l'en-tête PERF_ENTETE.
+# Les PERF_ECHANTILLONS dernières mesures de chaque vue restent en cache
+# PERF_RETENTION_SECONDES secondes.
+PERF_PROFILAGE = os.environ.get('PERF_PROFILAGE', 'False').lower() in ('true', '1', 'yes')
+PERF_ENTETE = os.environ.get('PERF_ENTETE', 'X-Profilage')
+PERF_SEUIL_N_PLUS_1 = int(os.environ.get('PERF_SEUIL_N_PLUS_1', '5'))
+PERF_ECHANTILLONS = int(os.environ.get('PERF_ECHANTILLONS', '200'))
+PERF_RETENTION_SECONDES = int(os.environ.get('PERF_RETENTION_SECONDES', '86400'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -283,7 +400,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page par numéro, par curseur (?pagination=curseur) ou sans total (?total=false)
+    'DEFAULT_PAGINATION_CLASS': 'transport.api.pagination.PaginationAdaptative',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',